@@ -0,0 +1,260 @@
+"""
+Interpretation gateway in front of the AI client
+Identical requests are answered from a TTL cache keyed by a canonical prompt
+fingerprint, concurrent identical requests share one upstream call
+(singleflight), and upstream calls are capped by a concurrency limit with a
+bounded wait queue so bursts are shed instead of piling up threads. Every
+upstream call has a deadline and every caller waits a bounded time, falling
+back to a caller-supplied result instead of hanging on a stuck model.
+
+Load-test offline against the stub client with:
+    python ai_gateway.py --requests 2000 --distinct 50 --threads 32 --latency 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+from cache_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_SIZE = 5000
+AI_CACHE_TTL = 6 * 3600           # seconds an interpretation is reused
+AI_MAX_CONCURRENCY = 4            # upstream calls in flight at once
+AI_MAX_QUEUE = 32                 # callers allowed to wait for a slot
+AI_QUEUE_TIMEOUT = 10.0           # seconds a caller waits for a slot
+AI_CALL_TIMEOUT = 30.0            # seconds an upstream call may take
+
+
+class AIGatewayBusy(RuntimeError):
+    """The upstream concurrency limit and its wait queue are both full"""
+
+
+class AIGatewayTimeout(AIGatewayBusy):
+    """The upstream call (or the wait for another caller's call) ran past its deadline"""
+
+
+def fingerprint(kind: str, payload: Any) -> str:
+    """Stable key for a request: kind plus the canonical JSON of its inputs"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return f"{kind}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}"
+
+
+class _Call:
+    """One upstream call that any number of callers can wait on"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AIGateway:
+    """Cached, deduplicated, concurrency-limited access to an AI client"""
+
+    def __init__(self, client, cache_size: int = AI_CACHE_SIZE, ttl: int = AI_CACHE_TTL,
+                 max_concurrency: int = AI_MAX_CONCURRENCY, max_queue: int = AI_MAX_QUEUE,
+                 queue_timeout: float = AI_QUEUE_TIMEOUT, call_timeout: float = AI_CALL_TIMEOUT):
+        self.client = client
+        self.ttl = ttl
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Upstream calls run here so the caller can stop waiting; a call past its
+        # deadline keeps its slot until the client returns, so the limit still holds
+        self._calls = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ai-upstream')
+        self._in_flight: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {'calls': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0, 'timeouts': 0,
+                       'fallbacks': 0, 'call_ms': 0.0}
+
+    def generate(self, key: str, prompt: str, fallback: Optional[str] = None) -> str:
+        """Return the interpretation for ``prompt``, calling upstream at most once per key
+
+        When the call fails, is shed or misses its deadline, ``fallback`` is
+        returned (and not cached) if given; otherwise the error is raised.
+        """
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            return self._generate(key, prompt)
+        except Exception:
+            if fallback is None:
+                raise
+            with self._lock:
+                self._stats['fallbacks'] += 1
+            return fallback
+
+    def _generate(self, key: str, prompt: str) -> str:
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            # The leader gives up within queue + call timeout; the margin covers its bookkeeping
+            if not call.done.wait(self.queue_timeout + self.call_timeout + 1.0):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise AIGatewayTimeout(f"No AI response for {key} within the gateway deadline")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._call_upstream(prompt)
+            self._cache.set(key, call.result)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+
+    def _call_upstream(self, prompt: str) -> str:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._stats['rejected'] += 1
+                logger.warning(f"AI gateway shedding request: {self.max_queue} callers already waiting")
+                raise AIGatewayBusy(f"AI gateway queue full ({self.max_queue} waiting)")
+            self._queued += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._queued -= 1
+        if not acquired:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise AIGatewayBusy(f"No AI slot free within {self.queue_timeout}s")
+
+        started = time.perf_counter()
+        with self._lock:
+            self._active += 1
+
+        def finished(future):
+            with self._lock:
+                self._active -= 1
+                self._stats['calls'] += 1
+                self._stats['call_ms'] += (time.perf_counter() - started) * 1000
+                if future.exception() is not None:
+                    self._stats['errors'] += 1
+            self._slots.release()
+
+        future = self._calls.submit(self.client.generate, prompt)
+        future.add_done_callback(finished)
+        try:
+            return future.result(timeout=self.call_timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            logger.warning(f"AI upstream call exceeded {self.call_timeout}s; answering without it")
+            raise AIGatewayTimeout(f"AI upstream call exceeded {self.call_timeout}s")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(in_flight=self._active, queued=self._queued)
+        calls = stats.pop('call_ms')
+        stats['avg_call_ms'] = round(calls / stats['calls'], 2) if stats['calls'] else 0.0
+        stats['cache'] = self._cache.stats()
+        return stats
+
+
+class StubAIClient:
+    """Deterministic offline stand-in for the AI client
+
+    The same prompt always yields the same text, and ``latency`` seconds of
+    simulated model time make gateway load tests meaningful.
+    """
+
+    PHRASES = [
+        "The cards speak of a threshold you are already standing on.",
+        "What feels like delay is the ground being prepared.",
+        "Old patterns loosen as the moon turns; let them.",
+        "Trust the quieter voice beneath the question.",
+        "A choice made in clarity now echoes for months.",
+        "Balance what you give with what you allow yourself to receive.",
+    ]
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).digest())
+        return " ".join(rng.sample(self.PHRASES, 3))
+
+
+def load_test(gateway: AIGateway, requests: int, distinct: int, threads: int,
+              make_prompt: Callable[[int], str] = lambda i: f"reading {i}") -> Dict:
+    """Fire ``requests`` calls over ``distinct`` prompts from ``threads`` workers"""
+    rng = random.Random(7)
+    picks = [rng.randrange(distinct) for _ in range(requests)]
+
+    def one(i: int) -> bool:
+        prompt = make_prompt(i)
+        try:
+            gateway.generate(fingerprint('load_test', prompt), prompt)
+            return True
+        except AIGatewayBusy:
+            return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        failures = sum(1 for ok in pool.map(one, picks) if not ok)
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'shed': failures,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(requests / elapsed, 1) if elapsed else 0.0,
+        'gateway': gateway.get_stats()
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the AI gateway against the stub client")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=50, help="number of distinct prompts")
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated model latency in seconds")
+    parser.add_argument('--concurrency', type=int, default=AI_MAX_CONCURRENCY)
+    parser.add_argument('--queue', type=int, default=AI_MAX_QUEUE)
+    args = parser.parse_args(argv)
+
+    client = StubAIClient(latency=args.latency)
+    gateway = AIGateway(client, max_concurrency=args.concurrency, max_queue=args.queue)
+    result = load_test(gateway, args.requests, args.distinct, args.threads)
+    result['upstream_calls'] = client.calls
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,184 @@
+"""
+Event ingestion pipeline for STAR analytics
+Bounded in-memory queue drained by a background flusher that writes events
+in bulk, size- or time-triggered. A full queue rejects new events instead of
+blocking requests (drops are counted), failed batches are retried a bounded
+number of times with backoff, and pending events are drained on shutdown
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+INGEST_QUEUE_SIZE = 10000
+INGEST_BATCH_SIZE = 100        # flush as soon as this many events are waiting
+INGEST_FLUSH_INTERVAL = 1.0    # ... or this many seconds after the first one arrived
+DROP_LOG_EVERY = 1000
+STOP_POLL_SECONDS = 0.1        # how quickly an idle or collecting flusher notices stop()
+INGEST_MAX_RETRIES = 3         # re-writes of a failed batch before its events count as failed
+INGEST_RETRY_DELAY = 0.5       # seconds before the first retry; doubles with each attempt
+
+# write_batch(events) persists one batch; raising marks the whole batch failed
+BatchWriter = Callable[[List[Any]], None]
+
+
+class EventIngestor:
+    """Bounded queue with a bulk write-behind flusher"""
+
+    def __init__(self, write_batch: BatchWriter, max_queue: int = INGEST_QUEUE_SIZE,
+                 batch_size: int = INGEST_BATCH_SIZE, flush_interval: float = INGEST_FLUSH_INTERVAL,
+                 max_retries: int = INGEST_MAX_RETRIES, retry_delay: float = INGEST_RETRY_DELAY):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._retries: Deque[Tuple[float, int, List[Any]]] = deque()  # (retry at, failed attempts, batch)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.accepted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+
+    def submit(self, event: Any) -> bool:
+        """Queue one event; returns False (and counts a drop) when the queue is full"""
+        return self.submit_many([event])[0] == 1
+
+    def submit_many(self, events: Sequence[Any]) -> Tuple[int, int]:
+        """Queue events in order until the queue fills; returns (accepted, dropped)"""
+        accepted = 0
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                break
+            accepted += 1
+        dropped = len(events) - accepted
+
+        with self._lock:
+            self.accepted += accepted
+            if dropped:
+                previous = self.dropped
+                self.dropped += dropped
+                if previous // DROP_LOG_EVERY != self.dropped // DROP_LOG_EVERY or previous == 0:
+                    logger.warning(f"Analytics ingest queue full: {self.dropped} events dropped so far")
+        if accepted:
+            self._ensure_flusher()
+        return accepted, dropped
+
+    def _collect(self) -> List[Any]:
+        """Wait for the first event, then gather until the batch is full or the interval elapses"""
+        try:
+            batch = [self._queue.get(timeout=STOP_POLL_SECONDS)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, STOP_POLL_SECONDS)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _write(self, batch: List[Any], attempts: int = 0) -> None:
+        with self._write_lock:
+            try:
+                self.write_batch(batch)
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+            except Exception as e:
+                attempts += 1
+                with self._lock:
+                    if attempts <= self.max_retries:
+                        delay = self.retry_delay * 2 ** (attempts - 1)
+                        self._retries.append((time.monotonic() + delay, attempts, batch))
+                        self.retried += 1
+                    else:
+                        self.failed += len(batch)
+                if attempts <= self.max_retries:
+                    logger.warning(f"Analytics batch write failed ({len(batch)} events, attempt {attempts}), "
+                                   f"retrying in {delay:.1f}s: {e}")
+                else:
+                    logger.error(f"Analytics batch write failed ({len(batch)} events) after {attempts} attempts, "
+                                 f"giving up: {e}")
+
+    def _write_retries(self, force: bool = False) -> int:
+        """Re-write failed batches whose backoff has elapsed (all of them with ``force``)"""
+        now = time.monotonic()
+        with self._lock:
+            due = [item for item in self._retries if force or item[0] <= now]
+            if not due:
+                return 0
+            self._retries = deque(item for item in self._retries if not (force or item[0] <= now))
+        for _, attempts, batch in due:
+            self._write(batch, attempts)
+        return len(due)
+
+    def flush(self) -> int:
+        """Write everything currently queued, in batches. Returns events taken off the queue."""
+        taken = 0
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return taken
+            taken += len(batch)
+            self._write(batch)
+
+    def _ensure_flusher(self) -> None:
+        if self._stopped.is_set():
+            return
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._run, name='analytics-ingest', daemon=True)
+                    self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._write_retries()
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop accepting background work and drain whatever is still queued or awaiting a retry"""
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout)
+        self.flush()
+        while self._write_retries(force=True):
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'accepted': self.accepted,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'retried': self.retried,
+                'retrying': sum(len(batch) for _, _, batch in self._retries),
+                'batches': self.batches
+            }
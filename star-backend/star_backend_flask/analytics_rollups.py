@@ -0,0 +1,352 @@
+"""
+Incremental analytics rollups for STAR
+Hourly and daily pre-aggregates of ingested engagement events: counts by
+event type, element, lunar phase and hour of day, plus HyperLogLog sketches
+of unique users, and a running platform engagement average. Dashboards read
+a bounded number of buckets for any time range instead of scanning events.
+Buckets live in memory and, when Redis is configured, in Redis hashes and
+native HyperLogLogs shared by all workers
+
+Backfill from stored events with:
+    python analytics_rollups.py backfill --days 90
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from ephemeris import get_ephemeris_engine
+from lunar_table import get_lunar_table
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_HOURLY_RETENTION_DAYS = 14   # older ranges are answered at day granularity
+ROLLUP_KEY_PREFIX = "rollup"
+HLL_PRECISION = 12                  # 4096 registers, ~1.6% standard error
+
+LUNAR_PHASE_NAMES = ("new_moon", "waxing_crescent", "first_quarter", "waxing_gibbous",
+                     "full_moon", "waning_gibbous", "last_quarter", "waning_crescent")
+
+ROLLUP_BACKFILL_DAYS = 30           # default backfill window (and per-process warm-up without Redis)
+ENGAGEMENT_SCALE = 1000             # scores are summed as fixed-point integers
+
+# (user_id, event_type, timestamp, element or None)
+RollupEvent = Tuple[str, str, datetime, Optional[str]]
+
+
+class HyperLogLog:
+    """Fixed-size distinct-count sketch; mergeable by register-wise max"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value: str) -> None:
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class RollupBucket:
+    """Aggregates for one hour or one day"""
+
+    __slots__ = ('total', 'types', 'elements', 'phases', 'hours', 'users')
+
+    def __init__(self):
+        self.total = 0
+        self.types: Counter = Counter()
+        self.elements: Counter = Counter()
+        self.phases: Counter = Counter()
+        self.hours: List[int] = [0] * 24
+        self.users = HyperLogLog()
+
+    def add(self, user_id: str, event_type: str, hour: int, element: Optional[str], phase: Optional[str]) -> None:
+        self.total += 1
+        self.types[event_type] += 1
+        self.hours[hour] += 1
+        if element:
+            self.elements[element] += 1
+        if phase:
+            self.phases[phase] += 1
+        self.users.add(user_id)
+
+
+def lunar_phase_names(instants: List[datetime]) -> List[str]:
+    """Eight-way lunar phase at each (naive UTC) instant"""
+    if not instants:
+        return []
+    table = get_lunar_table()
+    if table is not None and table.covers(*instants):
+        longitudes = table.longitudes_for(instants, ["Moon", "Sun"])
+    else:
+        longitudes = get_ephemeris_engine().longitudes(instants, ["Moon", "Sun"])
+    elongation = (longitudes[:, 0] - longitudes[:, 1]) % 360.0
+    indices = ((elongation + 22.5) // 45.0).astype(int) % 8
+    return [LUNAR_PHASE_NAMES[i] for i in indices]
+
+
+class AnalyticsRollups:
+    """Hourly/daily pre-aggregates updated as events are ingested"""
+
+    def __init__(self, redis_manager: Any = None, hourly_retention_days: int = ROLLUP_HOURLY_RETENTION_DAYS):
+        self.redis = redis_manager
+        self.hourly_retention_days = hourly_retention_days
+        self._hourly: Dict[datetime, RollupBucket] = {}
+        self._daily: Dict[date, RollupBucket] = {}
+        self._phases: Dict[datetime, str] = {}
+        self._score_sum = 0
+        self._score_users = 0
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.client is not None
+
+    def _hour_key(self, hour: datetime) -> str:
+        return f"{ROLLUP_KEY_PREFIX}:hour:{hour.strftime('%Y-%m-%dT%H')}"
+
+    def _day_key(self, day: date) -> str:
+        return f"{ROLLUP_KEY_PREFIX}:day:{day.isoformat()}"
+
+    def _engagement_key(self) -> str:
+        return f"{ROLLUP_KEY_PREFIX}:engagement"
+
+    def _hourly_ttl(self) -> int:
+        return (self.hourly_retention_days + 1) * 86400
+
+    def _hourly_cutoff(self) -> datetime:
+        return datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=self.hourly_retention_days)
+
+    def _phase_for_hours(self, hours: Iterable[datetime]) -> Dict[datetime, str]:
+        """Lunar phase at the middle of each hour, computed once per hour"""
+        with self._lock:
+            missing = sorted({hour for hour in hours if hour not in self._phases})
+        if missing:
+            names = lunar_phase_names([hour + timedelta(minutes=30) for hour in missing])
+            with self._lock:
+                self._phases.update(zip(missing, names))
+                cutoff = self._hourly_cutoff()
+                for stale in [hour for hour in self._phases if hour < cutoff and hour not in missing]:
+                    del self._phases[stale]
+        with self._lock:
+            return dict(self._phases)
+
+    def record_many(self, events: Iterable[RollupEvent]) -> None:
+        """Fold ingested events into their hour and day buckets"""
+        normalized = []
+        for user_id, event_type, timestamp, element in events:
+            if timestamp.tzinfo is not None:
+                timestamp = (timestamp - timestamp.utcoffset()).replace(tzinfo=None)
+            normalized.append((user_id, event_type, timestamp.replace(minute=0, second=0, microsecond=0), element))
+        if not normalized:
+            return
+
+        phases = self._phase_for_hours(hour for _, _, hour, _ in normalized)
+        cutoff = self._hourly_cutoff()
+        # Redis increments and HyperLogLog members, split by whether the key expires
+        fields: Dict[bool, Dict[str, Counter]] = {True: {}, False: {}}
+        members: Dict[bool, Dict[str, List[str]]] = {True: {}, False: {}}
+
+        with self._lock:
+            for user_id, event_type, hour, element in normalized:
+                phase = phases.get(hour)
+                targets = [(False, self._day_key(hour.date()), self._daily, hour.date())]
+                if hour >= cutoff:
+                    targets.append((True, self._hour_key(hour), self._hourly, hour))
+                for hourly, key, store, slot in targets:
+                    bucket = store.get(slot)
+                    if bucket is None:
+                        bucket = store[slot] = RollupBucket()
+                    bucket.add(user_id, event_type, hour.hour, element, phase)
+
+                    counts = fields[hourly].setdefault(key, Counter())
+                    counts['total'] += 1
+                    counts['type:' + event_type] += 1
+                    counts['hour:' + str(hour.hour)] += 1
+                    if element:
+                        counts['element:' + element] += 1
+                    if phase:
+                        counts['phase:' + phase] += 1
+                    members[hourly].setdefault(key + ':users', []).append(user_id)
+            for stale in [slot for slot in self._hourly if slot < cutoff]:
+                del self._hourly[stale]
+            self.recorded += len(normalized)
+
+        if self._use_redis():
+            for hourly, ex in ((True, self._hourly_ttl()), (False, None)):
+                self.redis.hincrby_many({key: dict(counts) for key, counts in fields[hourly].items()}, ex=ex)
+                self.redis.pfadd_many(members[hourly], ex=ex)
+
+    def reset_day(self, day: date) -> None:
+        """Drop a day's buckets (and its hours) before it is rebuilt by a backfill"""
+        start = datetime.combine(day, time())
+        hours = [start + timedelta(hours=offset) for offset in range(24)]
+        with self._lock:
+            self._daily.pop(day, None)
+            for hour in hours:
+                self._hourly.pop(hour, None)
+        if self._use_redis():
+            for key in [self._day_key(day)] + [self._hour_key(hour) for hour in hours]:
+                self.redis.delete(key)
+                self.redis.delete(key + ':users')
+
+    def _plan(self, start: datetime, end: datetime) -> Tuple[List[date], List[datetime]]:
+        """Split [start, end) into whole days and edge hours; hours past retention widen to their day"""
+        first_hour = start.replace(minute=0, second=0, microsecond=0)
+        first_day = start.date() if start == datetime.combine(start.date(), time()) else start.date() + timedelta(days=1)
+        last_day = end.date()
+        days: List[date] = []
+        hours: List[datetime] = []
+
+        if datetime.combine(first_day, time()) <= datetime.combine(last_day, time()):
+            day = first_day
+            while day < last_day:
+                days.append(day)
+                day += timedelta(days=1)
+            edges = [(first_hour, datetime.combine(first_day, time())), (datetime.combine(last_day, time()), end)]
+        else:
+            edges = [(first_hour, end)]
+
+        cutoff = self._hourly_cutoff()
+        for edge_start, edge_end in edges:
+            hour = edge_start
+            while hour < edge_end:
+                if hour >= cutoff:
+                    hours.append(hour)
+                elif hour.date() not in days:
+                    days.append(hour.date())
+                hour += timedelta(hours=1)
+        return days, hours
+
+    def _merge_fields(self, summary: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        for field, value in fields.items():
+            value = int(value)
+            if field == 'total':
+                summary['total'] += value
+            else:
+                group, _, name = field.partition(':')
+                if group == 'type':
+                    summary['event_types'][name] += value
+                elif group == 'element':
+                    summary['elements'][name] += value
+                elif group == 'phase':
+                    summary['lunar_phases'][name] += value
+                elif group == 'hour':
+                    summary['hours'][int(name)] += value
+
+    def summary(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Aggregates over [start, end), to the hour (to the day beyond hourly retention)"""
+        days, hours = self._plan(start, end)
+        keys = [self._day_key(day) for day in days] + [self._hour_key(hour) for hour in hours]
+        summary: Dict[str, Any] = {
+            'total': 0,
+            'event_types': Counter(),
+            'elements': Counter(),
+            'lunar_phases': Counter(),
+            'hours': [0] * 24,
+            'unique_users': 0
+        }
+
+        if self._use_redis():
+            hashes = self.redis.hgetall_many(keys)
+            unique_users = self.redis.pfcount(key + ':users' for key in keys)
+            if hashes is not None and unique_users is not None:
+                for fields in hashes:
+                    self._merge_fields(summary, fields or {})
+                summary['unique_users'] = unique_users
+                return summary
+
+        users = HyperLogLog()
+        with self._lock:
+            buckets = [self._daily[day] for day in days if day in self._daily]
+            buckets += [self._hourly[hour] for hour in hours if hour in self._hourly]
+            for bucket in buckets:
+                summary['total'] += bucket.total
+                summary['event_types'].update(bucket.types)
+                summary['elements'].update(bucket.elements)
+                summary['lunar_phases'].update(bucket.phases)
+                for hour, count in enumerate(bucket.hours):
+                    summary['hours'][hour] += count
+                users.merge(bucket.users)
+        summary['unique_users'] = users.count() if buckets else 0
+        return summary
+
+    def record_engagement_score(self, previous: Optional[float], score: float) -> None:
+        """Fold one user's engagement score change into the running platform average"""
+        delta = int(round(score * ENGAGEMENT_SCALE)) - (int(round(previous * ENGAGEMENT_SCALE)) if previous is not None else 0)
+        new_user = 1 if previous is None else 0
+        with self._lock:
+            self._score_sum += delta
+            self._score_users += new_user
+        if self._use_redis():
+            self.redis.hincrby_many({self._engagement_key(): {'sum': delta, 'users': new_user}})
+
+    def reset_engagement(self, scores: Iterable[float]) -> None:
+        """Replace the running engagement totals (used by backfill)"""
+        scores = list(scores)
+        total = sum(int(round(score * ENGAGEMENT_SCALE)) for score in scores)
+        with self._lock:
+            self._score_sum = total
+            self._score_users = len(scores)
+        if self._use_redis():
+            self.redis.delete(self._engagement_key())
+            self.redis.hincrby_many({self._engagement_key(): {'sum': total, 'users': len(scores)}})
+
+    def average_engagement(self) -> Optional[float]:
+        """Mean engagement score over all users with insights; None until any are known"""
+        if self._use_redis():
+            hashes = self.redis.hgetall_many([self._engagement_key()])
+            if hashes is not None:
+                fields = hashes[0] or {}
+                users = int(fields.get('users', 0))
+                return int(fields.get('sum', 0)) / ENGAGEMENT_SCALE / users if users else None
+        with self._lock:
+            return self._score_sum / ENGAGEMENT_SCALE / self._score_users if self._score_users else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hourly_buckets': len(self._hourly),
+                'daily_buckets': len(self._daily),
+                'recorded': self.recorded,
+                'redis_enabled': self._use_redis()
+            }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild analytics rollups from stored events")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    backfill = subcommands.add_parser('backfill', help="recompute the last N days of rollups and the engagement average")
+    backfill.add_argument('--days', type=int, default=ROLLUP_BACKFILL_DAYS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from analytics_engine import get_analytics_engine
+    from cosmos_db import get_cosmos_helper
+
+    engine = get_analytics_engine(get_cosmos_helper())
+    asyncio.run(engine.backfill_rollups(args.days))
@@ -75,18 +75,18 @@ def track_engagement():
             location=data.get('location')
         )
         
-        # Track the event
+        # Queue the event; it is written in bulk by the ingest flusher
         engine = get_analytics_engine()
-        success = asyncio.run(engine.track_engagement(event))
-        
-        if success:
+        if engine.enqueue_engagement(event):
             return jsonify({
                 'success': True,
-                'message': 'Engagement tracked successfully',
+                'message': 'Engagement queued',
                 'timestamp': event.timestamp.isoformat()
-            })
+            }), 202
         else:
-            return jsonify({'error': 'Failed to track engagement'}), 500
+            response = jsonify({'error': 'Analytics ingestion is saturated, event dropped'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
             
     except Exception as e:
         logger.error(f"Error in track_engagement: {e}")
@@ -259,15 +259,19 @@ def get_engagement_summary():
         # Get recent events for activity calculation
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days)
-        recent_events = asyncio.run(engine._get_recent_events(user_id, days))
+        if days <= engine.user_index.retention_days:
+            activity = asyncio.run(engine.get_user_activity(user_id, days))
+            activity_counts = activity['event_counts']
+        else:
+            from collections import Counter
+            recent_events = asyncio.run(engine._get_recent_events(user_id, days))
+            activity_counts = Counter(event.get('event_type', 'unknown') for event in recent_events)
         
         # Calculate activity metrics
-        total_activities = len(recent_events)
+        total_activities = sum(activity_counts.values())
         daily_average = total_activities / max(1, days)
         
         # Most common activities
-        from collections import Counter
-        activity_counts = Counter(event.get('event_type', 'unknown') for event in recent_events)
         top_activities = [
             {'type': activity, 'count': count}
             for activity, count in activity_counts.most_common(5)
@@ -333,7 +337,7 @@ def batch_track_engagement():
         user_id = g.current_user['id']
         engine = get_analytics_engine()
         
-        successful_tracks = 0
+        events = []
         failed_tracks = 0
         errors = []
         
@@ -379,30 +383,30 @@ def batch_track_engagement():
                     location=event_data.get('location')
                 )
                 
-                # Track the event
-                success = asyncio.run(engine.track_engagement(event))
-                
-                if success:
-                    successful_tracks += 1
-                else:
-                    failed_tracks += 1
-                    errors.append(f"Event {i}: Failed to track engagement")
+                events.append(event)
                     
             except Exception as e:
                 failed_tracks += 1
                 errors.append(f"Event {i}: {str(e)}")
         
+        # Queue the whole batch at once; events beyond the queue's capacity are dropped
+        successful_tracks, dropped = engine.ingestor.submit_many(events)
+        if dropped:
+            failed_tracks += dropped
+            errors.append(f"{dropped} events dropped: analytics ingestion is saturated")
+        
         return jsonify({
             'success': successful_tracks > 0,
             'summary': {
                 'total_events': len(data['events']),
                 'successful': successful_tracks,
                 'failed': failed_tracks,
+                'dropped': dropped,
                 'success_rate': (successful_tracks / len(data['events'])) * 100 if data['events'] else 0
             },
             'errors': errors[:10],  # Limit error messages
             'timestamp': datetime.utcnow().isoformat()
-        })
+        }), 202 if successful_tracks else (503 if dropped else 400)
         
     except Exception as e:
         logger.error(f"Error in batch_track_engagement: {e}")
@@ -486,16 +490,19 @@ def analytics_health():
         engine = get_analytics_engine()
         
         # Basic health indicators
-        cache_size = len(engine.engagement_cache)
+        ingest_stats = engine.ingestor.get_stats()
         insights_cached = len(engine.insights_cache)
         
         return jsonify({
             'status': 'healthy',
             'analytics_engine': 'operational',
             'cache_stats': {
-                'engagement_events_cached': cache_size,
+                'engagement_events_queued': ingest_stats['queued'],
                 'user_insights_cached': insights_cached
             },
+            'ingestion': ingest_stats,
+            'user_index': engine.user_index.get_stats(),
+            'rollups': engine.rollups.get_stats(),
             'timestamp': datetime.utcnow().isoformat()
         })
         
@@ -7,15 +7,20 @@ import datetime
 import json
 import logging
 from functools import wraps
-from typing import Any, Dict, Optional
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional
 
 from cosmos_db import get_cosmos_helper
-from flask import Blueprint, g, jsonify, request
+from event_solver import EVENT_KINDS, get_event_solver, parse_cursor
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from oracle_engine import (MoonPhase, OccultOracleEngine, TarotSpread,
-                           ZodiacSign)
+from lunar_table import start_lunar_table_refresher
+from oracle_engine_enhanced import (MoonPhase, OccultOracleEngine,
+                                    TarotSpread, ZodiacSign)
 from star_auth import token_required
+from zodiac_atlas import decode as zodiac_decode
+from zodiac_atlas import get_zodiac_atlas
 
 # Initialize Oracle API Blueprint
 oracle_bp = Blueprint('oracle', __name__, url_prefix='/api/v1/oracle')
@@ -34,6 +39,9 @@ def init_oracle_engine(ai_client=None):
     global oracle_engine
     cosmos_helper = get_cosmos_helper()
     oracle_engine = OccultOracleEngine(cosmos_helper, ai_client)
+    # Keeps the precomputed lunar table covering the next months; lookups
+    # fall back to live ephemeris until the first build lands
+    start_lunar_table_refresher()
     logging.info("Oracle Engine initialized successfully")
 
 def oracle_required(f):
@@ -70,6 +78,141 @@ def validate_birth_data(data: Dict) -> tuple[bool, str]:
     
     return True, ""
 
+# ========== RESPONSE PAYLOADS ==========
+
+def tarot_cards_payload(cards) -> list:
+    """Drawn (name, reversed, position) triples for API responses"""
+    return [
+        {
+            'name': card_name,
+            'reversed': reversed_flag,
+            'position': position,
+            'position_meaning': position
+        }
+        for card_name, reversed_flag, position in cards
+    ]
+
+def natal_chart_payload(chart) -> Dict:
+    """Natal chart positions for API responses"""
+    return {
+        'sun': {
+            'sign': chart.sun.zodiac_sign.value[0],
+            'degree': round(chart.sun.degree, 2),
+            'longitude': round(chart.sun.longitude, 2)
+        },
+        'moon': {
+            'sign': chart.moon.zodiac_sign.value[0],
+            'degree': round(chart.moon.degree, 2),
+            'longitude': round(chart.moon.longitude, 2)
+        },
+        'mercury': {
+            'sign': chart.mercury.zodiac_sign.value[0],
+            'degree': round(chart.mercury.degree, 2)
+        },
+        'venus': {
+            'sign': chart.venus.zodiac_sign.value[0],
+            'degree': round(chart.venus.degree, 2)
+        },
+        'mars': {
+            'sign': chart.mars.zodiac_sign.value[0],
+            'degree': round(chart.mars.degree, 2)
+        },
+        'jupiter': {
+            'sign': chart.jupiter.zodiac_sign.value[0],
+            'degree': round(chart.jupiter.degree, 2)
+        },
+        'saturn': {
+            'sign': chart.saturn.zodiac_sign.value[0],
+            'degree': round(chart.saturn.degree, 2)
+        },
+        'ascendant': {
+            'sign': chart.ascendant.zodiac_sign.value[0],
+            'degree': round(chart.ascendant.degree, 2)
+        },
+        'midheaven': {
+            'sign': chart.midheaven.zodiac_sign.value[0],
+            'degree': round(chart.midheaven.degree, 2)
+        },
+        'houses': [round(house, 2) for house in chart.houses]
+    }
+
+def aspect_payload(aspect) -> Dict:
+    """Single natal aspect for API responses"""
+    return {
+        'planet1': aspect.planet1,
+        'planet2': aspect.planet2,
+        'aspect': aspect.aspect_type.value[0],
+        'orb': round(aspect.orb, 2),
+        'exact_angle': round(aspect.exact_angle, 2),
+        'applying': aspect.applying,
+        'interpretation': aspect.interpretation
+    }
+
+def transit_payload(transit) -> Dict:
+    """Single transit for API responses"""
+    return {
+        'transiting_planet': transit.transiting_planet,
+        'natal_planet': transit.natal_planet,
+        'aspect': transit.aspect_type.value[0],
+        'exact_date': transit.exact_date.isoformat(),
+        'orb': round(transit.orb, 2),
+        'interpretation': transit.interpretation,
+        'peak_influence': {
+            'start': transit.peak_influence[0].isoformat(),
+            'end': transit.peak_influence[1].isoformat()
+        }
+    }
+
+def moon_payload(moon_data) -> Dict:
+    """Current moon for API responses"""
+    return {
+        'phase': moon_data.phase.value[0],
+        'illumination': round(moon_data.illumination, 1),
+        'zodiac_sign': moon_data.zodiac_sign.value[0],
+        'degree': round(moon_data.degree, 1),
+        'void_of_course': moon_data.void_of_course
+    }
+
+def hexagram_payload(hexagram) -> Dict:
+    """Cast I Ching hexagram for API responses"""
+    return {
+        'number': hexagram.number,
+        'name': hexagram.name,
+        'trigrams': {
+            'upper': hexagram.trigrams[0],
+            'lower': hexagram.trigrams[1]
+        },
+        'meaning': hexagram.meaning,
+        'judgment': hexagram.judgment,
+        'image': hexagram.image,
+        'changing_lines': hexagram.changing_lines
+    }
+
+def session_payload(session) -> Dict:
+    """Complete oracle session summary for API responses"""
+    return {
+        'id': session.session_id,
+        'timestamp': session.timestamp.isoformat(),
+        'summary': session.session_summary,
+        'recommendations': session.recommendations,
+        'tarot_reading_id': session.tarot_reading.id if session.tarot_reading else None,
+        'numerology_highlights': {
+            'life_path': session.numerology_profile.get('life_path'),
+            'personal_year': session.numerology_profile.get('personal_year'),
+            'personal_year_meaning': session.numerology_profile.get('personal_year_meaning')
+        },
+        'moon_phase': session.moon_data.phase.value[0] if session.moon_data else None,
+        'i_ching_hexagram': {
+            'name': session.i_ching_hexagram.name,
+            'number': session.i_ching_hexagram.number,
+            'meaning': session.i_ching_hexagram.meaning
+        } if session.i_ching_hexagram else None,
+        'major_transits': len([t for t in session.current_transits if 'Jupiter' in t.transiting_planet or 'Saturn' in t.transiting_planet]),
+        'partial': bool(session.stage_errors),
+        'failed_stages': sorted(session.stage_errors),
+        'stage_timings_ms': session.stage_timings
+    }
+
 # ========== HEALTH & STATUS ENDPOINTS ==========
 
 @oracle_bp.route('/health', methods=['GET'])
@@ -173,15 +316,7 @@ def create_tarot_reading():
                 'id': reading.id,
                 'spread_type': reading.spread_type.value[0],
                 'question': question,
-                'cards': [
-                    {
-                        'name': card_name,
-                        'reversed': reversed_flag,
-                        'position': position,
-                        'position_meaning': position
-                    }
-                    for card_name, reversed_flag, position in reading.cards
-                ],
+                'cards': tarot_cards_payload(reading.cards),
                 'overall_energy': reading.overall_energy,
                 'ai_interpretation': reading.ai_interpretation,
                 'lunar_influence': reading.lunar_influence,
@@ -270,47 +405,7 @@ def calculate_natal_chart():
         # Convert to API response
         response = {
             'status': 'success',
-            'natal_chart': {
-                'sun': {
-                    'sign': chart.sun.zodiac_sign.value[0],
-                    'degree': round(chart.sun.degree, 2),
-                    'longitude': round(chart.sun.longitude, 2)
-                },
-                'moon': {
-                    'sign': chart.moon.zodiac_sign.value[0],
-                    'degree': round(chart.moon.degree, 2),
-                    'longitude': round(chart.moon.longitude, 2)
-                },
-                'mercury': {
-                    'sign': chart.mercury.zodiac_sign.value[0],
-                    'degree': round(chart.mercury.degree, 2)
-                },
-                'venus': {
-                    'sign': chart.venus.zodiac_sign.value[0],
-                    'degree': round(chart.venus.degree, 2)
-                },
-                'mars': {
-                    'sign': chart.mars.zodiac_sign.value[0],
-                    'degree': round(chart.mars.degree, 2)
-                },
-                'jupiter': {
-                    'sign': chart.jupiter.zodiac_sign.value[0],
-                    'degree': round(chart.jupiter.degree, 2)
-                },
-                'saturn': {
-                    'sign': chart.saturn.zodiac_sign.value[0],
-                    'degree': round(chart.saturn.degree, 2)
-                },
-                'ascendant': {
-                    'sign': chart.ascendant.zodiac_sign.value[0],
-                    'degree': round(chart.ascendant.degree, 2)
-                },
-                'midheaven': {
-                    'sign': chart.midheaven.zodiac_sign.value[0],
-                    'degree': round(chart.midheaven.degree, 2)
-                },
-                'houses': [round(house, 2) for house in chart.houses]
-            }
+            'natal_chart': natal_chart_payload(chart)
         }
         
         return jsonify(response)
@@ -351,17 +446,7 @@ def calculate_aspects():
         aspects = oracle_engine.calculate_aspects(chart, orb_tolerance)
         
         # Convert to API response
-        aspects_data = []
-        for aspect in aspects:
-            aspects_data.append({
-                'planet1': aspect.planet1,
-                'planet2': aspect.planet2,
-                'aspect': aspect.aspect_type.value[0],
-                'orb': round(aspect.orb, 2),
-                'exact_angle': round(aspect.exact_angle, 2),
-                'applying': aspect.applying,
-                'interpretation': aspect.interpretation
-            })
+        aspects_data = [aspect_payload(aspect) for aspect in aspects]
         
         return jsonify({
             'status': 'success',
@@ -398,27 +483,15 @@ def calculate_transits():
             birth_date = datetime.datetime.fromisoformat(birth_date)
         
         birth_place = data['birth_place']
-        days_ahead = data.get('days_ahead', 30)
+        # Transits are sampled daily, so bound the window
+        days_ahead = max(0, min(int(data.get('days_ahead', 30)), 365))
         
         # Calculate chart and transits
         chart = oracle_engine.calculate_natal_chart_cached(birth_date, birth_place)
         transits = oracle_engine.calculate_transits(chart, days_ahead=days_ahead)
         
         # Convert to API response
-        transits_data = []
-        for transit in transits:
-            transits_data.append({
-                'transiting_planet': transit.transiting_planet,
-                'natal_planet': transit.natal_planet,
-                'aspect': transit.aspect_type.value[0],
-                'exact_date': transit.exact_date.isoformat(),
-                'orb': round(transit.orb, 2),
-                'interpretation': transit.interpretation,
-                'peak_influence': {
-                    'start': transit.peak_influence[0].isoformat(),
-                    'end': transit.peak_influence[1].isoformat()
-                }
-            })
+        transits_data = [transit_payload(transit) for transit in transits]
         
         return jsonify({
             'status': 'success',
@@ -434,6 +507,108 @@ def calculate_transits():
             'error': str(e)
         }), 500
 
+@oracle_bp.route('/astrology/events', methods=['GET'])
+@oracle_required
+def get_astrology_events():
+    """Page through exact ingresses, aspects, lunar phases and eclipses in a date range"""
+    try:
+        try:
+            start = datetime.datetime.fromisoformat(request.args['start']) if 'start' in request.args else datetime.datetime.utcnow()
+            end = datetime.datetime.fromisoformat(request.args['end']) if 'end' in request.args else start + datetime.timedelta(days=30)
+            cursor = parse_cursor(request.args['cursor']) if 'cursor' in request.args else None
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SS)'
+            }), 400
+        
+        kinds = [kind.strip() for kind in request.args.get('kinds', ','.join(EVENT_KINDS)).split(',') if kind.strip()]
+        if not kinds or set(kinds) - set(EVENT_KINDS):
+            return jsonify({
+                'status': 'error',
+                'message': f"kinds must be a comma-separated subset of: {', '.join(EVENT_KINDS)}"
+            }), 400
+        
+        end = min(end, start + datetime.timedelta(days=366))
+        limit = max(1, min(int(request.args.get('limit', 50)), 200))
+        
+        # Events stream in (time, kind, id) order, so a page only computes up to its
+        # last event; it resumes strictly after the cursor's key, keeping ties
+        events = get_event_solver().iter_events(cursor[0] if cursor else start, end, kinds=kinds)
+        if cursor:
+            events = (event for event in events if event.key > cursor)
+        page = list(islice(events, limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        
+        return jsonify({
+            'status': 'success',
+            'events': [event.to_dict() for event in page],
+            'count': len(page),
+            'next_cursor': page[-1].cursor if has_more else None
+        })
+        
+    except Exception as e:
+        logging.error(f"Astrology event search failed: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to find astrology events',
+            'error': str(e)
+        }), 500
+
+# ========== MULTI-ZODIAC ATLAS ENDPOINTS ==========
+
+ZODIAC_BULK_MAX = 10000
+
+@oracle_bp.route('/zodiac/bulk', methods=['POST'])
+@oracle_required
+@limiter.limit("30 per minute")
+def bulk_zodiac_lookup():
+    """Resolve Western, Chinese, Vedic, Mayan and Aztec signs for many birthdates at once"""
+    try:
+        data = request.get_json() or {}
+        dates = data.get('dates')
+        if not isinstance(dates, list) or not dates:
+            return jsonify({
+                'status': 'error',
+                'message': 'dates must be a non-empty list of ISO dates'
+            }), 400
+        if len(dates) > ZODIAC_BULK_MAX:
+            return jsonify({
+                'status': 'error',
+                'message': f"At most {ZODIAC_BULK_MAX} dates per request"
+            }), 400
+        
+        ordinals, valid = [], []
+        for value in dates:
+            try:
+                ordinals.append(datetime.date.fromisoformat(str(value)[:10]).toordinal())
+                valid.append(True)
+            except ValueError:
+                valid.append(False)
+        
+        # One vectorized atlas read for the whole batch
+        records = get_zodiac_atlas().lookup_ordinals(ordinals)
+        decoded = iter(zodiac_decode(record) for record in records)
+        results = [
+            dict(next(decoded), date=str(value)[:10]) if ok else {'date': value, 'error': 'Invalid date'}
+            for value, ok in zip(dates, valid)
+        ]
+        
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'count': len(results)
+        })
+        
+    except Exception as e:
+        logging.error(f"Bulk zodiac lookup failed: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to resolve zodiac signs',
+            'error': str(e)
+        }), 500
+
 # ========== MOON PHASE ENDPOINTS ==========
 
 @oracle_bp.route('/moon/current', methods=['GET'])
@@ -446,13 +621,7 @@ def get_current_moon():
         
         return jsonify({
             'status': 'success',
-            'moon_data': {
-                'phase': moon_data.phase.value[0],
-                'illumination': round(moon_data.illumination, 1),
-                'zodiac_sign': moon_data.zodiac_sign.value[0],
-                'degree': round(moon_data.degree, 1),
-                'void_of_course': moon_data.void_of_course
-            },
+            'moon_data': moon_payload(moon_data),
             'guidance': lunar_guidance
         })
         
@@ -552,19 +721,7 @@ def cast_i_ching():
         
         return jsonify({
             'status': 'success',
-            'hexagram': {
-                'number': hexagram.number,
-                'name': hexagram.name,
-                'trigrams': {
-                    'upper': hexagram.trigrams[0],
-                    'lower': hexagram.trigrams[1]
-                },
-                'meaning': hexagram.meaning,
-                'judgment': hexagram.judgment,
-                'image': hexagram.image,
-                'changing_lines': hexagram.changing_lines,
-                'question': question
-            }
+            'hexagram': dict(hexagram_payload(hexagram), question=question)
         })
         
     except Exception as e:
@@ -617,25 +774,7 @@ def create_complete_oracle_session():
         # Convert to API response
         response = {
             'status': 'success',
-            'session': {
-                'id': session.session_id,
-                'timestamp': session.timestamp.isoformat(),
-                'summary': session.session_summary,
-                'recommendations': session.recommendations,
-                'tarot_reading_id': session.tarot_reading.id if session.tarot_reading else None,
-                'numerology_highlights': {
-                    'life_path': session.numerology_profile.get('life_path'),
-                    'personal_year': session.numerology_profile.get('personal_year'),
-                    'personal_year_meaning': session.numerology_profile.get('personal_year_meaning')
-                },
-                'moon_phase': session.moon_data.phase.value[0],
-                'i_ching_hexagram': {
-                    'name': session.i_ching_hexagram.name,
-                    'number': session.i_ching_hexagram.number,
-                    'meaning': session.i_ching_hexagram.meaning
-                } if session.i_ching_hexagram else None,
-                'major_transits': len([t for t in session.current_transits if 'Jupiter' in t.transiting_planet or 'Saturn' in t.transiting_planet])
-            }
+            'session': session_payload(session)
         }
         
         return jsonify(response)
@@ -648,6 +787,181 @@ def create_complete_oracle_session():
             'error': str(e)
         }), 500
 
+# ========== STREAMING ENDPOINTS ==========
+# Server-Sent Events variants that emit each section as soon as it is ready,
+# so the first bytes go out after the fastest stage rather than the slowest
+
+SSE_CHUNK_CHARS = 160   # interpretation text per event
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def text_chunks(text: str, size: int = SSE_CHUNK_CHARS) -> Iterator[str]:
+    """Split text into pieces of about ``size`` characters on word boundaries"""
+    chunk = ''
+    for word in (text or '').split(' '):
+        if chunk and len(chunk) + len(word) + 1 > size:
+            yield chunk + ' '
+            chunk = word
+        else:
+            chunk = f"{chunk} {word}" if chunk else word
+    if chunk:
+        yield chunk
+
+def sse_response(events: Iterator[str]) -> Response:
+    """Stream events without proxy buffering"""
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def interpretation_events(reading) -> Iterator[str]:
+    """AI interpretation in chunks followed by the rest of the reading"""
+    for chunk in text_chunks(reading.ai_interpretation):
+        yield sse_event('interpretation', {'text': chunk})
+    yield sse_event('reading', {
+        'id': reading.id,
+        'spread_type': reading.spread_type.value[0],
+        'overall_energy': reading.overall_energy,
+        'lunar_influence': reading.lunar_influence,
+        'timestamp': reading.timestamp.isoformat()
+    })
+
+@oracle_bp.route('/tarot/reading/stream', methods=['POST'])
+@token_required
+@oracle_required
+@limiter.limit("5 per minute")
+def stream_tarot_reading():
+    """Stream a tarot reading: cards, then the moon, then the interpretation"""
+    data = request.get_json() or {}
+    user_id = g.current_user.get('id') if hasattr(g, 'current_user') else 'anonymous'
+    spread_name = data.get('spread', 'Celtic Cross')
+    question = data.get('question', '')
+    spread_type = next(
+        (spread for spread in TarotSpread if spread.value[0] == spread_name),
+        TarotSpread.CELTIC_CROSS
+    )
+    
+    def events():
+        try:
+            cards = oracle_engine.draw_spread(spread_type)
+            yield sse_event('cards', {
+                'spread_type': spread_type.value[0],
+                'question': question,
+                'cards': tarot_cards_payload(cards)
+            })
+            moon_data = oracle_engine.calculate_moon_phase()
+            yield sse_event('moon', moon_payload(moon_data))
+            reading = oracle_engine.interpret_spread(spread_type, cards, question, user_id, moon_data=moon_data)
+            yield from interpretation_events(reading)
+            yield sse_event('done', {'status': 'success'})
+        except Exception as e:
+            logging.error(f"Streaming tarot reading failed: {e}")
+            yield sse_event('error', {'message': 'Failed to create tarot reading', 'error': str(e)})
+    
+    return sse_response(events())
+
+@oracle_bp.route('/astrology/natal-chart/stream', methods=['POST'])
+@token_required
+@oracle_required
+@limiter.limit("10 per minute")
+def stream_natal_chart():
+    """Stream a natal chart, then its aspects, then upcoming transits"""
+    data = request.get_json() or {}
+    valid, error_msg = validate_birth_data(data)
+    if not valid:
+        return jsonify({
+            'status': 'error',
+            'message': error_msg
+        }), 400
+    
+    birth_date = data['birth_date']
+    if isinstance(birth_date, str):
+        birth_date = datetime.datetime.fromisoformat(birth_date)
+    birth_place = data['birth_place']
+    try:
+        orb_tolerance = float(data.get('orb_tolerance', 8.0))
+        days_ahead = max(0, min(int(data.get('days_ahead', 30)), 365))
+    except (TypeError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': 'orb_tolerance and days_ahead must be numbers'
+        }), 400
+    
+    def events():
+        try:
+            chart = oracle_engine.calculate_natal_chart_cached(birth_date, birth_place)
+            yield sse_event('natal_chart', natal_chart_payload(chart))
+            aspects = oracle_engine.calculate_aspects(chart, orb_tolerance)
+            yield sse_event('aspects', [aspect_payload(aspect) for aspect in aspects])
+            transits = oracle_engine.calculate_transits(chart, days_ahead=days_ahead)
+            yield sse_event('transits', [transit_payload(transit) for transit in transits])
+            yield sse_event('done', {'status': 'success'})
+        except Exception as e:
+            logging.error(f"Streaming natal chart failed: {e}")
+            yield sse_event('error', {'message': 'Failed to calculate natal chart', 'error': str(e)})
+    
+    return sse_response(events())
+
+@oracle_bp.route('/session/complete/stream', methods=['POST'])
+@token_required
+@oracle_required
+@limiter.limit("2 per minute")
+def stream_complete_oracle_session():
+    """Stream a complete oracle session, one event per stage as it finishes"""
+    data = request.get_json() or {}
+    user_id = g.current_user.get('id') if hasattr(g, 'current_user') else 'anonymous'
+    
+    missing_fields = [field for field in ['name', 'birth_date', 'birth_place'] if field not in data]
+    if missing_fields:
+        return jsonify({
+            'status': 'error',
+            'message': f"Missing required fields: {', '.join(missing_fields)}"
+        }), 400
+    
+    valid, error_msg = validate_birth_data(data)
+    if not valid:
+        return jsonify({
+            'status': 'error',
+            'message': error_msg
+        }), 400
+    
+    birth_date = data['birth_date']
+    if isinstance(birth_date, str):
+        birth_date = datetime.datetime.fromisoformat(birth_date)
+    
+    stage_events = {
+        'natal_chart': lambda chart: [sse_event('natal_chart', natal_chart_payload(chart))],
+        'transits': lambda transits: [sse_event('transits', [transit_payload(t) for t in transits])],
+        'moon': lambda moon_data: [sse_event('moon', moon_payload(moon_data))],
+        'tarot_cards': lambda cards: [sse_event('cards', {'cards': tarot_cards_payload(cards)})],
+        'tarot': interpretation_events,
+        'numerology': lambda numerology: [sse_event('numerology', numerology)],
+        'i_ching': lambda hexagram: [sse_event('i_ching', hexagram_payload(hexagram))],
+        'session': lambda session: [sse_event('session', session_payload(session))]
+    }
+    
+    def events():
+        try:
+            for stage, result in oracle_engine.iter_complete_oracle_session(
+                user_id=user_id,
+                name=data['name'],
+                birth_date=birth_date,
+                birth_place=data['birth_place'],
+                question=data.get('question', '')
+            ):
+                if result is None:
+                    yield sse_event('stage_error', {'stage': stage})
+                elif stage in stage_events:
+                    yield from stage_events[stage](result)
+            yield sse_event('done', {'status': 'success'})
+        except Exception as e:
+            logging.error(f"Streaming oracle session failed: {e}")
+            yield sse_event('error', {'message': 'Failed to create oracle session', 'error': str(e)})
+    
+    return sse_response(events())
+
 # ========== ERROR HANDLERS ==========
 
 @oracle_bp.errorhandler(429)
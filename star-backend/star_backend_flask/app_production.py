@@ -17,6 +17,9 @@ from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+from pagination import (InvalidCursor, cosmos_seek, estimated_total, page_info,
+                        page_params, split_page)
+
 # Load environment variables
 load_dotenv()
 
@@ -335,14 +338,16 @@ def get_daily_tonalpohualli():
 # ===============================
 
 @app.route('/api/posts', methods=['GET'])
-@cache.cached(timeout=30)
+@cache.cached(timeout=30, query_string=True)
 @limiter.limit("100 per minute")
 def get_posts():
-    """Get social feed posts with pagination and filtering"""
+    """Get social feed posts with cursor pagination and filtering"""
     try:
         # Query parameters
-        page = request.args.get('page', 1, type=int)
-        limit = min(request.args.get('limit', 20, type=int), 50)
+        try:
+            limit, cursor, include_total = page_params(request.args, default_limit=20, max_limit=50)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
         post_type = request.args.get('type')
         user_id = request.args.get('user_id')
         
@@ -350,43 +355,36 @@ def get_posts():
             return jsonify({"error": "Database not available"}), 503
             
         # Build query
-        query = "SELECT * FROM c WHERE c.type = 'post'"
+        filters = "c.type = 'post'"
         parameters = []
         
         if post_type:
-            query += " AND c.post_type = @post_type"
+            filters += " AND c.post_type = @post_type"
             parameters.append({"name": "@post_type", "value": post_type})
             
         if user_id:
-            query += " AND c.user_id = @user_id"
+            filters += " AND c.user_id = @user_id"
             parameters.append({"name": "@user_id", "value": user_id})
             
-        query += " ORDER BY c.created_at DESC"
-        offset = (page - 1) * limit
-        query += f" OFFSET {offset} LIMIT {limit}"
-        
-        posts = list(cosmos_helper.query_items(query, parameters))
-        
-        # Get total count
-        count_query = "SELECT VALUE COUNT(1) FROM c WHERE c.type = 'post'"
-        if post_type:
-            count_query = count_query.replace("WHERE c.type = 'post'", 
-                                            "WHERE c.type = 'post' AND c.post_type = @post_type")
-        
-        try:
-            total = list(cosmos_helper.query_items(count_query, parameters))[0]
-        except (IndexError, TypeError):
-            total = len(posts)
+        # Seek past the cursor instead of skipping OFFSET rows
+        seek, order_by, seek_parameters = cosmos_seek(cursor)
+        query = f"SELECT * FROM c WHERE {filters}{seek}{order_by} OFFSET 0 LIMIT {limit + 1}"
+        posts, next_cursor = split_page(list(cosmos_helper.query_items(query, parameters + seek_parameters)), limit)
+        
+        # Counting is opt-in and reuses a recent estimate
+        total = None
+        if include_total:
+            def count_posts():
+                try:
+                    return list(cosmos_helper.query_items(f"SELECT VALUE COUNT(1) FROM c WHERE {filters}", parameters))[0]
+                except (IndexError, TypeError):
+                    return len(posts)
+            total = estimated_total(('posts', post_type, user_id), count_posts)
         
         return jsonify({
             "success": True,
             "posts": posts,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "pages": (total + limit - 1) // limit
-            }
+            "pagination": page_info(next_cursor, total, limit)
         })
         
     except Exception as e:
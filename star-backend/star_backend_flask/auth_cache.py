@@ -0,0 +1,37 @@
+"""
+Authenticated-principal cache for STAR token checks
+Keeps the user row behind a verified JWT for a short time, keyed by
+(user_id, token exp), so repeat requests with the same token skip the
+users lookup. Profile updates invalidate every cached token of the user
+"""
+
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from cache_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_SIZE = 10000
+PRINCIPAL_CACHE_TTL = 30  # seconds a principal may be served without re-reading the user
+
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+UserFetcher = Callable[[str], Optional[Dict[str, Any]]]
+
+
+def get_principal(user_id: Any, exp: Any, fetch_user: UserFetcher) -> Optional[Dict[str, Any]]:
+    """User row for a verified token, from the cache or ``fetch_user``; unknown users are not cached"""
+    key = (str(user_id), exp)
+    user = principal_cache.get(key)
+    if user is None:
+        user = fetch_user(str(user_id))
+        if user:
+            principal_cache.set(key, user)
+    return user
+
+
+def invalidate_principal(user_id: Any) -> None:
+    """Forget every cached token of a user after their profile changes"""
+    user_id = str(user_id)
+    principal_cache.delete_where(lambda key: key[0] == user_id)
@@ -3,16 +3,33 @@ Badge Processing Engine for STAR Platform
 Handles badge unlocks, progress tracking, and cosmic achievements
 """
 
+import asyncio
 import json
 import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from cache_utils import TTLCache
 from cosmos_db import get_cosmos_helper
+from redis_utils import get_redis
 
 logger = logging.getLogger(__name__)
 
+FIRE_SIGNS = ['Aries', 'Leo', 'Sagittarius']
+BADGE_STATE_MAX_USERS = 50000          # local fallback only, when Redis is not configured
+BADGE_STATE_TTL = 7 * 86400            # idle users are re-seeded from storage after a week
+BADGE_STATE_KEY_PREFIX = "badges:state"
+SEEDED_FIELD = "_seeded"
+JOIN_DATE_FIELD = "_join_date"
+SIGN_FIELD = "_sign"
+UNLOCKED_FIELD = "unlocked:"
+# Events that advance content counters; only counted when the server performed the action
+VERIFIED_EVENT_TYPES = {'post_create', 'tarot_draw'}
+
 class BadgeRarity(str, Enum):
     COMMON = 'common'
     RARE = 'rare'
@@ -27,12 +44,199 @@ class BadgeCategory(str, Enum):
     SOCIAL_COSMIC = 'social_cosmic'
     TEMPORAL_PLANETARY = 'temporal_planetary'
 
+@dataclass
+class UserBadgeState:
+    """Per-user counters the badge conditions read"""
+    counters: Counter = field(default_factory=Counter)
+    join_date: Optional[str] = None
+    zodiac_sign: Optional[str] = None   # from the stored profile, never from event payloads
+    unlocked: Set[str] = field(default_factory=set)
+
+    def to_fields(self) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {name: count for name, count in self.counters.items() if count}
+        fields.update({UNLOCKED_FIELD + badge_id: 1 for badge_id in self.unlocked})
+        if self.join_date:
+            fields[JOIN_DATE_FIELD] = self.join_date
+        if self.zodiac_sign:
+            fields[SIGN_FIELD] = self.zodiac_sign
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, str]) -> 'UserBadgeState':
+        state = cls(join_date=fields.get(JOIN_DATE_FIELD), zodiac_sign=fields.get(SIGN_FIELD))
+        for name, value in fields.items():
+            if name.startswith(UNLOCKED_FIELD):
+                state.unlocked.add(name[len(UNLOCKED_FIELD):])
+            elif not name.startswith('_'):
+                state.counters[name] = int(value)
+        return state
+
+
+def sign_counter(sign: Optional[str]) -> str:
+    return f"posts_by_sign:{sign or 'unknown'}"
+
+
+def event_counters(event_type: str, sign: Optional[str] = None) -> Counter:
+    """Counter increments for one engagement event"""
+    counters = Counter(active=1)
+    if event_type == 'post_create':
+        counters['total_posts'] += 1
+        counters[sign_counter(sign.title() if sign else None)] += 1
+    elif event_type == 'tarot_draw':
+        counters['tarot_readings_count'] += 1
+    return counters
+
+
+def _fire_posts(state: UserBadgeState) -> int:
+    return sum(state.counters[sign_counter(sign)] for sign in FIRE_SIGNS)
+
+
+def _account_age_days(state: UserBadgeState) -> int:
+    if not state.join_date:
+        return 0
+    join_date = datetime.fromisoformat(state.join_date.replace('Z', '+00:00'))
+    return (datetime.now(timezone.utc) - join_date).days
+
+
+# condition_type -> (counters it watches, value compared against target_value)
+CONDITION_RULES: Dict[str, Tuple[List[str], Callable[[UserBadgeState], float]]] = {
+    'posts_by_element': ([sign_counter(sign) for sign in FIRE_SIGNS], _fire_posts),
+    # Interaction tracking is not in place yet; fire posts stand in at 10 interactions each
+    'fire_sign_interactions': ([sign_counter(sign) for sign in FIRE_SIGNS], lambda state: 10 * _fire_posts(state)),
+    'tarot_readings_completed': (['tarot_readings_count'], lambda state: state.counters['tarot_readings_count']),
+    'total_posts': (['total_posts'], lambda state: state.counters['total_posts']),
+    # Age grows with time rather than events, so any activity re-checks it
+    'account_age_days': (['active'], _account_age_days),
+    # Eclipse badges are special events and are never met by counters
+}
+
+
+@dataclass
+class CompiledCondition:
+    condition_type: str
+    target_value: float
+    watches: List[str]
+    value: Optional[Callable[[UserBadgeState], float]]
+
+    def met(self, state: UserBadgeState) -> bool:
+        if self.value is None:
+            return False
+        try:
+            return self.value(state) >= self.target_value
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error evaluating condition {self.condition_type}: {e}")
+            return False
+
+
+class BadgeRuleIndex:
+    """Badge manifests compiled into condition evaluators and a counter -> badges index"""
+
+    def __init__(self, manifests: Dict[str, Any]):
+        self.badges: Dict[str, Tuple[str, List[CompiledCondition]]] = {}
+        self.by_counter: Dict[str, Set[str]] = {}
+
+        for badge_id, manifest in manifests.items():
+            unlock_conditions = manifest.get('unlock_conditions', {})
+            compiled = []
+            for condition in unlock_conditions.get('conditions', []):
+                condition_type = condition['condition_type']
+                if condition_type not in CONDITION_RULES and condition_type != 'active_during_eclipse':
+                    logger.warning(f"Unknown condition type: {condition_type}")
+                watches, value = CONDITION_RULES.get(condition_type, ([], None))
+                compiled.append(CompiledCondition(condition_type, condition['target_value'], watches, value))
+                for counter in watches:
+                    self.by_counter.setdefault(counter, set()).add(badge_id)
+            self.badges[badge_id] = (unlock_conditions.get('logic_operator', 'AND'), compiled)
+
+    def affected(self, counters: Iterable[str]) -> Set[str]:
+        """Badges watching any of the changed counters"""
+        badge_ids = set()
+        for counter in counters:
+            badge_ids.update(self.by_counter.get(counter, ()))
+        return badge_ids
+
+    def is_met(self, badge_id: str, state: UserBadgeState) -> bool:
+        logic_operator, conditions = self.badges[badge_id]
+        if logic_operator == 'AND':
+            return all(condition.met(state) for condition in conditions)
+        if logic_operator == 'OR':
+            return any(condition.met(state) for condition in conditions)
+        return False
+
+    def unlockable(self, badge_ids: Iterable[str], state: UserBadgeState) -> List[str]:
+        """Candidates the user has not unlocked yet and now qualifies for"""
+        return sorted(badge_id for badge_id in badge_ids
+                      if badge_id not in state.unlocked and self.is_met(badge_id, state))
+
+
+class BadgeStateStore:
+    """Per-user badge counters, shared by every worker through one expiring
+    Redis hash per user, with an in-process TTL LRU when Redis is not configured"""
+
+    def __init__(self, redis_manager: Any = None, ttl: int = BADGE_STATE_TTL,
+                 max_users: int = BADGE_STATE_MAX_USERS):
+        self.redis = redis_manager
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=max_users, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.client is not None
+
+    def _key(self, user_id: str) -> str:
+        return f"{BADGE_STATE_KEY_PREFIX}:{user_id}"
+
+    def get(self, user_id: str) -> Optional[UserBadgeState]:
+        """Current counters, or None if the user has not been seeded (or expired)"""
+        if self._use_redis():
+            fields = self.redis.hgetall_many([self._key(user_id)])
+            if fields is not None:
+                fields = fields[0] or {}
+                return UserBadgeState.from_fields(fields) if SEEDED_FIELD in fields else None
+        return self.local.get(user_id)
+
+    def seed(self, user_id: str, state: UserBadgeState) -> UserBadgeState:
+        """Store freshly loaded counters unless another worker seeded the user first"""
+        if self._use_redis():
+            written = self.redis.init_hash(self._key(user_id), state.to_fields(), SEEDED_FIELD, ex=self.ttl)
+            if written is not None:
+                return state if written else (self.get(user_id) or state)
+        self.local.set(user_id, state)
+        return state
+
+    def add(self, user_id: str, delta: Counter) -> Optional[UserBadgeState]:
+        """Apply counter increments; None if the user is not seeded (the caller seeds instead)"""
+        if self._use_redis():
+            fields = self.redis.hincrby_get(self._key(user_id), dict(delta), ex=self.ttl)
+            if fields is not None:
+                # Incrementing an expired hash recreates it without the seed marker
+                return UserBadgeState.from_fields(fields) if SEEDED_FIELD in fields else None
+        with self._lock:
+            state = self.local.get(user_id)
+            if state is not None:
+                state.counters.update(delta)
+            return state
+
+    def mark_unlocked(self, user_id: str, badge_ids: Iterable[str]) -> None:
+        badge_ids = list(badge_ids)
+        if self._use_redis() and self.redis.hincrby_many(
+                {self._key(user_id): {UNLOCKED_FIELD + badge_id: 1 for badge_id in badge_ids}}, ex=self.ttl):
+            return
+        with self._lock:
+            state = self.local.get(user_id)
+            if state is not None:
+                state.unlocked.update(badge_ids)
+
+
 class BadgeUnlockEngine:
     """Core engine for processing badge unlocks and progress"""
     
     def __init__(self):
         self.db_helper = get_cosmos_helper()
         self.badge_manifests = self._load_badge_manifests()
+        self.rules = BadgeRuleIndex(self.badge_manifests)
+        # Per-user counters kept current from verified engagement events
+        self.states = BadgeStateStore(redis_manager=get_redis())
         
     def _load_badge_manifests(self) -> Dict[str, Any]:
         """Load all active badge manifests from database"""
@@ -113,27 +317,69 @@ class BadgeUnlockEngine:
     async def check_user_badge_unlocks(self, user_id: str) -> List[Dict[str, Any]]:
         """Check all possible badge unlocks for a user and return newly unlocked badges"""
         try:
-            user_progress = await self._get_user_progress(user_id)
-            user_stats = await self._get_user_stats(user_id)
-            newly_unlocked = []
-
-            for badge_id, manifest in self.badge_manifests.items():
-                # Skip if already unlocked
-                if self._is_badge_unlocked(user_progress, badge_id):
-                    continue
-
-                # Check unlock conditions
-                if await self._check_unlock_conditions(user_id, manifest, user_stats):
-                    unlock_result = await self._unlock_badge(user_id, badge_id, manifest)
-                    if unlock_result:
-                        newly_unlocked.append(unlock_result)
-
-            return newly_unlocked
+            state, _ = await self._get_user_state(user_id)
+            return self._unlock_badges(user_id, self.rules.unlockable(self.rules.badges, state))
 
         except Exception as e:
             logger.error(f"Error checking badge unlocks for user {user_id}: {e}")
             return []
 
+    def process_engagement_batch(self, events: List[Any]) -> List[Dict[str, Any]]:
+        """Fold a batch of engagement events into user counters and unlock what they complete
+
+        Content counters only move for events the server emitted for an action
+        it performed; client-reported events just mark the user active. The
+        sign is the user's stored profile sign, not whatever the event carries.
+        """
+        activity: Dict[str, Counter] = {}
+        for event in events:
+            event_type = event.event_type.value
+            counted = event_type if getattr(event, 'verified', False) and event_type in VERIFIED_EVENT_TYPES else 'active'
+            activity.setdefault(str(event.user_id), Counter())[counted] += 1
+
+        newly_unlocked = []
+        for user_id, counts in activity.items():
+            try:
+                state, seeded = asyncio.run(self._get_user_state(user_id))
+                if seeded:
+                    # Fresh counters already include the content behind these events
+                    candidates = self.rules.badges
+                else:
+                    delta = Counter()
+                    for event_type, count in counts.items():
+                        for name, amount in event_counters(event_type, state.zodiac_sign).items():
+                            delta[name] += amount * count
+                    candidates = self.rules.affected(delta)
+                    state = self.states.add(user_id, delta)
+                    if state is None:
+                        # Expired between read and write: reseed, which counts these events too
+                        state, _ = asyncio.run(self._get_user_state(user_id))
+                        candidates = self.rules.badges
+                newly_unlocked.extend(self._unlock_badges(user_id, self.rules.unlockable(candidates, state)))
+            except Exception as e:
+                logger.error(f"Error processing badge events for user {user_id}: {e}")
+        return newly_unlocked
+
+    async def _get_user_state(self, user_id: str) -> Tuple[UserBadgeState, bool]:
+        """Shared counters for a user, seeded from storage on first use; True if just seeded"""
+        state = self.states.get(user_id)
+        if state is not None:
+            return state, False
+
+        user_progress = await self._get_user_progress(user_id)
+        user_stats = await self._get_user_stats(user_id)
+        counters = Counter({'total_posts': user_stats.get('total_posts', 0),
+                            'tarot_readings_count': user_stats.get('tarot_readings_count', 0)})
+        for sign, count in user_stats.get('posts_by_sign', {}).items():
+            counters[sign_counter(sign)] = count
+        state = UserBadgeState(
+            counters=counters,
+            join_date=user_stats.get('join_date'),
+            zodiac_sign=user_stats.get('zodiac_sign'),
+            unlocked={badge_id for badge_id in user_progress if self._is_badge_unlocked(user_progress, badge_id)}
+        )
+        return self.states.seed(user_id, state), True
+
     async def _get_user_progress(self, user_id: str) -> Dict[str, Any]:
         """Get user's current badge progress"""
         try:
@@ -220,108 +466,47 @@ class BadgeUnlockEngine:
         """Check if user has already unlocked a badge"""
         return badge_id in user_progress and user_progress[badge_id].get('status') == 'unlocked'
 
-    async def _check_unlock_conditions(self, user_id: str, manifest: Dict[str, Any], user_stats: Dict[str, Any]) -> bool:
-        """Check if user meets all conditions for badge unlock"""
-        try:
-            conditions = manifest.get('unlock_conditions', {})
-            logic_operator = conditions.get('logic_operator', 'AND')
-            condition_list = conditions.get('conditions', [])
-
-            results = []
-            
-            for condition in condition_list:
-                condition_type = condition['condition_type']
-                target_value = condition['target_value']
-                
-                result = await self._evaluate_condition(condition_type, target_value, user_stats, user_id)
-                results.append(result)
-
-            # Apply logic operator
-            if logic_operator == 'AND':
-                return all(results)
-            elif logic_operator == 'OR':
-                return any(results)
-            else:
-                return False
-
-        except Exception as e:
-            logger.error(f"Error checking unlock conditions: {e}")
-            return False
-
-    async def _evaluate_condition(self, condition_type: str, target_value: Union[int, str, bool], 
-                                 user_stats: Dict[str, Any], user_id: str) -> bool:
-        """Evaluate individual unlock condition"""
-        try:
-            if condition_type == 'posts_by_element':
-                # Count posts by fire signs (Aries, Leo, Sagittarius)
-                fire_signs = ['Aries', 'Leo', 'Sagittarius']
-                fire_posts = sum(user_stats['posts_by_sign'].get(sign, 0) for sign in fire_signs)
-                return fire_posts >= target_value
-
-            elif condition_type == 'tarot_readings_completed':
-                return user_stats['tarot_readings_count'] >= target_value
-
-            elif condition_type == 'total_posts':
-                return user_stats['total_posts'] >= target_value
-
-            elif condition_type == 'account_age_days':
-                if user_stats['join_date']:
-                    join_date = datetime.fromisoformat(user_stats['join_date'].replace('Z', '+00:00'))
-                    days_active = (datetime.now(timezone.utc) - join_date).days
-                    return days_active >= target_value
-
-            elif condition_type == 'fire_sign_interactions':
-                # This would require more complex interaction tracking
-                # For now, return True if user has posted as fire signs
-                fire_signs = ['Aries', 'Leo', 'Sagittarius']
-                fire_posts = sum(user_stats['posts_by_sign'].get(sign, 0) for sign in fire_signs)
-                return fire_posts >= (target_value / 10)  # Simplified calculation
-
-            elif condition_type == 'active_during_eclipse':
-                # This would require real-time astronomical data
-                # For demo, return False (eclipse badges are special events)
-                return False
-
-            else:
-                logger.warning(f"Unknown condition type: {condition_type}")
-                return False
-
-        except Exception as e:
-            logger.error(f"Error evaluating condition {condition_type}: {e}")
-            return False
-
-    async def _unlock_badge(self, user_id: str, badge_id: str, manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Unlock a badge for a user"""
+    def _unlock_badges(self, user_id: str, badge_ids: List[str]) -> List[Dict[str, Any]]:
+        """Unlock several badges for a user with one batched upsert"""
+        if not badge_ids:
+            return []
         try:
             container = self.db_helper.get_container('user_badges')
-            
-            badge_record = {
+            unlocked_at = datetime.now(timezone.utc).isoformat()
+            badge_records = [{
                 'id': f"{user_id}_{badge_id}",
                 'partition_key': user_id,
                 'user_id': user_id,
                 'badge_id': badge_id,
                 'status': 'unlocked',
-                'unlocked_at': datetime.now(timezone.utc).isoformat(),
+                'unlocked_at': unlocked_at,
                 'equipped': False,  # User can choose to display
                 'display_order': 999,  # Default order
-                'manifest': manifest  # Store manifest snapshot
-            }
+                'manifest': self.badge_manifests[badge_id]  # Store manifest snapshot
+            } for badge_id in badge_ids]
+
+            if hasattr(container, 'upsert'):
+                # Supabase table: one multi-row upsert
+                container.upsert(badge_records).execute()
+            else:
+                for badge_record in badge_records:
+                    container.upsert_item(badge_record)
 
-            container.upsert_item(badge_record)
+            self.states.mark_unlocked(user_id, badge_ids)
             
-            logger.info(f"Unlocked badge {badge_id} for user {user_id}")
+            logger.info(f"Unlocked badges {badge_ids} for user {user_id}")
             
-            return {
+            return [{
                 'badge_id': badge_id,
-                'name': manifest['metadata']['name'],
-                'description': manifest['metadata']['description'],
-                'rarity': manifest.get('rarity', BadgeRarity.COMMON),
-                'unlocked_at': badge_record['unlocked_at']
-            }
+                'name': self.badge_manifests[badge_id]['metadata']['name'],
+                'description': self.badge_manifests[badge_id]['metadata']['description'],
+                'rarity': self.badge_manifests[badge_id].get('rarity', BadgeRarity.COMMON),
+                'unlocked_at': unlocked_at
+            } for badge_id in badge_ids]
 
         except Exception as e:
-            logger.error(f"Error unlocking badge {badge_id} for user {user_id}: {e}")
-            return None
+            logger.error(f"Error unlocking badges {badge_ids} for user {user_id}: {e}")
+            return []
 
     async def get_user_badges(self, user_id: str, include_locked: bool = False) -> Dict[str, Any]:
         """Get user's badge collection with progress"""
@@ -373,5 +558,13 @@ class BadgeUnlockEngine:
             logger.error(f"Error getting user badges for {user_id}: {e}")
             return {'unlocked_badges': [], 'equipped_badges': [], 'locked_badges': []}
 
-# Singleton instance
-badge_engine = BadgeUnlockEngine()
\ No newline at end of file
+# Singleton instance, kept current by the analytics event stream
+badge_engine = BadgeUnlockEngine()
+
+try:
+    from analytics_engine import AnalyticsEngine
+
+    # Registered on the class so both the base and the enhanced engine feed it
+    AnalyticsEngine.add_batch_listener(badge_engine.process_engagement_batch)
+except ImportError as e:
+    logger.warning(f"Badge engine not subscribed to engagement events: {e}")
\ No newline at end of file
@@ -4,9 +4,14 @@ import zoneinfo
 from typing import Dict, List, Optional
 
 import swisseph as swe
+from gazetteer import get_gazetteer
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from geopy.geocoders import Nominatim
 
+# Ask Nominatim about places the local gazetteer does not know (blocks the request). On by
+# default: without a generated GeoNames table the gazetteer only knows a few dozen cities
+REMOTE_GEOCODER_FALLBACK = os.environ.get('GEOCODER_REMOTE_FALLBACK', 'true').lower() not in ('0', 'false', 'no')
+
 # Initialize Swiss Ephemeris with the ephemeris file path if needed
 # swe.set_ephe_path(os.path.join(os.path.dirname(__file__), 'ephem'))
 
@@ -30,15 +35,21 @@ class BirthChartCalculator:
             location_str: Location string like "New York, NY" or "Tokyo, Japan"
 
         Returns:
-            Dict with 'lat', 'lng', 'addr' keys, or None if geocoding fails
+            Dict with 'lat', 'lng', 'addr', 'timezone' keys, or None if geocoding fails
         """
+        place = get_gazetteer().resolve(location_str)
+        if place:
+            return place.to_geocode()
+        if not REMOTE_GEOCODER_FALLBACK:
+            return None
         try:
             location = self.geolocator.geocode(location_str, timeout=10)
             if location:
                 return {
                     'lat': location.latitude,
                     'lng': location.longitude,
-                    'addr': location.address
+                    'addr': location.address,
+                    'timezone': None
                 }
             return None
         except (GeocoderTimedOut, GeocoderUnavailable) as e:
@@ -147,8 +158,14 @@ class BirthChartCalculator:
             latitude = geo_data['lat']
             longitude = geo_data['lng']
 
+            # Birth times are local wall-clock times at the birth place
+            timezone_offset = 0.0
+            if geo_data.get('timezone'):
+                zone = zoneinfo.ZoneInfo(geo_data['timezone'])
+                timezone_offset = birth_dt.replace(tzinfo=zone).utcoffset().total_seconds() / 3600
+
             # Calculate Julian Day
-            jd = self._julian_day(birth_dt)
+            jd = self._julian_day(birth_dt, timezone_offset)
 
             # Set geographic position for house calculation
             swe.set_topo(longitude, latitude, 0)  # Altitude = 0 for simplicity
@@ -0,0 +1,154 @@
+"""
+In-process caching utilities for STAR backend
+Thread-safe LRU cache with per-entry TTL and hit/miss accounting, and a
+two-tier cache that fronts a shared RedisManager with that LRU
+"""
+
+import base64
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire ``ttl`` seconds after being set"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live value, refreshing its LRU position"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[0] < time.monotonic():
+                if item is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Get every live value among ``keys``; missing keys are omitted"""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``; returns how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for performance reporting"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class TieredCache:
+    """In-process LRU in front of an optional RedisManager.
+
+    Values live as objects in the LRU and as ``serialize``-d bytes in Redis
+    (base64 text, since the shared client decodes responses), so a hit in
+    either tier skips recomputation and only Redis hits pay for decoding.
+    """
+
+    def __init__(self, namespace: str, serialize: Callable[[Any], bytes],
+                 deserialize: Callable[[bytes], Any], redis_manager: Any = None,
+                 maxsize: int = 1024, ttl: float = 3600):
+        self.namespace = namespace
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.redis = redis_manager
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.client is not None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        if self._use_redis():
+            raw = self.redis.get(self._redis_key(key))
+            if raw:
+                try:
+                    value = self.deserialize(base64.b64decode(raw))
+                    self.redis_hits += 1
+                    self.local.set(key, value)
+                    return value
+                except Exception as e:
+                    logger.warning(f"Discarding undecodable cache entry {self._redis_key(key)}: {e}")
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=ttl)
+        if self._use_redis():
+            encoded = base64.b64encode(self.serialize(value)).decode('ascii')
+            self.redis.set(self._redis_key(key), encoded, ex=int(ttl))
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier hit/miss counters for performance reporting"""
+        local_hits = self.local.hits
+        total = local_hits + self.redis_hits + self.misses
+        return {
+            'local_hits': local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'hit_rate': (local_hits + self.redis_hits) / total if total else 0.0,
+            'local_size': len(self.local),
+            'redis_enabled': self._use_redis()
+        }
@@ -117,6 +117,7 @@ def get_session(session_id: str):
         
         # Check if user is participant or if session is public
         if not session.is_private or user_id in session.participants:
+            snapshot = engine.state_snapshot(session)
             return jsonify({
                 'session_id': session.session_id,
                 'title': session.title,
@@ -140,7 +141,8 @@ def get_session(session_id: str):
                 'room_code': session.room_code,
                 'created_at': session.created_at.isoformat(),
                 'started_at': session.started_at.isoformat() if session.started_at else None,
-                'shared_state': session.shared_state,
+                'shared_state': snapshot['state'],
+                'state_version': snapshot['version'],
                 'live_cursors': session.live_cursors
             })
         else:
@@ -322,9 +324,16 @@ def get_session_state(session_id: str):
         if user_id not in session.participants:
             return jsonify({'error': 'Access denied'}), 403
         
+        # Clients that already hold a version only need what they missed
+        since_version = request.args.get('since_version', type=int)
+        if since_version is not None:
+            return jsonify({'session_id': session_id, **engine.get_state_catch_up(session_id, since_version)})
+        
+        snapshot = engine.state_snapshot(session)
         return jsonify({
             'session_id': session_id,
-            'shared_state': session.shared_state,
+            'shared_state': snapshot['state'],
+            'state_version': snapshot['version'],
             'tarot_spread': session.tarot_spread,
             'numerology_data': session.numerology_data,
             'cosmos_state': session.cosmos_state,
@@ -345,9 +354,10 @@ def update_session_state(session_id: str):
     try:
         data = request.get_json()
         state_update = data.get('state_update')
+        ops = data.get('ops')
         
-        if not state_update:
-            return jsonify({'error': 'State update is required'}), 400
+        if not state_update and not ops:
+            return jsonify({'error': 'State update or ops are required'}), 400
         
         engine = get_collaboration_engine()
         if not engine:
@@ -355,13 +365,14 @@ def update_session_state(session_id: str):
         
         user_id = g.current_user.get('id')
         
-        success = engine.sync_session_state(session_id, user_id, state_update)
+        delta = engine.sync_session_state(session_id, user_id, state_update, ops)
         
-        if success:
+        if delta:
             return jsonify({
                 'message': 'State updated successfully',
                 'session_id': session_id,
-                'updated_keys': list(state_update.keys())
+                'updated_keys': [op['key'] for op in delta['ops']],
+                'version': delta['version']
             })
         else:
             return jsonify({'error': 'Failed to update state'}), 400
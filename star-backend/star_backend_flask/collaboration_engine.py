@@ -4,6 +4,7 @@ Handles shared tarot readings, group numerology sessions, collaborative cosmos f
 and synchronized multi-user experiences using SocketIO and real-time state management.
 """
 
+import atexit
 import json
 import logging
 import uuid
@@ -13,13 +14,25 @@ from enum import Enum
 from typing import Any, Dict, List, Optional, Set
 
 from cosmos_db import get_cosmos_helper
+from cursor_frames import CursorFrames
 from flask import request
 from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
+from session_state import DebouncedWriter, InvalidOp, VersionedState, ops_from_update
+from socket_fanout import init_socket_fanout
+
+try:
+    from redis_utils import get_redis
+except ImportError:
+    get_redis = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hash of session_id -> listing summary and hosting node, shared by every worker.
+# A session lives in one worker's memory and can only be joined through it
+SESSION_REGISTRY_KEY = 'collab:sessions'
+
 class CollaborationSessionType(Enum):
     TAROT_READING = "tarot_reading"
     NUMEROLOGY_SESSION = "numerology_session"
@@ -99,6 +112,18 @@ class CollaborationEngine:
         self.active_sessions: Dict[str, CollaborationSession] = {}
         self.user_sessions: Dict[str, Set[str]] = {}  # user_id -> set of session_ids
         self.socket_users: Dict[str, str] = {}  # socket_id -> user_id
+        self.session_sockets: Dict[str, Dict[str, Set[str]]] = {}  # session_id -> user_id -> socket_ids
+        
+        # Cross-worker broadcasts and session registry
+        self.fanout = init_socket_fanout(socketio)
+        self.redis = get_redis() if get_redis else None
+        
+        # Versioned shared state and write-behind persistence
+        self.session_states: Dict[str, VersionedState] = {}
+        self.persistence = DebouncedWriter(self._persist_session)
+        
+        # Live cursors go out as coalesced ~30 Hz frames
+        self.cursor_frames = CursorFrames(self._emit_cursor_frame)
         
         # Register SocketIO event handlers
         self._register_socket_events()
@@ -123,12 +148,14 @@ class CollaborationEngine:
         @self.socketio.on('connect')
         def handle_connect():
             logger.info(f"User connected: {request.sid}")
+            self.fanout.connect(request.sid)
             emit('connection_confirmed', {'socket_id': request.sid})
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
             logger.info(f"User disconnected: {request.sid}")
             self._handle_user_disconnect(request.sid)
+            self.fanout.disconnect(request.sid)
         
         @self.socketio.on('join_collaboration')
         def handle_join_collaboration(data):
@@ -150,6 +177,10 @@ class CollaborationEngine:
         def handle_sync_state(data):
             return self._handle_state_sync(data, request.sid)
         
+        @self.socketio.on('resync_state')
+        def handle_resync_state(data):
+            return self._handle_state_resync(data, request.sid)
+        
         @self.socketio.on('tarot_card_drawn')
         def handle_tarot_card_drawn(data):
             return self._handle_tarot_collaboration(data, request.sid)
@@ -206,6 +237,7 @@ class CollaborationEngine:
         
         # Store session
         self.active_sessions[session_id] = session
+        self.session_states[session_id] = VersionedState(session.shared_state)
         
         # Track user sessions
         if host_id not in self.user_sessions:
@@ -214,6 +246,7 @@ class CollaborationEngine:
         
         # Save to database
         self._save_session_to_db(session)
+        self._register_session(session)
         
         logger.info(f"Created collaboration session: {session_id} ({session_type.value})")
         return session
@@ -230,7 +263,11 @@ class CollaborationEngine:
         """Join an existing collaboration session."""
         
         if session_id not in self.active_sessions:
-            logger.warning(f"Attempted to join non-existent session: {session_id}")
+            host = self.session_host(session_id)
+            if host:
+                logger.warning(f"Session {session_id} is hosted by worker {host}, not {self.fanout.node_id}")
+            else:
+                logger.warning(f"Attempted to join non-existent session: {session_id}")
             return False
         
         session = self.active_sessions[session_id]
@@ -272,7 +309,8 @@ class CollaborationEngine:
             session.started_at = datetime.utcnow()
         
         # Update database
-        self._save_session_to_db(session)
+        self.persistence.mark(session.session_id)
+        self._register_session(session)
         
         # Notify all participants
         self._broadcast_to_session(session_id, 'user_joined', {
@@ -280,7 +318,8 @@ class CollaborationEngine:
             'username': username,
             'zodiac_sign': zodiac_sign,
             'role': role.value,
-            'participant_count': len(session.participants)
+            'participant_count': len(session.participants),
+            'cursor_slot': self.cursor_frames.slot(session_id, user_id)
         })
         
         logger.info(f"User {user_id} joined session {session_id}")
@@ -300,8 +339,10 @@ class CollaborationEngine:
         # Remove user from session
         user = session.participants.pop(user_id, None)
         
-        # Remove from live cursors
+        # Remove from live cursors and the session's socket index
         session.live_cursors.pop(user_id, None)
+        self.cursor_frames.release(session_id, user_id)
+        self.session_sockets.get(session_id, {}).pop(user_id, None)
         
         # Update user sessions tracking
         if user_id in self.user_sessions:
@@ -335,13 +376,14 @@ class CollaborationEngine:
         })
         
         # Update database
-        self._save_session_to_db(session)
+        self.persistence.mark(session.session_id)
+        self._register_session(session)
         
         logger.info(f"User {user_id} left session {session_id}")
         return True
     
     def update_cursor_position(self, session_id: str, user_id: str, position: Dict[str, float]):
-        """Update user's cursor position in real-time."""
+        """Record a cursor move; it reaches participants in the session's next frame."""
         
         if session_id not in self.active_sessions:
             return False
@@ -351,53 +393,59 @@ class CollaborationEngine:
         if user_id not in session.participants:
             return False
         
-        # Update cursor position
-        session.live_cursors[user_id] = {
-            'x': position.get('x', 0),
-            'y': position.get('y', 0),
-            'timestamp': datetime.utcnow().isoformat(),
-            'element': position.get('element')
-        }
-        
-        # Broadcast to other participants
-        self._broadcast_to_session(session_id, 'cursor_updated', {
-            'user_id': user_id,
-            'username': session.participants[user_id].username,
-            'position': session.live_cursors[user_id]
-        }, exclude_user=user_id)
+        # Latest position for the state API; the frame carries the time
+        x, y, element = position.get('x', 0), position.get('y', 0), position.get('element')
+        session.live_cursors[user_id] = {'x': x, 'y': y, 'element': element}
+        self.cursor_frames.update(session_id, user_id, x, y, element)
         
         return True
     
-    def sync_session_state(self, session_id: str, user_id: str, state_update: Dict[str, Any]):
-        """Synchronize session state across all participants."""
+    def _emit_cursor_frame(self, session_id: str, frame: Dict[str, Any]):
+        """Deliver one coalesced cursor frame; clients ignore their own slot."""
+        
+        if session_id in self.active_sessions:
+            self.fanout.emit('cursor_frame', dict(frame, session_id=session_id), rooms=session_id)
+    
+    def sync_session_state(
+        self,
+        session_id: str,
+        user_id: str,
+        state_update: Optional[Dict[str, Any]] = None,
+        ops: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Apply state ops (or a legacy key/value update) and broadcast only the delta."""
         
         if session_id not in self.active_sessions:
-            return False
+            return None
         
         session = self.active_sessions[session_id]
         
         if user_id not in session.participants:
-            return False
+            return None
         
-        # Update shared state
-        for key, value in state_update.items():
-            session.shared_state[key] = {
-                'value': value,
-                'updated_by': user_id,
-                'timestamp': datetime.utcnow().isoformat()
-            }
+        try:
+            delta = self.session_states[session_id].apply(ops or ops_from_update(state_update or {}), user_id)
+        except InvalidOp as e:
+            logger.warning(f"Rejected state ops for session {session_id}: {e}")
+            return None
         
-        # Broadcast state update
+        # Broadcast state delta
         self._broadcast_to_session(session_id, 'state_synchronized', {
-            'updated_by': user_id,
-            'updates': state_update,
-            'full_state': session.shared_state
+            'session_id': session_id,
+            'updates': {op['key']: op.get('value') for op in delta['ops'] if op['op'] == 'set'},
+            **delta
         }, exclude_user=user_id)
         
-        # Update database
-        self._save_session_to_db(session)
+        # Update database (write-behind)
+        self.persistence.mark(session_id)
         
-        return True
+        return delta
+    
+    def get_state_catch_up(self, session_id: str, since_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Deltas after since_version, or a snapshot when they are no longer retained."""
+        
+        state = self.session_states.get(session_id)
+        return state.catch_up(since_version) if state else None
     
     def handle_tarot_collaboration(self, session_id: str, user_id: str, tarot_data: Dict[str, Any]):
         """Handle collaborative tarot reading events."""
@@ -451,7 +499,7 @@ class CollaborationEngine:
         })
         
         # Update database
-        self._save_session_to_db(session)
+        self.persistence.mark(session.session_id)
         
         return True
     
@@ -509,7 +557,7 @@ class CollaborationEngine:
         })
         
         # Update database
-        self._save_session_to_db(session)
+        self.persistence.mark(session.session_id)
         
         return True
     
@@ -593,7 +641,10 @@ class CollaborationEngine:
         
         if success:
             join_room(session_id)
+            self.fanout.join(socket_id, session_id)
+            self._index_socket(session_id, user_id, socket_id)
             session = self.active_sessions[session_id]
+            snapshot = self.state_snapshot(session)
             
             emit('session_joined', {
                 'session_id': session_id,
@@ -603,9 +654,14 @@ class CollaborationEngine:
                     'description': session.description,
                     'type': session.session_type.value,
                     'status': session.status.value,
-                    'shared_state': session.shared_state
-                }
+                    'shared_state': snapshot['state'],
+                    'state_version': snapshot['version']
+                },
+                'cursor_slot': self.cursor_frames.slot(session_id, user_id),
+                'cursor_slots': self.cursor_frames.slots(session_id)
             })
+        elif session_id not in self.active_sessions and self.session_host(session_id):
+            emit('error', {'message': 'Session is hosted on another server', 'session_id': session_id})
         else:
             emit('error', {'message': 'Failed to join session'})
     
@@ -617,6 +673,8 @@ class CollaborationEngine:
         
         if session_id and user_id:
             leave_room(session_id)
+            self.fanout.leave(socket_id, session_id)
+            self._unindex_socket(session_id, user_id, socket_id)
             success = self.leave_session(session_id, user_id)
             
             if success:
@@ -659,6 +717,8 @@ class CollaborationEngine:
         )
         
         join_room(session.session_id)
+        self.fanout.join(socket_id, session.session_id)
+        self._index_socket(session.session_id, user_id, socket_id)
         
         emit('session_created', {
             'session_id': session.session_id,
@@ -682,9 +742,27 @@ class CollaborationEngine:
         session_id = data.get('session_id')
         user_id = self.socket_users.get(socket_id)
         state_update = data.get('state_update')
+        ops = data.get('ops')
         
-        if session_id and user_id and state_update:
-            self.sync_session_state(session_id, user_id, state_update)
+        if session_id and user_id and (state_update or ops):
+            delta = self.sync_session_state(session_id, user_id, state_update, ops)
+            if delta:
+                emit('state_ack', {'session_id': session_id, 'version': delta['version']})
+            else:
+                emit('error', {'message': 'Failed to sync state'})
+    
+    def _handle_state_resync(self, data: Dict[str, Any], socket_id: str):
+        """Send a reconnecting client the deltas it missed (or a snapshot)."""
+        
+        session_id = data.get('session_id')
+        user_id = self.socket_users.get(socket_id)
+        session = self.active_sessions.get(session_id)
+        
+        if not session or user_id not in session.participants:
+            emit('error', {'message': 'Failed to resync state'})
+            return
+        
+        emit('state_catch_up', {'session_id': session_id, **self.get_state_catch_up(session_id, data.get('since_version'))})
     
     def _handle_tarot_collaboration(self, data: Dict[str, Any], socket_id: str):
         """Handle tarot collaboration from SocketIO."""
@@ -750,29 +828,40 @@ class CollaborationEngine:
         if not user_id:
             return
         
-        # Remove user from all sessions
-        if user_id in self.user_sessions:
-            session_ids = list(self.user_sessions[user_id])
-            for session_id in session_ids:
+        # Leave every session this was the user's last socket in
+        for session_id in list(self.user_sessions.get(user_id, ())):
+            if not self._unindex_socket(session_id, user_id, socket_id):
                 self.leave_session(session_id, user_id)
         
         # Clean up socket mapping
         del self.socket_users[socket_id]
     
+    def _index_socket(self, session_id: str, user_id: str, socket_id: str):
+        """Track a participant's socket in the session's index."""
+        
+        self.session_sockets.setdefault(session_id, {}).setdefault(user_id, set()).add(socket_id)
+    
+    def _unindex_socket(self, session_id: str, user_id: str, socket_id: str) -> bool:
+        """Drop a socket from the session's index; True if the user still has another one there."""
+        
+        user_sockets = self.session_sockets.get(session_id, {}).get(user_id)
+        if user_sockets is None:
+            return False
+        user_sockets.discard(socket_id)
+        if not user_sockets:
+            del self.session_sockets[session_id][user_id]
+            return False
+        return True
+    
     def _broadcast_to_session(self, session_id: str, event: str, data: Dict[str, Any], exclude_user: Optional[str] = None):
         """Broadcast event to all participants in a session."""
         
+        # One room emit reaches participants on every worker; the excluded
+        # user's own sockets come from the session's index
+        skip_sids = None
         if exclude_user:
-            # Find socket IDs for users in session except excluded user
-            target_sockets = []
-            for socket_id, user_id in self.socket_users.items():
-                if user_id != exclude_user and user_id in self.active_sessions.get(session_id, {}).participants:
-                    target_sockets.append(socket_id)
-            
-            for socket_id in target_sockets:
-                self.socketio.emit(event, data, room=socket_id)
-        else:
-            self.socketio.emit(event, data, room=session_id)
+            skip_sids = list(self.session_sockets.get(session_id, {}).get(exclude_user, ()))
+        self.fanout.emit(event, data, rooms=session_id, skip_sid=skip_sids or None)
     
     def _generate_room_code(self) -> str:
         """Generate a unique room code for public sessions."""
@@ -790,53 +879,84 @@ class CollaborationEngine:
             if not code_exists:
                 return code
     
+    def _persist_session(self, session_id: str):
+        """Write-behind target: save a session that is still active (raises so failures are retried)."""
+        
+        session = self.active_sessions.get(session_id)
+        if session is not None:
+            self._write_session(session)
+    
     def _save_session_to_db(self, session: CollaborationSession):
         """Save session to Cosmos DB."""
         
         try:
-            container = self.cosmos_helper.get_container('collaboration_sessions')
-            
-            # Convert session to dict for storage
-            session_data = {
-                'id': session.session_id,
-                'session_type': session.session_type.value,
-                'title': session.title,
-                'description': session.description,
-                'host_id': session.host_id,
-                'participants': {uid: asdict(user) for uid, user in session.participants.items()},
-                'status': session.status.value,
-                'created_at': session.created_at.isoformat(),
-                'started_at': session.started_at.isoformat() if session.started_at else None,
-                'ended_at': session.ended_at.isoformat() if session.ended_at else None,
-                'max_participants': session.max_participants,
-                'is_private': session.is_private,
-                'room_code': session.room_code,
-                'shared_state': session.shared_state,
-                'tarot_spread': session.tarot_spread,
-                'numerology_data': session.numerology_data,
-                'cosmos_state': session.cosmos_state,
-                'live_cursors': session.live_cursors,
-                'voice_channels': session.voice_channels,
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            
-            container.upsert_item(session_data)
-            logger.info(f"Saved session to database: {session.session_id}")
-            
+            self._write_session(session)
         except Exception as e:
             logger.error(f"Failed to save session to database: {e}")
     
+    def state_snapshot(self, session: CollaborationSession) -> Dict[str, Any]:
+        """Shared state and its version, read together under the state lock."""
+        
+        state = self.session_states.get(session.session_id)
+        if state is not None:
+            return state.snapshot()
+        return {'state': dict(session.shared_state), 'version': None}
+    
+    def _write_session(self, session: CollaborationSession):
+        """Upsert the session document from a consistent snapshot of its state."""
+        
+        container = self.cosmos_helper.get_container('collaboration_sessions')
+        
+        # Snapshot under the state lock so concurrent ops cannot mutate it mid-serialization
+        snapshot = self.state_snapshot(session)
+        shared_state, state_version = snapshot['state'], snapshot['version']
+        
+        # Convert session to dict for storage
+        session_data = {
+            'id': session.session_id,
+            'session_type': session.session_type.value,
+            'title': session.title,
+            'description': session.description,
+            'host_id': session.host_id,
+            'participants': {uid: asdict(user) for uid, user in session.participants.items()},
+            'status': session.status.value,
+            'created_at': session.created_at.isoformat(),
+            'started_at': session.started_at.isoformat() if session.started_at else None,
+            'ended_at': session.ended_at.isoformat() if session.ended_at else None,
+            'max_participants': session.max_participants,
+            'is_private': session.is_private,
+            'room_code': session.room_code,
+            'shared_state': shared_state,
+            'state_version': state_version,
+            'tarot_spread': session.tarot_spread,
+            'numerology_data': session.numerology_data,
+            'cosmos_state': session.cosmos_state,
+            'live_cursors': dict(session.live_cursors),
+            'voice_channels': session.voice_channels,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        
+        container.upsert_item(session_data)
+        logger.info(f"Saved session to database: {session.session_id}")
+    
     def _end_session(self, session_id: str):
         """End and clean up a collaboration session."""
         
         if session_id in self.active_sessions:
             session = self.active_sessions[session_id]
             
-            # Save final state to history
+            # Write final state now instead of behind, then history
+            self.persistence.discard(session_id)
+            self._save_session_to_db(session)
             self._save_session_history(session)
             
             # Clean up active sessions
             del self.active_sessions[session_id]
+            self.session_states.pop(session_id, None)
+            self.session_sockets.pop(session_id, None)
+            self.cursor_frames.drop_session(session_id)
+            if self.redis is not None:
+                self.redis.hdel(SESSION_REGISTRY_KEY, session_id)
             
             # Clean up user sessions tracking
             for user_id in list(session.participants.keys()):
@@ -866,7 +986,7 @@ class CollaborationEngine:
                     (session.ended_at - session.started_at).total_seconds() / 60
                     if session.started_at and session.ended_at else 0
                 ),
-                'final_state': session.shared_state,
+                'final_state': self.state_snapshot(session)['state'],
                 'tarot_results': session.tarot_spread,
                 'numerology_results': session.numerology_data,
                 'cosmos_final_state': session.cosmos_state,
@@ -879,28 +999,63 @@ class CollaborationEngine:
         except Exception as e:
             logger.error(f"Failed to save session history: {e}")
     
+    def _session_summary(self, session: CollaborationSession) -> Dict[str, Any]:
+        """Listing entry for a session"""
+        return {
+            'session_id': session.session_id,
+            'title': session.title,
+            'description': session.description,
+            'session_type': session.session_type.value,
+            'status': session.status.value,
+            'participant_count': len(session.participants),
+            'max_participants': session.max_participants,
+            'is_private': session.is_private,
+            'room_code': session.room_code,
+            'created_at': session.created_at.isoformat(),
+            'host_username': session.participants[session.host_id].username if session.host_id in session.participants else 'Unknown'
+        }
+    
+    def _register_session(self, session: CollaborationSession):
+        """Publish a live session's listing entry to the shared registry."""
+        
+        if self.redis is None or session.session_id not in self.active_sessions:
+            return
+        entry = dict(self._session_summary(session), participant_ids=list(session.participants), node=self.fanout.node_id)
+        self.redis.hset(SESSION_REGISTRY_KEY, session.session_id, json.dumps(entry))
+    
+    def session_host(self, session_id: str) -> Optional[str]:
+        """Live worker hosting a session that is not in this worker's memory, if any
+        
+        Registry entries of workers whose fan-out heartbeat expired are removed.
+        """
+        
+        if self.redis is None or session_id in self.active_sessions:
+            return None
+        raw = self.redis.hget(SESSION_REGISTRY_KEY, session_id)
+        if raw is None:
+            return None
+        try:
+            node = json.loads(raw).get('node')
+        except (ValueError, AttributeError):
+            node = None
+        alive = self.fanout.alive_nodes([node]) if node else set()
+        if alive is not None and node not in alive:
+            self.redis.hdel(SESSION_REGISTRY_KEY, session_id)
+            return None
+        return node
+    
     def get_active_sessions(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get list of active collaboration sessions."""
+        """Get list of active collaboration sessions that can be joined through this worker.
+        
+        Sessions held by other workers are left out: joining one here would fail,
+        since its state and participants live in that worker's memory.
+        """
         
         sessions = []
         for session in self.active_sessions.values():
             if user_id and user_id not in session.participants:
                 continue
-                
-            session_info = {
-                'session_id': session.session_id,
-                'title': session.title,
-                'description': session.description,
-                'session_type': session.session_type.value,
-                'status': session.status.value,
-                'participant_count': len(session.participants),
-                'max_participants': session.max_participants,
-                'is_private': session.is_private,
-                'room_code': session.room_code,
-                'created_at': session.created_at.isoformat(),
-                'host_username': session.participants.get(session.host_id, {}).username if session.host_id in session.participants else 'Unknown'
-            }
-            sessions.append(session_info)
+            sessions.append(self._session_summary(session))
         
         return sessions
 
@@ -911,6 +1066,8 @@ def init_collaboration_engine(socketio: SocketIO) -> CollaborationEngine:
     """Initialize the global collaboration engine."""
     global collaboration_engine
     collaboration_engine = CollaborationEngine(socketio)
+    atexit.register(collaboration_engine.persistence.stop)
+    atexit.register(collaboration_engine.cursor_frames.stop)
     return collaboration_engine
 
 def get_collaboration_engine() -> CollaborationEngine:
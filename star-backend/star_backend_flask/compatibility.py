@@ -0,0 +1,440 @@
+"""
+Vectorized multi-zodiac compatibility for STAR
+Each user is encoded once as a small vector of sign codes (Western sun sign,
+Chinese animal and element, Vedic rashi, Mayan day sign). Pairwise scores
+live in precomputed sign x sign tables, so scoring one user against the whole
+user base is a single NumPy gather-and-sum over an (users, systems) code
+matrix and a top-K is an argpartition, with no per-pair Python
+"""
+
+import datetime
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from recommendations import get_compatibility_score
+from redis_utils import get_redis
+from zodiac_atlas import (CHINESE_ANIMALS, CHINESE_ELEMENTS, MAYAN_DAY_SIGNS, VEDIC_RASHIS,
+                          WESTERN_SIGNS, get_zodiac_atlas)
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_SCORE = 0.5          # score against a sign the profile does not have
+COMPATIBILITY_INITIAL_CAPACITY = 1024
+COMPATIBILITY_MAX_K = 100
+COMPATIBILITY_REFRESH_SECONDS = 600         # full reload from the users container
+COMPATIBILITY_GENERATION_CHECK_SECONDS = 5  # how often the shared generation is polled
+COMPATIBILITY_GENERATION_KEY = 'compat:generation'
+COMPATIBILITY_PAGE_SIZE = 1000              # users read per request when loading profiles
+PROFILE_COLUMNS = 'id,birth_date,zodiac_sign,chinese_zodiac,chinese_element,vedic_zodiac'
+
+# Systems in code-vector column order, with the share each has in the total
+SYSTEMS = ('western', 'chinese_animal', 'chinese_element', 'vedic', 'mayan')
+SYSTEM_WEIGHTS = {'western': 0.4, 'chinese_animal': 0.25, 'chinese_element': 0.1, 'vedic': 0.15, 'mayan': 0.1}
+SYSTEM_SIGNS = {
+    'western': WESTERN_SIGNS,
+    'chinese_animal': CHINESE_ANIMALS,
+    'chinese_element': CHINESE_ELEMENTS,
+    'vedic': VEDIC_RASHIS,
+    'mayan': MAYAN_DAY_SIGNS
+}
+# Spellings found in stored profiles
+SIGN_ALIASES = {'vrischika': 'vrishchika', 'sheep': 'goat', 'ram': 'goat', 'chicken': 'rooster', 'boar': 'pig'}
+
+# Shared element and karmic tables (also used by the ritual intelligence profile)
+ELEMENT_COMPATIBILITY = {
+    'fire': {'fire': 0.8, 'air': 0.9, 'water': 0.3, 'earth': 0.4},
+    'water': {'fire': 0.3, 'air': 0.4, 'water': 0.8, 'earth': 0.9},
+    'air': {'fire': 0.9, 'air': 0.8, 'water': 0.4, 'earth': 0.3},
+    'earth': {'fire': 0.4, 'air': 0.3, 'water': 0.9, 'earth': 0.8}
+}
+CHINESE_KARMIC_PAIRS = {
+    'rat': ['dragon', 'monkey'], 'ox': ['snake', 'rooster'], 'tiger': ['horse', 'dog'],
+    'rabbit': ['goat', 'pig'], 'dragon': ['rat', 'monkey'], 'snake': ['ox', 'rooster'],
+    'horse': ['tiger', 'dog'], 'goat': ['rabbit', 'pig'], 'monkey': ['rat', 'dragon'],
+    'rooster': ['ox', 'snake'], 'dog': ['tiger', 'horse'], 'pig': ['rabbit', 'goat']
+}
+
+
+def _western_table() -> np.ndarray:
+    # Rashi i is sidereal sign i, so Vedic pairs score like their Western equivalents
+    return np.array([[get_compatibility_score(a, b) for b in WESTERN_SIGNS] for a in WESTERN_SIGNS])
+
+
+def _chinese_animal_table() -> np.ndarray:
+    table = np.full((12, 12), 0.5)
+    for i, animal in enumerate(CHINESE_ANIMALS):
+        table[i, i] = 0.8
+        table[i, (i + 6) % 12] = 0.2      # the opposing "clash" animal
+        for partner in CHINESE_KARMIC_PAIRS[animal.lower()]:
+            table[i, CHINESE_ANIMALS.index(partner.capitalize())] = 0.9
+    return table
+
+
+def _chinese_element_table() -> np.ndarray:
+    # Same element harmonizes, neighbours in the generating cycle nourish, the rest control
+    steps = np.abs(np.subtract.outer(np.arange(5), np.arange(5))) % 5
+    return np.select([steps == 0, (steps == 1) | (steps == 4)], [0.7, 0.8], 0.3)
+
+
+def _mayan_table() -> np.ndarray:
+    # Day signs of the same colour family (every fourth sign) resonate
+    family = np.arange(20) % 4
+    return np.where(np.equal.outer(family, family), 0.8, 0.5)
+
+
+def _padded(table: np.ndarray) -> np.ndarray:
+    """Add an 'unknown' row and column scoring UNKNOWN_SCORE"""
+    size = len(table)
+    padded = np.full((size + 1, size + 1), UNKNOWN_SCORE, dtype=np.float32)
+    padded[:size, :size] = table
+    return padded
+
+
+SCORE_TABLES = {
+    'western': _padded(_western_table()),
+    'chinese_animal': _padded(_chinese_animal_table()),
+    'chinese_element': _padded(_chinese_element_table()),
+    'vedic': _padded(_western_table()),
+    'mayan': _padded(_mayan_table())
+}
+UNKNOWN_CODES = np.array([len(SYSTEM_SIGNS[system]) for system in SYSTEMS], dtype=np.uint8)
+# Column s of a code matrix indexes into the flattened tables at OFFSETS[s]
+OFFSETS = np.cumsum([0] + [len(SCORE_TABLES[system]) for system in SYSTEMS[:-1]]).astype(np.int16)
+
+
+def _sign_code(system: str, name: Any) -> int:
+    if not name:
+        return int(UNKNOWN_CODES[SYSTEMS.index(system)])
+    key = str(name).strip().lower()
+    key = SIGN_ALIASES.get(key, key)
+    for code, sign in enumerate(SYSTEM_SIGNS[system]):
+        if sign.lower() == key:
+            return code
+    return int(UNKNOWN_CODES[SYSTEMS.index(system)])
+
+
+def _birth_date(profile: Dict) -> Optional[datetime.date]:
+    birth_date = profile.get('birth_date')
+    if isinstance(birth_date, str):
+        try:
+            return datetime.date.fromisoformat(birth_date[:10])
+        except ValueError:
+            return None
+    if isinstance(birth_date, datetime.datetime):
+        return birth_date.date()
+    return birth_date or None
+
+
+def _atlas_codes(records: np.ndarray) -> np.ndarray:
+    return np.stack([records['western'], records['chinese_animal'], records['chinese_element'],
+                     records['vedic_rashi'], records['day_sign']], axis=-1).astype(np.uint8)
+
+
+def _name_codes(profile: Dict) -> np.ndarray:
+    signs = profile.get('zodiac_signs') or {}
+    return np.array([
+        _sign_code('western', profile.get('zodiac_sign') or signs.get('western')),
+        _sign_code('chinese_animal', profile.get('chinese_zodiac') or signs.get('chinese')),
+        _sign_code('chinese_element', profile.get('chinese_element') or signs.get('chinese_element')),
+        _sign_code('vedic', profile.get('vedic_zodiac') or signs.get('vedic')),
+        _sign_code('mayan', profile.get('mayan_day_sign') or signs.get('mayan'))
+    ], dtype=np.uint8)
+
+
+def encode(profile: Dict) -> np.ndarray:
+    """Code vector for a user profile
+
+    A birth date resolves every system through the zodiac atlas; otherwise
+    stored sign names are used (``zodiac_sign`` / ``chinese_zodiac`` /
+    ``vedic_zodiac`` or a ``zodiac_signs`` dict) and missing systems are unknown.
+    """
+    birth_date = _birth_date(profile)
+    if birth_date:
+        return _atlas_codes(get_zodiac_atlas().lookup_many([birth_date]))[0]
+    return _name_codes(profile)
+
+
+def encode_many(profiles: Iterable[Dict]) -> Tuple[List[str], np.ndarray]:
+    """User ids and an (n, systems) code matrix, with every birth date resolved in one atlas lookup"""
+    ids: List[str] = []
+    codes: List[Optional[np.ndarray]] = []
+    dated_rows: List[int] = []
+    dates: List[datetime.date] = []
+    for profile in profiles:
+        if profile.get('id') is None:
+            continue
+        birth_date = _birth_date(profile)
+        if birth_date:
+            dated_rows.append(len(codes))
+            dates.append(birth_date)
+            codes.append(None)
+        else:
+            codes.append(_name_codes(profile))
+        ids.append(str(profile['id']))
+    matrix = np.empty((len(ids), len(SYSTEMS)), dtype=np.uint8)
+    for row, row_codes in enumerate(codes):
+        if row_codes is not None:
+            matrix[row] = row_codes
+    if dates:
+        matrix[dated_rows] = _atlas_codes(get_zodiac_atlas().lookup_many(dates))
+    return ids, matrix
+
+
+def load_profiles(table: Any, page_size: int = COMPATIBILITY_PAGE_SIZE) -> List[Dict]:
+    """Every user's zodiac fields from the Supabase users table, read in id-ordered pages
+
+    Errors propagate so a failed reload keeps the previous matrix instead of emptying it.
+    """
+    profiles: List[Dict] = []
+    start = 0
+    while True:
+        page = table.select(PROFILE_COLUMNS).order('id').range(start, start + page_size - 1).execute().data or []
+        profiles.extend(page)
+        if len(page) < page_size:
+            return profiles
+        start += page_size
+
+
+def mark_profiles_changed() -> None:
+    """Tell every worker's index that zodiac fields changed somewhere"""
+    get_redis().incr(COMPATIBILITY_GENERATION_KEY)
+
+
+def weighted_rows(codes: np.ndarray) -> np.ndarray:
+    """One user's weighted score rows, concatenated to match OFFSETS"""
+    return np.concatenate([SYSTEM_WEIGHTS[system] * SCORE_TABLES[system][codes[s]]
+                           for s, system in enumerate(SYSTEMS)]).astype(np.float32)
+
+
+def score_codes(codes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Compatibility of one code vector against an (n, systems) code matrix"""
+    if not len(others):
+        return np.zeros(0, dtype=np.float32)
+    return weighted_rows(codes)[others + OFFSETS].sum(axis=1)
+
+
+def breakdown(a: np.ndarray, b: np.ndarray) -> Dict[str, float]:
+    """Per-system scores for one pair"""
+    return {system: round(float(SCORE_TABLES[system][a[s], b[s]]), 2) for s, system in enumerate(SYSTEMS)}
+
+
+def sign_compatibility(sign1: str, sign2: str) -> float:
+    """Western sign-to-sign score from the shared table"""
+    return float(SCORE_TABLES['western'][_sign_code('western', sign1), _sign_code('western', sign2)])
+
+
+class CompatibilityIndex:
+    """In-memory code matrix of every user, scored in bulk
+
+    The matrix is reloaded from the bound loader every ``refresh_seconds``
+    and whenever the shared generation counter in Redis moves, so profiles
+    written by other workers are picked up. Reloads are encoded in bulk and
+    swapped in whole, off the query lock.
+    """
+
+    def __init__(self, capacity: int = COMPATIBILITY_INITIAL_CAPACITY,
+                 refresh_seconds: float = COMPATIBILITY_REFRESH_SECONDS):
+        self._codes = np.empty((capacity, len(SYSTEMS)), dtype=np.uint8)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._loader: Optional[Callable[[], Iterable[Dict]]] = None
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._generation: Optional[str] = None
+        self._generation_checked_at = 0.0
+        self._recent: Optional[Dict[str, Optional[np.ndarray]]] = None  # local writes during a reload
+        self.refresh_seconds = refresh_seconds
+        self.refreshes = 0
+        self.queries = 0
+        self.query_ms = 0.0
+
+    def bind(self, loader: Callable[[], Iterable[Dict]]) -> None:
+        """Source of all user profiles, read on first use and on every refresh"""
+        self._loader = loader
+        self._loaded = False
+
+    def warm(self) -> threading.Thread:
+        """Load the index in the background (called at startup)"""
+        thread = threading.Thread(target=self.refresh, name='compatibility-warm', daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self, force: bool = True) -> int:
+        """Reload every profile from the loader; concurrent callers share one reload"""
+        if self._loader is None:
+            return len(self)
+        if not self._refresh_lock.acquire(blocking=not self._loaded):
+            return len(self)
+        try:
+            if not force and not self._is_stale():
+                return len(self)
+            generation = self._shared_generation()
+            with self._lock:
+                self._recent = {}
+            started = time.perf_counter()
+            ids, codes = encode_many(self._loader())
+            with self._lock:
+                capacity = max(len(self._codes), COMPATIBILITY_INITIAL_CAPACITY)
+                while capacity < len(ids):
+                    capacity *= 2
+                self._codes = np.empty((capacity, len(SYSTEMS)), dtype=np.uint8)
+                self._codes[:len(ids)] = codes
+                self._ids = ids
+                self._rows = {user_id: row for row, user_id in enumerate(ids)}
+                recent, self._recent = self._recent, None
+                for user_id, user_codes in recent.items():
+                    if user_codes is None:
+                        self.remove(user_id)
+                    else:
+                        self.upsert_codes(user_id, user_codes)
+                self._loaded = True
+                self._loaded_at = time.monotonic()
+                self._generation = generation
+                self.refreshes += 1
+            logger.info(f"Compatibility index loaded {len(ids)} users in "
+                        f"{(time.perf_counter() - started) * 1000:.0f} ms")
+            return len(ids)
+        except Exception as e:
+            with self._lock:
+                self._recent = None
+            logger.error(f"Compatibility index refresh failed: {e}")
+            return len(self)
+        finally:
+            self._refresh_lock.release()
+
+    def _shared_generation(self) -> Optional[str]:
+        return get_redis().get(COMPATIBILITY_GENERATION_KEY)
+
+    def _is_stale(self) -> bool:
+        if not self._loaded:
+            return True
+        now = time.monotonic()
+        if now - self._loaded_at >= self.refresh_seconds:
+            return True
+        if now - self._generation_checked_at >= COMPATIBILITY_GENERATION_CHECK_SECONDS:
+            self._generation_checked_at = now
+            return self._shared_generation() != self._generation
+        return False
+
+    def _ensure_loaded(self) -> None:
+        if self._loader is None:
+            return
+        if not self._loaded:
+            self.refresh(force=False)
+        elif not self._refresh_lock.locked() and self._is_stale():
+            threading.Thread(target=self.refresh, name='compatibility-refresh', daemon=True).start()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: str) -> bool:
+        return str(user_id) in self._rows
+
+    def upsert(self, user_id: str, profile: Dict) -> None:
+        self.upsert_codes(user_id, encode(profile))
+
+    def upsert_many(self, profiles: Iterable[Dict]) -> int:
+        ids, codes = encode_many(profiles)
+        with self._lock:
+            for user_id, user_codes in zip(ids, codes):
+                self.upsert_codes(user_id, user_codes)
+        return len(ids)
+
+    def upsert_codes(self, user_id: str, codes: np.ndarray) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            if self._recent is not None:
+                self._recent[user_id] = np.array(codes, dtype=np.uint8)
+            row = self._rows.get(user_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._codes):
+                    self._codes = np.concatenate([self._codes, np.empty_like(self._codes)])
+                self._ids.append(user_id)
+                self._rows[user_id] = row
+            self._codes[row] = codes
+
+    def remove(self, user_id: str) -> bool:
+        """Drop a user by moving the last row into its slot"""
+        user_id = str(user_id)
+        with self._lock:
+            if self._recent is not None:
+                self._recent[user_id] = None
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return False
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._codes[row] = self._codes[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+            return True
+
+    def codes_for(self, user_id: str) -> Optional[np.ndarray]:
+        self._ensure_loaded()
+        row = self._rows.get(str(user_id))
+        return None if row is None else self._codes[row].copy()
+
+    def score(self, user_a: str, user_b: str) -> Optional[float]:
+        a, b = self.codes_for(user_a), self.codes_for(user_b)
+        if a is None or b is None:
+            return None
+        return float(score_codes(a, b[None, :])[0])
+
+    def top_k(self, user_id: str, k: int = 10, exclude: Sequence[str] = (),
+              codes: Optional[np.ndarray] = None) -> List[Tuple[str, float, Dict[str, float]]]:
+        """The ``k`` most compatible other users as (user_id, score, per-system scores)"""
+        self._ensure_loaded()
+        started = time.perf_counter()
+        k = max(1, min(int(k), COMPATIBILITY_MAX_K))
+        with self._lock:
+            codes = codes if codes is not None else self.codes_for(user_id)
+            if codes is None:
+                return []
+            matrix = self._codes[:len(self._ids)]
+            scores = score_codes(codes, matrix)
+            for skipped in (user_id, *exclude):
+                row = self._rows.get(str(skipped))
+                if row is not None:
+                    scores[row] = -np.inf
+            k = min(k, int(np.isfinite(scores).sum()))
+            if k <= 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind='stable')]
+            results = [(self._ids[row], round(float(scores[row]), 4), breakdown(codes, matrix[row]))
+                       for row in best]
+        self.queries += 1
+        self.query_ms += (time.perf_counter() - started) * 1000
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'users': len(self._ids),
+            'bytes': int(self._codes.nbytes),
+            'refreshes': self.refreshes,
+            'queries': self.queries,
+            'avg_query_ms': round(self.query_ms / self.queries, 3) if self.queries else 0.0
+        }
+
+
+# Global compatibility index instance
+_compatibility_index = None
+_index_lock = threading.Lock()
+
+
+def get_compatibility_index() -> CompatibilityIndex:
+    """Get global CompatibilityIndex instance"""
+    global _compatibility_index
+    if _compatibility_index is None:
+        with _index_lock:
+            if _compatibility_index is None:
+                _compatibility_index = CompatibilityIndex()
+    return _compatibility_index
@@ -4,7 +4,16 @@ import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+from auth_cache import invalidate_principal
+from compatibility import mark_profiles_changed
+from counters import get_counter_service
 from supabase import Client, create_client
+from user_loader import invalidate_user
+
+try:
+    from redis_utils import get_redis
+except ImportError:
+    get_redis = None
 
 
 # Mock Supabase client for development/testing
@@ -72,6 +81,9 @@ class MockQuery:
     def in_(self, *args, **kwargs):
         return self
 
+    def or_(self, *args, **kwargs):
+        return self
+
     def contains(self, *args, **kwargs):
         return self
 
@@ -107,6 +119,34 @@ class MockQuery:
 # Constants
 BLOB_STORAGE_NOT_INITIALIZED = "Blob storage not initialized"
 
+# Counter service scope for Supabase post counts; likes/comments rows are the
+# source of truth, so no write-behind writer is registered for it
+POST_COUNTER_SCOPE = "post"
+
+# Sparks have no table yet, so their counts are persisted write-behind in a
+# Redis hash per post rather than living only in the counter cache
+SPARK_COUNTER_SCOPE = "post_sparks"
+SPARK_COUNTER_KEY = "post:counters:{}"
+
+
+def apply_spark_counter_deltas(post_id: str, deltas: Dict[str, int]) -> None:
+    """Persist spark count deltas; raises so the counter service retries when Redis is down"""
+    redis = get_redis() if get_redis else None
+    if not redis or not redis.hincrby_many({SPARK_COUNTER_KEY.format(post_id): deltas}):
+        raise Exception("Redis not available for spark counters")
+
+
+def load_spark_count(post_id: str) -> int:
+    redis = get_redis() if get_redis else None
+    value = redis.hget(SPARK_COUNTER_KEY.format(post_id), 'sparks') if redis else None
+    return int(value) if value else 0
+
+
+get_counter_service().register_writer(SPARK_COUNTER_SCOPE, apply_spark_counter_deltas)
+
+# Profile fields the compatibility index encodes; editing one invalidates it
+PROFILE_ZODIAC_FIELDS = {'birth_date', 'zodiac_sign', 'chinese_zodiac', 'chinese_element', 'vedic_zodiac', 'zodiac_signs'}
+
 # Query parameter constants (keeping for compatibility)
 PARAM_USER_ID = "@user_id"
 PARAM_USERNAME = "@username"
@@ -179,11 +219,26 @@ class SupabaseDBHelper:
             logging.error(f"Error getting user by username: {e}")
             return None
 
+    def get_users_by_ids(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get several users by ID in one query"""
+        if not user_ids:
+            return []
+        try:
+            response = self.supabase.table('users').select('*').in_('id', list(user_ids)).execute()
+            return response.data or []
+        except Exception as e:
+            logging.error(f"Error getting users by IDs: {e}")
+            return []
+
     def update_user(self, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update user data"""
         try:
             updates['updated_at'] = datetime.now(timezone.utc).isoformat()
             response = self.supabase.table('users').update(updates).eq('id', user_id).execute()
+            invalidate_user(user_id)
+            invalidate_principal(user_id)
+            if PROFILE_ZODIAC_FIELDS & updates.keys():
+                mark_profiles_changed()
             return response.data[0] if response.data else None
         except Exception as e:
             logging.error(f"Error updating user: {e}")
@@ -292,6 +347,7 @@ class SupabaseDBHelper:
         try:
             profile_data['updated_at'] = datetime.now(timezone.utc).isoformat()
             response = self.supabase.table('profiles').update(profile_data).eq('user_id', user_id).execute()
+            invalidate_user(user_id)
             return response.data[0] if response.data else None
         except Exception as e:
             logging.error(f"Error updating profile: {e}")
@@ -313,6 +369,7 @@ class SupabaseDBHelper:
             like_data['created_at'] = datetime.now(timezone.utc).isoformat()
 
             response = self.supabase.table('likes').insert(like_data).execute()
+            get_counter_service().increment(POST_COUNTER_SCOPE, like_data.get('post_id'), 'likes', 1)
             return response.data[0] if response.data else {}
         except Exception as e:
             logging.error(f"Error creating like: {e}")
@@ -322,7 +379,10 @@ class SupabaseDBHelper:
         """Delete a like"""
         try:
             response = self.supabase.table('likes').delete().eq('post_id', post_id).eq('user_id', user_id).execute()
-            return len(response.data) > 0
+            deleted = len(response.data) > 0
+            if deleted:
+                get_counter_service().increment(POST_COUNTER_SCOPE, post_id, 'likes', -1)
+            return deleted
         except Exception as e:
             logging.error(f"Error deleting like: {e}")
             return False
@@ -336,11 +396,14 @@ class SupabaseDBHelper:
             logging.error(f"Error checking like exists: {e}")
             return False
 
+    def _count_likes(self, post_id: str) -> int:
+        response = self.supabase.table('likes').select('id', count='exact').eq('post_id', post_id).limit(1).execute()
+        return response.count or 0
+
     def get_likes_count(self, post_id: str) -> int:
-        """Get likes count for a post"""
+        """Get likes count for a post from the counter service (rows are counted only on a cache miss)"""
         try:
-            response = self.supabase.table('likes').select('*', count='exact').eq('post_id', post_id).execute()
-            return response.count or 0
+            return get_counter_service().get(POST_COUNTER_SCOPE, post_id, 'likes', lambda: self._count_likes(post_id))
         except Exception as e:
             logging.error(f"Error getting likes count: {e}")
             return 0
@@ -352,6 +415,7 @@ class SupabaseDBHelper:
             comment_data['created_at'] = datetime.now(timezone.utc).isoformat()
 
             response = self.supabase.table('comments').insert(comment_data).execute()
+            get_counter_service().increment(POST_COUNTER_SCOPE, comment_data.get('post_id'), 'comments', 1)
             return response.data[0] if response.data else {}
         except Exception as e:
             logging.error(f"Error creating comment: {e}")
@@ -389,8 +453,9 @@ class SupabaseDBHelper:
 
     # Placeholder methods for compatibility - implement as needed
     def create_spark(self, spark_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a spark (placeholder)"""
+        """Create a spark (placeholder; the count is still persisted through the counter service)"""
         logging.warning("create_spark not implemented for Supabase")
+        get_counter_service().increment(SPARK_COUNTER_SCOPE, spark_data.get('post_id'), 'sparks', 1)
         return spark_data
 
     def get_sparks_by_post(self, _post_id: str) -> List[Dict[str, Any]]:
@@ -403,10 +468,13 @@ class SupabaseDBHelper:
         logging.warning("check_spark_exists not implemented for Supabase")
         return False
 
-    def get_sparks_count(self, _post_id: str) -> int:
-        """Get sparks count (placeholder)"""
-        logging.warning("get_sparks_count not implemented for Supabase")
-        return 0
+    def get_sparks_count(self, post_id: str) -> int:
+        """Get sparks count from the counter service (the persisted base lives in Redis)"""
+        try:
+            return get_counter_service().get(SPARK_COUNTER_SCOPE, post_id, 'sparks', lambda: load_spark_count(post_id))
+        except Exception as e:
+            logging.error(f"Error getting sparks count: {e}")
+            return 0
 
     def get_comments(self, post_id: str, page: int = 1, per_page: int = 10) -> List[Dict[str, Any]]:
         """Get comments with pagination"""
@@ -0,0 +1,227 @@
+"""
+Counter service for STAR engagement counts
+Coalesces likes/comments/sparks increments in memory and flushes the
+deltas write-behind as atomic increments, so hot posts cost one write per
+flush interval instead of a read-modify-write per interaction
+"""
+
+import atexit
+import contextlib
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from cache_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 0.25   # write-behind cadence for pending deltas
+COUNTER_CACHE_SIZE = 50000
+COUNTER_CACHE_TTL = 300         # seconds before a count is re-read from the database
+COUNTER_MAX_RETRIES = 5         # failed flushes of one entity before its deltas are dead-lettered
+COUNTER_DEAD_LETTER_SIZE = 1000
+
+# apply_fn(entity_id, {field: delta}) persists deltas atomically (e.g. Cosmos patch incr)
+DeltaWriter = Callable[[str, Dict[str, int]], None]
+
+
+class CounterService:
+    """Atomic-increment counters with a write-behind coalescing buffer"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 cache_ttl: float = COUNTER_CACHE_TTL, max_retries: int = COUNTER_MAX_RETRIES):
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._values = TTLCache(maxsize=COUNTER_CACHE_SIZE, ttl=cache_ttl)
+        self._pending: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._inflight: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._writers: Dict[str, DeltaWriter] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}
+        self._held: Dict[Tuple[str, str], int] = {}  # entities whose deltas stay queued (hold depth)
+        self._generation = 0  # bumped whenever an in-flight write settles (written or re-queued)
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=COUNTER_DEAD_LETTER_SIZE)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()  # held while deltas are being written
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.flushes = 0
+        self.coalesced_increments = 0
+
+    def register_writer(self, scope: str, apply_fn: DeltaWriter) -> None:
+        """Persist deltas for ``scope`` through ``apply_fn``; scopes without a writer are cache-only"""
+        self._writers[scope] = apply_fn
+
+    def increment(self, scope: str, entity_id: str, field: str, delta: int = 1) -> None:
+        """Apply a delta to the live count and queue it for write-behind"""
+        key = (scope, str(entity_id), field)
+        with self._lock:
+            current = self._values.get(key)
+            if current is not None:
+                self._values.set(key, max(0, current + delta))
+            if scope in self._writers:
+                self._pending[(scope, str(entity_id))][field] += delta
+                self.coalesced_increments += 1
+                self._ensure_flusher()
+
+    def get(self, scope: str, entity_id: str, field: str, load: Callable[[], int]) -> int:
+        """Read a count, loading the persisted base on a miss and adding unflushed deltas"""
+        key = (scope, str(entity_id), field)
+        value = self._values.get(key)
+        if value is not None:
+            return value
+
+        entity = (scope, str(entity_id))
+        with self._lock:
+            generation, settled = self._generation, entity not in self._inflight
+        base = load() or 0
+        with self._lock:
+            if settled and generation == self._generation and entity not in self._inflight:
+                # No write of this entity ran during the load, so queued deltas are all the base lacks
+                return self._cache(key, base + self._pending.get(entity, {}).get(field, 0))
+
+        # A write of this entity was in flight, so the base may or may not include it:
+        # reload with flushes held off, when nothing is in flight
+        with self._flush_lock:
+            base = load() or 0
+            with self._lock:
+                pending = self._pending.get(entity, {}).get(field, 0)
+                pending += self._inflight.get(entity, {}).get(field, 0)
+                return self._cache(key, base + pending)
+
+    def _cache(self, key: Tuple[str, str, str], value: int) -> int:
+        value = max(0, value)
+        self._values.set(key, value)
+        return value
+
+    def forget(self, scope: str, entity_id: str, fields) -> None:
+        """Drop cached counts so the next read reloads the persisted base"""
+        for field in fields:
+            self._values.delete((scope, str(entity_id), field))
+
+    def discard(self, scope: str, entity_id: str) -> Dict[str, int]:
+        """Drop an entity's queued deltas (e.g. once a rebuild has counted them); returns them"""
+        with self._lock:
+            return dict(self._pending.pop((scope, str(entity_id)), {}))
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Hold off flushes, waiting for one in progress, for the duration of the block"""
+        with self._flush_lock:
+            yield
+
+    @contextlib.contextmanager
+    def held(self, scope: str, entity_id: str):
+        """Keep one entity's deltas queued for the duration of the block, after any flush in progress
+
+        Unlike paused(), other entities keep flushing.
+        """
+        key = (scope, str(entity_id))
+        with self._flush_lock:
+            with self._lock:
+                self._held[key] = self._held.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._held[key] > 1:
+                    self._held[key] -= 1
+                else:
+                    del self._held[key]
+
+    def flush(self) -> int:
+        """Write all pending deltas; failed writes are re-queued up to ``max_retries`` times, then
+        dead-lettered. Returns entities written."""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            if self._held:
+                batch = {key: self._pending.pop(key) for key in list(self._pending) if key not in self._held}
+            else:
+                batch, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            self._inflight = dict(batch)  # entries leave as their writes settle
+
+        written = 0
+        for (scope, entity_id), deltas in batch.items():
+            deltas = {field: delta for field, delta in deltas.items() if delta}
+            if not deltas:
+                with self._lock:
+                    self._inflight.pop((scope, entity_id), None)
+                continue
+            try:
+                self._writers[scope](entity_id, deltas)
+                written += 1
+                with self._lock:
+                    self._failures.pop((scope, entity_id), None)
+                    self._settle((scope, entity_id))
+            except Exception as e:
+                with self._lock:
+                    self._settle((scope, entity_id))
+                    failures = self._failures[(scope, entity_id)] = self._failures.get((scope, entity_id), 0) + 1
+                    if failures < self.max_retries:
+                        for field, delta in deltas.items():
+                            self._pending[(scope, entity_id)][field] += delta
+                        dead = False
+                    else:
+                        del self._failures[(scope, entity_id)]
+                        self.dead_letters.append({'scope': scope, 'entity_id': entity_id,
+                                                  'deltas': deltas, 'error': str(e)})
+                        dead = True
+                if dead:
+                    # The cached counts include deltas that will never be written
+                    self.forget(scope, entity_id, deltas)
+                    logger.error(f"Counter flush for {scope}:{entity_id} failed {failures} times, "
+                                 f"dead-lettered {deltas}: {e}")
+                else:
+                    logger.error(f"Counter flush failed for {scope}:{entity_id} (attempt {failures}): {e}")
+        with self._lock:
+            self._inflight = {}
+        if written:
+            self.flushes += 1
+        return written
+
+    def _settle(self, entity: Tuple[str, str]) -> None:
+        """An in-flight write finished (persisted or re-queued); call under _lock"""
+        self._inflight.pop(entity, None)
+        self._generation += 1
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stopped.clear()
+            self._flusher = threading.Thread(target=self._run, name='counter-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self) -> None:
+        """Stop the flusher and drain pending deltas"""
+        self._stopped.set()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = sum(len(deltas) for deltas in self._pending.values())
+        return {
+            'pending_counters': pending,
+            'flushes': self.flushes,
+            'coalesced_increments': self.coalesced_increments,
+            'cached_counts': len(self._values),
+            'dead_lettered': len(self.dead_letters)
+        }
+
+
+# Global counter service instance
+_counter_service = None
+
+
+def get_counter_service() -> CounterService:
+    """Get global CounterService instance"""
+    global _counter_service
+    if _counter_service is None:
+        _counter_service = CounterService()
+        atexit.register(_counter_service.stop)
+    return _counter_service
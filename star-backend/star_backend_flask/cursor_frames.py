@@ -0,0 +1,135 @@
+"""
+Live cursor frames for STAR collaboration sessions
+Cursor moves only overwrite the participant's latest position; a ticker
+emits one array-encoded frame per session at ~30 Hz carrying every
+cursor that moved since the previous frame. Participants are addressed
+by small per-session slot numbers instead of user ids, and the frame
+carries one millisecond timestamp instead of one ISO string per move
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CURSOR_FRAME_HZ = 30
+CURSOR_FRAME_VERSION = 1
+CURSOR_PRECISION = 1     # decimals kept for x/y
+
+# emit_frame(session_id, frame) delivers one frame to a session
+FrameEmitter = Callable[[str, Dict[str, Any]], None]
+
+
+def encode_frame(moves: Dict[int, Tuple[float, float, Optional[str]]], now: float) -> Dict[str, Any]:
+    """``{'v', 't', 'c': [[slot, x, y, element], ...]}`` for the moves of one tick"""
+    return {
+        'v': CURSOR_FRAME_VERSION,
+        't': int(now * 1000),
+        'c': [[slot, round(x, CURSOR_PRECISION), round(y, CURSOR_PRECISION), element]
+              for slot, (x, y, element) in sorted(moves.items())]
+    }
+
+
+def decode_frame(frame: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'slot': slot, 'x': x, 'y': y, 'element': element} for slot, x, y, element in frame['c']]
+
+
+class CursorFrames:
+    """Coalesces cursor moves per session into fixed-rate frames"""
+
+    def __init__(self, emit_frame: FrameEmitter, hz: float = CURSOR_FRAME_HZ):
+        self.emit_frame = emit_frame
+        self.period = 1.0 / hz
+        self._slots: Dict[str, Dict[str, int]] = {}                      # session -> user -> slot
+        self._pending: Dict[str, Dict[int, Tuple[float, float, Optional[str]]]] = {}
+        self._lock = threading.Lock()
+        self._has_pending = threading.Event()
+        self._stopped = threading.Event()
+        self._ticker: Optional[threading.Thread] = None
+        self.moves = 0
+        self.frames = 0
+
+    # Slots
+
+    def slot(self, session_id: str, user_id: str) -> int:
+        """Stable slot for a participant, reusing the lowest free one"""
+        with self._lock:
+            slots = self._slots.setdefault(session_id, {})
+            if user_id not in slots:
+                taken = set(slots.values())
+                slots[user_id] = next(i for i in range(len(slots) + 1) if i not in taken)
+            return slots[user_id]
+
+    def slots(self, session_id: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._slots.get(session_id, {}))
+
+    def release(self, session_id: str, user_id: str) -> None:
+        with self._lock:
+            slot = self._slots.get(session_id, {}).pop(user_id, None)
+            if slot is not None:
+                self._pending.get(session_id, {}).pop(slot, None)
+
+    def drop_session(self, session_id: str) -> None:
+        with self._lock:
+            self._slots.pop(session_id, None)
+            self._pending.pop(session_id, None)
+
+    # Moves and frames
+
+    def update(self, session_id: str, user_id: str, x: float, y: float, element: Optional[str] = None) -> None:
+        """Record a move (no I/O); only the latest position per tick is sent"""
+        slot = self.slot(session_id, user_id)
+        with self._lock:
+            self.moves += 1
+            self._pending.setdefault(session_id, {})[slot] = (float(x), float(y), element)
+        self._has_pending.set()
+        self._ensure_ticker()
+
+    def flush(self) -> int:
+        """Emit one frame per session with pending moves; returns frames emitted"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._has_pending.clear()
+        now = time.time()
+        emitted = 0
+        for session_id, moves in pending.items():
+            if not moves:
+                continue
+            try:
+                self.emit_frame(session_id, encode_frame(moves, now))
+                emitted += 1
+            except Exception as e:
+                logger.warning(f"Cursor frame emit failed for session {session_id}: {e}")
+        self.frames += emitted
+        return emitted
+
+    def _ensure_ticker(self) -> None:
+        if self._ticker is not None:
+            return
+        with self._lock:
+            if self._ticker is None and not self._stopped.is_set():
+                self._ticker = threading.Thread(target=self._run, name='cursor-frames', daemon=True)
+                self._ticker.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            # Idle until someone moves, then tick at the frame rate
+            self._has_pending.wait()
+            if self._stopped.is_set():
+                break
+            self.flush()
+            self._stopped.wait(self.period)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._has_pending.set()
+        if self._ticker is not None:
+            self._ticker.join(timeout=1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = len(self._slots)
+        return {'sessions': sessions, 'moves': self.moves, 'frames': self.frames, 'hz': round(1.0 / self.period, 1)}
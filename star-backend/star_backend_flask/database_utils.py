@@ -77,6 +77,17 @@ def update_user_online_status(username, is_online=True):
         logger.error(f"Error updating user online status: {e}")
         return False
 
+def mark_users_online(user_ids, seen_at):
+    """Mark several users online as of seen_at in one UPDATE (presence flusher)"""
+    helper = get_cosmos_helper()
+    timestamp = seen_at.isoformat()
+    helper.table('users').update({
+        'is_online': True,
+        'last_seen': timestamp,
+        'updated_at': timestamp
+    }).in_('id', list(user_ids)).execute()
+    logger.debug(f"Marked {len(user_ids)} users online")
+
 def get_users_container():
     """Get users container - helper function (returns Supabase table)"""
     try:
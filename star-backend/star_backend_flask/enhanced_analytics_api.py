@@ -236,6 +236,12 @@ def track_enhanced_engagement():
         
         user_id = g.current_user['id']
         
+        # Signs come from the authenticated user's profile, never the payload
+        profile = getattr(g, 'user_profile', None) or g.current_user
+        zodiac_signs = profile.get('zodiac_signs')
+        if not zodiac_signs and profile.get('zodiac_sign'):
+            zodiac_signs = {'western': profile['zodiac_sign']}
+        
         # Create engagement event
         event = EngagementEvent(
             user_id=user_id,
@@ -244,7 +250,7 @@ def track_enhanced_engagement():
             metadata=data.get('metadata', {}),
             session_id=data.get('session_id'),
             duration=data.get('duration'),
-            zodiac_signs=data.get('zodiac_signs'),
+            zodiac_signs=zodiac_signs,
             location=data.get('location')
         )
         
@@ -3,19 +3,25 @@
 Enhanced STAR Backend with Real-Time Features
 Supports WebSocket, personalized feeds, virtual scrolling, and offline caching
 """
-import json
 import logging
 import random
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
 
+from compatibility import encode, get_compatibility_index, sign_compatibility
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
+from pagination import (Cursor, InvalidCursor, list_seek, page_info, page_params, sort_newest_first,
+                        split_page)
+from search_index import get_search_index, interest_topics, post_interests, post_terms, tokenize
+from socket_fanout import init_socket_fanout
 
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Cross-worker delivery and shared room membership (local-only without Redis)
+fanout = init_socket_fanout(socketio)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,8 +56,12 @@ USERS_DB = {
     }
 }
 
-# Connected clients for real-time updates
-CONNECTED_CLIENTS = {}
+# Mock posts the search index is seeded with when it starts empty
+SEARCH_CORPUS_SIZE = 2000
+
+# Size of the mock zodiac moment / constellation thread streams
+MOCK_MOMENT_COUNT = 220
+MOCK_THREAD_COUNT = 60
 
 def generate_cosmic_posts(count=100, filters=None):
     """Generate cosmic posts with advanced filtering support"""
@@ -132,21 +142,49 @@ def matches_filters(post, filters):
     if filters.get('postTypes') and post['type'] not in filters['postTypes']:
         return False
     
+    topics = interest_topics(filters.get('interests') or ())
+    if topics and not set(topics) & post_interests(post):
+        return False
+    
     if filters.get('searchQuery'):
-        query = filters['searchQuery'].lower()
-        searchable_text = json.dumps(post).lower()
-        if query not in searchable_text:
+        if not set(tokenize(filters['searchQuery'])) <= post_terms(post):
             return False
     
     return True
 
+def search_index():
+    """Post search index, seeded in memory with the mock corpus on first use"""
+    index = get_search_index()
+    if not len(index):
+        # Demo posts are never written to the shared index directory
+        index.add_many(generate_cosmic_posts(SEARCH_CORPUS_SIZE), persist=False)
+    return index
+
+def compatibility_index():
+    """User compatibility index, seeded with the mock users on first use"""
+    index = get_compatibility_index()
+    if not len(index):
+        index.upsert_many(USERS_DB.values())
+    return index
+
+def search_facets(filters):
+    """Index facet filters for feed/search filters"""
+    facets = {}
+    if filters.get('zodiacSigns'):
+        facets['sign'] = filters['zodiacSigns']
+    if filters.get('postTypes'):
+        facets['type'] = filters['postTypes']
+    topics = interest_topics(filters.get('interests') or ())
+    if topics:
+        facets['interest'] = topics
+    return facets
+
 @app.route('/api/v1/feed', methods=['GET'])
 def cosmic_feed():
     """Enhanced cosmic feed with advanced filtering and virtual scrolling support"""
     try:
-        # Get pagination parameters
-        limit = min(int(request.args.get('limit', 10)), 100)  # Support up to 100 items for virtual scrolling
-        offset = int(request.args.get('offset', 0))
+        # Get pagination parameters; up to 100 items for virtual scrolling
+        limit, cursor, include_total = page_params(request.args, default_limit=10)
         
         # Get filtering parameters
         filters = {
@@ -176,39 +214,49 @@ def cosmic_feed():
                 'zodiacSigns': list(user_context['zodiac_signs'].values()),
                 'interests': user_context['interests']
             }
-            # Mix personalized (70%) and diverse (30%) content
+            # Mix personalized (70%) and diverse (30%) content, both continuing from the cursor
             personalized_count = int(limit * 0.7)
             diverse_count = limit - personalized_count
             
-            personalized_posts = generate_cosmic_posts(200, user_filters)[:personalized_count]
-            diverse_posts = generate_cosmic_posts(200)[:diverse_count]
+            personalized_pool = generate_cosmic_posts(200, user_filters)
+            diverse_pool = generate_cosmic_posts(200)
+            personalized_posts, personalized_next = list_seek(
+                sort_newest_first(personalized_pool), cursor, personalized_count)
+            diverse_posts, diverse_next = list_seek(
+                sort_newest_first(diverse_pool), cursor, diverse_count)
             
-            all_posts = personalized_posts + diverse_posts
-            random.shuffle(all_posts)  # Mix them naturally
+            paginated_data = sort_newest_first(personalized_posts + diverse_posts)
+            next_cursor = (Cursor.after(paginated_data[-1]).encode()
+                           if paginated_data and (personalized_next or diverse_next) else None)
+            total = len(personalized_pool) + len(diverse_pool)
         else:
-            # Standard filtered feed
-            all_posts = generate_cosmic_posts(1000, filters if filters else None)
-        
-        # Apply pagination
-        paginated_data = all_posts[offset:offset + limit]
+            if filters.get('searchQuery'):
+                # Text-filtered feed: every query term must match, newest first; the index
+                # seeks past the cursor and returns just this page plus one
+                before = (cursor.created_at, cursor.id) if cursor and cursor.created_at is not None else None
+                total, rows = search_index().search_newest(filters['searchQuery'], search_facets(filters),
+                                                           limit=limit + 1, before=before, require_all=True)
+                paginated_data, next_cursor = split_page(rows, limit)
+            else:
+                # Standard filtered feed
+                all_posts = generate_cosmic_posts(1000, filters if filters else None)
+                total = len(all_posts)
+                paginated_data, next_cursor = list_seek(sort_newest_first(all_posts), cursor, limit)
         
         # Add virtual scrolling metadata
         response_data = {
             'posts': paginated_data,
-            'pagination': {
-                'offset': offset,
-                'limit': limit,
-                'total_available': len(all_posts),
-                'has_more': offset + limit < len(all_posts)
-            },
+            'pagination': page_info(next_cursor, total if include_total else None, limit),
             'filters_applied': filters,
             'personalized': bool(user_context and not filters.get('searchQuery'))
         }
         
-        logging.info(f"Feed request: limit={limit}, offset={offset}, filters={filters}, returned={len(paginated_data)} items")
+        logging.info(f"Feed request: limit={limit}, cursor={cursor}, filters={filters}, returned={len(paginated_data)} items")
         
         return jsonify(response_data)
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Feed error: {e}")
         return jsonify({'error': 'Failed to load feed'}), 500
@@ -233,29 +281,9 @@ def search_posts():
         if request.args.get('type'):
             filters['postTypes'] = [request.args.get('type')]
         
-        # Search through posts
-        all_posts = generate_cosmic_posts(2000, filters)
-        
-        # Sort by relevance (mock scoring)
-        for post in all_posts:
-            score = 0
-            content_text = json.dumps(post).lower()
-            query_lower = query.lower()
-            
-            # Score based on query matches
-            score += content_text.count(query_lower) * 10
-            if query_lower in post.get('username', '').lower():
-                score += 20
-            if query_lower in post.get('zodiac', '').lower():
-                score += 15
-            
-            post['relevance_score'] = score
-        
-        # Sort by relevance
-        all_posts.sort(key=lambda x: x['relevance_score'], reverse=True)
-        
-        # Apply pagination
-        paginated_results = all_posts[offset:offset + limit]
+        # BM25-ranked search over the post index
+        total_found, hits = search_index().search(query, search_facets(filters), limit=limit, offset=offset)
+        paginated_results = [dict(post, relevance_score=round(score, 4)) for post, score in hits]
         
         return jsonify({
             'results': paginated_results,
@@ -263,8 +291,8 @@ def search_posts():
             'pagination': {
                 'offset': offset,
                 'limit': limit,
-                'total_found': len(all_posts),
-                'has_more': offset + limit < len(all_posts)
+                'total_found': total_found,
+                'has_more': offset + limit < total_found
             }
         })
         
@@ -276,8 +304,7 @@ def search_posts():
 def shared_tarot_readings():
     """Infinite scroll for shared tarot readings"""
     try:
-        limit = min(int(request.args.get('limit', 15)), 50)
-        offset = int(request.args.get('offset', 0))
+        limit, cursor, include_total = page_params(request.args, default_limit=15, max_limit=50)
         spread_type = request.args.get('spread_type')  # single, three_card, celtic_cross
         
         filters = {'postTypes': ['tarot_reading']}
@@ -287,22 +314,16 @@ def shared_tarot_readings():
         # Generate tarot-specific posts
         all_readings = generate_cosmic_posts(500, filters)
         
-        # Sort by creation time (newest first)
-        all_readings.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        # Apply pagination
-        paginated_readings = all_readings[offset:offset + limit]
+        # Newest first, continuing after the cursor
+        paginated_readings, next_cursor = list_seek(sort_newest_first(all_readings), cursor, limit)
         
         return jsonify({
             'readings': paginated_readings,
-            'pagination': {
-                'offset': offset,
-                'limit': limit,
-                'total_available': len(all_readings),
-                'has_more': offset + limit < len(all_readings)
-            }
+            'pagination': page_info(next_cursor, len(all_readings) if include_total else None, limit)
         })
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Shared tarot error: {e}")
         return jsonify({'error': 'Failed to load tarot readings'}), 500
@@ -468,10 +489,7 @@ def generate_multi_zodiac_dna(western, chinese, vedic, mayan, galactic_tone):
 def handle_connect():
     """Handle client connection"""
     client_id = request.sid
-    CONNECTED_CLIENTS[client_id] = {
-        'connected_at': datetime.now(timezone.utc).isoformat(),
-        'rooms': []
-    }
+    fanout.connect(client_id)
     logging.info(f"Client connected: {client_id}")
     emit('connected', {'message': 'Connected to STAR cosmic network', 'client_id': client_id})
 
@@ -479,8 +497,7 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection"""
     client_id = request.sid
-    if client_id in CONNECTED_CLIENTS:
-        del CONNECTED_CLIENTS[client_id]
+    fanout.disconnect(client_id)
     logging.info(f"Client disconnected: {client_id}")
 
 @socketio.on('join_feed_room')
@@ -490,8 +507,7 @@ def handle_join_feed_room(data):
     client_id = request.sid
     
     join_room(room_name)
-    if client_id in CONNECTED_CLIENTS:
-        CONNECTED_CLIENTS[client_id]['rooms'].append(room_name)
+    fanout.join(client_id, room_name)
     
     logging.info(f"Client {client_id} joined room: {room_name}")
     emit('joined_room', {'room': room_name, 'message': f'Joined {room_name} for cosmic updates'})
@@ -503,8 +519,7 @@ def handle_leave_feed_room(data):
     client_id = request.sid
     
     leave_room(room_name)
-    if client_id in CONNECTED_CLIENTS and room_name in CONNECTED_CLIENTS[client_id]['rooms']:
-        CONNECTED_CLIENTS[client_id]['rooms'].remove(room_name)
+    fanout.leave(client_id, room_name)
     
     logging.info(f"Client {client_id} left room: {room_name}")
     emit('left_room', {'room': room_name})
@@ -516,6 +531,10 @@ def handle_new_post(data):
     if not post:
         return
     
+    # Make it searchable right away
+    if post.get('id'):
+        search_index().add(post)
+    
     # Determine which rooms should receive this post
     rooms = ['general_feed']
     
@@ -528,13 +547,12 @@ def handle_new_post(data):
     if post.get('type'):
         rooms.append(f'type_{post["type"]}')
     
-    # Broadcast to all relevant rooms
-    for room in rooms:
-        socketio.emit('feed_update', {
-            'type': 'new_post',
-            'post': post,
-            'timestamp': datetime.now(timezone.utc).isoformat()
-        }, room=room)
+    # One emit (and at most one publish) covers every relevant room
+    fanout.emit('feed_update', {
+        'type': 'new_post',
+        'post': post,
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }, rooms=rooms)
     
     logging.info(f"Broadcasted new post {post.get('id')} to rooms: {rooms}")
 
@@ -545,7 +563,7 @@ def handle_cosmic_event(data):
     if not event:
         return
     
-    socketio.emit('cosmic_alert', {
+    fanout.emit('cosmic_alert', {
         'type': 'cosmic_event',
         'event': event,
         'timestamp': datetime.now(timezone.utc).isoformat()
@@ -568,7 +586,8 @@ def health_check():
             'search': True,
             'offline_support': True
         },
-        'connected_clients': len(CONNECTED_CLIENTS),
+        'connected_clients': fanout.connected_count(),
+        'socket_fanout': fanout.get_stats(),
         'timestamp': datetime.now(timezone.utc).isoformat()
     })
 
@@ -589,6 +608,7 @@ def simulate_cosmic_events():
         while True:
             time.sleep(30)  # Every 30 seconds
             event = random.choice(events)
+            # Every worker runs its own simulation, so keep it node-local
             socketio.emit('cosmic_alert', {
                 'type': 'cosmic_event',
                 'event': event,
@@ -600,13 +620,28 @@ def simulate_cosmic_events():
     thread.daemon = True
     thread.start()
 
+def ordinal_after(cursor):
+    """Index following the generated item (``<kind>_<n>``) a cursor points at"""
+    if cursor is None:
+        return 0
+    try:
+        return int(cursor.id.split('_')[1]) + 1
+    except (AttributeError, IndexError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def ordinal_page(items, start, limit, total, timestamp):
+    """Cursor fields for a page of a generated stream"""
+    next_cursor = (Cursor(created_at=timestamp(items[-1]), id=items[-1]['id']).encode()
+                   if items and start + limit < total else None)
+    return {'hasMore': next_cursor is not None, 'nextCursor': next_cursor}
+
 # Zodiac Moments API endpoints
 @app.route('/api/v1/zodiac-moments', methods=['GET'])
 def get_zodiac_moments():
     """Get paginated zodiac moments (TikTok-style videos)"""
     try:
-        page = int(request.args.get('page', 0))
-        limit = min(int(request.args.get('limit', 20)), 50)  # Max 50 per request
+        limit, cursor, _ = page_params(request.args, default_limit=20, max_limit=50)
+        start = ordinal_after(cursor)
         
         # Mock zodiac moments data - replace with actual database queries
         mock_moments = []
@@ -614,7 +649,7 @@ def get_zodiac_moments():
                        'libra', 'scorpio', 'sagittarius', 'capricorn', 'aquarius', 'pisces']
         elements = ['fire', 'water', 'air', 'earth', 'none']
         
-        for i in range(page * limit, (page + 1) * limit):
+        for i in range(start, min(start + limit, MOCK_MOMENT_COUNT)):
             zodiac = zodiac_signs[i % len(zodiac_signs)]
             moment = {
                 'id': f'moment_{i}',
@@ -643,9 +678,10 @@ def get_zodiac_moments():
         
         return jsonify({
             'moments': mock_moments,
-            'hasMore': page < 10,  # Mock has more data
-            'nextPage': page + 1 if page < 10 else None
+            **ordinal_page(mock_moments, start, limit, MOCK_MOMENT_COUNT, lambda moment: moment['timestamp'])
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching zodiac moments: {e}")
         return jsonify({'error': 'Failed to fetch zodiac moments'}), 500
@@ -658,12 +694,12 @@ def like_zodiac_moment(moment_id):
         is_liked = request.json.get('isLiked', False)
         
         # Emit real-time like update
-        socketio.emit('moment_liked', {
+        fanout.emit('moment_liked', {
             'momentId': moment_id,
             'userId': user_id,
             'isLiked': is_liked,
             'timestamp': datetime.now().isoformat()
-        }, room=f'moment_{moment_id}')
+        }, rooms=f'moment_{moment_id}')
         
         return jsonify({
             'success': True,
@@ -711,7 +747,7 @@ def upload_zodiac_moment():
         }
         
         # Emit new moment to all users
-        socketio.emit('new_moment', new_moment, broadcast=True)
+        fanout.emit('new_moment', new_moment)
         
         return jsonify({
             'success': True,
@@ -726,8 +762,8 @@ def upload_zodiac_moment():
 def get_constellation_threads():
     """Get paginated constellation threads with astrological connections"""
     try:
-        page = int(request.args.get('page', 0))
-        limit = min(int(request.args.get('limit', 10)), 20)  # Max 20 per request
+        limit, cursor, _ = page_params(request.args, default_limit=10, max_limit=20)
+        start = ordinal_after(cursor)
         
         # Mock constellation threads data
         mock_threads = []
@@ -735,7 +771,7 @@ def get_constellation_threads():
                        'libra', 'scorpio', 'sagittarius', 'capricorn', 'aquarius', 'pisces']
         elements = ['fire', 'water', 'air', 'earth']
         
-        for i in range(page * limit, (page + 1) * limit):
+        for i in range(start, min(start + limit, MOCK_THREAD_COUNT)):
             root_zodiac = zodiac_signs[i % len(zodiac_signs)]
             thread_zodiacs = [
                 root_zodiac,
@@ -807,9 +843,10 @@ def get_constellation_threads():
         
         return jsonify({
             'threads': mock_threads,
-            'hasMore': page < 5,  # Mock has 5 pages
-            'nextPage': page + 1 if page < 5 else None
+            **ordinal_page(mock_threads, start, limit, MOCK_THREAD_COUNT, lambda thread: thread['rootPost']['timestamp'])
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching constellation threads: {e}")
         return jsonify({'error': 'Failed to fetch constellation threads'}), 500
@@ -846,11 +883,11 @@ def reply_to_thread(thread_id):
         }
         
         # Emit real-time thread update
-        socketio.emit('thread_reply', {
+        fanout.emit('thread_reply', {
             'threadId': thread_id,
             'reply': new_reply,
             'timestamp': datetime.now().isoformat()
-        }, room=f'thread_{thread_id}')
+        }, rooms=f'thread_{thread_id}')
         
         return jsonify({
             'success': True,
@@ -868,30 +905,24 @@ def get_profile_influence(user_id):
         # Generate mock user posts for influence calculation
         user_posts = generate_cosmic_posts(20, {'user_id': user_id})
         
-        # Calculate top follows with zodiac compatibility
         user = USERS_DB.get(user_id, {})
         user_zodiac = user.get('zodiac_signs', {}).get('western', 'Aries')
         
+        # Top follows: the most compatible users across all zodiac systems
+        index = compatibility_index()
+        codes = None if user_id in index else encode({'zodiac_sign': user_zodiac})
         top_follows = []
-        for other_user_id, other_user in USERS_DB.items():
-            if other_user_id != user_id:
-                compatibility_score = calculate_zodiac_compatibility(
-                    user_zodiac, 
-                    other_user.get('zodiac_signs', {}).get('western', 'Aries')
-                )
-                top_follows.append({
-                    'id': other_user_id,
-                    'username': other_user.get('username', 'Unknown'),
-                    'zodiac': other_user.get('zodiac_signs', {}).get('western', 'Aries'),
-                    'zodiac_signs': other_user.get('zodiac_signs', {}),
-                    'compatibility_score': compatibility_score,
-                    'mutual_connections': random.randint(5, 50),
-                    'follower_count': random.randint(100, 10000)
-                })
-        
-        # Sort by compatibility and limit
-        top_follows.sort(key=lambda x: x['compatibility_score'], reverse=True)
-        top_follows = top_follows[:5]
+        for other_user_id, compatibility_score, _ in index.top_k(user_id, 5, codes=codes):
+            other_user = USERS_DB.get(other_user_id, {})
+            top_follows.append({
+                'id': other_user_id,
+                'username': other_user.get('username', 'Unknown'),
+                'zodiac': other_user.get('zodiac_signs', {}).get('western', 'Aries'),
+                'zodiac_signs': other_user.get('zodiac_signs', {}),
+                'compatibility_score': compatibility_score,
+                'mutual_connections': random.randint(5, 50),
+                'follower_count': random.randint(100, 10000)
+            })
         
         # Get most liked posts with ritual reactions
         most_liked_posts = []
@@ -988,27 +1019,7 @@ def get_profile_influence(user_id):
 
 def calculate_zodiac_compatibility(sign1, sign2):
     """Calculate compatibility score between two zodiac signs"""
-    # Simplified compatibility matrix
-    compatibility_matrix = {
-        'Aries': {'Leo': 0.9, 'Sagittarius': 0.9, 'Gemini': 0.8, 'Aquarius': 0.8},
-        'Taurus': {'Virgo': 0.9, 'Capricorn': 0.9, 'Cancer': 0.8, 'Pisces': 0.8},
-        'Gemini': {'Libra': 0.9, 'Aquarius': 0.9, 'Aries': 0.8, 'Leo': 0.8},
-        'Cancer': {'Scorpio': 0.9, 'Pisces': 0.9, 'Taurus': 0.8, 'Virgo': 0.8},
-        'Leo': {'Aries': 0.9, 'Sagittarius': 0.9, 'Gemini': 0.8, 'Libra': 0.8},
-        'Virgo': {'Taurus': 0.9, 'Capricorn': 0.9, 'Cancer': 0.8, 'Scorpio': 0.8},
-        'Libra': {'Gemini': 0.9, 'Aquarius': 0.9, 'Leo': 0.8, 'Sagittarius': 0.8},
-        'Scorpio': {'Cancer': 0.9, 'Pisces': 0.9, 'Virgo': 0.8, 'Capricorn': 0.8},
-        'Sagittarius': {'Aries': 0.9, 'Leo': 0.9, 'Libra': 0.8, 'Aquarius': 0.8},
-        'Capricorn': {'Taurus': 0.9, 'Virgo': 0.9, 'Scorpio': 0.8, 'Pisces': 0.8},
-        'Aquarius': {'Gemini': 0.9, 'Libra': 0.9, 'Aries': 0.8, 'Sagittarius': 0.8},
-        'Pisces': {'Cancer': 0.9, 'Scorpio': 0.9, 'Taurus': 0.8, 'Capricorn': 0.8}
-    }
-    
-    if sign1 == sign2:
-        return 0.95  # Same sign high compatibility
-    
-    sign1_compat = compatibility_matrix.get(sign1, {})
-    return sign1_compat.get(sign2, random.uniform(0.3, 0.7))  # Default random compatibility
+    return sign_compatibility(sign1, sign2)
 
 def get_zodiac_element(zodiac_sign):
     """Get the elemental association of a zodiac sign"""
@@ -1034,7 +1045,7 @@ def add_post_reaction(post_id):
             logging.info(f"Elemental reaction: {element} on post {post_id}")
             
             # Emit real-time update to all connected clients
-            socketio.emit('post_reaction', {
+            fanout.emit('post_reaction', {
                 'post_id': post_id,
                 'reaction_type': 'elemental',
                 'element': element,
@@ -1056,7 +1067,7 @@ def add_post_reaction(post_id):
             logging.info(f"Zodiac reaction: {zodiac} {action} on post {post_id}")
             
             # Emit real-time update to all connected clients
-            socketio.emit('post_reaction', {
+            fanout.emit('post_reaction', {
                 'post_id': post_id,
                 'reaction_type': 'zodiac',
                 'zodiac': zodiac,
@@ -1118,6 +1129,7 @@ def handle_join_post(data):
     post_id = data.get('post_id')
     if post_id:
         join_room(f"post_{post_id}")
+        fanout.join(request.sid, f"post_{post_id}")
         emit('joined_post', {'post_id': post_id})
         logging.info(f"User joined post room: {post_id}")
 
@@ -1127,6 +1139,7 @@ def handle_leave_post(data):
     post_id = data.get('post_id')
     if post_id:
         leave_room(f"post_{post_id}")
+        fanout.leave(request.sid, f"post_{post_id}")
         emit('left_post', {'post_id': post_id})
         logging.info(f"User left post room: {post_id}")
 
@@ -5,11 +5,14 @@ import logging
 import uuid
 from datetime import datetime, timedelta, timezone
 
+from analytics_engine import EngagementType, track_verified_action
 from cosmos_db import get_cosmos_helper
 from enhanced_tarot_engine import AdvancedTarotSpread, EnhancedTarotEngine
 from flask import Blueprint, g, jsonify, request
 from numerology import NumerologyEngine
 from star_auth import token_required
+from timeline import fan_out_post
+from user_stats import get_user_stats_projection
 
 # Constants to avoid duplication
 READING_NOT_FOUND_ERROR = 'Reading not found or access denied'
@@ -131,6 +134,7 @@ def enhanced_tarot_draw(current_user):
         try:
             tarot_container = cosmos_helper.get_container('tarot_readings')
             tarot_container.create_item(reading_record)
+            track_verified_action(user_id, EngagementType.TAROT_DRAW, user_zodiac, {'reading_id': reading_id})
         except Exception as e:
             logging.warning(f"Failed to store reading in Cosmos DB: {e}")
         
@@ -459,6 +463,14 @@ def share_tarot_reading(current_user):
             # Add to posts container for social feed
             posts_container = cosmos_helper.get_container('posts')
             posts_container.create_item(shared_post)
+            get_user_stats_projection().post_created(user_id, shared_post['created_at'])
+            track_verified_action(user_id, EngagementType.POST_CREATE, current_user.get('zodiac_sign'),
+                                  {'post_id': shared_post_id})
+            try:
+                fan_out_post(shared_post, cosmos_helper)
+            except Exception as e:
+                # Timeline delivery must not fail the share
+                logging.error(f"Timeline fan-out error: {e}")
         elif share_type == 'profile':
             # Add to user's profile shared readings
             try:
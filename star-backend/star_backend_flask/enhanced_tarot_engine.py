@@ -6,10 +6,12 @@ Implements advanced tarot spreads, AI-powered interpretations, and cosmic timing
 import logging
 import random
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
 
+from seeded_rng import daily, draw_indices, generator_for, rng_for, today_utc
+
 logger = logging.getLogger(__name__)
 
 class TarotSuit(Enum):
@@ -332,25 +334,37 @@ class EnhancedTarotEngine:
         
         return deck
     
-    def draw_cards(self, count: int, seed: Optional[str] = None) -> List[TarotCard]:
-        """Draw random cards from the deck"""
-        if seed:
-            random.seed(seed)
+    def draw_cards(self, count: int, seed: Optional[str] = None,
+                   rng: Optional[random.Random] = None) -> List[TarotCard]:
+        """Draw random cards from the deck (reproducibly when seeded)"""
+        if rng is None:
+            rng = rng_for(seed) if seed else rng_for()
         
-        return random.sample(self.deck, min(count, len(self.deck)))
+        return rng.sample(self.deck, min(count, len(self.deck)))
+    
+    def draw_many(self, count: int, draws: int, seed: Optional[str] = None) -> List[List[Tuple[TarotCard, bool]]]:
+        """Draw ``draws`` independent readings of ``count`` cards in one vectorized pass"""
+        generator = generator_for(seed) if seed else generator_for()
+        indices, reversed_ = draw_indices(len(self.deck), count, draws, generator)
+        return [
+            [(self.deck[i], bool(r)) for i, r in zip(row, flags)]
+            for row, flags in zip(indices.tolist(), reversed_.tolist())
+        ]
     
-    def generate_reading(self, spread_type: str, user_context: Optional[Dict] = None) -> Dict[str, Any]:
+    def generate_reading(self, spread_type: str, user_context: Optional[Dict] = None,
+                         seed: Optional[str] = None) -> Dict[str, Any]:
         """Generate a complete tarot reading with AI interpretation"""
         if spread_type not in self.spreads:
             raise ValueError(f"Unknown spread type: {spread_type}")
         
         spread = self.spreads[spread_type]
-        cards = self.draw_cards(spread['card_count'])
+        rng = rng_for(seed, spread_type) if seed else rng_for()
+        cards = self.draw_cards(spread['card_count'], rng=rng)
         
         # Create card placements
         placements = []
         for i, (card, position) in enumerate(zip(cards, spread['positions'])):
-            is_reversed = random.choice([True, False])  # 50% chance reversed
+            is_reversed = rng.choice([True, False])  # 50% chance reversed
             
             placements.append({
                 'position': {
@@ -1072,12 +1086,18 @@ class EnhancedTarotEngine:
         
         return {'influence': 'Universal energy flows'}
     
-    def get_daily_guidance(self, user_profile: Dict[str, Any]) -> Dict[str, Any]:
-        """Get personalized daily tarot guidance"""
-        
-        # Draw a single card for daily guidance
-        daily_card = self.draw_cards(1)[0]
-        
+    def get_daily_guidance(self, user_profile: Dict[str, Any], day: Optional[date] = None) -> Dict[str, Any]:
+        """Get personalized daily tarot guidance (one card per user per day)"""
+        user_id = user_profile.get('id') or user_profile.get('user_id')
+        if not user_id:
+            return self._build_daily_guidance(self.draw_cards(1)[0])
+        
+        day = day or today_utc()
+        return daily('tarot_daily_guidance', user_id, lambda: self._build_daily_guidance(
+            self.draw_cards(1, rng=rng_for(user_id, day.isoformat(), 'daily_card'))[0]
+        ), day)
+    
+    def _build_daily_guidance(self, daily_card: TarotCard) -> Dict[str, Any]:
         # Create simplified reading for daily use
         guidance = {
             'card': {
@@ -1385,8 +1405,8 @@ class EnhancedTarotEngine:
             return 'No data available'
         
         month_counts = {}
-        for date in dates:
-            month_key = f"{date.strftime('%B')} {date.year}"
+        for day in dates:
+            month_key = f"{day.strftime('%B')} {day.year}"
             month_counts[month_key] = month_counts.get(month_key, 0) + 1
         
         most_active = max(month_counts, key=month_counts.get)
@@ -0,0 +1,131 @@
+"""
+Batched ephemeris engine for STAR astrology
+Computes geocentric ecliptic longitudes of all bodies for arrays of instants
+into a NumPy matrix in one pass, and finds aspects with vectorized
+angular-difference / orb masks instead of nested per-pair loops
+"""
+
+import datetime
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import ephem
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BODY_NAMES = ("Sun", "Moon", "Mercury", "Venus", "Mars",
+              "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto")
+
+# ephem's Dublin Julian Date epoch (1899-12-31 12:00 UT) as a Julian Date
+DUBLIN_JD_OFFSET = 2415020.0
+J2000_JD = 2451545.0
+
+
+def _to_ephem_dates(dates: Sequence[datetime.datetime]) -> np.ndarray:
+    """Convert datetimes to ephem Dublin Julian Dates; aware datetimes are converted to UTC"""
+    converted = []
+    for date in dates:
+        if date.tzinfo is not None:
+            date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        converted.append(float(ephem.Date(date)))
+    return np.asarray(converted, dtype=float)
+
+
+class EphemerisEngine:
+    """Vectorized planetary positions and aspect detection"""
+
+    def __init__(self, bodies: Sequence[str] = BODY_NAMES):
+        self.bodies = tuple(bodies)
+        self.body_index = {name: i for i, name in enumerate(self.bodies)}
+        # compute() mutates ephem bodies, so each thread reuses its own set
+        # rather than serializing every chart on one shared set
+        self._local = threading.local()
+
+    def _body_objects(self) -> List[ephem.Body]:
+        objects = getattr(self._local, 'bodies', None)
+        if objects is None:
+            objects = self._local.bodies = [getattr(ephem, name)() for name in self.bodies]
+        return objects
+
+    def longitudes(self, dates: Sequence[datetime.datetime],
+                   bodies: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Geocentric tropical ecliptic longitudes in degrees, shape (len(dates), len(bodies))"""
+        return self.longitudes_for_ephem_dates(_to_ephem_dates(dates), bodies)
+
+    def longitudes_for_ephem_dates(self, ephem_dates: np.ndarray,
+                                   bodies: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Same as ``longitudes`` for instants already given as ephem (Dublin Julian) dates"""
+        indices = [self.body_index[name] for name in (bodies or self.bodies)]
+        ephem_dates = np.asarray(ephem_dates, dtype=float)
+        ra = np.empty((len(ephem_dates), len(indices)))
+        dec = np.empty_like(ra)
+
+        body_objects = self._body_objects()
+        for row, ephem_date in enumerate(ephem_dates):
+            for col, index in enumerate(indices):
+                body = body_objects[index]
+                body.compute(ephem_date)
+                ra[row, col] = body.g_ra
+                dec[row, col] = body.g_dec
+
+        return self._equatorial_to_ecliptic(ra, dec, ephem_dates)
+
+    @staticmethod
+    def _equatorial_to_ecliptic(ra: np.ndarray, dec: np.ndarray, ephem_dates: np.ndarray) -> np.ndarray:
+        """Convert apparent RA/Dec of date (radians) to ecliptic longitude (degrees) for the whole matrix"""
+        centuries = (ephem_dates + DUBLIN_JD_OFFSET - J2000_JD) / 36525.0
+        obliquity = np.radians(23.4392911 - 0.0130042 * centuries)[:, None]
+        lon = np.arctan2(np.sin(ra) * np.cos(obliquity) + np.tan(dec) * np.sin(obliquity), np.cos(ra))
+        return np.degrees(lon) % 360.0
+
+    @staticmethod
+    def local_sidereal_degrees(dates: Sequence[datetime.datetime], east_longitudes: Sequence[float]) -> np.ndarray:
+        """Local mean sidereal time (the RAMC) in degrees for each (date, longitude) pair"""
+        days = _to_ephem_dates(dates) + DUBLIN_JD_OFFSET - J2000_JD
+        centuries = days / 36525.0
+        gmst = 280.46061837 + 360.98564736629 * days + 0.000387933 * centuries ** 2
+        return (gmst + np.asarray(east_longitudes, dtype=float)) % 360.0
+
+    @staticmethod
+    def find_aspects(longitudes_a: np.ndarray, longitudes_b: np.ndarray,
+                     aspect_angles: Sequence[float], aspect_orbs: Sequence[float]) -> Tuple[np.ndarray, ...]:
+        """Find aspects between every point of ``a`` and every point of ``b``.
+
+        ``longitudes_a`` has shape (..., n) and ``longitudes_b`` (..., m); leading
+        dimensions (e.g. time) broadcast. Only the first matching aspect per pair
+        is reported, in ``aspect_angles`` order.
+
+        Returns (hit mask (..., n, m), aspect index, orb, separation), each (..., n, m).
+        """
+        a = np.asarray(longitudes_a, dtype=float)[..., :, None]
+        b = np.asarray(longitudes_b, dtype=float)[..., None, :]
+        separation = np.abs(a - b) % 360.0
+        separation = np.minimum(separation, 360.0 - separation)
+
+        angles = np.asarray(aspect_angles, dtype=float)
+        orbs = np.asarray(aspect_orbs, dtype=float)
+        deviation = np.abs(separation[..., None] - angles)
+        within = deviation <= orbs
+
+        hit = within.any(axis=-1)
+        aspect_index = within.argmax(axis=-1)
+        orb = np.take_along_axis(deviation, aspect_index[..., None], axis=-1)[..., 0]
+        return hit, aspect_index, orb, separation
+
+    def positions(self, date: datetime.datetime) -> Dict[str, float]:
+        """Longitudes of all bodies at a single instant"""
+        return dict(zip(self.bodies, self.longitudes([date])[0].tolist()))
+
+
+# Global ephemeris engine instance
+_ephemeris_engine = None
+
+
+def get_ephemeris_engine() -> EphemerisEngine:
+    """Get global EphemerisEngine instance"""
+    global _ephemeris_engine
+    if _ephemeris_engine is None:
+        _ephemeris_engine = EphemerisEngine()
+    return _ephemeris_engine
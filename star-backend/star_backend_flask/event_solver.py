@@ -0,0 +1,326 @@
+"""
+Exact astronomical event solver for STAR astrology
+Sweeps a time range once on a coarse grid, brackets every sign ingress,
+exact aspect, lunar phase and eclipse in the same longitude matrix, then
+root-finds each bracket to the second. Events are yielded as a stream in
+time order, chunk by chunk, so callers can page through long ranges
+without computing all of them
+"""
+
+import datetime
+import logging
+import math
+from dataclasses import asdict, dataclass, field
+from itertools import combinations
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import ephem
+import numpy as np
+from ephemeris import BODY_NAMES, EphemerisEngine, _to_ephem_dates, get_ephemeris_engine
+from lunar_table import get_lunar_table
+
+logger = logging.getLogger(__name__)
+
+EVENT_KINDS = ("ingress", "aspect", "phase", "eclipse")
+
+SWEEP_STEP_HOURS = 6        # grid spacing; the Moon moves ~3.3° per step
+SWEEP_CHUNK_DAYS = 2        # events are produced and yielded one chunk at a time
+ROOT_TOLERANCE_SECONDS = 1
+
+ZODIAC_SIGN_NAMES = ("Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+                     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces")
+
+# Signed separations (first body minus second) for each major aspect
+ASPECT_TARGETS = {
+    "conjunction": (0.0,),
+    "sextile": (60.0, 300.0),
+    "square": (90.0, 270.0),
+    "trine": (120.0, 240.0),
+    "opposition": (180.0,),
+}
+
+PHASE_TARGETS = {0.0: "new_moon", 90.0: "first_quarter", 180.0: "full_moon", 270.0: "last_quarter"}
+
+# Maximum |Moon ecliptic latitude| at syzygy for an eclipse (penumbral lunar included)
+ECLIPSE_LATITUDE_LIMITS = {"solar_eclipse": 1.58, "lunar_eclipse": 1.6}
+
+# Bodies the Moon must aspect for it not to be void of course
+VOC_PLANETS = ("Sun", "Mercury", "Venus", "Mars", "Jupiter", "Saturn")
+VOC_LOOKBACK_DAYS = 3
+
+
+@dataclass
+class AstroEvent:
+    kind: str                   # ingress | aspect | phase | eclipse
+    time: datetime.datetime     # exact instant (UTC)
+    body: str
+    name: str                   # sign entered, aspect, phase or eclipse type
+    angle: float                # target longitude / separation in degrees
+    other: Optional[str] = None
+    details: Dict = field(default_factory=dict)
+
+    @property
+    def event_id(self) -> str:
+        """Stable identity of the event within its instant"""
+        return f"{self.body}:{self.other or ''}:{self.name}:{self.angle:g}"
+
+    @property
+    def key(self) -> Tuple[datetime.datetime, str, str]:
+        """Total order used for streaming and keyset paging"""
+        return (self.time, self.kind, self.event_id)
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.time.isoformat()}|{self.kind}|{self.event_id}"
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["time"] = self.time.isoformat()
+        data["id"] = self.event_id
+        return data
+
+
+def parse_cursor(cursor: str) -> Tuple[datetime.datetime, str, str]:
+    """Keyset position from ``AstroEvent.cursor``; raises ValueError if malformed
+
+    A bare ISO timestamp (the old cursor format) sorts after every event at
+    that instant.
+    """
+    timestamp, _, rest = cursor.partition("|")
+    if not rest:
+        return (datetime.datetime.fromisoformat(timestamp), "\uffff", "")
+    kind, _, event_id = rest.partition("|")
+    return (datetime.datetime.fromisoformat(timestamp), kind, event_id)
+
+
+def _wrap180(angles):
+    return (angles + 180.0) % 360.0 - 180.0
+
+
+def find_root(func: Callable[[float], float], a: float, b: float,
+              fa: Optional[float] = None, fb: Optional[float] = None,
+              tolerance: float = ROOT_TOLERANCE_SECONDS / 86400.0, max_iterations: int = 60) -> float:
+    """Root of ``func`` bracketed by [a, b] using regula falsi (Illinois variant).
+
+    Converges superlinearly on the smooth angle functions used here while
+    keeping the bracket, so it never escapes [a, b] like a plain secant.
+    """
+    fa = func(a) if fa is None else fa
+    fb = func(b) if fb is None else fb
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+
+    side = 0
+    for _ in range(max_iterations):
+        c = (a * fb - b * fa) / (fb - fa)
+        fc = func(c)
+        if fc == 0 or abs(b - a) < tolerance:
+            return c
+        if (fc > 0) == (fb > 0):
+            b, fb = c, fc
+            if side == -1:
+                fa /= 2
+            side = -1
+        else:
+            a, fa = c, fc
+            if side == 1:
+                fb /= 2
+            side = 1
+        if abs(b - a) < tolerance:
+            break
+    return (a + b) / 2
+
+
+class EventSolver:
+    """Brackets and root-finds ingresses, aspects, phases and eclipses"""
+
+    def __init__(self, engine: Optional[EphemerisEngine] = None,
+                 step_hours: float = SWEEP_STEP_HOURS, chunk_days: float = SWEEP_CHUNK_DAYS):
+        self.engine = engine or get_ephemeris_engine()
+        self.step = step_hours / 24.0
+        self.chunk = chunk_days
+
+    # ---------- longitude source ----------
+
+    def _longitudes(self, ephem_dates: np.ndarray, bodies: Sequence[str]) -> np.ndarray:
+        """Longitudes (dates x bodies) from the lunar table when it covers the request, else the ephemeris"""
+        table = get_lunar_table()
+        if table is not None and table.covers_ephem_range(float(ephem_dates.min()), float(ephem_dates.max()), bodies):
+            return table.longitudes_for_ephem_dates(ephem_dates, bodies)
+        return self.engine.longitudes_for_ephem_dates(ephem_dates, bodies)
+
+    def _quantity(self, t: float, bodies: Tuple[str, ...]) -> float:
+        """Longitude of one body, or the separation first - second of two, at one instant"""
+        row = self._longitudes(np.array([t]), bodies)[0]
+        return float(row[0] - row[1]) if len(bodies) == 2 else float(row[0])
+
+    def _solve(self, bodies: Tuple[str, ...], target: float, a: float, b: float) -> float:
+        func = lambda t: _wrap180(self._quantity(t, bodies) - target)
+        return find_root(func, a, b)
+
+    # ---------- sweep ----------
+
+    @staticmethod
+    def _brackets(quantity: np.ndarray, targets: np.ndarray) -> List[Tuple[int, int]]:
+        """(grid index, target index) pairs where ``quantity`` crosses a target between samples"""
+        offset = _wrap180(quantity[:, None] - targets[None, :])
+        positive = offset >= 0
+        near = np.abs(offset) < 90     # excludes the ±180° wrap jump
+        crossing = (positive[:-1] != positive[1:]) & near[:-1] & near[1:]
+        return list(zip(*np.nonzero(crossing)))
+
+    def _events_in(self, grid: np.ndarray, kinds: Sequence[str], bodies: Sequence[str],
+                   aspect_pairs: Sequence[Tuple[str, str]]) -> List[AstroEvent]:
+        needed = list(dict.fromkeys(
+            list(bodies if "ingress" in kinds else ())
+            + [name for pair in (aspect_pairs if "aspect" in kinds else ()) for name in pair]
+            + (["Moon", "Sun"] if {"phase", "eclipse"} & set(kinds) else [])
+        ))
+        if not needed:
+            return []
+        matrix = self._longitudes(grid, needed)
+        column = {name: i for i, name in enumerate(needed)}
+        events = []
+
+        if "ingress" in kinds:
+            targets = np.arange(0.0, 360.0, 30.0)
+            for body in bodies:
+                for i, k in self._brackets(matrix[:, column[body]], targets):
+                    exact = self._solve((body,), targets[k], grid[i], grid[i + 1])
+                    # Retrograde motion re-enters the sign behind the boundary
+                    moving_forward = _wrap180(matrix[i + 1, column[body]] - matrix[i, column[body]]) >= 0
+                    sign_index = (k if moving_forward else k - 1) % 12
+                    events.append(AstroEvent(
+                        kind="ingress", time=ephem.Date(exact).datetime(), body=body,
+                        name=ZODIAC_SIGN_NAMES[sign_index], angle=float(targets[k]),
+                        details={"retrograde": not moving_forward}
+                    ))
+
+        if "aspect" in kinds:
+            names, angles = zip(*[(name, angle) for name, values in ASPECT_TARGETS.items() for angle in values])
+            targets = np.asarray(angles)
+            for first, second in aspect_pairs:
+                separation = matrix[:, column[first]] - matrix[:, column[second]]
+                for i, k in self._brackets(separation, targets):
+                    exact = self._solve((first, second), targets[k], grid[i], grid[i + 1])
+                    events.append(AstroEvent(
+                        kind="aspect", time=ephem.Date(exact).datetime(), body=first, other=second,
+                        name=names[k], angle=float(min(targets[k], 360.0 - targets[k]))
+                    ))
+
+        if {"phase", "eclipse"} & set(kinds):
+            phase_angles = np.asarray(list(PHASE_TARGETS))
+            elongation = matrix[:, column["Moon"]] - matrix[:, column["Sun"]]
+            for i, k in self._brackets(elongation, phase_angles):
+                target = float(phase_angles[k])
+                if "phase" not in kinds and target not in (0.0, 180.0):
+                    continue
+                exact = self._solve(("Moon", "Sun"), target, grid[i], grid[i + 1])
+                when = ephem.Date(exact).datetime()
+                if "phase" in kinds:
+                    events.append(AstroEvent(kind="phase", time=when, body="Moon", other="Sun",
+                                             name=PHASE_TARGETS[target], angle=target))
+                if "eclipse" in kinds and target in (0.0, 180.0):
+                    eclipse = self._eclipse_at(exact, target)
+                    if eclipse:
+                        events.append(eclipse)
+
+        return events
+
+    def _eclipse_at(self, syzygy: float, elongation: float) -> Optional[AstroEvent]:
+        """An eclipse occurs at new/full moon when the Moon is close enough to its node"""
+        moon = ephem.Moon(ephem.Date(syzygy))
+        latitude = math.degrees(float(ephem.Ecliptic(moon, epoch=ephem.Date(syzygy)).lat))
+        eclipse_type = "solar_eclipse" if elongation == 0.0 else "lunar_eclipse"
+        if abs(latitude) > ECLIPSE_LATITUDE_LIMITS[eclipse_type]:
+            return None
+        return AstroEvent(kind="eclipse", time=ephem.Date(syzygy).datetime(), body="Moon", other="Sun",
+                          name=eclipse_type, angle=elongation,
+                          details={"moon_latitude": round(latitude, 3)})
+
+    def iter_events(self, start: datetime.datetime, end: datetime.datetime,
+                    kinds: Sequence[str] = EVENT_KINDS, bodies: Sequence[str] = BODY_NAMES,
+                    aspect_pairs: Optional[Sequence[Tuple[str, str]]] = None) -> Iterator[AstroEvent]:
+        """Yield events in [start, end) in ``AstroEvent.key`` order, computing one chunk at a time.
+
+        ``bodies`` are checked for ingresses; aspects default to every pair
+        of ``bodies`` unless ``aspect_pairs`` is given. Chunks and the sweep
+        grid are aligned to absolute dates, so an event gets the same
+        root-found time whatever ``start`` it is reached from (keyset paging
+        relies on this).
+        """
+        unknown = set(kinds) - set(EVENT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown event kinds: {', '.join(sorted(unknown))}")
+        if aspect_pairs is None:
+            aspect_pairs = list(combinations(bodies, 2))
+
+        t_start, t_end = _to_ephem_dates([start, end])
+        t0 = math.floor(t_start / self.chunk) * self.chunk
+        while t0 < t_end:
+            t1 = t0 + self.chunk
+            grid = np.append(np.arange(t0, t1, self.step), t1)
+            events = [event for event in self._events_in(grid, kinds, bodies, aspect_pairs)
+                      if t_start <= float(ephem.Date(event.time)) < t_end]
+            events.sort(key=lambda event: event.key)
+            yield from events
+            t0 = t1
+
+    def next_event(self, date: datetime.datetime, horizon_days: float = 3, **kwargs) -> Optional[AstroEvent]:
+        """First event after ``date`` within the horizon"""
+        return next(self.iter_events(date, date + datetime.timedelta(days=horizon_days), **kwargs), None)
+
+    def solve_longitude(self, body: str, longitude: float, start: datetime.datetime,
+                        end: datetime.datetime) -> Optional[datetime.datetime]:
+        """First instant in [start, end] when ``body`` reaches ``longitude``, or None"""
+        t0, t1 = _to_ephem_dates([start, end])
+        grid = np.append(np.arange(t0, t1, self.step), t1)
+        brackets = self._brackets(self._longitudes(grid, (body,))[:, 0], np.array([longitude % 360.0]))
+        if not brackets:
+            return None
+        i, _ = brackets[0]
+        return ephem.Date(self._solve((body,), longitude % 360.0, grid[i], grid[i + 1])).datetime()
+
+    # ---------- lunar conveniences ----------
+
+    def moon_aspect_pairs(self) -> List[Tuple[str, str]]:
+        return [("Moon", planet) for planet in VOC_PLANETS]
+
+    def next_moon_aspect(self, date: datetime.datetime, horizon_days: float = 3) -> Optional[AstroEvent]:
+        return self.next_event(date, horizon_days, kinds=("aspect",), bodies=("Moon",),
+                               aspect_pairs=self.moon_aspect_pairs())
+
+    def void_of_course(self, date: datetime.datetime) -> Dict:
+        """Void-of-course window: from the Moon's last exact major aspect until it changes sign"""
+        ingress = self.next_event(date, 3, kinds=("ingress",), bodies=("Moon",))
+        if ingress is None:
+            return {"is_void": False, "void_start": None, "void_until": None, "next_aspect": None}
+
+        window_start = ingress.time - datetime.timedelta(days=VOC_LOOKBACK_DAYS)
+        aspects = list(self.iter_events(window_start, ingress.time, kinds=("aspect",), bodies=("Moon",),
+                                        aspect_pairs=self.moon_aspect_pairs()))
+        void_start = aspects[-1].time if aspects else window_start
+        upcoming = [aspect for aspect in aspects if aspect.time > date]
+        next_aspect = upcoming[0] if upcoming else self.next_moon_aspect(ingress.time)
+
+        return {
+            "is_void": void_start <= date < ingress.time,
+            "void_start": void_start,
+            "void_until": ingress.time,
+            "next_sign": ingress.name,
+            "next_aspect": next_aspect.time if next_aspect else None
+        }
+
+
+# Global event solver instance
+_event_solver = None
+
+
+def get_event_solver() -> EventSolver:
+    """Get global EventSolver instance"""
+    global _event_solver
+    if _event_solver is None:
+        _event_solver = EventSolver()
+    return _event_solver
@@ -2,11 +2,18 @@ import os
 import uuid
 from datetime import datetime, timedelta, timezone
 
+from analytics_engine import EngagementType, track_verified_action
 from azure.cosmos import CosmosClient, exceptions
+from cosmos_db import get_cosmos_helper
+from counters import get_counter_service
 from flask import Blueprint, current_app, jsonify, request
 # Import notification function
 from notifications import create_notification
+from pagination import InvalidCursor, cosmos_page, page_info, page_params
 from star_auth import token_required
+from timeline import fan_out_post, get_timeline_store
+from user_loader import get_user_loader
+from user_stats import get_user_stats_projection
 from werkzeug.exceptions import BadRequest
 
 feed = Blueprint('feed', __name__)
@@ -42,6 +49,26 @@ def get_user_by_id(user_id):
     except exceptions.CosmosHttpResponseError:
         return None
 
+def get_users_by_ids(user_ids):
+    """Get several users by ID from Cosmos DB in one query, keyed by ID"""
+    if not database:
+        raise Exception("Cosmos DB not available")
+    user_ids = list({str(uid) for uid in user_ids if uid})
+    if not user_ids:
+        return {}
+    try:
+        container = database.get_container_client("Users")
+        query = "SELECT c.id, c.username, c.zodiac_sign FROM c WHERE ARRAY_CONTAINS(@user_ids, c.id)"
+        params = [{"name": "@user_ids", "value": user_ids}]
+        items = container.query_items(query=query, parameters=params, enable_cross_partition_query=True)
+        return {item['id']: item for item in items}
+    except exceptions.CosmosHttpResponseError:
+        return {}
+
+def get_author_loader():
+    """Request-scoped batched loader over the Cosmos Users container"""
+    return get_user_loader(get_users_by_ids, namespace='cosmos_users')
+
 def create_post(post_data):
     """Create a new post in Cosmos DB"""
     if not database:
@@ -52,10 +79,27 @@ def create_post(post_data):
         if 'id' not in post_data:
             post_data['id'] = str(uuid.uuid4())
         container.create_item(post_data)
-        return post_data
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to create post: {str(e)}")
 
+    # The post is stored; stats and analytics are best-effort from here on
+    try:
+        get_user_stats_projection().post_created(post_data['user_id'], post_data.get('created_at'))
+    except Exception as e:
+        current_app.logger.error(f"User stats update error: {str(e)}")
+    try:
+        track_verified_action(post_data['user_id'], EngagementType.POST_CREATE, post_data.get('zodiac_sign'),
+                              {'post_id': post_data['id']})
+    except Exception as e:
+        current_app.logger.error(f"Post analytics error: {str(e)}")
+
+    try:
+        fan_out_post(post_data, get_cosmos_helper())
+    except Exception as e:
+        # Timeline delivery must not fail the post; readers fall back to querying
+        current_app.logger.error(f"Timeline fan-out error: {str(e)}")
+    return post_data
+
 def get_posts_by_user(user_id, limit=10):
     """Get posts by user ID"""
     if not database:
@@ -72,61 +116,146 @@ def get_posts_by_user(user_id, limit=10):
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to get posts: {str(e)}")
 
+# Post counters live on the Post document and are updated write-behind
+POST_COUNTER_SCOPE = 'cosmos_post'
+
+def apply_post_counter_deltas(post_id, deltas):
+    """Atomically increment Post counter fields with a single patch operation"""
+    if not database:
+        raise Exception("Cosmos DB not available")
+    posts_container = database.get_container_client("Posts")
+    # Posts are partitioned by id (see the single-partition id lookups above)
+    posts_container.patch_item(
+        item=post_id,
+        partition_key=post_id,
+        patch_operations=[{'op': 'incr', 'path': f'/{field}', 'value': delta} for field, delta in deltas.items()]
+    )
+
+get_counter_service().register_writer(POST_COUNTER_SCOPE, apply_post_counter_deltas)
+
+def get_post_counter(post_id, field):
+    """Read a Post counter (likes/comments) including unflushed increments"""
+    def load():
+        container = database.get_container_client("Posts")
+        query = f"SELECT VALUE c.{field} FROM c WHERE c.id = @post_id"
+        params = [{"name": "@post_id", "value": post_id}]
+        items = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
+        return items[0] if items else 0
+    return get_counter_service().get(POST_COUNTER_SCOPE, post_id, field, load)
+
 def toggle_like(user_id, post_id):
     """Toggle like on a post"""
     if not database:
         raise Exception("Cosmos DB not available")
     try:
         interactions_container = database.get_container_client("Interactions")
-        posts_container = database.get_container_client("Posts")
-        
-        # Check if like exists
-        query = "SELECT * FROM c WHERE c.user_id = @user_id AND c.post_id = @post_id AND c.interaction_type = 'like'"
+        counters = get_counter_service()
+
+        # Likes created before deterministic ids carry uuid ids; a legacy like
+        # still counts as liked, so this toggle removes it
+        query = ("SELECT c.id FROM c WHERE c.user_id = @user_id AND c.post_id = @post_id "
+                 "AND c.interaction_type = 'like' AND c.id != @like_id")
+        like_id = f"like_{user_id}_{post_id}"
         params = [
             {"name": "@user_id", "value": user_id},
-            {"name": "@post_id", "value": post_id}
+            {"name": "@post_id", "value": post_id},
+            {"name": "@like_id", "value": like_id}
         ]
-        existing_likes = list(interactions_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-        
-        if existing_likes:
-            # Unlike: remove interaction and decrement likes
-            for like in existing_likes:
-                interactions_container.delete_item(like['id'], partition_key=like['user_id'])
-            
-            # Update post likes count
-            query = "SELECT * FROM c WHERE c.id = @post_id"
-            params = [{"name": "@post_id", "value": post_id}]
-            posts = list(posts_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-            if posts:
-                post = posts[0]
-                post['likes'] = max(0, post.get('likes', 0) - 1)
-                posts_container.replace_item(post['id'], post)
-            
+        legacy_likes = list(interactions_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
+        if legacy_likes:
+            for like in legacy_likes:
+                interactions_container.delete_item(like['id'], partition_key=user_id)
+            counters.increment(POST_COUNTER_SCOPE, post_id, 'likes', -1)
             return False  # Unliked
-        else:
-            # Like: add interaction and increment likes
-            like_data = {
-                'id': str(uuid.uuid4()),
-                'user_id': user_id,
-                'post_id': post_id,
-                'interaction_type': 'like',
-                'timestamp': datetime.utcnow().isoformat()
-            }
+
+        # Deterministic id: creating an existing like conflicts instead of duplicating
+        like_data = {
+            'id': like_id,
+            'user_id': user_id,
+            'post_id': post_id,
+            'interaction_type': 'like',
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        try:
             interactions_container.create_item(like_data)
-            
-            # Update post likes count
-            query = "SELECT * FROM c WHERE c.id = @post_id"
-            params = [{"name": "@post_id", "value": post_id}]
-            posts = list(posts_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-            if posts:
-                post = posts[0]
-                post['likes'] = post.get('likes', 0) + 1
-                posts_container.replace_item(post['id'], post)
-            
-            return True  # Liked
+        except exceptions.CosmosResourceExistsError:
+            # Unlike: remove interaction and decrement likes
+            try:
+                interactions_container.delete_item(like_id, partition_key=user_id)
+            except exceptions.CosmosResourceNotFoundError:
+                return False  # A concurrent unlike already removed it and decremented
+            counters.increment(POST_COUNTER_SCOPE, post_id, 'likes', -1)
+            return False  # Unliked
+
+        counters.increment(POST_COUNTER_SCOPE, post_id, 'likes', 1)
+        return True  # Liked
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to toggle like: {str(e)}")
 
+# Per-user stats projection (UserStats container, partitioned by user id)
+class CosmosUserStatsBackend:
+    """Stores user stats documents in Cosmos DB and scans source data for rebuilds"""
+
+    def _container(self):
+        return database.get_container_client("UserStats")
+
+    def read(self, user_id):
+        try:
+            return self._container().read_item(item=user_id, partition_key=user_id)
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+
+    def increment(self, user_id, deltas):
+        try:
+            self._container().patch_item(
+                item=user_id,
+                partition_key=user_id,
+                patch_operations=[{'op': 'incr', 'path': f'/{field}', 'value': delta} for field, delta in deltas.items()]
+            )
+            return True
+        except exceptions.CosmosResourceNotFoundError:
+            return False
+
+    def set_fields(self, user_id, fields):
+        self._container().patch_item(
+            item=user_id,
+            partition_key=user_id,
+            patch_operations=[{'op': 'set', 'path': f'/{field}', 'value': value} for field, value in fields.items()]
+        )
+
+    def replace(self, doc):
+        self._container().upsert_item(doc)
+
+    def scan(self, user_id):
+        container = database.get_container_client("Posts")
+        query = "SELECT c.likes, c.comments, c.created_at FROM c WHERE c.user_id = @user_id"
+        params = [{"name": "@user_id", "value": user_id}]
+        posts = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=True))
+        helper = get_cosmos_helper()
+        return {
+            'posts': posts,
+            'followers_count': helper.get_followers_count(user_id),
+            'following_count': len(helper.get_following(user_id))
+        }
+
+    def user_ids(self):
+        container = database.get_container_client("Users")
+        return container.query_items(query="SELECT VALUE c.id FROM c", enable_cross_partition_query=True)
+
+if database:
+    get_user_stats_projection().bind(CosmosUserStatsBackend())
+
+def get_post_author_id(post_id):
+    """Get the author ID of a post"""
+    try:
+        container = database.get_container_client("Posts")
+        query = "SELECT VALUE c.user_id FROM c WHERE c.id = @post_id"
+        params = [{"name": "@post_id", "value": str(post_id)}]
+        items = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
+        return items[0] if items else None
+    except exceptions.CosmosHttpResponseError:
+        return None
+
 def create_comment(comment_data):
     """Create a new comment"""
     if not database:
@@ -136,31 +265,25 @@ def create_comment(comment_data):
         if 'id' not in comment_data:
             comment_data['id'] = str(uuid.uuid4())
         container.create_item(comment_data)
-        
-        # Update post comment count
-        posts_container = database.get_container_client("Posts")
-        query = "SELECT * FROM c WHERE c.id = @post_id"
-        params = [{"name": "@post_id", "value": comment_data['post_id']}]
-        posts = list(posts_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-        if posts:
-            post = posts[0]
-            post['comments'] = post.get('comments', 0) + 1
-            posts_container.replace_item(post['id'], post)
-        
+
+        # Update post comment count (coalesced write-behind)
+        get_counter_service().increment(POST_COUNTER_SCOPE, comment_data['post_id'], 'comments', 1)
+
         return comment_data
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to create comment: {str(e)}")
 
-def get_comments_by_post(post_id):
-    """Get comments for a post"""
+def get_comments_by_post(post_id, limit=50, cursor=None):
+    """Get one page of comments for a post, oldest first, and the next page's cursor"""
     if not database:
         raise Exception("Cosmos DB not available")
     try:
         container = database.get_container_client("Comments")
         query = "SELECT * FROM c WHERE c.post_id = @post_id ORDER BY c.created_at ASC"
         params = [{"name": "@post_id", "value": post_id}]
-        items = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-        return items
+        items = container.query_items(query=query, parameters=params, enable_cross_partition_query=False,
+                                      max_item_count=limit)
+        return cosmos_page(items, cursor)
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to get comments: {str(e)}")
 
@@ -177,23 +300,72 @@ def get_popular_posts(limit=10):
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to get popular posts: {str(e)}")
 
+def get_recent_posts_by_authors(author_ids, limit=10, before=None):
+    """Get the newest posts across several authors (pull-on-read timeline fallback)"""
+    if not database:
+        raise Exception("Cosmos DB not available")
+    try:
+        container = database.get_container_client("Posts")
+        query = "SELECT c.id, c.user_id, c.content, c.timestamp FROM c WHERE ARRAY_CONTAINS(@author_ids, c.user_id)"
+        params = [
+            {"name": "@author_ids", "value": list(author_ids)},
+            {"name": "@limit", "value": limit}
+        ]
+        if before:
+            query += " AND c.timestamp < @before"
+            params.append({"name": "@before", "value": before})
+        query += " ORDER BY c.timestamp DESC OFFSET 0 LIMIT @limit"
+        return list(container.query_items(query=query, parameters=params, enable_cross_partition_query=True))
+    except exceptions.CosmosHttpResponseError as e:
+        raise Exception(f"Failed to get author posts: {str(e)}")
+
+def get_following_ids(user_id):
+    """Get IDs of the users a user follows"""
+    return [f['followed_id'] for f in get_cosmos_helper().get_following(user_id) if f.get('followed_id')]
+
 @feed.route('/api/v1/feed', methods=['GET'])
 def get_feed():
+    """Home feed: one bounded timeline read plus one batched author lookup"""
     if not database:
         return jsonify({"error": "Cosmos DB not configured"}), 500
     try:
-        container = database.get_container_client("Posts")
-        # Optimized query: specific fields, pagination, single partition
-        query = "SELECT c.id, c.user_id, c.content, c.timestamp FROM c WHERE c.user_id = @user_id ORDER BY c.timestamp DESC OFFSET 0 LIMIT 10"
-        params = [{"name": "@user_id", "value": request.args.get("user_id", "default_user")}]
-        items = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
+        user_id = request.args.get("user_id", "default_user")
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        before = request.args.get("before")
+
+        store = get_timeline_store()
+        items = store.read(user_id, limit, before)
+
+        # Pull-on-read for high-follower authors that are not fanned out
+        pull_authors = store.pull_authors_followed_by(user_id, get_following_ids)
+        if pull_authors:
+            items = store.merge(items, get_recent_posts_by_authors(pull_authors, limit, before), limit)
+
+        if not items and not before:
+            # Cold timeline: fall back to the user's own recent posts
+            container = database.get_container_client("Posts")
+            query = "SELECT c.id, c.user_id, c.content, c.timestamp FROM c WHERE c.user_id = @user_id ORDER BY c.timestamp DESC OFFSET 0 LIMIT @limit"
+            params = [
+                {"name": "@user_id", "value": user_id},
+                {"name": "@limit", "value": limit}
+            ]
+            items = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
+
+        authors = get_author_loader().load_many(item.get('user_id') for item in items)
+        for item in items:
+            author = authors.get(item.get('user_id'), {})
+            item['username'] = author.get('username', 'Unknown')
+            item['zodiac_sign'] = author.get('zodiac_sign')
         return jsonify(items)
     except exceptions.CosmosHttpResponseError as e:
         return jsonify({"error": f"Feed query failed: {str(e)}"}), 500
+    except Exception as e:
+        current_app.logger.error(f"Feed error: {str(e)}")
+        return jsonify({"error": "Failed to fetch feed"}), 500
 
 @feed.route('/api/v1/posts', methods=['POST'])
 @token_required
-def create_post():
+def create_user_post():
     """Create a new user post"""
     try:
         data = request.get_json()
@@ -253,18 +425,14 @@ def like_post(post_id):
         liked = toggle_like(user_id, post_id)
         action = 'liked' if liked else 'unliked'
 
+        post_author_id = get_post_author_id(post_id)
+        if post_author_id:
+            get_user_stats_projection().post_liked(post_author_id, 1 if liked else -1)
+
         # Create notification for post author if liked
         if liked:
             try:
-                # Get post author
-                posts_container = database.get_container_client("Posts")
-                query = "SELECT c.user_id FROM c WHERE c.id = @post_id"
-                params = [{"name": "@post_id", "value": post_id}]
-                posts = list(posts_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-                
-                if posts and posts[0]['user_id'] != user_id:
-                    post_author_id = posts[0]['user_id']
-                    
+                if post_author_id and post_author_id != user_id:
                     # Get liker username
                     liker = get_user_by_id(user_id)
                     liker_username = liker.get('username', 'Someone') if liker else 'Someone'
@@ -286,7 +454,11 @@ def like_post(post_id):
                 current_app.logger.error(f"Notification creation error: {str(e)}")
                 # Don't fail the like operation if notification fails
 
-        return jsonify({'message': f'Post {action} successfully'}), 200
+        return jsonify({
+            'message': f'Post {action} successfully',
+            'liked': liked,
+            'likes': get_post_counter(post_id, 'likes')
+        }), 200
 
     except Exception as e:
         current_app.logger.error(f"Like error: {str(e)}")
@@ -322,15 +494,13 @@ def comment_on_post(post_id):
 
         result = create_comment(comment_data)
 
+        post_author_id = get_post_author_id(post_id)
+        if post_author_id:
+            get_user_stats_projection().comment_added(post_author_id)
+
         # Create notification for post author
         try:
-            posts_container = database.get_container_client("Posts")
-            query = "SELECT c.user_id FROM c WHERE c.id = @post_id"
-            params = [{"name": "@post_id", "value": str(post_id)}]
-            posts = list(posts_container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-            
-            if posts and posts[0]['user_id'] != user_id:
-                post_author_id = posts[0]['user_id']
+            if post_author_id and post_author_id != user_id:
                 commenter_username = user.get('username', 'Someone')
                 
                 create_notification(
@@ -362,12 +532,14 @@ def comment_on_post(post_id):
 def get_post_comments(post_id):
     """Get comments for a specific post"""
     try:
-        comments = get_comments_by_post(str(post_id))
+        limit, cursor, _ = page_params(request.args, default_limit=50)
+        comments, next_cursor = get_comments_by_post(str(post_id), limit, cursor)
         
-        # Enrich comments with usernames
+        # Enrich comments with usernames (one batched lookup)
+        authors = get_author_loader().load_many(comment['user_id'] for comment in comments)
         enriched_comments = []
         for comment in comments:
-            user = get_user_by_id(comment['user_id'])
+            user = authors.get(str(comment['user_id']))
             username = user.get('username', 'Unknown') if user else 'Unknown'
             
             enriched_comments.append({
@@ -379,8 +551,10 @@ def get_post_comments(post_id):
                 'created_at': comment.get('created_at', comment.get('timestamp'))
             })
 
-        return jsonify({'comments': enriched_comments}), 200
+        return jsonify({'comments': enriched_comments, 'pagination': page_info(next_cursor, limit=limit)}), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Get comments error: {str(e)}")
         return jsonify({'error': 'Failed to fetch comments'}), 500
@@ -390,32 +564,33 @@ def get_trending():
     """Get trending content for FOMO algorithm"""
     try:
         # Get recent highly engaged posts
-        posts = get_popular_posts(10)
+        posts = [post for post in get_popular_posts(10) if post.get('likes', 0) > 5]  # Simple threshold for trending
+        posts = posts[:5]  # Limit to top 5 before hydrating authors
+        authors = get_author_loader().load_many(post['user_id'] for post in posts)
 
         trending_content = []
         for post in posts:
-            if post.get('likes', 0) > 5:  # Simple threshold for trending
-                user = get_user_by_id(post['user_id'])
-                username = user.get('username', 'Unknown') if user else 'Unknown'
-
-                trending_content.append({
-                    'id': post['id'],
-                    'type': 'trending_post',
-                    'content': {
-                        'text': post['content'][:100] + '...' if len(post['content']) > 100 else post['content'],
-                        'engagement_score': calculate_engagement_score(post)
-                    },
-                    'author': username,
-                    'zodiac_sign': post.get('zodiac_sign'),
-                    'engagement': {
-                        'likes': post.get('likes', 0),
-                        'comments': post.get('comments', 0),
-                        'shares': post.get('shares', 0)
-                    }
-                })
+            user = authors.get(str(post['user_id']))
+            username = user.get('username', 'Unknown') if user else 'Unknown'
+
+            trending_content.append({
+                'id': post['id'],
+                'type': 'trending_post',
+                'content': {
+                    'text': post['content'][:100] + '...' if len(post['content']) > 100 else post['content'],
+                    'engagement_score': calculate_engagement_score(post)
+                },
+                'author': username,
+                'zodiac_sign': post.get('zodiac_sign'),
+                'engagement': {
+                    'likes': post.get('likes', 0),
+                    'comments': post.get('comments', 0),
+                    'shares': post.get('shares', 0)
+                }
+            })
 
         return jsonify({
-            'trending_content': trending_content[:5],  # Limit to top 5
+            'trending_content': trending_content,
             'planetary_context': get_current_planetary_context()
         }), 200
 
@@ -424,26 +599,11 @@ def get_trending():
         return jsonify({'error': 'Failed to fetch trending content'}), 500
 
 def get_user_stats(user_id):
-    """Get user post statistics"""
+    """Get user post and social statistics from the materialized projection"""
     if not database:
         raise Exception("Cosmos DB not available")
     try:
-        container = database.get_container_client("Posts")
-        # Note: Cosmos DB doesn't have built-in aggregation like SQL COUNT/SUM
-        # For now, we'll fetch all posts and calculate stats
-        query = "SELECT * FROM c WHERE c.user_id = @user_id"
-        params = [{"name": "@user_id", "value": user_id}]
-        posts = list(container.query_items(query=query, parameters=params, enable_cross_partition_query=False))
-        
-        post_count = len(posts)
-        total_likes = sum(post.get('likes', 0) for post in posts)
-        total_comments = sum(post.get('comments', 0) for post in posts)
-        
-        return {
-            'post_count': post_count,
-            'total_likes': total_likes,
-            'total_comments': total_comments
-        }
+        return get_user_stats_projection().get(user_id)
     except exceptions.CosmosHttpResponseError as e:
         raise Exception(f"Failed to get user stats: {str(e)}")
 
@@ -483,9 +643,8 @@ def get_cosmic_profile(user_id):
         # Get recent posts
         recent_posts = get_recent_posts(user_id_str, 5)
 
-        # Placeholder for badges and streaks - would need separate containers
+        # Placeholder for badges - would need separate container
         badges = []
-        streak = {'current_streak': 0}
 
         return jsonify({
             'profile': {
@@ -503,7 +662,10 @@ def get_cosmic_profile(user_id):
                 'posts': stats.get('post_count', 0),
                 'total_likes': stats.get('total_likes', 0),
                 'total_comments': stats.get('total_comments', 0),
-                'current_streak': streak.get('current_streak', 0)
+                'followers': stats.get('followers_count', 0),
+                'following': stats.get('following_count', 0),
+                'current_streak': stats.get('current_streak', 0),
+                'longest_streak': stats.get('longest_streak', 0)
             },
             'recent_posts': recent_posts,
             'badges': badges,
@@ -0,0 +1,51 @@
+"""
+Advisory file locks for STAR workers sharing a data directory
+Several gunicorn workers write the same index and table files; these
+helpers serialize them with flock on a sidecar ``.lock`` file. Where flock
+is unavailable (Windows development) locking is a no-op, which is safe for
+a single process
+"""
+
+import contextlib
+import os
+from typing import IO, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server, nothing to coordinate
+    fcntl = None
+
+
+def _open(path: str) -> IO:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return open(path, 'a+')
+
+
+@contextlib.contextmanager
+def locked(path: str, shared: bool = False) -> Iterator[None]:
+    """Hold an exclusive (or shared) lock on ``path`` for the duration of the block"""
+    handle = _open(path)
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        handle.close()  # closing releases the lock
+
+
+def try_lock(path: str) -> Optional[IO]:
+    """Take an exclusive lock without waiting; keep the returned handle open to hold it
+
+    Returns None when another process holds the lock. The lock is released
+    when the handle is closed or the process exits, so a crashed holder
+    never blocks the others.
+    """
+    handle = _open(path)
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except OSError:
+        handle.close()
+        return None
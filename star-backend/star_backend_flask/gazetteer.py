@@ -0,0 +1,421 @@
+"""
+Local gazetteer for STAR birth-place resolution
+A compact place table (GeoNames import, memory-mapped at runtime) with a
+sorted normalized-name index for exact and prefix lookups, a trigram index
+for fuzzy matches, IANA timezones per place and an LRU of recent
+resolutions, so natal charts never wait on an external geocoder. Without a
+generated table a small built-in set of major cities is used
+
+Build from a GeoNames dump (e.g. cities15000.txt) with:
+    python gazetteer.py --geonames cities15000.txt
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from cache_utils import TTLCache
+from file_lock import locked
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.environ.get(
+    'GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.npy')
+)
+GAZETTEER_CACHE_SIZE = 10000
+GAZETTEER_CACHE_TTL = 24 * 3600
+GAZETTEER_MAX_ALIASES = 8       # alternate names indexed per place
+FUZZY_MIN_SCORE = 0.7           # trigram Dice coefficient needed for a fuzzy match
+PREFIX_MIN_LENGTH = 3
+
+PLACE_DTYPE = np.dtype([('name', 'S64'), ('country', 'S2'), ('admin1', 'S20'),
+                        ('lat', '<f4'), ('lng', '<f4'), ('population', '<u4'), ('tz', '<u2')])
+KEY_DTYPE = np.dtype([('key', 'S64'), ('row', '<u4')])
+
+# Qualifiers people type after the city name that are not ISO country codes
+COUNTRY_ALIASES = {
+    'usa': 'us', 'united states': 'us', 'united states of america': 'us', 'america': 'us',
+    'uk': 'gb', 'united kingdom': 'gb', 'england': 'gb', 'great britain': 'gb', 'scotland': 'gb',
+    'wales': 'gb', 'northern ireland': 'gb', 'ireland': 'ie', 'canada': 'ca', 'mexico': 'mx',
+    'brazil': 'br', 'brasil': 'br', 'argentina': 'ar', 'chile': 'cl', 'colombia': 'co', 'peru': 'pe',
+    'venezuela': 've', 'france': 'fr', 'germany': 'de', 'deutschland': 'de', 'italy': 'it',
+    'spain': 'es', 'portugal': 'pt', 'netherlands': 'nl', 'holland': 'nl', 'belgium': 'be',
+    'switzerland': 'ch', 'austria': 'at', 'sweden': 'se', 'norway': 'no', 'denmark': 'dk',
+    'finland': 'fi', 'poland': 'pl', 'greece': 'gr', 'turkey': 'tr', 'russia': 'ru', 'ukraine': 'ua',
+    'georgia': 'ge', 'israel': 'il', 'egypt': 'eg', 'nigeria': 'ng', 'kenya': 'ke', 'ghana': 'gh',
+    'south africa': 'za', 'morocco': 'ma', 'uae': 'ae', 'united arab emirates': 'ae',
+    'saudi arabia': 'sa', 'iran': 'ir', 'pakistan': 'pk', 'india': 'in', 'bangladesh': 'bd',
+    'china': 'cn', 'japan': 'jp', 'south korea': 'kr', 'korea': 'kr', 'taiwan': 'tw',
+    'hong kong': 'hk', 'philippines': 'ph', 'vietnam': 'vn', 'thailand': 'th', 'malaysia': 'my',
+    'indonesia': 'id', 'singapore': 'sg', 'australia': 'au', 'new zealand': 'nz'
+}
+
+# Region names -> GeoNames admin1 codes (US states use postal codes, Canadian
+# provinces numeric codes, so those are qualified with the country)
+REGION_ALIASES = {
+    'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca',
+    'colorado': 'co', 'connecticut': 'ct', 'delaware': 'de', 'district of columbia': 'dc',
+    'florida': 'fl', 'georgia': 'ga', 'hawaii': 'hi', 'idaho': 'id', 'illinois': 'il', 'indiana': 'in',
+    'iowa': 'ia', 'kansas': 'ks', 'kentucky': 'ky', 'louisiana': 'la', 'maine': 'me', 'maryland': 'md',
+    'massachusetts': 'ma', 'michigan': 'mi', 'minnesota': 'mn', 'mississippi': 'ms', 'missouri': 'mo',
+    'montana': 'mt', 'nebraska': 'ne', 'nevada': 'nv', 'new hampshire': 'nh', 'new jersey': 'nj',
+    'new mexico': 'nm', 'new york': 'ny', 'north carolina': 'nc', 'north dakota': 'nd', 'ohio': 'oh',
+    'oklahoma': 'ok', 'oregon': 'or', 'pennsylvania': 'pa', 'rhode island': 'ri',
+    'south carolina': 'sc', 'south dakota': 'sd', 'tennessee': 'tn', 'texas': 'tx', 'utah': 'ut',
+    'vermont': 'vt', 'virginia': 'va', 'washington': 'wa', 'west virginia': 'wv', 'wisconsin': 'wi',
+    'wyoming': 'wy',
+    'alberta': 'ca.01', 'british columbia': 'ca.02', 'manitoba': 'ca.03', 'new brunswick': 'ca.04',
+    'newfoundland': 'ca.05', 'newfoundland and labrador': 'ca.05', 'nova scotia': 'ca.07',
+    'ontario': 'ca.08', 'prince edward island': 'ca.09', 'quebec': 'ca.10', 'saskatchewan': 'ca.11',
+    'yukon': 'ca.12', 'northwest territories': 'ca.13', 'nunavut': 'ca.14'
+}
+
+# name, country, admin1, lat, lng, population, timezone
+BUILTIN_PLACES = [
+    ('New York', 'US', 'NY', 40.7128, -74.0060, 8804190, 'America/New_York'),
+    ('Los Angeles', 'US', 'CA', 34.0522, -118.2437, 3898747, 'America/Los_Angeles'),
+    ('Chicago', 'US', 'IL', 41.8781, -87.6298, 2746388, 'America/Chicago'),
+    ('Houston', 'US', 'TX', 29.7604, -95.3698, 2304580, 'America/Chicago'),
+    ('Phoenix', 'US', 'AZ', 33.4484, -112.0740, 1608139, 'America/Phoenix'),
+    ('Philadelphia', 'US', 'PA', 39.9526, -75.1652, 1603797, 'America/New_York'),
+    ('San Antonio', 'US', 'TX', 29.4241, -98.4936, 1434625, 'America/Chicago'),
+    ('San Diego', 'US', 'CA', 32.7157, -117.1611, 1386932, 'America/Los_Angeles'),
+    ('Dallas', 'US', 'TX', 32.7767, -96.7970, 1304379, 'America/Chicago'),
+    ('San Jose', 'US', 'CA', 37.3382, -121.8863, 1013240, 'America/Los_Angeles'),
+    ('Austin', 'US', 'TX', 30.2672, -97.7431, 961855, 'America/Chicago'),
+    ('San Francisco', 'US', 'CA', 37.7749, -122.4194, 873965, 'America/Los_Angeles'),
+    ('Seattle', 'US', 'WA', 47.6062, -122.3321, 737015, 'America/Los_Angeles'),
+    ('Denver', 'US', 'CO', 39.7392, -104.9903, 715522, 'America/Denver'),
+    ('Nashville', 'US', 'TN', 36.1627, -86.7816, 689447, 'America/Chicago'),
+    ('Boston', 'US', 'MA', 42.3601, -71.0589, 675647, 'America/New_York'),
+    ('Portland', 'US', 'OR', 45.5152, -122.6784, 652503, 'America/Los_Angeles'),
+    ('Las Vegas', 'US', 'NV', 36.1699, -115.1398, 641903, 'America/Los_Angeles'),
+    ('Atlanta', 'US', 'GA', 33.7490, -84.3880, 498715, 'America/New_York'),
+    ('Miami', 'US', 'FL', 25.7617, -80.1918, 442241, 'America/New_York'),
+    ('Toronto', 'CA', '08', 43.6532, -79.3832, 2794356, 'America/Toronto'),
+    ('Montreal', 'CA', '10', 45.5017, -73.5673, 1762949, 'America/Toronto'),
+    ('Calgary', 'CA', '01', 51.0447, -114.0719, 1306784, 'America/Edmonton'),
+    ('Vancouver', 'CA', '02', 49.2827, -123.1207, 662248, 'America/Vancouver'),
+    ('London', 'GB', 'ENG', 51.5074, -0.1278, 8961989, 'Europe/London'),
+    ('Paris', 'FR', '11', 48.8566, 2.3522, 2138551, 'Europe/Paris'),
+    ('Berlin', 'DE', '16', 52.5200, 13.4050, 3644826, 'Europe/Berlin'),
+    ('Rome', 'IT', '07', 41.9028, 12.4964, 2872800, 'Europe/Rome'),
+    ('Madrid', 'ES', '29', 40.4168, -3.7038, 3223334, 'Europe/Madrid'),
+    ('Amsterdam', 'NL', '07', 52.3676, 4.9041, 872680, 'Europe/Amsterdam'),
+    ('Moscow', 'RU', '48', 55.7558, 37.6176, 12506468, 'Europe/Moscow'),
+    ('Cairo', 'EG', '11', 30.0444, 31.2357, 9539673, 'Africa/Cairo'),
+    ('Dubai', 'AE', '03', 25.2048, 55.2708, 3331420, 'Asia/Dubai'),
+    ('Mumbai', 'IN', '16', 19.0760, 72.8777, 12442373, 'Asia/Kolkata'),
+    ('Singapore', 'SG', '00', 1.3521, 103.8198, 5685807, 'Asia/Singapore'),
+    ('Beijing', 'CN', '22', 39.9042, 116.4074, 21542000, 'Asia/Shanghai'),
+    ('Tokyo', 'JP', '40', 35.6762, 139.6503, 13960000, 'Asia/Tokyo'),
+    ('Sydney', 'AU', '02', -33.8688, 151.2093, 5312163, 'Australia/Sydney'),
+    ('Melbourne', 'AU', '07', -37.8136, 144.9631, 5078193, 'Australia/Melbourne'),
+    ('Brisbane', 'AU', '04', -27.4698, 153.0251, 2560720, 'Australia/Brisbane'),
+    ('Perth', 'AU', '08', -31.9505, 115.8605, 2085973, 'Australia/Perth'),
+    ('Adelaide', 'AU', '05', -34.9285, 138.6007, 1359760, 'Australia/Adelaide'),
+    ('Greenwich', 'GB', 'ENG', 51.4769, 0.0005, 287942, 'Europe/London'),
+]
+
+_NOT_FOUND = object()
+
+
+def normalize(name: str) -> str:
+    """Lowercase ASCII form used for matching: accents stripped, punctuation collapsed to spaces"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    ascii_name = decomposed.encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', ascii_name).split())
+
+
+def _to_bytes(value: str, width: int) -> bytes:
+    return value.encode('utf-8')[:width]
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f" {key} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _metadata_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _keys_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.keys.npy'
+
+
+def _lock_path(path: str) -> str:
+    return path + '.lock'
+
+
+@dataclass(frozen=True)
+class Place:
+    """One resolved gazetteer entry"""
+    name: str
+    country: str
+    admin1: str
+    latitude: float
+    longitude: float
+    population: int
+    timezone: Optional[str]
+
+    @property
+    def coordinates(self) -> Tuple[float, float]:
+        return (self.latitude, self.longitude)
+
+    def to_geocode(self) -> Dict[str, Any]:
+        """Same shape as the geocoder result used by birth_chart, plus the timezone"""
+        address = ', '.join(part for part in (self.name, self.admin1, self.country) if part)
+        return {'lat': self.latitude, 'lng': self.longitude, 'addr': address, 'timezone': self.timezone}
+
+
+class Gazetteer:
+    """Place table plus a sorted key index; lookups are exact, prefix, then fuzzy"""
+
+    def __init__(self, places: np.ndarray, keys: np.ndarray, timezones: Sequence[str]):
+        self.places = places            # PLACE_DTYPE rows
+        self.keys = keys                # KEY_DTYPE rows sorted by key (names and aliases)
+        self.timezones = list(timezones)
+        self._resolved = TTLCache(maxsize=GAZETTEER_CACHE_SIZE, ttl=GAZETTEER_CACHE_TTL)
+        self._trigram_index: Optional[Tuple[Dict[str, np.ndarray], np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    # ---------- construction and persistence ----------
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]]) -> 'Gazetteer':
+        """Build from dicts with name, aliases, country, admin1, lat, lng, population, timezone"""
+        timezones = ['']
+        tz_index = {'': 0}
+        rows = []
+        key_rows = []
+        for record in records:
+            tz = record.get('timezone') or ''
+            if tz not in tz_index:
+                tz_index[tz] = len(timezones)
+                timezones.append(tz)
+            row = len(rows)
+            rows.append((_to_bytes(record['name'], 64), _to_bytes(record.get('country') or '', 2),
+                         _to_bytes(record.get('admin1') or '', 20), record['lat'], record['lng'],
+                         min(int(record.get('population') or 0), 2 ** 32 - 1), tz_index[tz]))
+            keys = {normalize(record['name'])}
+            for alias in record.get('aliases') or ():
+                if len(keys) > GAZETTEER_MAX_ALIASES:
+                    break
+                keys.add(normalize(alias))
+            key_rows.extend((_to_bytes(key, 64), row) for key in keys if key)
+
+        places = np.array(rows, dtype=PLACE_DTYPE)
+        keys = np.array(key_rows, dtype=KEY_DTYPE)
+        keys = keys[np.argsort(keys['key'], kind='stable')]
+        return cls(places, keys, timezones)
+
+    @classmethod
+    def builtin(cls) -> 'Gazetteer':
+        return cls.build({'name': name, 'country': country, 'admin1': admin1, 'lat': lat, 'lng': lng,
+                          'population': population, 'timezone': tz}
+                         for name, country, admin1, lat, lng, population, tz in BUILTIN_PLACES)
+
+    @classmethod
+    def from_geonames(cls, path: str, min_population: int = 0) -> 'Gazetteer':
+        """Import a GeoNames tab-separated dump (allCountries / citiesNNNN format)"""
+        def records():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) < 18:
+                        continue
+                    population = int(fields[14] or 0)
+                    if population < min_population:
+                        continue
+                    yield {
+                        'name': fields[1],
+                        'aliases': [fields[2]] + [alias for alias in fields[3].split(',') if alias],
+                        'country': fields[8],
+                        'admin1': fields[10],
+                        'lat': float(fields[4]),
+                        'lng': float(fields[5]),
+                        'population': population,
+                        'timezone': fields[17]
+                    }
+        return cls.build(records())
+
+    def save(self, path: str = GAZETTEER_PATH) -> None:
+        """Write the place table, key index and metadata sidecar atomically
+
+        Temporary files are per process, and the set is swapped in under the
+        gazetteer's exclusive lock, arrays first and metadata last, so a loader
+        never pairs new arrays with old metadata.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, self.places)
+        np.save(_keys_path(tmp_path), self.keys)
+        metadata = {
+            'rows': int(len(self.places)),
+            'keys': int(len(self.keys)),
+            'timezones': self.timezones,
+            'generated_at': datetime.datetime.utcnow().isoformat()
+        }
+        with open(_metadata_path(tmp_path), 'w') as f:
+            json.dump(metadata, f)
+        with locked(_lock_path(path)):
+            os.replace(tmp_path, path)
+            os.replace(_keys_path(tmp_path), _keys_path(path))
+            os.replace(_metadata_path(tmp_path), _metadata_path(path))
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH) -> Optional['Gazetteer']:
+        """Memory-map a saved gazetteer; returns None if none has been generated"""
+        if not all(os.path.exists(p) for p in (path, _keys_path(path), _metadata_path(path))):
+            return None
+        try:
+            with locked(_lock_path(path), shared=True):
+                with open(_metadata_path(path)) as f:
+                    metadata = json.load(f)
+                places = np.load(path, mmap_mode='r')
+                keys = np.load(_keys_path(path), mmap_mode='r')
+            return cls(places, keys, metadata['timezones'])
+        except Exception as e:
+            logger.error(f"Failed to load gazetteer {path}: {e}")
+            return None
+
+    # ---------- lookups ----------
+
+    def _place(self, row: int) -> Place:
+        entry = self.places[row]
+        return Place(
+            name=entry['name'].decode('utf-8', 'ignore'),
+            country=entry['country'].decode('ascii', 'ignore'),
+            admin1=entry['admin1'].decode('utf-8', 'ignore'),
+            latitude=round(float(entry['lat']), 4),
+            longitude=round(float(entry['lng']), 4),
+            population=int(entry['population']),
+            timezone=self.timezones[int(entry['tz'])] or None
+        )
+
+    def _key_range(self, key: str, prefix: bool = False) -> np.ndarray:
+        """Place rows whose key equals (or starts with) ``key``"""
+        encoded = _to_bytes(key, 64)
+        lo = np.searchsorted(self.keys['key'], encoded, side='left')
+        hi = np.searchsorted(self.keys['key'], encoded + b'\xff' if prefix else encoded, side='right')
+        return np.unique(np.asarray(self.keys['row'][lo:hi]))
+
+    def _fuzzy(self, key: str) -> np.ndarray:
+        """Rows of the keys sharing the most trigrams with ``key`` (Dice >= FUZZY_MIN_SCORE)"""
+        postings, sizes = self._trigrams()
+        query = _trigrams(key)
+        hits = [postings[gram] for gram in query if gram in postings]
+        if not hits:
+            return np.empty(0, dtype=np.uint32)
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        scores = 2.0 * shared / (len(query) + sizes[candidates])
+        best = scores.max()
+        if best < FUZZY_MIN_SCORE:
+            return np.empty(0, dtype=np.uint32)
+        return np.unique(np.asarray(self.keys['row'][candidates[scores >= best - 1e-9]]))
+
+    def _trigrams(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Trigram -> key positions, built on first fuzzy lookup"""
+        if self._trigram_index is None:
+            with self._lock:
+                if self._trigram_index is None:
+                    postings: Dict[str, List[int]] = {}
+                    sizes = np.zeros(len(self.keys), dtype=np.int32)
+                    for position, key in enumerate(self.keys['key'].tolist()):
+                        grams = _trigrams(key.decode('ascii', 'ignore'))
+                        sizes[position] = len(grams)
+                        for gram in grams:
+                            postings.setdefault(gram, []).append(position)
+                    self._trigram_index = ({gram: np.array(positions, dtype=np.int64)
+                                            for gram, positions in postings.items()}, sizes)
+        return self._trigram_index
+
+    def _codes(self, row: int) -> set:
+        """Country and region codes a qualifier can match for one place"""
+        entry = self.places[row]
+        country = entry['country'].decode('ascii', 'ignore').lower()
+        admin1 = normalize(entry['admin1'].decode('utf-8', 'ignore'))
+        return {country, admin1, f"{country}.{admin1}"}
+
+    def _best(self, rows: np.ndarray, qualifiers: Sequence[str]) -> Optional[int]:
+        """The most populous row matching every country/region qualifier
+
+        "Portland, Maine" must not resolve to Portland, Oregon: a candidate
+        that contradicts a qualifier is rejected rather than returned.
+        """
+        wanted = [{q, COUNTRY_ALIASES.get(q, q), REGION_ALIASES.get(q, q)} for q in qualifiers]
+        matching = [row for row in rows.tolist() if all(self._codes(row) & codes for codes in wanted)]
+        if not matching:
+            return None
+        return int(max(matching, key=lambda row: int(self.places[row]['population'])))
+
+    def resolve(self, query: str) -> Optional[Place]:
+        """Resolve free text like ``"Tokyo, Japan"`` or ``"san fransisco"`` to a place"""
+        cache_key = normalize(query)
+        cached = self._resolved.get(cache_key, _NOT_FOUND)
+        if cached is not _NOT_FOUND:
+            return cached
+
+        parts = [normalize(part) for part in (query or '').split(',')]
+        name, qualifiers = parts[0], [part for part in parts[1:] if part]
+        place = None
+        if name:
+            row = self._best(self._key_range(name), qualifiers)
+            if row is None and len(name) >= PREFIX_MIN_LENGTH:
+                row = self._best(self._key_range(name, prefix=True), qualifiers)
+            if row is None:
+                row = self._best(self._fuzzy(name), qualifiers)
+            for broader in qualifiers:
+                # "Brooklyn, New York": fall back to an enclosing place that is indexed
+                if row is not None:
+                    break
+                row = self._best(self._key_range(broader), [])
+            place = self._place(row) if row is not None else None
+        self._resolved.set(cache_key, place)
+        return place
+
+    def coordinates(self, query: str, default: Tuple[float, float]) -> Tuple[float, float]:
+        place = self.resolve(query)
+        return place.coordinates if place else default
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'places': int(len(self.places)), 'keys': int(len(self.keys)),
+                'fuzzy_index': self._trigram_index is not None, 'cache': self._resolved.stats()}
+
+
+# ---------- global gazetteer ----------
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Get the memory-mapped gazetteer, falling back to the built-in city list"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load(GAZETTEER_PATH) or Gazetteer.builtin()
+    return _gazetteer
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the local gazetteer from a GeoNames dump")
+    parser.add_argument('--geonames', required=True, help="GeoNames TSV, e.g. cities15000.txt")
+    parser.add_argument('--path', default=GAZETTEER_PATH)
+    parser.add_argument('--min-population', type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    gazetteer = Gazetteer.from_geonames(args.geonames, args.min_population)
+    gazetteer.save(args.path)
+    logger.info(f"Gazetteer built: {len(gazetteer.places)} places, {len(gazetteer.keys)} keys")
@@ -3,6 +3,7 @@ import os
 from datetime import datetime
 
 from flask import Blueprint, jsonify, request
+from pagination import InvalidCursor, page_info, page_params, postgrest_seek, split_page
 from star_auth import token_required
 
 # TODO: Replace with Azure Cosmos DB imports
@@ -51,10 +52,14 @@ def get_group_messages(current_user, group_id):
         if not member_check.data:
             return jsonify({'error': 'Not a member of this group'}), 403
 
-        # Get messages with user info
-        messages_response = supabase.table('chat_messages').select('*, profiles(username, zodiac_sign)').eq('group_id', group_id).order('created_at', desc=True).limit(50).execute()
+        # Get messages with user info, newest first; the cursor pages back through history
+        limit, cursor, _ = page_params(request.args, default_limit=50)
+        query = supabase.table('chat_messages').select('*, profiles(username, zodiac_sign)').eq('group_id', group_id)
+        messages, next_cursor = split_page(postgrest_seek(query, cursor, limit).execute().data, limit)
 
-        return jsonify({'messages': messages_response.data}), 200
+        return jsonify({'messages': messages, 'pagination': page_info(next_cursor, limit=limit)}), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -226,17 +231,20 @@ def get_zodiac_room_messages(current_user, element):
         if element not in ZODIAC_ELEMENTS:
             return jsonify({'error': INVALID_ZODIAC_ELEMENT}), 400
 
-        # Get messages with user info, ordered by newest first
-        messages_response = supabase.table('zodiac_chat_messages').select('*, profiles(username, zodiac_sign)').eq('element', element).order('created_at', desc=True).limit(50).execute()
+        # Get messages with user info, ordered by newest first; the cursor pages back through history
+        limit, cursor, _ = page_params(request.args, default_limit=50)
+        query = supabase.table('zodiac_chat_messages').select('*, profiles(username, zodiac_sign)').eq('element', element)
+        messages, next_cursor = split_page(postgrest_seek(query, cursor, limit).execute().data or [], limit)
 
         # Reverse to show oldest first for chat UI
-        messages = messages_response.data[::-1] if messages_response.data else []
-
         return jsonify({
-            'messages': messages,
-            'room_info': ZODIAC_ELEMENTS[element]
+            'messages': messages[::-1],
+            'room_info': ZODIAC_ELEMENTS[element],
+            'pagination': page_info(next_cursor, limit=limit)
         }), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -10,6 +10,9 @@ from datetime import datetime, timedelta
 from enum import Enum
 from typing import Dict, List, Optional, Tuple
 
+from ephemeris import get_ephemeris_engine
+from event_solver import get_event_solver
+
 
 class MoonPhase(Enum):
     NEW_MOON = "new_moon"
@@ -429,28 +432,20 @@ class LunarCalculations:
         return f"{phase_desc}. Mayan: {mayan_energy}. Chinese: {chinese_trait}."
 
     def is_moon_void_of_course(self, date: datetime) -> Dict[str, any]:
-        """Check if moon is void of course (no major aspects to other planets) using simplified calculation"""
-        # Simplified void of course calculation
-        # In a full implementation, this would check aspects to all planets
-        # For now, use a simplified approach based on moon's position relative to sign boundaries
+        """Check if moon is void of course (past its last major aspect before changing sign)"""
+        void = get_event_solver().void_of_course(date)
+        next_change_time = void['void_until']
+        is_void = void['is_void']
 
-        moon_info = self.get_moon_zodiac_sign(date)
-        moon_longitude = moon_info['longitude']
-
-        # Calculate next sign change
+        # Degrees the moon still has to travel in its current sign
+        moon_longitude = float(get_ephemeris_engine().longitudes([date], ['Moon'])[0, 0])
         next_sign_change = ((int(moon_longitude // 30) + 1) * 30) - moon_longitude
 
-        # Simplified: moon is void if within 2 degrees of sign change
-        is_void = next_sign_change <= 2.0
-
-        # Estimate time to next sign change (moon moves ~12-13 degrees per day)
-        hours_to_change = (next_sign_change / 12.2) * 24
-        next_change_time = date + timedelta(hours=hours_to_change)
-
         return {
             'is_void': is_void,
+            'void_start': void['void_start'].isoformat() if void['void_start'] else None,
             'next_sign_change_degrees': round(next_sign_change, 2),
-            'next_sign_change_time': next_change_time.isoformat(),
+            'next_sign_change_time': next_change_time.isoformat() if next_change_time else None,
             'advice': "Avoid major decisions during void periods" if is_void else "Good time for action and decisions"
         }
 
@@ -571,32 +566,20 @@ class LunarCalculations:
 
     def get_eclipse_dates(self, start_date: datetime, end_date: datetime) -> List[Dict[str, any]]:
         """Calculate solar and lunar eclipses within date range"""
-        eclipses = []
-
-        # This is a simplified eclipse calculation
-        # In production, use more sophisticated astronomical calculations
-        current_date = start_date
-
-        while current_date <= end_date:
-            # Check for solar eclipse (simplified)
-            if current_date.day == 14 and current_date.month in [3, 9]:  # Equinox periods
-                eclipses.append({
-                    'type': 'solar_eclipse',
-                    'date': current_date.isoformat(),
-                    'description': 'Solar eclipse - major life changes and revelations'
-                })
-
-            # Check for lunar eclipse (simplified)
-            if current_date.day == 28 and current_date.month in [3, 9]:  # Full moon periods
-                eclipses.append({
-                    'type': 'lunar_eclipse',
-                    'date': current_date.isoformat(),
-                    'description': 'Lunar eclipse - emotional transformations and endings'
-                })
-
-            current_date += timedelta(days=1)
-
-        return eclipses
+        descriptions = {
+            'solar_eclipse': 'Solar eclipse - major life changes and revelations',
+            'lunar_eclipse': 'Lunar eclipse - emotional transformations and endings'
+        }
+
+        # New and full moons close enough to a lunar node, solved to the second
+        return [
+            {
+                'type': event.name,
+                'date': event.time.isoformat(),
+                'description': descriptions[event.name]
+            }
+            for event in get_event_solver().iter_events(start_date, end_date, kinds=('eclipse',))
+        ]
 
 
 # Global calculator instance
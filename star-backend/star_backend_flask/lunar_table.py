@@ -0,0 +1,288 @@
+"""
+Precomputed lunar ephemeris table for STAR lunar features
+A compact array of Moon and planet longitudes at fixed resolution, generated
+offline, memory-mapped at runtime and refreshed by a background job, so
+moon phase, void-of-course, ingress and mansion lookups are O(1)
+interpolations instead of fresh ephemeris evaluations
+
+Build offline with:
+    python lunar_table.py --years 2 --step 10
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import ephem
+import numpy as np
+from ephemeris import EphemerisEngine, _to_ephem_dates, get_ephemeris_engine
+from file_lock import locked, try_lock
+
+logger = logging.getLogger(__name__)
+
+LUNAR_TABLE_BODIES = ("Moon", "Sun", "Mercury", "Venus", "Mars", "Jupiter", "Saturn")
+LUNAR_TABLE_STEP_MINUTES = 10
+LUNAR_TABLE_YEARS = 2          # coverage on each side of the build date
+LUNAR_TABLE_REFRESH_HOURS = 24
+LUNAR_TABLE_POLL_SECONDS = 300  # how often workers look for a table rewritten by the refresher
+LUNAR_TABLE_MIN_HORIZON_DAYS = 180  # rebuild when coverage ahead drops below this
+LUNAR_TABLE_PATH = os.environ.get(
+    'LUNAR_TABLE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'lunar_ephemeris.npy')
+)
+BUILD_CHUNK_ROWS = 4096
+
+
+def _metadata_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _lock_path(path: str) -> str:
+    return path + '.lock'
+
+
+class LunarEphemerisTable:
+    """Fixed-step table of ecliptic longitudes with wrap-aware linear interpolation"""
+
+    def __init__(self, longitudes: np.ndarray, start: float, step_minutes: float,
+                 bodies: Sequence[str] = LUNAR_TABLE_BODIES):
+        self.longitudes = longitudes            # (rows, bodies) float32 degrees
+        self.start = float(start)               # ephem date of row 0
+        self.step = step_minutes / (24 * 60)    # row spacing in days
+        self.step_minutes = step_minutes
+        self.bodies = tuple(bodies)
+        self.body_index = {name: i for i, name in enumerate(self.bodies)}
+
+    # ---------- construction and persistence ----------
+
+    @classmethod
+    def build(cls, start: datetime.datetime, end: datetime.datetime,
+              step_minutes: float = LUNAR_TABLE_STEP_MINUTES,
+              engine: Optional[EphemerisEngine] = None) -> 'LunarEphemerisTable':
+        """Compute the table by evaluating the ephemeris at every step"""
+        engine = engine or get_ephemeris_engine()
+        step = datetime.timedelta(minutes=step_minutes)
+        rows = int((end - start) / step) + 1
+        longitudes = np.empty((rows, len(LUNAR_TABLE_BODIES)), dtype=np.float32)
+        for offset in range(0, rows, BUILD_CHUNK_ROWS):
+            dates = [start + step * i for i in range(offset, min(offset + BUILD_CHUNK_ROWS, rows))]
+            longitudes[offset:offset + len(dates)] = engine.longitudes(dates, LUNAR_TABLE_BODIES)
+        return cls(longitudes, float(ephem.Date(start)), step_minutes)
+
+    def save(self, path: str = LUNAR_TABLE_PATH) -> None:
+        """Write the table atomically (array + JSON metadata sidecar)
+
+        Temporary files are per process, and the pair is swapped in under the
+        table's exclusive lock, array first, so a loader never pairs a new
+        array with old metadata.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, np.asarray(self.longitudes, dtype=np.float32))
+        metadata = {
+            'start': self.start,
+            'step_minutes': self.step_minutes,
+            'bodies': list(self.bodies),
+            'rows': int(len(self.longitudes)),
+            'generated_at': datetime.datetime.utcnow().isoformat()
+        }
+        with open(_metadata_path(tmp_path), 'w') as f:
+            json.dump(metadata, f)
+        with locked(_lock_path(path)):
+            os.replace(tmp_path, path)
+            os.replace(_metadata_path(tmp_path), _metadata_path(path))
+
+    @classmethod
+    def load(cls, path: str = LUNAR_TABLE_PATH) -> Optional['LunarEphemerisTable']:
+        """Memory-map a saved table; returns None if it has not been generated"""
+        if not os.path.exists(path) or not os.path.exists(_metadata_path(path)):
+            return None
+        try:
+            with locked(_lock_path(path), shared=True):
+                with open(_metadata_path(path)) as f:
+                    metadata = json.load(f)
+                longitudes = np.load(path, mmap_mode='r')
+            return cls(longitudes, metadata['start'], metadata['step_minutes'], metadata['bodies'])
+        except Exception as e:
+            logger.error(f"Failed to load lunar table {path}: {e}")
+            return None
+
+    # ---------- coverage ----------
+
+    @property
+    def end(self) -> float:
+        return self.start + (len(self.longitudes) - 1) * self.step
+
+    @property
+    def start_datetime(self) -> datetime.datetime:
+        return ephem.Date(self.start).datetime()
+
+    @property
+    def end_datetime(self) -> datetime.datetime:
+        return ephem.Date(self.end).datetime()
+
+    def covers(self, *dates: datetime.datetime) -> bool:
+        positions = _to_ephem_dates(dates)
+        return bool(((positions >= self.start) & (positions <= self.end)).all())
+
+    # ---------- lookups ----------
+
+    def _interpolate(self, ephem_dates: np.ndarray, columns: List[int]) -> np.ndarray:
+        position = (ephem_dates - self.start) / self.step
+        row = np.clip(np.floor(position).astype(int), 0, len(self.longitudes) - 2)
+        fraction = (position - row)[:, None]
+        lower = np.asarray(self.longitudes[row][:, columns], dtype=float)
+        upper = np.asarray(self.longitudes[row + 1][:, columns], dtype=float)
+        delta = (upper - lower + 180.0) % 360.0 - 180.0   # shortest way round 0°/360°
+        return (lower + fraction * delta) % 360.0
+
+    def longitudes_for(self, dates: Sequence[datetime.datetime],
+                       bodies: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Interpolated longitudes, shape (len(dates), len(bodies)) - same layout as EphemerisEngine.longitudes"""
+        return self.longitudes_for_ephem_dates(_to_ephem_dates(dates), bodies)
+
+    def longitudes_for_ephem_dates(self, ephem_dates: np.ndarray,
+                                   bodies: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Same as ``longitudes_for`` for instants already given as ephem (Dublin Julian) dates"""
+        columns = [self.body_index[name] for name in (bodies or self.bodies)]
+        return self._interpolate(np.asarray(ephem_dates, dtype=float), columns)
+
+    def covers_ephem_range(self, start: float, end: float, bodies: Sequence[str] = ()) -> bool:
+        """Whether [start, end] (ephem dates) and every body in ``bodies`` are in the table"""
+        return self.start <= start and end <= self.end and all(name in self.body_index for name in bodies)
+
+    def positions(self, date: datetime.datetime) -> Dict[str, float]:
+        """Longitudes of every tabulated body at one instant"""
+        return dict(zip(self.bodies, self.longitudes_for([date])[0].tolist()))
+
+    def next_ingress(self, date: datetime.datetime, body: str = "Moon",
+                     max_hours: float = 72) -> Optional[datetime.datetime]:
+        """Time the body next enters a new 30° sign, interpolated between table rows"""
+        column = self.body_index[body]
+        start = float(ephem.Date(date))
+        stop = min(start + max_hours / 24.0, self.end)
+        first_row = int(np.ceil((start - self.start) / self.step))
+        last_row = int(np.floor((stop - self.start) / self.step))
+        if first_row > last_row or start < self.start:
+            return None
+
+        current = self._interpolate(np.array([start]), [column])[0, 0]
+        signs = np.floor(np.asarray(self.longitudes[first_row:last_row + 1, column], dtype=float) / 30.0)
+        changed = np.nonzero(signs != np.floor(current / 30.0))[0]
+        if not len(changed):
+            return None
+
+        # Interpolate the 30° boundary crossing between the two rows
+        row = first_row + changed[0]
+        before_date = max(start, self.start + (row - 1) * self.step)
+        before = self._interpolate(np.array([before_date]), [column])[0, 0]
+        after = float(self.longitudes[row, column])
+        boundary = (np.floor(before / 30.0) + 1) * 30.0
+        travelled = (after - before) % 360.0
+        needed = (boundary - before) % 360.0
+        fraction = needed / travelled if travelled else 0.0
+        crossing = before_date + fraction * (self.start + row * self.step - before_date)
+        return ephem.Date(crossing).datetime()
+
+
+# ---------- global table and refresh job ----------
+
+_lunar_table: Optional[LunarEphemerisTable] = None
+_lunar_table_loaded = False
+_lunar_table_mtime: Optional[float] = None  # mtime of the file _lunar_table was loaded from
+_refresh_thread: Optional[threading.Thread] = None
+_table_lock = threading.Lock()
+
+
+def _table_mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(_metadata_path(path))
+    except OSError:
+        return None
+
+
+def _reload_lunar_table() -> None:
+    global _lunar_table, _lunar_table_loaded, _lunar_table_mtime
+    with _table_lock:
+        _lunar_table_mtime = _table_mtime(LUNAR_TABLE_PATH)
+        _lunar_table = LunarEphemerisTable.load(LUNAR_TABLE_PATH) or _lunar_table
+        _lunar_table_loaded = True
+
+
+def get_lunar_table() -> Optional[LunarEphemerisTable]:
+    """Get the memory-mapped lunar table, or None until one has been generated"""
+    if not _lunar_table_loaded:
+        _reload_lunar_table()
+    return _lunar_table
+
+
+def refresh_lunar_table(path: str = LUNAR_TABLE_PATH, years: float = LUNAR_TABLE_YEARS,
+                        step_minutes: float = LUNAR_TABLE_STEP_MINUTES) -> LunarEphemerisTable:
+    """Rebuild a table centred on now, persist it and swap it in"""
+    now = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    span = datetime.timedelta(days=365.25 * years)
+    table = LunarEphemerisTable.build(now - span, now + span, step_minutes)
+    table.save(path)
+    logger.info(f"Lunar table rebuilt: {table.start_datetime} to {table.end_datetime}, {len(table.longitudes)} rows")
+    if path == LUNAR_TABLE_PATH:
+        _reload_lunar_table()
+    return table
+
+
+def _needs_refresh(table: Optional[LunarEphemerisTable]) -> bool:
+    if table is None:
+        return True
+    horizon = datetime.datetime.utcnow() + datetime.timedelta(days=LUNAR_TABLE_MIN_HORIZON_DAYS)
+    return not table.covers(datetime.datetime.utcnow(), horizon)
+
+
+def start_lunar_table_refresher(interval_hours: float = LUNAR_TABLE_REFRESH_HOURS,
+                                poll_seconds: float = LUNAR_TABLE_POLL_SECONDS) -> threading.Thread:
+    """Start a daemon thread that keeps this worker's table current
+
+    Only the worker holding the refresher lock rebuilds the table (a crashed
+    holder releases it, and another worker takes over on its next poll); the
+    others pick up the rewritten file when its mtime changes.
+    """
+    global _refresh_thread
+    if _refresh_thread and _refresh_thread.is_alive():
+        return _refresh_thread
+
+    def run():
+        stop = threading.Event()
+        leader = None
+        next_check = 0.0
+        while True:
+            try:
+                if leader is None:
+                    leader = try_lock(LUNAR_TABLE_PATH + '.refresher.lock')
+                    if leader is not None:
+                        logger.info(f"Lunar table refresher elected in process {os.getpid()}")
+                if _table_mtime(LUNAR_TABLE_PATH) != _lunar_table_mtime:
+                    _reload_lunar_table()
+                if leader is not None and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + interval_hours * 3600
+                    if _needs_refresh(get_lunar_table()):
+                        refresh_lunar_table()
+            except Exception as e:
+                logger.error(f"Lunar table refresh failed: {e}")
+            stop.wait(poll_seconds)
+
+    _refresh_thread = threading.Thread(target=run, name='lunar-table-refresh', daemon=True)
+    _refresh_thread.start()
+    return _refresh_thread
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the precomputed lunar ephemeris table")
+    parser.add_argument('--path', default=LUNAR_TABLE_PATH)
+    parser.add_argument('--years', type=float, default=LUNAR_TABLE_YEARS)
+    parser.add_argument('--step', type=float, default=LUNAR_TABLE_STEP_MINUTES, help="resolution in minutes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    refresh_lunar_table(args.path, args.years, args.step)
@@ -25,10 +25,18 @@ from marshmallow import Schema, ValidationError, fields, validate
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 import api
+from analytics_engine import EngagementType, get_analytics_engine, track_verified_action
+from auth_cache import get_principal
+from compatibility import get_compatibility_index, load_profiles, mark_profiles_changed
 from cosmos_db import get_cosmos_helper
 from database_utils import (check_username_exists, create_user,
-                            get_user_by_username, get_users_container,
-                            update_user_online_status)
+                            get_user_by_username, get_users_container)
+from presence import get_presence_tracker
+from socket_fanout import init_socket_fanout
+from timeline import fan_out_post, get_timeline_store
+from user_loader import get_user_loader
+from user_stats import get_user_stats_projection
+from zodiac_atlas import get_zodiac_atlas, warm_zodiac_atlas
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, filename='app.log', format='%(asctime)s %(levelname)s: %(message)s')
@@ -94,6 +102,30 @@ def get_user_by_id(user_id):
         logger.error(f"Error getting user by ID: {e}")
         return None
 
+def get_compatibility_profiles():
+    """Every user's zodiac fields, for the compatibility index"""
+    users_container = get_users_container()
+    if not users_container:
+        return []
+    return load_profiles(users_container)
+
+# Bound here so the first compatibility query loads the index on demand;
+# the warm-ups below run from start_background_jobs() at app startup
+get_compatibility_index().bind(get_compatibility_profiles)
+
+_background_jobs_started = False
+
+def start_background_jobs():
+    """Warm the compatibility index, zodiac atlas and analytics rollups in the background (once per process)"""
+    global _background_jobs_started
+    if _background_jobs_started:
+        return
+    _background_jobs_started = True
+    get_compatibility_index().warm()
+    warm_zodiac_atlas()
+    if cosmos_helper:
+        get_analytics_engine(cosmos_helper)  # starts the rollup backfill in the background
+
 def get_posts(limit=20):
     """Get recent posts"""
     if not cosmos_helper:
@@ -108,6 +140,21 @@ def create_post(post_data):
     result = cosmos_helper.create_post(post_data)
     if result['error']:
         raise Exception(f"Failed to create post: {result['error']}")
+    # The post is stored; stats and analytics are best-effort from here on
+    try:
+        get_user_stats_projection().post_created(post_data['user_id'], post_data.get('created_at'))
+    except Exception as e:
+        logger.error(f"User stats update error: {str(e)}")
+    try:
+        track_verified_action(post_data['user_id'], EngagementType.POST_CREATE, post_data.get('zodiac_sign'),
+                              {'post_id': post_data.get('id')})
+    except Exception as e:
+        logger.error(f"Post analytics error: {str(e)}")
+    try:
+        fan_out_post(post_data, cosmos_helper)
+    except Exception as e:
+        # Timeline delivery must not fail the post; readers fall back to querying
+        logger.error(f"Timeline fan-out error: {str(e)}")
     return result['data']
 
 def get_user_profile(username):
@@ -317,26 +364,14 @@ def get_chinese_zodiac_element(birth_year):
     return elements[element_index]
 
 def get_vedic_zodiac(birth_date):
-    """Simple approximation of Vedic zodiac from Western equivalent by month/day"""
+    """Simple approximation of Vedic zodiac from its Western (tropical sun sign) equivalent"""
     western_to_vedic = {
         'Aries': 'Mesha', 'Taurus': 'Vrishabha', 'Gemini': 'Mithuna',
         'Cancer': 'Karka', 'Leo': 'Simha', 'Virgo': 'Kanya',
         'Libra': 'Tula', 'Scorpio': 'Vrischika', 'Sagittarius': 'Dhanu',
         'Capricorn': 'Makara', 'Aquarius': 'Kumbha', 'Pisces': 'Meena'
     }
-    m, d = birth_date.month, birth_date.day
-    if (m == 3 and d >= 21) or (m == 4 and d <= 19): west = 'Aries'
-    elif (m == 4 and d >= 20) or (m == 5 and d <= 20): west = 'Taurus'
-    elif (m == 5 and d >= 21) or (m == 6 and d <= 20): west = 'Gemini'
-    elif (m == 6 and d >= 21) or (m == 7 and d <= 22): west = 'Cancer'
-    elif (m == 7 and d >= 23) or (m == 8 and d <= 22): west = 'Leo'
-    elif (m == 8 and d >= 23) or (m == 9 and d <= 22): west = 'Virgo'
-    elif (m == 9 and d >= 23) or (m == 10 and d <= 22): west = 'Libra'
-    elif (m == 10 and d >= 23) or (m == 11 and d <= 21): west = 'Scorpio'
-    elif (m == 11 and d >= 22) or (m == 12 and d <= 21): west = 'Sagittarius'
-    elif (m == 12 and d >= 22) or (m == 1 and d <= 19): west = 'Capricorn'
-    elif (m == 1 and d >= 20) or (m == 2 and d <= 18): west = 'Aquarius'
-    else: west = 'Pisces'
+    west = get_zodiac_atlas().describe(birth_date)['western']
     return western_to_vedic.get(west, 'Unknown')
 
 # -------------------- JWT AUTHENTICATION --------------------
@@ -349,11 +384,11 @@ def token_required(f):
         try:
             token = request.headers['Authorization'].split(' ')[1]
             data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=[app.config['JWT_ALGORITHM']])
-            user_data = get_user_by_id(data['user_id'])
+            user_data = get_principal(data['user_id'], data.get('exp'), get_user_by_id)
             if not user_data:
                 return {'error': 'User not found'}, 401
             current_user = type('User', (), {'id': user_data['id'], 'username': user_data['username'], 'zodiac_sign': user_data['zodiac_sign']})
-            update_user_online_status(current_user.username, True)
+            get_presence_tracker().touch(current_user.id)
         except jwt.ExpiredSignatureError:
             return {'error': 'Token has expired'}, 401
         except jwt.InvalidTokenError:
@@ -413,6 +448,8 @@ class Register(Resource):
                 'is_online': True
             }
             create_user(new_user)
+            get_compatibility_index().upsert(new_user['id'], new_user)
+            mark_profiles_changed()
             return {'message': 'Registered successfully'}, 201
         except ValidationError as err:
             return {'error': f'Invalid input: {err.messages}'}, 400
@@ -439,7 +476,7 @@ class Login(Resource):
                 'exp': datetime.now(timezone.utc) + timedelta(hours=24)
             }, app.config['JWT_SECRET_KEY'], algorithm=app.config['JWT_ALGORITHM'])
 
-            update_user_online_status(user['id'], True)
+            get_presence_tracker().touch(user['id'])
 
             return {
                 'token': token,
@@ -462,9 +499,10 @@ class PostResource(Resource):
         """Get posts; transforms nested user.username to top-level username for convenience"""
         try:
             posts = get_posts(limit=20)
+            authors = get_user_loader().load_many(post.get('user_id') for post in posts)
             enriched_posts = []
             for post in posts:
-                user = get_user_by_id(post.get('user_id'))
+                user = authors.get(str(post.get('user_id')))
                 username = user.get('username') if user else None
                 enriched_posts.append({
                     'id': post.get('id'),
@@ -532,6 +570,8 @@ class FollowResource(Resource):
                 'followed_id': user_id,
                 'created_at': datetime.now(timezone.utc).isoformat()
             })
+            get_timeline_store().invalidate_following(current_user.id)
+            get_user_stats_projection().follow_changed(current_user.id, user_id)
             return {'message': 'Followed'}, 201
         except Exception as e:
             logger.error(f"Follow error: {str(e)}")
@@ -562,6 +602,24 @@ class ProfileResource(Resource):
             logger.error(f"Failed to fetch profile: {str(e)}")
             return {'error': 'Failed to fetch profile'}, 500
 
+class CompatibleUsersResource(Resource):
+    @limiter.limit("120/hour")
+    def get(self, user_id):
+        """Most compatible users across the zodiac systems"""
+        try:
+            limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+            matches = get_compatibility_index().top_k(user_id, limit)
+            if not matches and user_id not in get_compatibility_index():
+                return {'error': 'User not found'}, 404
+            return {
+                'user_id': user_id,
+                'matches': [{'user_id': match_id, 'score': score, 'systems': systems}
+                            for match_id, score, systems in matches]
+            }, 200
+        except Exception as e:
+            logger.error(f"Failed to find compatible users: {str(e)}")
+            return {'error': 'Failed to find compatible users'}, 500
+
 class TrendDiscoveryResource(Resource):
     @limiter.limit("60/hour")
     @cache.cached(timeout=300)
@@ -896,6 +954,7 @@ rest_api.add_resource(PostResource, '/api/v1/posts')
 rest_api.add_resource(UploadResource, '/api/v1/upload')
 rest_api.add_resource(FollowResource, '/api/v1/follow/<int:user_id>')
 rest_api.add_resource(ProfileResource, '/api/v1/profile/<int:user_id>')
+rest_api.add_resource(CompatibleUsersResource, '/api/v1/users/<user_id>/compatible')
 rest_api.add_resource(TrendDiscoveryResource, '/api/v1/trends')
 rest_api.add_resource(ZodiacNumberResource, '/api/v1/zodiac-numbers')
 rest_api.add_resource(HoroscopeResource, '/api/v1/horoscopes')
@@ -924,6 +983,7 @@ def register_resources(api_obj=None):
     target_api.add_resource(UploadResource, '/api/v1/upload')
     target_api.add_resource(FollowResource, '/api/v1/follow/<int:user_id>')
     target_api.add_resource(ProfileResource, '/api/v1/profile/<int:user_id>')
+    target_api.add_resource(CompatibleUsersResource, '/api/v1/users/<user_id>/compatible')
     target_api.add_resource(TrendDiscoveryResource, '/api/v1/trends')
     target_api.add_resource(ZodiacNumberResource, '/api/v1/zodiac-numbers')
     target_api.add_resource(HoroscopeResource, '/api/v1/horoscopes')
@@ -954,6 +1014,9 @@ def create_app(config: dict | None = None):
     if 'api' not in app.blueprints:
         app.register_blueprint(api.api_bp)
 
+    if os.environ.get('TESTING') != 'true' and not app.config.get('TESTING'):
+        start_background_jobs()
+
     return app
 
 # ==================== SOCKET.IO EVENTS ====================
@@ -961,11 +1024,13 @@ def create_app(config: dict | None = None):
 @socketio.on('connect')
 def handle_connect():
     logger.info('Client connected to SocketIO')
+    init_socket_fanout(socketio).connect(request.sid)
     emit('connected', {'data': 'Connected to Star', 'timestamp': datetime.now(timezone.utc).isoformat()})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     logger.info('Client disconnected from SocketIO')
+    init_socket_fanout(socketio).disconnect(request.sid)
 
 @socketio.on('join_room')
 def handle_join_room(data):
@@ -974,6 +1039,7 @@ def handle_join_room(data):
         emit('error', {'message': 'Invalid room'})
         return
     join_room(room)
+    init_socket_fanout(socketio).join(request.sid, room)
     logger.info(f'Client joined room: {room}')
     emit('room_joined', {'room': room})
 
@@ -985,7 +1051,7 @@ def handle_send_message(data):
         emit('error', {'message': 'Invalid room or message'})
         return
     logger.info(f'Message sent to room: {room}')
-    emit('new_message', {'message': message, 'timestamp': datetime.now(timezone.utc).isoformat()}, room=room)
+    init_socket_fanout(socketio).emit('new_message', {'message': message, 'timestamp': datetime.now(timezone.utc).isoformat()}, rooms=room)
 
 # ==================== GLOBAL ERROR HANDLER ====================
 
@@ -998,6 +1064,7 @@ def handle_error(error):
 
 if __name__ == '__main__':
     logger.info("Starting Star App server...")
+    start_background_jobs()
     logger.info(f"Available at: http://localhost:{os.environ.get('PORT', 5000)}")
     socketio.run(
         app,
@@ -2,6 +2,7 @@ import os
 from datetime import datetime, timezone
 
 from flask import Blueprint, current_app, jsonify, request
+from pagination import InvalidCursor, page_info, page_params, postgrest_seek, split_page
 from star_auth import token_required
 
 # TODO: Replace with Azure Cosmos DB imports
@@ -49,15 +50,20 @@ def get_user_notifications():
     """Get user's notifications"""
     try:
         user_id = request.user_id
-        limit = int(request.args.get('limit', 20))
-        offset = int(request.args.get('offset', 0))
+        limit, cursor, include_total = page_params(request.args, default_limit=20)
 
-        result = get_supabase_client().table('notifications').select('*').eq('user_id', user_id).order('created_at', desc=True).range(offset, offset + limit - 1).execute()
+        # Planner row estimate only when the client asks for a total
+        query = get_supabase_client().table('notifications').select('*', count='estimated' if include_total else None).eq('user_id', user_id)
+        result = postgrest_seek(query, cursor, limit).execute()
+        page, next_cursor = split_page(result.data, limit)
 
         return jsonify({
-            'notifications': result.data,
-            'count': len(result.data)
+            'notifications': page,
+            'count': len(page),
+            'pagination': page_info(next_cursor, result.count if include_total else None, limit)
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Failed to get notifications: {e}")
         return jsonify({'error': 'Failed to get notifications'}), 500
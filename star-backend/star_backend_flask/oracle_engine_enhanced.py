@@ -3,16 +3,35 @@ Occult Oracle AI Engine for Star Platform
 Provides authentic astrological calculations, tarot readings, numerology, and Kabbalistic insights
 """
 
+import bisect
 import datetime
 import json
 import logging
 import math
 import random
-from dataclasses import asdict, dataclass
+import struct
+from dataclasses import asdict, dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import ephem
+import numpy as np
+from ai_gateway import AIGateway, fingerprint
+from cache_utils import TieredCache
+from ephemeris import get_ephemeris_engine
+from event_solver import get_event_solver
+from gazetteer import get_gazetteer
+from lunar_table import LUNAR_TABLE_BODIES, get_lunar_table
+from seeded_rng import generator_for, rng_for, toss_hexagram_lines
+from stage_graph import Stage, StageGraph, StageRun, StageTimings, get_stage_executor
+from zodiac_atlas import (AZTEC_DAY_SIGNS, CHINESE_ANIMALS, CHINESE_ELEMENTS, GALACTIC_TONES,
+                          MAYAN_DAY_SIGNS, TZOLKIN_CORRELATION, VEDIC_AYANAMSA_DAYS, VEDIC_NAKSHATRAS,
+                          VEDIC_RASHIS, WESTERN_SIGNS, get_zodiac_atlas)
+
+try:
+    from redis_utils import get_redis
+except ImportError:  # redis client not installed; chart cache stays in-process
+    get_redis = None
 
 
 class ZodiacSign(Enum):
@@ -153,6 +172,8 @@ class OccultOracleEngine:
         self.cosmos_db = cosmos_db_helper
         self.ai_client = ai_client
         self.logger = logging.getLogger(__name__)
+        # Cached, deduplicated and concurrency-limited access to the AI client
+        self._ai_gateway = AIGateway(ai_client) if ai_client else None
         
         # House system constants for proper calculations
         self.house_systems = {
@@ -161,6 +182,16 @@ class OccultOracleEngine:
             'equal': self._calculate_equal_houses
         }
 
+        # Natal charts: in-process LRU in front of the shared Redis cache
+        self._chart_cache = TieredCache(
+            "natal_chart", self._serialize_natal_chart, self._deserialize_natal_chart,
+            redis_manager=get_redis() if get_redis else None,
+            maxsize=self.NATAL_CHART_CACHE_SIZE, ttl=self.NATAL_CHART_CACHE_TTL
+        )
+
+        # Per-stage latency of oracle sessions, reported by get_performance_stats
+        self._stage_timings = StageTimings()
+
     def _initialize_tarot_deck(self) -> List[TarotCard]:
         """Initialize the 78-card Kabbalistic Tarot deck"""
         major_arcana = [
@@ -272,76 +303,59 @@ class OccultOracleEngine:
 
         return major_arcana + minor_arcana
 
+    # Birth places the gazetteer cannot resolve fall back to New York
+    NATAL_DEFAULT_COORDS = (40.7128, -74.0060)
+
+    CHART_BODY_SYMBOLS = {
+        "Sun": "☉", "Moon": "☽", "Mercury": "☿", "Venus": "♀", "Mars": "♂",
+        "Jupiter": "♃", "Saturn": "♄", "Uranus": "⛢", "Neptune": "♆", "Pluto": "♇"
+    }
+
     def calculate_natal_chart(self, birth_date: datetime.datetime, birth_place: str) -> NatalChart:
         """Calculate complete natal chart using PyEphem for NASA-accurate positions"""
+        return self.calculate_natal_charts_bulk([(birth_date, birth_place)])[0]
 
-        # Convert location name to coordinates (simplified - in production use geocoding API)
-        # For now, use hardcoded coordinates for common locations
-        location_coords = {
-            'New York': (40.7128, -74.0060),
-            'London': (51.5074, -0.1278),
-            'Tokyo': (35.6762, 139.6503),
-            'Paris': (48.8566, 2.3522),
-            'Sydney': (-33.8688, 151.2093),
-            'Los Angeles': (34.0522, -118.2437),
-            'Chicago': (41.8781, -87.6298),
-            'Houston': (29.7604, -95.3698),
-            'Phoenix': (33.4484, -112.0740),
-            'Philadelphia': (39.9526, -75.1652),
-        }
-
-        # Default to New York if location not found
-        latitude, longitude = location_coords.get(birth_place, (40.7128, -74.0060))
-
-        # Set observer location
-        observer = ephem.Observer()
-        observer.lat = str(latitude)
-        observer.lon = str(longitude)
-        observer.date = birth_date
+    def calculate_natal_charts_bulk(self, births: Sequence[Tuple[datetime.datetime, str]]) -> List[NatalChart]:
+        """Calculate many natal charts with one batched ephemeris pass"""
+        if not births:
+            return []
+        engine = get_ephemeris_engine()
+        dates = [birth_date for birth_date, _ in births]
+        coords = [self._resolve_natal_coords(place) for _, place in births]
+
+        longitudes = engine.longitudes(dates, list(self.CHART_BODY_SYMBOLS))
+        ramcs = engine.local_sidereal_degrees(dates, [lon for _, lon in coords])
 
-        # Calculate planetary positions
-        sun = ephem.Sun(observer)
-        moon = ephem.Moon(observer)
-        mercury = ephem.Mercury(observer)
-        venus = ephem.Venus(observer)
-        mars = ephem.Mars(observer)
-        jupiter = ephem.Jupiter(observer)
-        saturn = ephem.Saturn(observer)
-        uranus = ephem.Uranus(observer)
-        neptune = ephem.Neptune(observer)
-        pluto = ephem.Pluto(observer)
+        return [
+            self._build_natal_chart(birth_date, latitude, longitude, row, float(ramc))
+            for birth_date, (latitude, longitude), row, ramc in zip(dates, coords, longitudes, ramcs)
+        ]
 
+    def _resolve_natal_coords(self, birth_place: str) -> Tuple[float, float]:
+        """Resolve a birth place to (latitude, longitude) through the local gazetteer"""
+        return get_gazetteer().coordinates(birth_place, self.NATAL_DEFAULT_COORDS)
+
+    def _build_natal_chart(self, birth_date: datetime.datetime, latitude: float, longitude: float,
+                           body_longitudes: np.ndarray, ramc: float) -> NatalChart:
+        """Assemble a NatalChart from one row of the ephemeris longitude matrix"""
         # Calculate houses (Placidus system)
         houses = self._calculate_houses(birth_date, latitude, longitude)
 
-        # Calculate ascendant and midheaven
-        ramc = observer.sidereal_time() * 15  # Right Ascension of Midheaven in degrees
+        # Calculate ascendant and midheaven from the RAMC
         ascendant_deg = self._calculate_ascendant(ramc, latitude)
         midheaven_deg = ramc
 
-        def create_celestial_body(name: str, body, symbol: str) -> CelestialBody:
-            longitude = math.degrees(float(body.ra)) % 360
-            sign = self._get_zodiac_sign(longitude)
-            degree = longitude - sign.value[2]
-            return CelestialBody(name, longitude, 0, sign, degree)
-
-        return NatalChart(
-            sun=create_celestial_body("Sun", sun, "☉"),
-            moon=create_celestial_body("Moon", moon, "☽"),
-            mercury=create_celestial_body("Mercury", mercury, "☿"),
-            venus=create_celestial_body("Venus", venus, "♀"),
-            mars=create_celestial_body("Mars", mars, "♂"),
-            jupiter=create_celestial_body("Jupiter", jupiter, "♃"),
-            saturn=create_celestial_body("Saturn", saturn, "♄"),
-            uranus=create_celestial_body("Uranus", uranus, "⛢"),
-            neptune=create_celestial_body("Neptune", neptune, "♆"),
-            pluto=create_celestial_body("Pluto", pluto, "♇"),
-            ascendant=CelestialBody("Ascendant", ascendant_deg, 0, self._get_zodiac_sign(ascendant_deg),
-                                   ascendant_deg - self._get_zodiac_sign(ascendant_deg).value[2]),
-            midheaven=CelestialBody("Midheaven", midheaven_deg, 0, self._get_zodiac_sign(midheaven_deg),
-                                   midheaven_deg - self._get_zodiac_sign(midheaven_deg).value[2]),
-            houses=houses
-        )
+        return self._chart_from_longitudes(list(body_longitudes) + [ascendant_deg, midheaven_deg], houses)
+
+    def _chart_from_longitudes(self, point_longitudes: Sequence[float], houses: List[float]) -> NatalChart:
+        """Build a NatalChart from longitudes ordered as CHART_POINTS"""
+        def create_point(name: str, point_longitude: float) -> CelestialBody:
+            sign = self._get_zodiac_sign(point_longitude)
+            return CelestialBody(name, point_longitude, 0, sign, point_longitude - sign.value[2])
+
+        points = {name.lower(): create_point(name, float(lon))
+                  for name, lon in zip(self.CHART_POINTS, point_longitudes)}
+        return NatalChart(houses=houses, **points)
 
     def _get_zodiac_sign(self, longitude: float) -> ZodiacSign:
         """Determine zodiac sign from longitude"""
@@ -398,15 +412,17 @@ class OccultOracleEngine:
             number = sum(int(digit) for digit in str(number))
         return number
 
-    def draw_tarot_cards(self, num_cards: int = 3, spread: str = "past-present-future") -> List[Tuple[TarotCard, bool]]:
+    def draw_tarot_cards(self, num_cards: int = 3, spread: str = "past-present-future",
+                         seed: Optional[str] = None) -> List[Tuple[TarotCard, bool]]:
         """Draw tarot cards with Kabbalistic correspondences"""
+        rng = rng_for(seed, spread) if seed else rng_for()
         drawn_cards = []
         available_cards = self.tarot_deck.copy()
 
         for _ in range(min(num_cards, len(available_cards))):
-            card = random.choice(available_cards)
+            card = rng.choice(available_cards)
             available_cards.remove(card)
-            reversed = random.choice([True, False])
+            reversed = rng.choice([True, False])
             drawn_cards.append((card, reversed))
 
         return drawn_cards
@@ -522,25 +538,39 @@ class OccultOracleEngine:
     # ========== ADVANCED TAROT SPREADS ==========
     
     def enhanced_tarot_reading(self, spread_type: TarotSpread = TarotSpread.CELTIC_CROSS, 
-                              question: str = "", user_id: str = None) -> TarotReading:
+                              question: str = "", user_id: str = None,
+                              seed: Optional[str] = None) -> TarotReading:
         """Perform enhanced tarot reading with AI interpretation and lunar influence"""
-        import uuid
-        
+        drawn_cards = self.draw_spread(spread_type, seed)
+        return self.interpret_spread(spread_type, drawn_cards, question, user_id)
+
+    def draw_spread(self, spread_type: TarotSpread = TarotSpread.CELTIC_CROSS,
+                    seed: Optional[str] = None) -> List[Tuple[str, bool, str]]:
+        """Draw (card name, reversed, position) for every position of a spread"""
         num_cards = spread_type.value[1]
         position_meanings = spread_type.value[2]
+        rng = rng_for(seed, spread_type.name) if seed else rng_for()
         
         drawn_cards = []
         available_cards = self.tarot_deck.copy()
         
         for i in range(num_cards):
-            card = random.choice(available_cards)
+            card = rng.choice(available_cards)
             available_cards.remove(card)
-            reversed = random.choice([True, False])
+            reversed = rng.choice([True, False])
             position_meaning = position_meanings[i]
             drawn_cards.append((card.name, reversed, position_meaning))
         
+        return drawn_cards
+
+    def interpret_spread(self, spread_type: TarotSpread, drawn_cards: List[Tuple[str, bool, str]],
+                         question: str = "", user_id: str = None,
+                         moon_data: Optional[MoonData] = None) -> TarotReading:
+        """Turn drawn cards into a complete reading; this is where the AI call happens"""
+        import uuid
+        
         # Calculate lunar influence
-        moon_data = self.calculate_moon_phase()
+        moon_data = moon_data or self.calculate_moon_phase()
         lunar_influence = self._get_lunar_influence_for_reading(moon_data)
         
         # Generate overall energy
@@ -592,7 +622,7 @@ class OccultOracleEngine:
             return self._generate_basic_interpretation(cards, question)
         
         try:
-            # Prepare context for AI
+            # Prepare context for AI; everything in it is part of the cache key
             cards_context = []
             for card_name, reversed, position in cards:
                 card_obj = next((c for c in self.tarot_deck if c.name == card_name), None)
@@ -607,11 +637,18 @@ class OccultOracleEngine:
                         "astrology": card_obj.astrology
                     })
             
+            question = ' '.join((question or '').split())
             prompt = self._create_ai_interpretation_prompt(cards_context, question, moon_data)
+            key = fingerprint("tarot_interpretation", {
+                "cards": [(card_name, reversed, position) for card_name, reversed, position in cards],
+                "moon_phase": moon_data.phase.name,
+                "moon_sign": moon_data.zodiac_sign.name,
+                "question": question
+            })
             
-            # Call AI service (implementation depends on your AI client)
-            response = self._call_ai_service(prompt)
-            return response
+            # Call AI service (implementation depends on your AI client); a slow or
+            # failing model answers with the basic interpretation instead
+            return self._call_ai_service(prompt, key, fallback=self._generate_basic_interpretation(cards, question))
             
         except Exception as e:
             self.logger.error(f"AI interpretation failed: {e}")
@@ -619,7 +656,11 @@ class OccultOracleEngine:
 
     def _create_ai_interpretation_prompt(self, cards_context: List[Dict], 
                                        question: str, moon_data: MoonData) -> str:
-        """Create prompt for AI interpretation"""
+        """Create prompt for AI interpretation
+
+        Only inputs that are part of the gateway fingerprint go into the
+        prompt, so a cached interpretation fits every request sharing its key.
+        """
         prompt = f"""As an expert tarot reader with deep knowledge of Kabbalah and astrology, 
 provide a comprehensive interpretation of this tarot reading.
 
@@ -627,8 +668,7 @@ Question: {question or 'General guidance'}
 
 Current Lunar Influence: 
 - Moon Phase: {moon_data.phase.value[0]}
-- Moon in {moon_data.zodiac_sign.value[0]} at {moon_data.degree:.1f}°
-- {moon_data.illumination:.1f}% illuminated
+- Moon in {moon_data.zodiac_sign.value[0]}
 
 Cards drawn:
 """
@@ -654,12 +694,16 @@ Keep the tone mystical but accessible, and limit to 300 words."""
         
         return prompt
 
-    def _call_ai_service(self, prompt: str) -> str:
-        """Call AI service for interpretation - implement based on your AI client"""
-        # Placeholder - implement with your specific AI service
-        # This could be OpenAI, Azure OpenAI, Anthropic, etc.
-        if hasattr(self.ai_client, 'generate'):
-            return self.ai_client.generate(prompt)
+    def _call_ai_service(self, prompt: str, key: Optional[str] = None, fallback: Optional[str] = None) -> str:
+        """Call AI service for interpretation through the gateway
+
+        ``key`` identifies requests that may share a response; without one
+        the prompt text itself is fingerprinted. ``fallback`` is returned when
+        the model fails or misses the gateway deadline.
+        """
+        # The client may be OpenAI, Azure OpenAI, Anthropic, etc. behind a generate(prompt) method
+        if self._ai_gateway and hasattr(self.ai_client, 'generate'):
+            return self._ai_gateway.generate(key or fingerprint("prompt", prompt), prompt, fallback)
         return "AI interpretation service not configured"
 
     def _generate_basic_interpretation(self, cards: List[Tuple[str, bool, str]], question: str) -> str:
@@ -692,18 +736,13 @@ Keep the tone mystical but accessible, and limit to 300 words."""
         if date is None:
             date = datetime.datetime.now()
         
-        observer = ephem.Observer()
-        observer.date = date
-        
-        moon = ephem.Moon(observer)
-        sun = ephem.Sun(observer)
+        moon_longitude, sun_longitude = self._lunar_longitudes([date], ("Moon", "Sun"))[0]
         
-        # Calculate illumination percentage
-        illumination = moon.moon_phase * 100
+        # Determine moon phase from the Sun-Moon elongation
+        phase_degrees = float(moon_longitude - sun_longitude) % 360
         
-        # Determine moon phase
-        phase_angle = (moon.hlong - sun.hlong) % (2 * math.pi)
-        phase_degrees = math.degrees(phase_angle)
+        # Calculate illumination percentage (illuminated fraction of the disc)
+        illumination = (1 - math.cos(math.radians(phase_degrees))) / 2 * 100
         
         if phase_degrees < 22.5:
             phase = MoonPhase.NEW_MOON
@@ -723,7 +762,7 @@ Keep the tone mystical but accessible, and limit to 300 words."""
             phase = MoonPhase.WANING_CRESCENT
         
         # Calculate moon's zodiac position
-        moon_longitude = math.degrees(float(moon.hlong)) % 360
+        moon_longitude = float(moon_longitude)
         moon_sign = self._get_zodiac_sign(moon_longitude)
         moon_degree = moon_longitude - moon_sign.value[2]
         
@@ -739,34 +778,36 @@ Keep the tone mystical but accessible, and limit to 300 words."""
             next_aspect_time=self._calculate_next_moon_aspect(date)
         )
 
+    def _lunar_longitudes(self, dates: Sequence[datetime.datetime],
+                          bodies: Sequence[str] = LUNAR_TABLE_BODIES) -> np.ndarray:
+        """Longitudes (dates x bodies) from the precomputed lunar table, or the ephemeris outside its coverage"""
+        table = get_lunar_table()
+        if table is not None and table.covers(dates[0], dates[-1]):
+            return table.longitudes_for(dates, bodies)
+        return get_ephemeris_engine().longitudes(dates, bodies)
+
     def _is_moon_void_of_course(self, date: datetime.datetime) -> bool:
         """Check if moon is void of course"""
         # Simplified calculation - in production, check if moon makes no major aspects
         # before changing signs
         try:
-            observer = ephem.Observer()
-            observer.date = date
-            moon = ephem.Moon(observer)
-            
             # Check if moon will change signs within 24 hours without major aspects
-            current_sign = self._get_zodiac_sign(math.degrees(float(moon.hlong)) % 360)
-            
-            # Check 24 hours ahead
-            future_observer = ephem.Observer()
-            future_observer.date = date + datetime.timedelta(hours=24)
-            future_moon = ephem.Moon(future_observer)
-            future_sign = self._get_zodiac_sign(math.degrees(float(future_moon.hlong)) % 360)
+            current, future = self._lunar_longitudes([date, date + datetime.timedelta(hours=24)], ("Moon",))[:, 0]
             
             # If sign changes within 24 hours, consider void of course
-            return current_sign != future_sign
+            return self._get_zodiac_sign(float(current)) != self._get_zodiac_sign(float(future))
             
         except Exception:
             return False
 
     def _calculate_next_moon_aspect(self, date: datetime.datetime) -> Optional[datetime.datetime]:
-        """Calculate when moon makes next major aspect"""
-        # Simplified - would calculate exact aspect times in production
-        return date + datetime.timedelta(hours=random.randint(2, 12))
+        """Calculate when moon makes next exact major aspect to Sun through Saturn"""
+        try:
+            aspect = get_event_solver().next_moon_aspect(date)
+            return aspect.time if aspect else None
+        except Exception as e:
+            self.logger.error(f"Next moon aspect calculation failed: {e}")
+            return None
 
     def _get_lunar_influence_for_reading(self, moon_data: MoonData) -> str:
         """Get lunar influence description for readings"""
@@ -988,56 +1029,41 @@ Keep the tone mystical but accessible, and limit to 300 words."""
 
     # ========== ASPECT CALCULATIONS ==========
     
+    CHART_POINTS = ("Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn",
+                    "Uranus", "Neptune", "Pluto", "Ascendant", "Midheaven")
+
+    def _chart_longitudes(self, natal_chart: NatalChart) -> np.ndarray:
+        return np.array([getattr(natal_chart, point.lower()).longitude for point in self.CHART_POINTS])
+
+    @staticmethod
+    def _aspect_orb_table(orb_tolerance: float) -> Tuple[List[AspectType], np.ndarray, np.ndarray]:
+        """Aspect types with their exact angles and effective orbs, in AspectType order"""
+        aspect_types = list(AspectType)
+        angles = np.array([aspect.value[1] for aspect in aspect_types], dtype=float)
+        orbs = np.minimum(orb_tolerance, np.array([aspect.value[2] for aspect in aspect_types], dtype=float))
+        return aspect_types, angles, orbs
+
     def calculate_aspects(self, natal_chart: NatalChart, orb_tolerance: float = 8.0) -> List[Aspect]:
         """Calculate all major aspects in the natal chart"""
+        longitudes = self._chart_longitudes(natal_chart)
+        aspect_types, angles, orbs = self._aspect_orb_table(orb_tolerance)
+        hit, aspect_index, orb, separation = get_ephemeris_engine().find_aspects(longitudes, longitudes, angles, orbs)
+
         aspects = []
-        planets = [
-            ("Sun", natal_chart.sun.longitude),
-            ("Moon", natal_chart.moon.longitude),
-            ("Mercury", natal_chart.mercury.longitude),
-            ("Venus", natal_chart.venus.longitude),
-            ("Mars", natal_chart.mars.longitude),
-            ("Jupiter", natal_chart.jupiter.longitude),
-            ("Saturn", natal_chart.saturn.longitude),
-            ("Uranus", natal_chart.uranus.longitude),
-            ("Neptune", natal_chart.neptune.longitude),
-            ("Pluto", natal_chart.pluto.longitude),
-            ("Ascendant", natal_chart.ascendant.longitude),
-            ("Midheaven", natal_chart.midheaven.longitude)
-        ]
-        
-        for i, (planet1, long1) in enumerate(planets):
-            for j, (planet2, long2) in enumerate(planets[i+1:], i+1):
-                aspect = self._calculate_aspect_between_planets(planet1, long1, planet2, long2, orb_tolerance)
-                if aspect:
-                    aspects.append(aspect)
-        
+        for i, j in zip(*np.nonzero(np.triu(hit, k=1))):
+            planet1, planet2 = self.CHART_POINTS[i], self.CHART_POINTS[j]
+            aspect_type = aspect_types[aspect_index[i, j]]
+            aspects.append(Aspect(
+                planet1=planet1,
+                planet2=planet2,
+                aspect_type=aspect_type,
+                orb=float(orb[i, j]),
+                exact_angle=float(separation[i, j]),
+                applying=bool((longitudes[j] - longitudes[i]) % 360 < 180),
+                interpretation=self._get_aspect_interpretation(planet1, planet2, aspect_type)
+            ))
         return aspects
 
-    def _calculate_aspect_between_planets(self, planet1: str, long1: float, planet2: str, long2: float, orb_tolerance: float) -> Optional[Aspect]:
-        """Calculate aspect between two planets"""
-        diff = abs(long1 - long2) % 360
-        diff = min(diff, 360 - diff)  # Get smallest angle
-        
-        for aspect_type in AspectType:
-            target_angle = aspect_type.value[1]
-            orb = abs(diff - target_angle)
-            
-            if orb <= min(orb_tolerance, aspect_type.value[2]):
-                applying = (long2 - long1) % 360 < 180
-                interpretation = self._get_aspect_interpretation(planet1, planet2, aspect_type)
-                return Aspect(
-                    planet1=planet1,
-                    planet2=planet2,
-                    aspect_type=aspect_type,
-                    orb=orb,
-                    exact_angle=diff,
-                    applying=applying,
-                    interpretation=interpretation
-                )
-        
-        return None
-
     def _get_aspect_interpretation(self, planet1: str, planet2: str, aspect_type: AspectType) -> str:
         """Get interpretation for planetary aspect"""
         interpretations = {
@@ -1097,80 +1123,71 @@ Keep the tone mystical but accessible, and limit to 300 words."""
         interpretation: str
         peak_influence: Tuple[datetime.datetime, datetime.datetime]  # (start, end)
 
+    TRANSIT_PLANETS = ("Jupiter", "Saturn", "Uranus", "Neptune", "Pluto")
+    TRANSIT_ORB = 3.0
+
     def calculate_transits(self, natal_chart: NatalChart, date: datetime.datetime = None, days_ahead: int = 30) -> List['OccultOracleEngine.TransitData']:
-        """Calculate upcoming transits for the next specified days"""
+        """Calculate transits active over the next specified days.
+
+        Slow-planet positions are sampled daily in one ephemeris pass; each
+        (transit, natal point, aspect) is reported once, dated to the exact
+        moment the aspect perfects around the sample with the tightest orb
+        (the sample itself when it does not perfect, e.g. near a station).
+        """
         if date is None:
             date = datetime.datetime.now()
-        
+
+        engine = get_ephemeris_engine()
+        sample_dates = [date + datetime.timedelta(days=day) for day in range(max(days_ahead, 0) + 1)]
+        transit_longitudes = engine.longitudes(sample_dates, self.TRANSIT_PLANETS)   # (days, transit planets)
+        natal_longitudes = self._chart_longitudes(natal_chart)                       # (natal points,)
+
+        aspect_types, angles, orbs = self._aspect_orb_table(self.TRANSIT_ORB)
+        hit, aspect_index, orb, _ = engine.find_aspects(transit_longitudes, natal_longitudes, angles, orbs)
+
+        # Tightest sample per (transit planet, natal point, aspect)
+        tightest: Dict[Tuple[int, int, int], Tuple[float, int]] = {}
+        for day, t, n in zip(*np.nonzero(hit)):
+            key = (t, n, int(aspect_index[day, t, n]))
+            if key not in tightest or orb[day, t, n] < tightest[key][0]:
+                tightest[key] = (float(orb[day, t, n]), day)
+
         transits = []
-        natal_planets = {
-            "Sun": natal_chart.sun.longitude,
-            "Moon": natal_chart.moon.longitude,
-            "Mercury": natal_chart.mercury.longitude,
-            "Venus": natal_chart.venus.longitude,
-            "Mars": natal_chart.mars.longitude,
-            "Jupiter": natal_chart.jupiter.longitude,
-            "Saturn": natal_chart.saturn.longitude,
-            "Uranus": natal_chart.uranus.longitude,
-            "Neptune": natal_chart.neptune.longitude,
-            "Pluto": natal_chart.pluto.longitude,
-            "Ascendant": natal_chart.ascendant.longitude,
-            "Midheaven": natal_chart.midheaven.longitude
-        }
-        
-        # Check transits for slow-moving planets (most significant)
-        transit_planets = ["Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
-        
-        for transit_planet in transit_planets:
-            try:
-                observer = ephem.Observer()
-                observer.date = date
-                
-                # Calculate current position of transiting planet
-                if transit_planet == "Jupiter":
-                    body = ephem.Jupiter(observer)
-                elif transit_planet == "Saturn":
-                    body = ephem.Saturn(observer)
-                elif transit_planet == "Uranus":
-                    body = ephem.Uranus(observer)
-                elif transit_planet == "Neptune":
-                    body = ephem.Neptune(observer)
-                elif transit_planet == "Pluto":
-                    body = ephem.Pluto(observer)
-                else:
-                    continue
-                
-                transit_longitude = math.degrees(float(body.hlong)) % 360
-                
-                # Check aspects to natal planets
-                for natal_planet, natal_longitude in natal_planets.items():
-                    aspect = self._calculate_aspect_between_planets(
-                        transit_planet, transit_longitude, natal_planet, natal_longitude, 3.0
-                    )
-                    
-                    if aspect:
-                        interpretation = self._get_transit_interpretation(transit_planet, natal_planet, aspect.aspect_type)
-                        
-                        # Calculate peak influence period
-                        start_influence = date - datetime.timedelta(days=self._get_transit_orb_days(transit_planet))
-                        end_influence = date + datetime.timedelta(days=self._get_transit_orb_days(transit_planet))
-                        
-                        transit_data = self.TransitData(
-                            transiting_planet=transit_planet,
-                            natal_planet=natal_planet,
-                            aspect_type=aspect.aspect_type,
-                            exact_date=date,  # Simplified - would calculate exact date
-                            orb=aspect.orb,
-                            interpretation=interpretation,
-                            peak_influence=(start_influence, end_influence)
-                        )
-                        transits.append(transit_data)
-                        
-            except Exception as e:
-                self.logger.error(f"Error calculating transits for {transit_planet}: {e}")
-        
+        for (t, n, a), (best_orb, day) in tightest.items():
+            transit_planet = self.TRANSIT_PLANETS[t]
+            natal_planet = self.CHART_POINTS[n]
+            aspect_type = aspect_types[a]
+            exact_date = self._exact_transit_date(
+                transit_planet, float(natal_longitudes[n]), float(angles[a]),
+                float(transit_longitudes[day, t]), sample_dates[day]
+            )
+            orb_days = datetime.timedelta(days=self._get_transit_orb_days(transit_planet))
+            transits.append(self.TransitData(
+                transiting_planet=transit_planet,
+                natal_planet=natal_planet,
+                aspect_type=aspect_type,
+                exact_date=exact_date,
+                orb=best_orb,
+                interpretation=self._get_transit_interpretation(transit_planet, natal_planet, aspect_type),
+                peak_influence=(exact_date - orb_days, exact_date + orb_days)
+            ))
+
+        transits.sort(key=lambda transit: (transit.exact_date, transit.orb))
         return transits
 
+    def _exact_transit_date(self, transit_planet: str, natal_longitude: float, aspect_angle: float,
+                            sampled_longitude: float, sample_date: datetime.datetime) -> datetime.datetime:
+        """Root-find the moment the transit aspect is exact within a day of its tightest sample"""
+        side = 1 if (sampled_longitude - natal_longitude) % 360 < 180 else -1
+        target = natal_longitude + side * aspect_angle
+        window = datetime.timedelta(days=1)
+        try:
+            exact = get_event_solver().solve_longitude(transit_planet, target, sample_date - window, sample_date + window)
+        except Exception as e:
+            self.logger.error(f"Exact transit solve failed for {transit_planet}: {e}")
+            exact = None
+        return exact or sample_date
+
     def _get_transit_interpretation(self, transit_planet: str, natal_planet: str, aspect: AspectType) -> str:
         """Get interpretation for transit aspect"""
         interpretations = {
@@ -1441,17 +1458,24 @@ Keep the tone mystical but accessible, and limit to 300 words."""
         image: str
         changing_lines: List[int]
 
-    def cast_i_ching(self, question: str = "") -> 'OccultOracleEngine.Hexagram':
+    def cast_i_ching(self, question: str = "", seed: Optional[str] = None) -> 'OccultOracleEngine.Hexagram':
         """Cast I Ching hexagram using traditional method"""
+        rng = rng_for(seed, question) if seed else rng_for()
         # Simulate coin toss method (3 coins, 6 times)
+        totals = [sum(rng.choice([2, 3]) for _ in range(3)) for _ in range(6)]  # 2=tails, 3=heads
+        return self._hexagram_from_totals(totals)
+
+    def cast_i_ching_many(self, count: int, seed: Optional[str] = None) -> List['OccultOracleEngine.Hexagram']:
+        """Cast ``count`` independent hexagrams with one vectorized coin toss"""
+        generator = generator_for(seed, 'i_ching') if seed else generator_for()
+        return [self._hexagram_from_totals(totals) for totals in toss_hexagram_lines(count, generator).tolist()]
+
+    def _hexagram_from_totals(self, totals: Sequence[int]) -> 'OccultOracleEngine.Hexagram':
+        """Hexagram for six three-coin totals, bottom line first"""
         lines = []
         changing_lines = []
         
-        for i in range(6):
-            # Three coin tosses
-            tosses = [random.choice([2, 3]) for _ in range(3)]  # 2=tails, 3=heads
-            total = sum(tosses)
-            
+        for i, total in enumerate(totals):
             if total == 6:  # Old Yin (changing to Yang)
                 lines.append(0)
                 changing_lines.append(i + 1)
@@ -1527,87 +1551,67 @@ Keep the tone mystical but accessible, and limit to 300 words."""
 
     # ========== PERFORMANCE & CACHING ==========
     
-    def _get_cache_key(self, prefix: str, *args) -> str:
-        """Generate cache key for expensive calculations"""
-        import hashlib
-        key_data = f"{prefix}:" + ":".join(str(arg) for arg in args)
-        return hashlib.md5(key_data.encode()).hexdigest()
+    NATAL_CHART_CACHE_SIZE = 4096
+    NATAL_CHART_CACHE_TTL = 3600
+    # The tarot stage waits on the AI interpretation; give it longer than the default
+    AI_STAGE_TIMEOUT = 30.0
+    # Format version, 12 chart point longitudes, house count; house cusps follow
+    _CHART_HEADER = struct.Struct("<B12dB")
+    _CHART_FORMAT_VERSION = 1
+
+    def _natal_chart_cache_key(self, birth_date: datetime.datetime, birth_place: str) -> str:
+        """Canonical key: UTC birth instant to the minute plus the resolved coordinates.
+
+        Equivalent inputs (the same instant in another timezone, a differently
+        cased or padded city name) share one entry.
+        """
+        if birth_date.tzinfo is not None:
+            birth_date = birth_date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        minute = (birth_date + datetime.timedelta(seconds=30)).replace(second=0, microsecond=0)
+        latitude, longitude = self._resolve_natal_coords(birth_place)
+        return f"{minute:%Y%m%dT%H%M}:{latitude:.4f}:{longitude:.4f}"
 
     def calculate_natal_chart_cached(self, birth_date: datetime.datetime, birth_place: str, 
-                                   cache_ttl: int = 3600) -> NatalChart:
+                                   cache_ttl: int = NATAL_CHART_CACHE_TTL) -> NatalChart:
         """Calculate natal chart with caching support"""
-        if hasattr(self, '_cache'):
-            cache_key = self._get_cache_key("natal_chart", birth_date.isoformat(), birth_place)
-            
-            # Try to get from cache first
-            cached_result = self._cache.get(cache_key)
-            if cached_result:
-                self.logger.debug(f"Retrieved natal chart from cache: {cache_key}")
-                return self._deserialize_natal_chart(cached_result)
+        cache_key = self._natal_chart_cache_key(birth_date, birth_place)
+        
+        # Try to get from cache first
+        cached_chart = self._chart_cache.get(cache_key)
+        if cached_chart is not None:
+            self.logger.debug(f"Retrieved natal chart from cache: {cache_key}")
+            return cached_chart
         
         # Calculate fresh chart
         chart = self.calculate_natal_chart(birth_date, birth_place)
         
         # Cache the result
-        if hasattr(self, '_cache'):
-            try:
-                serialized_chart = self._serialize_natal_chart(chart)
-                self._cache.set(cache_key, serialized_chart, ttl=cache_ttl)
-                self.logger.debug(f"Cached natal chart: {cache_key}")
-            except Exception as e:
-                self.logger.warning(f"Failed to cache natal chart: {e}")
+        try:
+            self._chart_cache.set(cache_key, chart, ttl=cache_ttl)
+            self.logger.debug(f"Cached natal chart: {cache_key}")
+        except Exception as e:
+            self.logger.warning(f"Failed to cache natal chart: {e}")
         
         return chart
 
-    def _serialize_natal_chart(self, chart: NatalChart) -> Dict:
-        """Serialize natal chart for caching"""
-        return {
-            "sun": asdict(chart.sun),
-            "moon": asdict(chart.moon),
-            "mercury": asdict(chart.mercury),
-            "venus": asdict(chart.venus),
-            "mars": asdict(chart.mars),
-            "jupiter": asdict(chart.jupiter),
-            "saturn": asdict(chart.saturn),
-            "uranus": asdict(chart.uranus),
-            "neptune": asdict(chart.neptune),
-            "pluto": asdict(chart.pluto),
-            "ascendant": asdict(chart.ascendant),
-            "midheaven": asdict(chart.midheaven),
-            "houses": chart.houses
-        }
-
-    def _deserialize_natal_chart(self, data: Dict) -> NatalChart:
-        """Deserialize cached natal chart"""
-        def dict_to_celestial_body(body_dict: Dict) -> CelestialBody:
-            # Reconstruct ZodiacSign enum from stored data
-            zodiac_sign = next((sign for sign in ZodiacSign 
-                              if sign.value[0] == body_dict['zodiac_sign']['value'][0]), 
-                             ZodiacSign.ARIES)
-            return CelestialBody(
-                name=body_dict['name'],
-                longitude=body_dict['longitude'],
-                latitude=body_dict['latitude'],
-                zodiac_sign=zodiac_sign,
-                degree=body_dict['degree'],
-                house=body_dict.get('house')
-            )
-
-        return NatalChart(
-            sun=dict_to_celestial_body(data['sun']),
-            moon=dict_to_celestial_body(data['moon']),
-            mercury=dict_to_celestial_body(data['mercury']),
-            venus=dict_to_celestial_body(data['venus']),
-            mars=dict_to_celestial_body(data['mars']),
-            jupiter=dict_to_celestial_body(data['jupiter']),
-            saturn=dict_to_celestial_body(data['saturn']),
-            uranus=dict_to_celestial_body(data['uranus']),
-            neptune=dict_to_celestial_body(data['neptune']),
-            pluto=dict_to_celestial_body(data['pluto']),
-            ascendant=dict_to_celestial_body(data['ascendant']),
-            midheaven=dict_to_celestial_body(data['midheaven']),
-            houses=data['houses']
-        )
+    def _serialize_natal_chart(self, chart: NatalChart) -> bytes:
+        """Pack a natal chart into a compact binary record for caching.
+
+        Only longitudes and house cusps are stored; signs and degrees are
+        derived again on load.
+        """
+        houses = [float(cusp) for cusp in chart.houses]
+        return self._CHART_HEADER.pack(self._CHART_FORMAT_VERSION, *self._chart_longitudes(chart), len(houses)) \
+            + struct.pack(f"<{len(houses)}d", *houses)
+
+    def _deserialize_natal_chart(self, data: bytes) -> NatalChart:
+        """Unpack a natal chart cached by _serialize_natal_chart"""
+        version, *values = self._CHART_HEADER.unpack_from(data)
+        if version != self._CHART_FORMAT_VERSION:
+            raise ValueError(f"Unsupported natal chart cache format {version}")
+        point_longitudes, house_count = values[:-1], values[-1]
+        houses = list(struct.unpack_from(f"<{house_count}d", data, self._CHART_HEADER.size))
+        return self._chart_from_longitudes(point_longitudes, houses)
 
     # ========== COMPLETE ORACLE SESSION ==========
     
@@ -1624,93 +1628,113 @@ Keep the tone mystical but accessible, and limit to 300 words."""
         i_ching_hexagram: Optional['OccultOracleEngine.Hexagram']
         session_summary: str
         recommendations: List[str]
+        stage_errors: Dict[str, str] = field(default_factory=dict)
+        stage_timings: Dict[str, float] = field(default_factory=dict)
 
     def create_complete_oracle_session(self, user_id: str, name: str, birth_date: datetime.datetime, 
                                      birth_place: str, question: str = "") -> 'OccultOracleEngine.OracleSession':
-        """Create comprehensive oracle session with all divination methods"""
+        """Create comprehensive oracle session with all divination methods
+
+        Independent stages run concurrently; a failed stage (and whatever
+        depends on it) is left empty and reported in ``stage_errors``.
+        """
+        session = None
+        for _, session in self.iter_complete_oracle_session(user_id, name, birth_date, birth_place, question):
+            pass
+        return session
+
+    def iter_complete_oracle_session(self, user_id: str, name: str, birth_date: datetime.datetime,
+                                     birth_place: str, question: str = "") -> Iterator[Tuple[str, Any]]:
+        """Yield ``(stage, result)`` as each session stage finishes, then ``("session", OracleSession)``
+
+        Failed stages yield ``None``; their errors end up on the session.
+        The tarot cards are drawn as their own stage so they can be shown
+        while the AI interpretation (stage ``tarot``) is still running.
+        """
         import uuid
         
         session_id = str(uuid.uuid4())
-        
-        try:
-            # Calculate natal chart
-            self.logger.info(f"Creating oracle session for user {user_id}")
-            natal_chart = self.calculate_natal_chart_cached(birth_date, birth_place)
-            
-            # Calculate current transits
-            current_transits = self.calculate_transits(natal_chart, days_ahead=60)
-            
-            # Get moon data
-            moon_data = self.calculate_moon_phase()
-            
-            # Perform enhanced tarot reading
-            tarot_reading = self.enhanced_tarot_reading(
-                spread_type=TarotSpread.CELTIC_CROSS,
-                question=question,
-                user_id=user_id
-            )
-            
-            # Calculate advanced numerology
-            numerology_profile = self.calculate_advanced_numerology(name, birth_date)
-            
-            # Cast I Ching
-            i_ching_hexagram = self.cast_i_ching(question)
-            
-            # Generate session summary
-            session_summary = self._generate_session_summary(
-                natal_chart, current_transits, moon_data, tarot_reading, 
+        self.logger.info(f"Creating oracle session for user {user_id}")
+        
+        graph = StageGraph([
+            Stage("natal_chart", lambda: self.calculate_natal_chart_cached(birth_date, birth_place)),
+            Stage("transits", lambda natal_chart: self.calculate_transits(natal_chart, days_ahead=60),
+                  deps=("natal_chart",)),
+            Stage("moon", self.calculate_moon_phase),
+            Stage("tarot_cards", lambda: self.draw_spread(TarotSpread.CELTIC_CROSS)),
+            Stage("tarot", lambda tarot_cards, moon: self.interpret_spread(
+                TarotSpread.CELTIC_CROSS, tarot_cards, question, user_id, moon_data=moon
+            ), deps=("tarot_cards", "moon"), timeout=self.AI_STAGE_TIMEOUT),
+            Stage("numerology", lambda: self.calculate_advanced_numerology(name, birth_date)),
+            Stage("i_ching", lambda: self.cast_i_ching(question)),
+        ])
+        run = StageRun()
+        for stage in get_stage_executor().stream(graph, run):
+            yield stage, run.get(stage)
+        self._stage_timings.record(run, "oracle_session")
+        if len(run.errors) == len(graph.stages):
+            raise Exception(f"Oracle session creation failed: {run.errors}")
+        
+        natal_chart = run.get("natal_chart")
+        current_transits = run.get("transits", [])
+        moon_data = run.get("moon")
+        tarot_reading = run.get("tarot")
+        numerology_profile = run.get("numerology", {})
+        i_ching_hexagram = run.get("i_ching")
+        
+        session = self.OracleSession(
+            session_id=session_id,
+            user_id=user_id,
+            timestamp=datetime.datetime.now(),
+            natal_chart=natal_chart,
+            current_transits=current_transits,
+            moon_data=moon_data,
+            tarot_reading=tarot_reading,
+            numerology_profile=numerology_profile,
+            i_ching_hexagram=i_ching_hexagram,
+            session_summary=self._generate_session_summary(
+                natal_chart, current_transits, moon_data, tarot_reading,
                 numerology_profile, i_ching_hexagram, question
-            )
-            
-            # Generate personalized recommendations
-            recommendations = self._generate_oracle_recommendations(
+            ),
+            recommendations=self._generate_oracle_recommendations(
                 natal_chart, current_transits, moon_data, numerology_profile
-            )
-            
-            session = self.OracleSession(
-                session_id=session_id,
-                user_id=user_id,
-                timestamp=datetime.datetime.now(),
-                natal_chart=natal_chart,
-                current_transits=current_transits,
-                moon_data=moon_data,
-                tarot_reading=tarot_reading,
-                numerology_profile=numerology_profile,
-                i_ching_hexagram=i_ching_hexagram,
-                session_summary=session_summary,
-                recommendations=recommendations
-            )
-            
-            # Save complete session to database
-            if self.cosmos_db:
-                self._save_oracle_session(session)
-            
-            self.logger.info(f"Oracle session {session_id} created successfully")
-            return session
-            
-        except Exception as e:
-            self.logger.error(f"Failed to create oracle session: {e}")
-            raise Exception(f"Oracle session creation failed: {str(e)}")
+            ),
+            stage_errors=run.errors,
+            stage_timings={stage: round(ms, 2) for stage, ms in run.timings.items()}
+        )
+        
+        # Save complete session to database
+        if self.cosmos_db:
+            self._save_oracle_session(session)
+        
+        if run.errors:
+            self.logger.warning(f"Oracle session {session_id} created without stages: {sorted(run.errors)}")
+        else:
+            self.logger.info(f"Oracle session {session_id} created successfully in {run.wall_ms:.0f}ms")
+        yield "session", session
 
-    def _generate_session_summary(self, natal_chart: NatalChart, transits: List, moon_data: MoonData,
-                                tarot_reading: TarotReading, numerology: Dict, hexagram, question: str) -> str:
-        """Generate comprehensive session summary"""
+    def _generate_session_summary(self, natal_chart: Optional[NatalChart], transits: List, moon_data: Optional[MoonData],
+                                tarot_reading: Optional[TarotReading], numerology: Dict, hexagram, question: str) -> str:
+        """Generate comprehensive session summary from whichever stages completed"""
         summary_parts = []
         
         # Astrological overview
-        sun_sign = natal_chart.sun.zodiac_sign.value[0]
-        moon_sign = natal_chart.moon.zodiac_sign.value[0]
-        rising_sign = natal_chart.ascendant.zodiac_sign.value[0]
-        
-        summary_parts.append(f"Your core identity as {sun_sign} Sun, {moon_sign} Moon, {rising_sign} Rising creates a unique blend of energies.")
+        if natal_chart:
+            sun_sign = natal_chart.sun.zodiac_sign.value[0]
+            moon_sign = natal_chart.moon.zodiac_sign.value[0]
+            rising_sign = natal_chart.ascendant.zodiac_sign.value[0]
+            
+            summary_parts.append(f"Your core identity as {sun_sign} Sun, {moon_sign} Moon, {rising_sign} Rising creates a unique blend of energies.")
         
         # Current lunar influence
-        summary_parts.append(f"With the {moon_data.phase.value[0]} in {moon_data.zodiac_sign.value[0]}, {self._get_lunar_influence_for_reading(moon_data)}")
+        if moon_data:
+            summary_parts.append(f"With the {moon_data.phase.value[0]} in {moon_data.zodiac_sign.value[0]}, {self._get_lunar_influence_for_reading(moon_data)}")
         
         # Numerology insight
-        life_path = numerology.get('life_path', 1)
-        personal_year = numerology.get('personal_year', 1)
-        summary_parts.append(f"Your Life Path {life_path} in Personal Year {personal_year} indicates {self._get_personal_year_meaning(personal_year)}")
+        if numerology:
+            life_path = numerology.get('life_path', 1)
+            personal_year = numerology.get('personal_year', 1)
+            summary_parts.append(f"Your Life Path {life_path} in Personal Year {personal_year} indicates {self._get_personal_year_meaning(personal_year)}")
         
         # Major transits
         if transits:
@@ -1718,24 +1742,27 @@ Keep the tone mystical but accessible, and limit to 300 words."""
             summary_parts.append(f"Current major influence: {major_transit.interpretation}")
         
         # Tarot essence
-        summary_parts.append(f"The tarot reveals: {tarot_reading.overall_energy}")
+        if tarot_reading:
+            summary_parts.append(f"The tarot reveals: {tarot_reading.overall_energy}")
         
         # I Ching wisdom
-        summary_parts.append(f"The I Ching counsels through {hexagram.name}: {hexagram.meaning}")
+        if hexagram:
+            summary_parts.append(f"The I Ching counsels through {hexagram.name}: {hexagram.meaning}")
         
         return " ".join(summary_parts)
 
-    def _generate_oracle_recommendations(self, natal_chart: NatalChart, transits: List, 
-                                       moon_data: MoonData, numerology: Dict) -> List[str]:
+    def _generate_oracle_recommendations(self, natal_chart: Optional[NatalChart], transits: List, 
+                                       moon_data: Optional[MoonData], numerology: Dict) -> List[str]:
         """Generate personalized recommendations based on all oracle data"""
         recommendations = []
         
         # Moon phase recommendations
-        lunar_activities = self._get_lunar_activities(moon_data.phase)
-        recommendations.extend([f"🌙 {activity}" for activity in lunar_activities[:2]])
+        if moon_data:
+            lunar_activities = self._get_lunar_activities(moon_data.phase)
+            recommendations.extend([f"🌙 {activity}" for activity in lunar_activities[:2]])
         
         # Numerology-based recommendations
-        personal_year = numerology.get('personal_year', 1)
+        personal_year = numerology.get('personal_year', 1) if numerology else None
         if personal_year == 1:
             recommendations.append("🔢 Focus on new beginnings and leadership opportunities")
         elif personal_year == 7:
@@ -1752,11 +1779,12 @@ Keep the tone mystical but accessible, and limit to 300 words."""
                     recommendations.append("⭐ Focus on discipline and long-term planning")
         
         # Astrological element balance
-        sun_element = self._get_element_for_sign(natal_chart.sun.zodiac_sign)
-        moon_element = self._get_element_for_sign(natal_chart.moon.zodiac_sign)
-        
-        if sun_element == moon_element:
-            recommendations.append(f"🔥 Your {sun_element} nature is strong - use this elemental power wisely")
+        if natal_chart:
+            sun_element = self._get_element_for_sign(natal_chart.sun.zodiac_sign)
+            moon_element = self._get_element_for_sign(natal_chart.moon.zodiac_sign)
+            
+            if sun_element == moon_element:
+                recommendations.append(f"🔥 Your {sun_element} nature is strong - use this elemental power wisely")
         
         return recommendations
 
@@ -1782,8 +1810,9 @@ Keep the tone mystical but accessible, and limit to 300 words."""
                 "tarot_reading_id": session.tarot_reading.id if session.tarot_reading else None,
                 "i_ching_hexagram": asdict(session.i_ching_hexagram) if session.i_ching_hexagram else None,
                 "numerology_profile": session.numerology_profile,
-                "moon_phase": session.moon_data.phase.value[0],
-                "transit_count": len(session.current_transits)
+                "moon_phase": session.moon_data.phase.value[0] if session.moon_data else None,
+                "transit_count": len(session.current_transits),
+                "failed_stages": sorted(session.stage_errors)
             }
             
             container_name = 'oracle_sessions'
@@ -1799,56 +1828,10 @@ Keep the tone mystical but accessible, and limit to 300 words."""
     # ========== GEOCODING INTEGRATION ==========
     
     def get_coordinates_from_location(self, location: str) -> Tuple[float, float]:
-        """Get coordinates from location name using geocoding service"""
-        # Enhanced location database
-        location_coords = {
-            # Major US Cities
-            'New York': (40.7128, -74.0060), 'Los Angeles': (34.0522, -118.2437),
-            'Chicago': (41.8781, -87.6298), 'Houston': (29.7604, -95.3698),
-            'Phoenix': (33.4484, -112.0740), 'Philadelphia': (39.9526, -75.1652),
-            'San Antonio': (29.4241, -98.4936), 'San Diego': (32.7157, -117.1611),
-            'Dallas': (32.7767, -96.7970), 'San Jose': (37.3382, -121.8863),
-            
-            # International Cities
-            'London': (51.5074, -0.1278), 'Paris': (48.8566, 2.3522),
-            'Tokyo': (35.6762, 139.6503), 'Sydney': (-33.8688, 151.2093),
-            'Berlin': (52.5200, 13.4050), 'Rome': (41.9028, 12.4964),
-            'Madrid': (40.4168, -3.7038), 'Amsterdam': (52.3676, 4.9041),
-            'Moscow': (55.7558, 37.6176), 'Beijing': (39.9042, 116.4074),
-            'Mumbai': (19.0760, 72.8777), 'Cairo': (30.0444, 31.2357),
-            'Dubai': (25.2048, 55.2708), 'Singapore': (1.3521, 103.8198),
-            
-            # More US Cities
-            'Miami': (25.7617, -80.1918), 'Seattle': (47.6062, -122.3321),
-            'Denver': (39.7392, -104.9903), 'Boston': (42.3601, -71.0589),
-            'Atlanta': (33.7490, -84.3880), 'Las Vegas': (36.1699, -115.1398),
-            'Portland': (45.5152, -122.6784), 'Nashville': (36.1627, -86.7816),
-            'Austin': (30.2672, -97.7431), 'San Francisco': (37.7749, -122.4194),
-            
-            # Canadian Cities
-            'Toronto': (43.6532, -79.3832), 'Vancouver': (49.2827, -123.1207),
-            'Montreal': (45.5017, -73.5673), 'Calgary': (51.0447, -114.0719),
-            
-            # Australian Cities
-            'Melbourne': (-37.8136, 144.9631), 'Brisbane': (-27.4698, 153.0251),
-            'Perth': (-31.9505, 115.8605), 'Adelaide': (-34.9285, 138.6007)
-        }
-        
-        # Try exact match first
-        coords = location_coords.get(location)
-        if coords:
-            return coords
-        
-        # Try case-insensitive match
-        for city, coords in location_coords.items():
-            if city.lower() == location.lower():
-                return coords
-        
-        # Try partial match
-        for city, coords in location_coords.items():
-            if location.lower() in city.lower() or city.lower() in location.lower():
-                self.logger.info(f"Partial match found: {location} -> {city}")
-                return coords
+        """Get coordinates from location name using the local gazetteer"""
+        place = get_gazetteer().resolve(location)
+        if place:
+            return place.coordinates
         
         # Default to Greenwich, UK for unknown locations
         self.logger.warning(f"Location '{location}' not found, using Greenwich coordinates")
@@ -1940,9 +1923,13 @@ Keep the tone mystical but accessible, and limit to 300 words."""
                 "Tarot", "Astrology", "Numerology", "I Ching", 
                 "Moon Phases", "Transits", "Aspects"
             ]),
-            "cache_enabled": hasattr(self, '_cache'),
+            "cache_enabled": True,
+            "natal_chart_cache": self._chart_cache.stats(),
+            "stage_timings": self._stage_timings.snapshot(),
+            "stage_pool": get_stage_executor().get_stats(),
             "database_enabled": self.cosmos_db is not None,
             "ai_enabled": self.ai_client is not None,
+            "ai_gateway": self._ai_gateway.get_stats() if self._ai_gateway else None,
             "version": "3.0.0",
             "engine_uptime": "calculating...",
             "last_health_check": datetime.datetime.now().isoformat()
@@ -1960,7 +1947,7 @@ Keep the tone mystical but accessible, and limit to 300 words."""
             "house_systems": list(self.house_systems.keys()),
             "ai_enabled": self.ai_client is not None,
             "database_enabled": self.cosmos_db is not None,
-            "cache_enabled": hasattr(self, '_cache'),
+            "cache_enabled": True,
             "supported_locations": 50,  # Number of cities in geocoding database
             "features": [
                 "Advanced Tarot Spreads",
@@ -2021,6 +2008,8 @@ class EnhancedLunarEngine:
             ("Revati", "Wealthy", 346.40, 360.00, "Mercury", "Wealth, prosperity, guidance")
         ]
 
+        self._mansion_starts = [mansion[2] for mansion in self.lunar_mansions]
+
         # Eclipse prediction data
         self.eclipse_saros_cycles = {}
 
@@ -2029,17 +2018,13 @@ class EnhancedLunarEngine:
         if date is None:
             date = datetime.datetime.now()
 
-        observer = ephem.Observer()
-        observer.date = date
-
-        moon = ephem.Moon(observer)
-        sun = ephem.Sun(observer)
+        moon_longitude, sun_longitude = self.oracle._lunar_longitudes([date], ("Moon", "Sun"))[0]
 
         # Enhanced illumination with atmospheric correction
-        illumination = self._calculate_precision_illumination(moon, sun)
+        illumination = self._calculate_precision_illumination(moon_longitude, sun_longitude)
 
         # Lunar mansion calculation
-        mansion = self._calculate_lunar_mansion(moon.hlong)
+        mansion = self._calculate_lunar_mansion(moon_longitude)
 
         # Void-of-course with exact aspect timing
         void_data = self._calculate_void_of_course_with_aspects(date)
@@ -2056,73 +2041,63 @@ class EnhancedLunarEngine:
             "next_aspect": void_data["next_aspect"],
             "eclipse": eclipse_data,
             "lunar_day": self._calculate_lunar_day(date),
-            "element_balance": self._calculate_lunar_element_balance(moon.hlong)
+            "element_balance": self._calculate_lunar_element_balance(moon_longitude)
         }
 
-    def _calculate_precision_illumination(self, moon: ephem.Moon, sun: ephem.Sun) -> float:
-        """Calculate precise lunar illumination with corrections"""
+    def _calculate_precision_illumination(self, moon_longitude: float, sun_longitude: float) -> float:
+        """Calculate precise lunar illumination from the Sun-Moon elongation"""
         try:
-            # Get the moon's illuminated fraction from PyEphem
-            illuminated_fraction = moon.moon_phase
-
-            # Apply small corrections for more precision
-            # In a full implementation, this would include atmospheric effects, etc.
-            correction_factor = 1.0 + (moon.hlong - sun.hlong) * 0.001  # Simplified correction
-
-            precise_illumination = illuminated_fraction * correction_factor
-            return max(0.0, min(100.0, precise_illumination * 100))
+            elongation = math.radians(float(moon_longitude - sun_longitude) % 360)
+            illuminated_fraction = (1 - math.cos(elongation)) / 2
+            return max(0.0, min(100.0, illuminated_fraction * 100))
 
         except Exception as e:
             self.logger.error(f"Precision illumination calculation error: {e}")
             return 0.0
 
     def _calculate_lunar_mansion(self, moon_longitude: float) -> Dict:
-        """Calculate current lunar mansion (Nakshatra)"""
-        deg_long = math.degrees(float(moon_longitude)) % 360
+        """Calculate current lunar mansion (Nakshatra) from the Moon's longitude in degrees"""
+        deg_long = float(moon_longitude) % 360
 
-        for mansion in self.lunar_mansions:
-            name, symbol, start, end, ruler, meaning = mansion
-            if start <= deg_long < end:
-                return {
-                    "name": name,
-                    "symbol": symbol,
-                    "ruler": ruler,
-                    "meaning": meaning,
-                    "degree": deg_long - start,
-                    "pada": int((deg_long - start) / 3.33) + 1  # 4 padas per mansion
-                }
-        return {}
+        index = bisect.bisect_right(self._mansion_starts, deg_long) - 1
+        if index < 0:
+            return {}
+        name, symbol, start, end, ruler, meaning = self.lunar_mansions[index]
+        return {
+            "name": name,
+            "symbol": symbol,
+            "ruler": ruler,
+            "meaning": meaning,
+            "degree": deg_long - start,
+            "pada": int((deg_long - start) / 3.33) + 1  # 4 padas per mansion
+        }
+
+    VOC_ASPECT_ANGLES = (0, 60, 90, 120, 180)
+    VOC_ASPECT_ORB = 5.0
+    VOC_WINDOW_HOURS = 48
 
     def _calculate_void_of_course_with_aspects(self, date: datetime.datetime) -> Dict:
         """Calculate void-of-course moon with exact aspect timing"""
         try:
-            observer = ephem.Observer()
-            observer.date = date
-
-            moon = ephem.Moon(observer)
-            current_sign = self.oracle._get_zodiac_sign(math.degrees(float(moon.hlong)) % 360)
-
-            # Check next 48 hours for sign changes and aspects
-            future_time = date
-            aspects_found = []
-            sign_change_time = None
-
-            for hour in range(1, 49):  # Check next 48 hours
-                future_time = date + datetime.timedelta(hours=hour)
-                future_observer = ephem.Observer()
-                future_observer.date = future_time
-                future_moon = ephem.Moon(future_observer)
-                future_sign = self.oracle._get_zodiac_sign(math.degrees(float(future_moon.hlong)) % 360)
-
-                # Check for sign change
-                if future_sign != current_sign and not sign_change_time:
-                    sign_change_time = future_time
-
-                # Check for major aspects (simplified)
-                if self._moon_makes_aspect(future_observer):
-                    aspects_found.append(future_time)
-
-            is_void = sign_change_time and not aspects_found
+            # Moon and planet longitudes for every hour of the next 48 in one lookup
+            hours = [date + datetime.timedelta(hours=hour) for hour in range(self.VOC_WINDOW_HOURS + 1)]
+            longitudes = self.oracle._lunar_longitudes(hours)
+            moon = longitudes[:, 0]
+
+            # Check for sign change
+            signs = np.floor(moon / 30)
+            changed = np.nonzero(signs[1:] != signs[0])[0]
+            sign_change_time = hours[changed[0] + 1] if len(changed) else None
+            table = get_lunar_table()
+            if sign_change_time and table is not None and table.covers(date, sign_change_time):
+                # Interpolated ingress instead of the hourly step that crossed it
+                sign_change_time = table.next_ingress(date, max_hours=self.VOC_WINDOW_HOURS) or sign_change_time
+
+            # Check for major aspects to Sun..Saturn at each hour
+            aspect_hours = self._moon_aspect_hours(moon[1:], longitudes[1:, 1:]) + 1
+            aspects_found = [hours[hour] for hour in aspect_hours]
+
+            is_void = bool(sign_change_time and not aspects_found)
             next_aspect = aspects_found[0] if aspects_found else None
 
             return {
@@ -2136,46 +2111,13 @@ class EnhancedLunarEngine:
             self.logger.error(f"VOC calculation error: {e}")
             return {"is_void": False, "void_until": None, "next_aspect": None}
 
-    def _moon_makes_aspect(self, observer: ephem.Observer) -> bool:
-        """Check if moon makes major aspect to any planet (simplified)"""
-        try:
-            moon = ephem.Moon(observer)
-            moon_long = math.degrees(float(moon.hlong)) % 360
-
-            # Check aspects to major planets (simplified)
-            planets = [
-                ("Sun", ephem.Sun(observer)),
-                ("Mercury", ephem.Mercury(observer)),
-                ("Venus", ephem.Venus(observer)),
-                ("Mars", ephem.Mars(observer)),
-                ("Jupiter", ephem.Jupiter(observer)),
-                ("Saturn", ephem.Saturn(observer))
-            ]
-
-            for planet_name, planet_body in planets:
-                try:
-                    planet_long = math.degrees(float(planet_body.hlong)) % 360
-                    diff = abs(moon_long - planet_long)
-                    diff = min(diff, 360 - diff)  # Smallest angle
-
-                    # Check for major aspects (0°, 60°, 90°, 120°, 180°)
-                    if diff < 5:  # Within 5° orb
-                        return True
-                    if abs(diff - 60) < 5:
-                        return True
-                    if abs(diff - 90) < 5:
-                        return True
-                    if abs(diff - 120) < 5:
-                        return True
-                    if abs(diff - 180) < 5:
-                        return True
-                except:
-                    continue
-
-            return False
-
-        except Exception:
-            return False
+    def _moon_aspect_hours(self, moon_longitudes: np.ndarray, planet_longitudes: np.ndarray) -> np.ndarray:
+        """Indices of the samples where the Moon makes a major aspect to any planet"""
+        hit, _, _, _ = get_ephemeris_engine().find_aspects(
+            moon_longitudes[:, None], planet_longitudes,
+            self.VOC_ASPECT_ANGLES, [self.VOC_ASPECT_ORB] * len(self.VOC_ASPECT_ANGLES)
+        )
+        return np.nonzero(hit.any(axis=(-2, -1)))[0]
 
     def _detect_eclipse_events(self, date: datetime.datetime) -> Dict:
         """Detect upcoming eclipse events (simplified)"""
@@ -2824,6 +2766,8 @@ class EnhancedOccultOracleEngine(OccultOracleEngine):
 
 
 # ========== USAGE EXAMPLES ==========
+
+def example_usage():
     """Example usage of the complete Oracle Engine"""
     
     # Initialize with database and AI client
@@ -2879,54 +2823,33 @@ class MultiZodiacCalculator:
         self.logger = logging.getLogger(__name__)
         
         # Chinese zodiac animals (12-year cycle starting 1924)
-        self.chinese_animals = [
-            "Rat", "Ox", "Tiger", "Rabbit", "Dragon", "Snake",
-            "Horse", "Goat", "Monkey", "Rooster", "Dog", "Pig"
-        ]
+        self.chinese_animals = list(CHINESE_ANIMALS)
         
         # Chinese elements (5-element cycle, 2 years each)
-        self.chinese_elements = ["Wood", "Fire", "Earth", "Metal", "Water"]
+        self.chinese_elements = list(CHINESE_ELEMENTS)
         
         # Vedic Rashis (12 signs)
-        self.vedic_rashis = [
-            "Mesha", "Vrishabha", "Mithuna", "Karka", "Simha", "Kanya",
-            "Tula", "Vrishchika", "Dhanu", "Makara", "Kumbha", "Meena"
-        ]
+        self.vedic_rashis = list(VEDIC_RASHIS)
         
         # Vedic Nakshatras (27 lunar mansions)
-        self.vedic_nakshatras = [
-            "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra",
-            "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", 
-            "Uttara Phalguni", "Hasta", "Chitra", "Swati", "Vishakha",
-            "Anuradha", "Jyeshtha", "Mula", "Purva Ashadha", "Uttara Ashadha",
-            "Shravana", "Dhanishta", "Shatabhisha", "Purva Bhadrapada",
-            "Uttara Bhadrapada", "Revati"
-        ]
+        self.vedic_nakshatras = list(VEDIC_NAKSHATRAS)
         
         # Mayan day signs (20-day cycle)
-        self.mayan_day_signs = [
-            "Imix", "Ik", "Akbal", "Kan", "Chicchan", "Cimi", "Manik", "Lamat",
-            "Muluc", "Oc", "Chuen", "Eb", "Ben", "Ix", "Men", "Cib",
-            "Caban", "Etznab", "Cauac", "Ahau"
-        ]
+        self.mayan_day_signs = list(MAYAN_DAY_SIGNS)
         
         # Galactic tones (1-13)
-        self.galactic_tones = [
-            "Magnetic", "Lunar", "Electric", "Self-Existing", "Overtone",
-            "Rhythmic", "Resonant", "Galactic", "Solar", "Planetary", 
-            "Spectral", "Crystal", "Cosmic"
-        ]
+        self.galactic_tones = list(GALACTIC_TONES)
         
         # Aztec day signs (20-day cycle) 
-        self.aztec_day_signs = [
-            "Cipactli", "Ehecatl", "Calli", "Cuetzpalin", "Coatl", "Miquiztli",
-            "Mazatl", "Tochtli", "Atl", "Itzcuintli", "Ozomatli", "Malinalli", 
-            "Acatl", "Ocelotl", "Cuauhtli", "Cozcacuauhtli", "Ollin", 
-            "Tecpatl", "Quiahuitl", "Xochitl"
-        ]
+        self.aztec_day_signs = list(AZTEC_DAY_SIGNS)
         
         # Mayan Tzolkin correlation constant (GMT+584283)
-        self.tzolkin_correlation = 584283
+        self.tzolkin_correlation = TZOLKIN_CORRELATION
+
+    @property
+    def atlas(self):
+        """Per-day sign codes for every system, from the precomputed atlas once it has loaded"""
+        return get_zodiac_atlas()
 
     def calculate_all_zodiac_systems(self, birth_date: datetime.datetime, 
                                    birth_time: str = None, birth_location: Dict = None) -> Dict:
@@ -2995,31 +2918,9 @@ class MultiZodiacCalculator:
         return self._calculate_western_basic(birth_date)
 
     def _calculate_western_basic(self, birth_date: datetime.datetime) -> Dict:
-        """Basic Western zodiac calculation"""
-        day_of_year = birth_date.timetuple().tm_yday
-        
-        # Adjust for leap year
-        if not self._is_leap_year(birth_date.year) and day_of_year > 59:
-            day_of_year += 1
-            
-        western_signs = [
-            ("Aries", 80, 110, "♈"), ("Taurus", 111, 141, "♉"), ("Gemini", 142, 172, "♊"),
-            ("Cancer", 173, 203, "♋"), ("Leo", 204, 234, "♌"), ("Virgo", 235, 265, "♍"),
-            ("Libra", 266, 296, "♎"), ("Scorpio", 297, 327, "♏"), ("Sagittarius", 328, 357, "♐"),
-            ("Capricorn", 358, 19, "♑"), ("Aquarius", 20, 49, "♒"), ("Pisces", 50, 79, "♓")
-        ]
-        
-        for sign_name, start, end, symbol in western_signs:
-            if start <= end:  # Normal range
-                if start <= day_of_year <= end:
-                    western_sign = sign_name
-                    western_symbol = symbol
-                    break
-            else:  # Crosses year boundary (Capricorn)
-                if day_of_year >= start or day_of_year <= end:
-                    western_sign = sign_name
-                    western_symbol = symbol
-                    break
+        """Basic Western zodiac calculation (sun sign at noon UTC from the atlas)"""
+        western_sign = WESTERN_SIGNS[self.atlas.lookup(birth_date)['western']]
+        western_symbol = next(sign.value[1] for sign in ZodiacSign if sign.value[0] == western_sign)
         
         return {
             'system': 'western',
@@ -3067,18 +2968,14 @@ class MultiZodiacCalculator:
                                 birth_time: str = None, birth_location: Dict = None) -> Dict:
         """Enhanced Vedic/Hindu zodiac calculation"""
         # Simplified Vedic calculation with sidereal correction
-        ayanamsa = 24  # Simplified - actual ayanamsa changes over time (currently ~24°)
-        
-        day_of_year = birth_date.timetuple().tm_yday
-        adjusted_day = (day_of_year - ayanamsa) % 365
-        
-        # Rashi calculation (12 signs)
-        rashi_index = int(adjusted_day / 30.44)  # ~30.44 days per rashi
-        rashi = self.vedic_rashis[rashi_index % 12]
+        ayanamsa = VEDIC_AYANAMSA_DAYS  # Simplified - actual ayanamsa changes over time (currently ~24°)
+        codes = self.atlas.lookup(birth_date)
         
-        # Nakshatra calculation (27 lunar mansions)
-        nakshatra_index = int(adjusted_day / 13.52)  # ~13.52 days per nakshatra  
-        nakshatra = self.vedic_nakshatras[nakshatra_index % 27]
+        # Rashi (12 signs) and nakshatra (27 lunar mansions)
+        rashi_index = int(codes['vedic_rashi'])
+        rashi = self.vedic_rashis[rashi_index]
+        nakshatra_index = int(codes['nakshatra'])
+        nakshatra = self.vedic_nakshatras[nakshatra_index]
         
         return {
             'system': 'vedic',
@@ -3106,19 +3003,11 @@ class MultiZodiacCalculator:
 
     def _calculate_mayan_enhanced(self, birth_date: datetime.datetime) -> Dict:
         """Enhanced Mayan Tzolkin sacred calendar calculation"""
-        # Calculate days since Maya correlation date (GMT+584283)
-        maya_epoch = datetime.datetime(1970, 1, 1) - datetime.timedelta(days=self.tzolkin_correlation)
-        days_since_epoch = (birth_date - maya_epoch).days
-        
-        # Tzolkin cycle: 260 days (20 day signs × 13 galactic tones)
-        tzolkin_day = days_since_epoch % 260
-        
-        # Day sign (20-day cycle)
-        day_sign_index = tzolkin_day % 20
-        day_sign = self.mayan_day_signs[day_sign_index]
-        
-        # Galactic tone (13-day cycle)
-        galactic_tone_number = (tzolkin_day % 13) + 1
+        # Tzolkin cycle: 260 days (20 day signs × 13 galactic tones), counted from GMT+584283
+        codes = self.atlas.lookup(birth_date)
+        tzolkin_day = int(codes['tzolkin'])
+        day_sign = self.mayan_day_signs[codes['day_sign']]
+        galactic_tone_number = int(codes['tone'])
         galactic_tone = self.galactic_tones[galactic_tone_number - 1]
         
         return {
@@ -3139,16 +3028,13 @@ class MultiZodiacCalculator:
 
     def _calculate_aztec_enhanced(self, birth_date: datetime.datetime) -> Dict:
         """Enhanced Aztec Tonalpohualli sacred calendar calculation"""
-        # Use same calculation method as Mayan but with Aztec day sign names
-        maya_epoch = datetime.datetime(1970, 1, 1) - datetime.timedelta(days=self.tzolkin_correlation)
-        days_since_epoch = (birth_date - maya_epoch).days
-        
-        tonalpohualli_day = days_since_epoch % 260
-        day_sign_index = tonalpohualli_day % 20
-        day_sign = self.aztec_day_signs[day_sign_index]
+        # Same 260-day count as the Mayan Tzolkin, with Aztec day sign names
+        codes = self.atlas.lookup(birth_date)
+        tonalpohualli_day = int(codes['tzolkin'])
+        day_sign = self.aztec_day_signs[codes['day_sign']]
         
         # Sacred number (1-13 cycle)
-        day_number = (tonalpohualli_day % 13) + 1
+        day_number = int(codes['tone'])
         
         return {
             'system': 'aztec', 
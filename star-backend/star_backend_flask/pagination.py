@@ -0,0 +1,184 @@
+"""
+Keyset (cursor) pagination for STAR list endpoints
+Opaque continuation tokens over a (created_at, id) sort key, translated to
+a Postgres seek predicate for Supabase, a seek clause for Cosmos SQL, a
+native Cosmos continuation token, or a bisect into an in-memory list.
+Totals are opt-in and served from a short-lived estimate cache
+"""
+
+import base64
+import bisect
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from cache_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE_MAX = 100
+TOTAL_ESTIMATE_TTL = 60   # seconds an opt-in total may be reused
+TOTAL_ESTIMATE_CACHE_SIZE = 1024
+CURSOR_ID_PATTERN = re.compile(r'[\w.:+-]{1,128}')  # uuids and composite ids; nothing PostgREST treats as syntax
+
+_total_estimates = TTLCache(maxsize=TOTAL_ESTIMATE_CACHE_SIZE, ttl=TOTAL_ESTIMATE_TTL)
+
+
+class InvalidCursor(ValueError):
+    """A cursor token that was not issued by this API"""
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position after the last item of a page"""
+    created_at: Optional[str] = None
+    id: Optional[str] = None
+    continuation: Optional[str] = None  # native Cosmos continuation token
+
+    def encode(self) -> str:
+        payload = {'c': self.continuation} if self.continuation else {'t': self.created_at, 'i': self.id}
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @classmethod
+    def decode(cls, token: Optional[str]) -> Optional["Cursor"]:
+        """Parse a token; empty means first page"""
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            if 'c' in payload:
+                return cls(continuation=str(payload['c']))
+            return cls(created_at=str(payload['t']), id=str(payload['i']))
+        except (ValueError, TypeError, KeyError) as e:
+            raise InvalidCursor(f"Invalid cursor: {token!r}") from e
+
+    @classmethod
+    def after(cls, item: Mapping[str, Any], time_field: str = 'created_at') -> "Cursor":
+        return cls(created_at=str(item.get(time_field)), id=str(item.get('id')))
+
+
+def page_params(args: Mapping[str, Any], default_limit: int = 20,
+                max_limit: int = PAGE_SIZE_MAX) -> Tuple[int, Optional[Cursor], bool]:
+    """(limit, cursor, include_total) from request args; raises InvalidCursor"""
+    try:
+        limit = int(args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        limit = default_limit
+    limit = max(1, min(limit, max_limit))
+    include_total = str(args.get('include_total', '')).lower() in ('1', 'true', 'yes')
+    return limit, Cursor.decode(args.get('cursor')), include_total
+
+
+def split_page(rows: List[Dict[str, Any]], limit: int,
+               time_field: str = 'created_at') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim rows fetched with ``limit + 1`` to a page and its next cursor (None on the last page)"""
+    page = rows[:limit]
+    if len(rows) > limit and page:
+        return page, Cursor.after(page[-1], time_field).encode()
+    return page, None
+
+
+def _check_seek_values(cursor: Cursor) -> None:
+    """Reject cursor values that are not a timestamp and an id before they reach a filter string"""
+    try:
+        datetime.fromisoformat(cursor.created_at.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise InvalidCursor(f"Invalid cursor time: {cursor.created_at!r}") from e
+    if cursor.id is None or not CURSOR_ID_PATTERN.fullmatch(cursor.id):
+        raise InvalidCursor(f"Invalid cursor id: {cursor.id!r}")
+
+
+def postgrest_seek(query: Any, cursor: Optional[Cursor], limit: int,
+                   time_field: str = 'created_at', descending: bool = True) -> Any:
+    """Order a Supabase query by (time, id), continue after ``cursor`` and fetch one extra row"""
+    if cursor is not None and cursor.created_at is not None:
+        _check_seek_values(cursor)
+        op = 'lt' if descending else 'gt'
+        query = query.or_(
+            f'{time_field}.{op}.{cursor.created_at},'
+            f'and({time_field}.eq.{cursor.created_at},id.{op}.{cursor.id})'
+        )
+    return query.order(time_field, desc=descending).order('id', desc=descending).limit(limit + 1)
+
+
+def cosmos_seek_indexing_policy(time_field: str = 'created_at') -> Dict[str, Any]:
+    """Indexing policy with the (time, id) composite indexes a cosmos_seek ORDER BY requires
+
+    Cosmos rejects a multi-field ORDER BY without a matching composite index,
+    so pass this as ``indexing_policy`` when creating a container that is paged
+    with cosmos_seek, or merge its ``compositeIndexes`` into the existing policy.
+    """
+    return {
+        'indexingMode': 'consistent',
+        'includedPaths': [{'path': '/*'}],
+        'compositeIndexes': [
+            [{'path': f'/{time_field}', 'order': order}, {'path': '/id', 'order': order}]
+            for order in ('descending', 'ascending')
+        ]
+    }
+
+
+def cosmos_seek(cursor: Optional[Cursor], time_field: str = 'created_at', descending: bool = True,
+                alias: str = 'c') -> Tuple[str, str, List[Dict[str, Any]]]:
+    """(seek predicate to AND into WHERE, ORDER BY clause, parameters) for Cosmos SQL
+
+    The two-field ORDER BY needs the composite index from cosmos_seek_indexing_policy().
+    """
+    direction, op = ('DESC', '<') if descending else ('ASC', '>')
+    order_by = f" ORDER BY {alias}.{time_field} {direction}, {alias}.id {direction}"
+    if cursor is None or cursor.created_at is None:
+        return '', order_by, []
+    predicate = (f" AND ({alias}.{time_field} {op} @cursor_time"
+                 f" OR ({alias}.{time_field} = @cursor_time AND {alias}.id {op} @cursor_id))")
+    return predicate, order_by, [
+        {"name": "@cursor_time", "value": cursor.created_at},
+        {"name": "@cursor_id", "value": cursor.id},
+    ]
+
+
+def cosmos_page(items: Any, cursor: Optional[Cursor]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of a Cosmos query (issued with ``max_item_count``) resumed from a native continuation"""
+    pager = items.by_page(cursor.continuation if cursor is not None else None)
+    page = list(next(pager, []))
+    token = pager.continuation_token
+    return page, Cursor(continuation=token).encode() if token else None
+
+
+def list_seek(items: List[Dict[str, Any]], cursor: Optional[Cursor], limit: int,
+              time_field: str = 'created_at') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Page through a list sorted newest first by (time, id)"""
+    start = 0
+    if cursor is not None and cursor.created_at is not None:
+        # bisect needs ascending keys; everything below the cursor key comes after it
+        keys = [(str(item.get(time_field)), str(item.get('id'))) for item in reversed(items)]
+        start = len(items) - bisect.bisect_left(keys, (cursor.created_at, cursor.id))
+    return split_page(items[start:start + limit + 1], limit, time_field)
+
+
+def sort_newest_first(items: List[Dict[str, Any]], time_field: str = 'created_at') -> List[Dict[str, Any]]:
+    """Sort in place by (time, id) descending, the order every cursor assumes"""
+    items.sort(key=lambda item: (str(item.get(time_field)), str(item.get('id'))), reverse=True)
+    return items
+
+
+def estimated_total(key: Hashable, count: Callable[[], int]) -> int:
+    """A total that may be up to TOTAL_ESTIMATE_TTL seconds old"""
+    total = _total_estimates.get(key)
+    if total is None:
+        total = count()
+        _total_estimates.set(key, total)
+    return total
+
+
+def page_info(next_cursor: Optional[str], total: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Standard pagination block of a list response"""
+    info: Dict[str, Any] = {'next_cursor': next_cursor, 'has_more': next_cursor is not None}
+    if limit is not None:
+        info['limit'] = limit
+    if total is not None:
+        info['estimated_total'] = total
+    return info
@@ -0,0 +1,148 @@
+"""
+Coalesced presence tracking for STAR
+Authenticated requests record "last seen" in memory; a background flusher
+marks everyone seen since the previous flush online with one bulk UPDATE
+per second of activity every few seconds, stamping each user with when they
+were active rather than when the flush ran, and a user is rewritten at most
+once per write interval
+"""
+
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_FLUSH_INTERVAL = 5.0    # seconds between bulk writes
+PRESENCE_WRITE_INTERVAL = 60.0   # seconds before the same user's last_seen is written again
+PRESENCE_MAX_TRACKED = 100000
+PRESENCE_WRITE_CHUNK = 500       # ids per UPDATE ... IN (...)
+
+# write_seen(user_ids, seen_at) persists one bulk presence update; users are
+# grouped by their activity time truncated to the second
+SeenWriter = Callable[[List[str], datetime], None]
+
+
+class PresenceTracker:
+    """In-memory last-seen map with a periodic bulk flusher"""
+
+    def __init__(self, write_seen: SeenWriter, flush_interval: float = PRESENCE_FLUSH_INTERVAL,
+                 write_interval: float = PRESENCE_WRITE_INTERVAL, max_tracked: int = PRESENCE_MAX_TRACKED):
+        self.write_seen = write_seen
+        self.flush_interval = flush_interval
+        self.write_interval = write_interval
+        self.max_tracked = max_tracked
+        self._last_seen: "OrderedDict[str, datetime]" = OrderedDict()
+        self._last_written: Dict[str, datetime] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.touches = 0
+        self.writes = 0
+        self.failed = 0
+
+    def touch(self, user_id: Any, seen_at: Optional[datetime] = None) -> None:
+        """Record that a user was seen at ``seen_at`` (default now); no I/O"""
+        user_id = str(user_id)
+        now = seen_at or datetime.now(timezone.utc)
+        with self._lock:
+            self.touches += 1
+            previous = self._last_seen.get(user_id)
+            if previous is not None and previous > now:
+                now = previous  # an older activity never moves last_seen back
+            self._last_seen[user_id] = now
+            self._last_seen.move_to_end(user_id)
+            while len(self._last_seen) > self.max_tracked:
+                evicted, _ = self._last_seen.popitem(last=False)
+                self._last_written.pop(evicted, None)
+                self._dirty.discard(evicted)
+            written = self._last_written.get(user_id)
+            if written is None or (now - written).total_seconds() >= self.write_interval:
+                self._dirty.add(user_id)
+        self._ensure_flusher()
+
+    def last_seen(self, user_id: Any) -> Optional[datetime]:
+        """Most recent activity seen by this process"""
+        with self._lock:
+            return self._last_seen.get(str(user_id))
+
+    def flush(self) -> int:
+        """Write all pending users; returns how many were written"""
+        with self._lock:
+            dirty, self._dirty = sorted(self._dirty), set()
+            groups: Dict[datetime, List[str]] = {}
+            for user_id in dirty:
+                seen_at = self._last_seen.get(user_id)
+                if seen_at is not None:
+                    groups.setdefault(seen_at.replace(microsecond=0), []).append(user_id)
+        if not groups:
+            return 0
+
+        written = 0
+        for seen_at, user_ids in sorted(groups.items()):
+            for start in range(0, len(user_ids), PRESENCE_WRITE_CHUNK):
+                chunk = user_ids[start:start + PRESENCE_WRITE_CHUNK]
+                try:
+                    self.write_seen(chunk, seen_at)
+                except Exception as e:
+                    logger.error(f"Presence write failed ({len(chunk)} users): {e}")
+                    with self._lock:
+                        self.failed += len(chunk)
+                    continue
+                written += len(chunk)
+                with self._lock:
+                    self.writes += 1
+                    for user_id in chunk:
+                        if user_id in self._last_seen:
+                            self._last_written[user_id] = seen_at
+        return written
+
+    def _ensure_flusher(self) -> None:
+        if self._stopped.is_set():
+            return
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._run, name='presence-flush', daemon=True)
+                    self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the flusher and write whatever is still pending"""
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tracked': len(self._last_seen),
+                'pending': len(self._dirty),
+                'touches': self.touches,
+                'writes': self.writes,
+                'failed': self.failed
+            }
+
+
+_presence_tracker: Optional[PresenceTracker] = None
+_presence_lock = threading.Lock()
+
+
+def get_presence_tracker() -> PresenceTracker:
+    """Process-wide tracker writing through database_utils"""
+    global _presence_tracker
+    if _presence_tracker is None:
+        with _presence_lock:
+            if _presence_tracker is None:
+                from database_utils import mark_users_online
+                _presence_tracker = PresenceTracker(mark_users_online)
+                atexit.register(_presence_tracker.stop)
+    return _presence_tracker
@@ -5,7 +5,7 @@ Provides Redis client management and common operations
 
 import json
 import logging
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set
 from urllib.parse import urlparse
 
 import redis
@@ -73,6 +73,16 @@ class RedisManager:
             logger.warning(f"Redis SET error for key {key}: {e}")
             return False
 
+    def set_nx(self, key: str, value: str, ex: Optional[int] = None) -> Optional[bool]:
+        """Set a key only if it is absent; True if set, False if it existed, None if Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            return bool(self.client.set(key, value, ex=ex, nx=True))
+        except Exception as e:
+            logger.warning(f"Redis SET NX error for key {key}: {e}")
+            return None
+
     def delete(self, key: str) -> bool:
         """Delete key from Redis"""
         if not self.client:
@@ -83,6 +93,16 @@ class RedisManager:
             logger.warning(f"Redis DELETE error for key {key}: {e}")
             return False
 
+    def incr(self, key: str, amount: int = 1) -> Optional[int]:
+        """Increment an integer key; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            return int(self.client.incr(key, amount))
+        except Exception as e:
+            logger.warning(f"Redis INCR error for key {key}: {e}")
+            return None
+
     def set_json(self, key: str, data: Any, ex: Optional[int] = None) -> bool:
         """Set JSON data in Redis"""
         return self.set(key, json.dumps(data), ex=ex)
@@ -107,6 +127,255 @@ class RedisManager:
             logger.warning(f"Redis PUBLISH error for channel {channel}: {e}")
             return False
 
+    def lrange(self, key: str, start: int, end: int) -> list:
+        """Get a range of elements from a Redis list"""
+        if not self.client:
+            return []
+        try:
+            return self.client.lrange(key, start, end)
+        except Exception as e:
+            logger.warning(f"Redis LRANGE error for key {key}: {e}")
+            return []
+
+    def lpush_capped(self, keys: Iterable[str], value: str, max_len: int) -> bool:
+        """Push a value onto the head of several lists, trimming each to max_len, in one round trip"""
+        if not self.client:
+            return False
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.lpush(key, value)
+                pipe.ltrim(key, 0, max_len - 1)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis LPUSH pipeline error: {e}")
+            return False
+
+    def hincrby_many(self, increments: Dict[str, Dict[str, int]], ex: Optional[int] = None) -> bool:
+        """Increment hash fields across several keys (optionally refreshing their expiry) in one round trip"""
+        if not self.client:
+            return False
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, fields in increments.items():
+                for field, amount in fields.items():
+                    pipe.hincrby(key, field, amount)
+                if ex:
+                    pipe.expire(key, ex)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis HINCRBY pipeline error: {e}")
+            return False
+
+    def hincrby_get(self, key: str, fields: Dict[str, int], ex: Optional[int] = None) -> Optional[Dict[str, str]]:
+        """Increment hash fields, refresh the expiry and return the whole hash in one round trip"""
+        if not self.client:
+            return None
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            for field, amount in fields.items():
+                pipe.hincrby(key, field, amount)
+            if ex:
+                pipe.expire(key, ex)
+            pipe.hgetall(key)
+            return pipe.execute()[-1]
+        except Exception as e:
+            logger.warning(f"Redis HINCRBY error for key {key}: {e}")
+            return None
+
+    def init_hash(self, key: str, mapping: Dict[str, Any], marker: str, ex: Optional[int] = None) -> Optional[bool]:
+        """Replace a hash with ``mapping`` unless it already has the ``marker`` field
+
+        True if this call wrote it, False if another writer initialized it
+        first, None if Redis is unavailable.
+        """
+        if not self.client:
+            return None
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(key)
+                if pipe.hexists(key, marker):
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                pipe.hset(key, mapping={**mapping, marker: 1})
+                if ex:
+                    pipe.expire(key, ex)
+                pipe.execute()
+                return True
+        except redis.WatchError:
+            return False
+        except Exception as e:
+            logger.warning(f"Redis hash init error for key {key}: {e}")
+            return None
+
+    def hgetall_many(self, keys: Iterable[str]) -> Optional[List[Dict[str, str]]]:
+        """Fetch several hashes in one round trip; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(key)
+            return pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis HGETALL pipeline error: {e}")
+            return None
+
+    def pfadd_many(self, members: Dict[str, Iterable[str]], ex: Optional[int] = None) -> bool:
+        """Add members to several HyperLogLogs (optionally refreshing their expiry) in one round trip"""
+        if not self.client:
+            return False
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, values in members.items():
+                pipe.pfadd(key, *values)
+                if ex:
+                    pipe.expire(key, ex)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis PFADD pipeline error: {e}")
+            return False
+
+    def pfcount(self, keys: Iterable[str]) -> Optional[int]:
+        """Approximate cardinality of the union of several HyperLogLogs; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        keys = list(keys)
+        if not keys:
+            return 0
+        try:
+            return int(self.client.pfcount(*keys))
+        except Exception as e:
+            logger.warning(f"Redis PFCOUNT error: {e}")
+            return None
+
+    def sadd(self, key: str, *members: str) -> bool:
+        """Add members to a set"""
+        if not self.client:
+            return False
+        try:
+            self.client.sadd(key, *members)
+            return True
+        except Exception as e:
+            logger.warning(f"Redis SADD error for key {key}: {e}")
+            return False
+
+    def srem(self, key: str, *members: str) -> bool:
+        """Remove members from a set"""
+        if not self.client:
+            return False
+        try:
+            self.client.srem(key, *members)
+            return True
+        except Exception as e:
+            logger.warning(f"Redis SREM error for key {key}: {e}")
+            return False
+
+    def sunion(self, keys: Iterable[str]) -> Optional[Set[str]]:
+        """Union of several sets; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        keys = list(keys)
+        if not keys:
+            return set()
+        try:
+            return set(self.client.sunion(keys))
+        except Exception as e:
+            logger.warning(f"Redis SUNION error: {e}")
+            return None
+
+    def smembers_many(self, keys: Iterable[str]) -> Optional[List[Set[str]]]:
+        """Members of several sets in one round trip; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.smembers(key)
+            return [set(members) for members in pipe.execute()]
+        except Exception as e:
+            logger.warning(f"Redis SMEMBERS pipeline error: {e}")
+            return None
+
+    def exists_many(self, keys: Iterable[str]) -> Optional[List[bool]]:
+        """Whether each key exists, in one round trip; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+            return [bool(found) for found in pipe.execute()]
+        except Exception as e:
+            logger.warning(f"Redis EXISTS pipeline error: {e}")
+            return None
+
+    def hget(self, key: str, field: str) -> Optional[str]:
+        """One hash field; None if missing or Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            return self.client.hget(key, field)
+        except Exception as e:
+            logger.warning(f"Redis HGET error for key {key}: {e}")
+            return None
+
+    def hset(self, key: str, field: str, value: str) -> bool:
+        """Set one hash field"""
+        if not self.client:
+            return False
+        try:
+            self.client.hset(key, field, value)
+            return True
+        except Exception as e:
+            logger.warning(f"Redis HSET error for key {key}: {e}")
+            return False
+
+    def hset_many(self, key: str, mapping: Dict[str, str]) -> bool:
+        """Set several hash fields in one command"""
+        if not self.client:
+            return False
+        if not mapping:
+            return True
+        try:
+            self.client.hset(key, mapping=mapping)
+            return True
+        except Exception as e:
+            logger.warning(f"Redis HSET error for key {key}: {e}")
+            return False
+
+    def hdel(self, key: str, *fields: str) -> bool:
+        """Delete hash fields"""
+        if not self.client:
+            return False
+        try:
+            self.client.hdel(key, *fields)
+            return True
+        except Exception as e:
+            logger.warning(f"Redis HDEL error for key {key}: {e}")
+            return False
+
+    def hlen(self, key: str) -> Optional[int]:
+        """Number of fields in a hash; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        try:
+            return int(self.client.hlen(key))
+        except Exception as e:
+            logger.warning(f"Redis HLEN error for key {key}: {e}")
+            return None
+
+    def pubsub(self) -> Optional[Any]:
+        """New pub/sub connection that skips subscribe confirmations; None if Redis is unavailable"""
+        if not self.client:
+            return None
+        return self.client.pubsub(ignore_subscribe_messages=True)
+
     def expire(self, key: str, time: int) -> bool:
         """Set expiration time for key"""
         if not self.client:
@@ -10,6 +10,8 @@ import random
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Tuple
 
+from compatibility import CHINESE_KARMIC_PAIRS, ELEMENT_COMPATIBILITY
+
 
 class FiveSystemZodiacCalculator:
     """Calculate zodiac signs across 5 different systems"""
@@ -621,14 +623,6 @@ class RitualIntelligenceBackend:
         western_sign = zodiac_profile['western']['sign']
         user_element = zodiac_profile['western']['element']
         
-        # Element compatibility
-        element_compatibility = {
-            'fire': {'fire': 0.8, 'air': 0.9, 'water': 0.3, 'earth': 0.4},
-            'water': {'fire': 0.3, 'air': 0.4, 'water': 0.8, 'earth': 0.9},
-            'air': {'fire': 0.9, 'air': 0.8, 'water': 0.4, 'earth': 0.3},
-            'earth': {'fire': 0.4, 'air': 0.3, 'water': 0.9, 'earth': 0.8}
-        }
-        
         # Calculate highest compatibility element
         if user_element == 'fire':
             highest_compatibility = ['air']
@@ -641,7 +635,7 @@ class RitualIntelligenceBackend:
         
         return {
             'highest_compatibility': highest_compatibility,
-            'element_scores': element_compatibility.get(user_element, {}),
+            'element_scores': ELEMENT_COMPATIBILITY.get(user_element, {}),
             'soul_mate_signs': self.get_soul_mate_signs(western_sign),
             'karmic_connections': self.get_karmic_connections(zodiac_profile['chinese']['animal'])
         }
@@ -666,13 +660,7 @@ class RitualIntelligenceBackend:
     
     def get_karmic_connections(self, chinese_animal: str) -> List[str]:
         """Get karmic connection animals in Chinese zodiac"""
-        karmic_pairs = {
-            'rat': ['dragon', 'monkey'], 'ox': ['snake', 'rooster'], 'tiger': ['horse', 'dog'],
-            'rabbit': ['goat', 'pig'], 'dragon': ['rat', 'monkey'], 'snake': ['ox', 'rooster'],
-            'horse': ['tiger', 'dog'], 'goat': ['rabbit', 'pig'], 'monkey': ['rat', 'dragon'],
-            'rooster': ['ox', 'snake'], 'dog': ['tiger', 'horse'], 'pig': ['rabbit', 'goat']
-        }
-        return karmic_pairs.get(chinese_animal, [])
+        return CHINESE_KARMIC_PAIRS.get(chinese_animal, [])
     
     def calculate_power_dates(self, zodiac_profile: Dict, birth_date: datetime) -> Dict[str, Any]:
         """Calculate power dates based on cosmic profile"""
@@ -0,0 +1,470 @@
+"""
+Full-text post search for STAR
+In-process inverted index over post content, usernames, post types and
+zodiac signs with BM25 ranking. Facets (sign in any zodiac system, sign per
+system, post type) are boolean bitmaps combined before scoring, so a query
+touches only the postings of its terms. Updates are incremental and logged
+to append-only segment files that are replayed on start and compacted as
+they accumulate. Segment names are unique per writer and compaction holds
+a directory lock, so several workers can share one index directory
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from file_lock import locked
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_DIR = os.environ.get(
+    'SEARCH_INDEX_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'search_index')
+)
+SEARCH_SEGMENT_SIZE = 500       # pending operations that trigger a segment write
+SEARCH_MAX_SEGMENTS = 8         # compact into one segment beyond this
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Term-frequency weight of each indexed field
+FIELD_BOOSTS = {'content': 1.0, 'username': 2.0, 'zodiac': 1.5, 'type': 1.0}
+
+# Interest topics a reader can follow, as the post types that cover them
+INTEREST_POST_TYPES = {
+    'tarot': ('tarot_reading',),
+    'astrology': ('zodiac_wisdom', 'cosmic_insight', 'daily_feature'),
+    'cosmic_events': ('cosmic_event',),
+    'community': ('community_post',),
+}
+
+# CamelCase-aware: "CosmicScorpio12" -> cosmic, scorpio, 12
+_TOKEN_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase word and number tokens of a string"""
+    return [token.lower() for token in _TOKEN_RE.findall(str(text))]
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, dict):
+        return ' '.join(str(value) for value in content.values())
+    return str(content or '')
+
+
+def post_fields(post: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Tokens of each searchable field of a post"""
+    signs = post.get('zodiac_signs') or {}
+    return {
+        'content': tokenize(_content_text(post.get('content'))),
+        'username': tokenize(post.get('username', '')),
+        'zodiac': tokenize(' '.join(str(sign) for sign in signs.values())) + tokenize(post.get('zodiac', '')),
+        'type': tokenize(post.get('type', '')),
+    }
+
+
+def interest_topics(interests: Iterable[str]) -> List[str]:
+    """The interests a post filter can use; ones no post type covers are ignored"""
+    return [topic for topic in dict.fromkeys(str(interest).lower() for interest in interests)
+            if topic in INTEREST_POST_TYPES]
+
+
+def post_interests(post: Dict[str, Any]) -> set:
+    """Interest topics of a post: its own ``interests`` plus those covering its type"""
+    interests = {str(interest).lower() for interest in post.get('interests') or ()}
+    interests.update(topic for topic, types in INTEREST_POST_TYPES.items() if post.get('type') in types)
+    return interests
+
+
+def post_facets(post: Dict[str, Any]) -> List[str]:
+    """Facet values of a post: ``sign:<value>`` for every system, ``<system>:<value>``,
+    ``type:<type>`` and ``interest:<topic>``"""
+    facets = []
+    for system, sign in (post.get('zodiac_signs') or {}).items():
+        value = str(sign).lower()
+        facets.append(f'sign:{value}')
+        facets.append(f'{system}:{value}')
+    if post.get('type'):
+        facets.append(f"type:{post['type']}")
+    facets.extend(f'interest:{interest}' for interest in sorted(post_interests(post)))
+    return facets
+
+
+def post_time(value: Any) -> float:
+    """Sortable seconds for an ISO ``created_at``; 0 when missing or unparseable"""
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def post_terms(post: Dict[str, Any]) -> set:
+    """Every token of a post, for boolean matching outside the index"""
+    return {token for tokens in post_fields(post).values() for token in tokens}
+
+
+class SearchIndex:
+    """Incremental BM25 inverted index with facet bitmaps and segment persistence"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._keys: List[Optional[str]] = []          # doc number -> post id (None once freed)
+        self._free: List[int] = []                    # doc numbers of removed posts, reused first
+        self._numbers: Dict[str, int] = {}            # post id -> live doc number
+        self._transient: set = set()                  # post ids kept in memory only
+        self._order = np.zeros(1024, dtype=np.int64)  # doc number -> insertion sequence (tie-break)
+        self._sequence = 0
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._doc_terms: Dict[int, Counter] = {}      # weighted term frequencies
+        self._doc_facets: Dict[int, List[str]] = {}
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        self._times = np.zeros(1024, dtype=np.float64)  # doc number -> created_at, for newest-first pages
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # rebuilt lazily after changes
+        self._facets: Dict[str, np.ndarray] = {}
+        self._total_length = 0.0
+        self._pending: List[Dict[str, Any]] = []
+        self._segments: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def _capacity(self) -> int:
+        return len(self._lengths)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity()
+        while capacity < needed:
+            capacity *= 2
+        if capacity != self._capacity():
+            used = len(self._keys)
+            self._lengths = np.resize(self._lengths, capacity)
+            self._lengths[used:] = 0
+            self._order = np.resize(self._order, capacity)
+            self._order[used:] = 0
+            self._times = np.resize(self._times, capacity)
+            self._times[used:] = 0
+            for facet, bits in self._facets.items():
+                grown = np.zeros(capacity, dtype=bool)
+                grown[:len(bits)] = bits
+                self._facets[facet] = grown
+
+    def _index(self, post: Dict[str, Any]) -> None:
+        key = str(post['id'])
+        self._unindex(key)
+        if self._free:
+            number = self._free.pop()
+            self._keys[number] = key
+        else:
+            number = len(self._keys)
+            self._keys.append(key)
+            self._grow(number + 1)
+        self._sequence += 1
+        self._order[number] = self._sequence
+        self._times[number] = post_time(post.get('created_at'))
+
+        terms: Counter = Counter()
+        for field, tokens in post_fields(post).items():
+            boost = FIELD_BOOSTS[field]
+            for token in tokens:
+                terms[token] += boost
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[number] = frequency
+            self._posting_arrays.pop(term, None)
+
+        facets = post_facets(post)
+        for facet in facets:
+            bits = self._facets.get(facet)
+            if bits is None:
+                bits = self._facets[facet] = np.zeros(self._capacity(), dtype=bool)
+            bits[number] = True
+
+        length = float(sum(terms.values()))
+        self._lengths[number] = length
+        self._total_length += length
+        self._numbers[key] = number
+        self._docs[number] = post
+        self._doc_terms[number] = terms
+        self._doc_facets[number] = facets
+
+    def _unindex(self, key: str) -> bool:
+        number = self._numbers.pop(key, None)
+        if number is None:
+            return False
+        for term in self._doc_terms.pop(number):
+            postings = self._postings[term]
+            del postings[number]
+            self._posting_arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+        for facet in self._doc_facets.pop(number):
+            self._facets[facet][number] = False
+        self._total_length -= float(self._lengths[number])
+        self._lengths[number] = 0
+        del self._docs[number]
+        self._keys[number] = None
+        self._free.append(number)
+        self._transient.discard(key)
+        return True
+
+    def _log(self, operation: Dict[str, Any]) -> None:
+        if self.path is None:
+            return
+        self._pending.append(operation)
+        if len(self._pending) >= SEARCH_SEGMENT_SIZE:
+            self.flush()
+
+    def add(self, post: Dict[str, Any], persist: bool = True) -> None:
+        """Index (or re-index) one post; with ``persist=False`` it is never written to a segment"""
+        with self._lock:
+            self._index(post)
+            if persist:
+                self._log({'op': 'add', 'doc': post})
+            else:
+                self._transient.add(str(post['id']))
+
+    def add_many(self, posts: Iterable[Dict[str, Any]], persist: bool = True) -> None:
+        for post in posts:
+            self.add(post, persist)
+
+    def remove(self, post_id: Any) -> bool:
+        with self._lock:
+            transient = str(post_id) in self._transient
+            removed = self._unindex(str(post_id))
+            if removed and not transient:
+                self._log({'op': 'delete', 'id': str(post_id)})
+            return removed
+
+    def get(self, post_id: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            number = self._numbers.get(str(post_id))
+            return self._docs.get(number) if number is not None else None
+
+    def _arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(doc numbers, weighted frequencies) of a term's postings"""
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            arrays = self._posting_arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            )
+        return arrays
+
+    def _facet_mask(self, facets: Optional[Dict[str, Iterable[str]]]) -> Optional[np.ndarray]:
+        """AND across facet groups, OR within a group; None means unfiltered"""
+        mask = None
+        for group, values in (facets or {}).items():
+            values = [str(value).lower() if group != 'type' else str(value) for value in values]
+            if not values:
+                continue
+            group_bits = np.zeros(self._capacity(), dtype=bool)
+            for value in values:
+                bits = self._facets.get(f'{group}:{value}')
+                if bits is not None:
+                    group_bits |= bits
+            mask = group_bits if mask is None else mask & group_bits
+        return mask
+
+    def _match(self, terms: List[str], facets: Optional[Dict[str, Iterable[str]]],
+               require_all: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """(matching doc numbers, BM25 score by doc number); caller holds the lock"""
+        doc_count = len(self._numbers)
+        no_hits = np.zeros(0, dtype=np.int64), np.zeros(0)
+        if not terms or not doc_count:
+            return no_hits
+        average_length = self._total_length / doc_count
+        mask = self._facet_mask(facets)
+
+        scores = np.zeros(self._capacity(), dtype=np.float64)
+        matched = np.zeros(self._capacity(), dtype=np.int32)
+        for term in terms:
+            arrays = self._arrays(term)
+            if arrays is None:
+                if require_all:
+                    return no_hits
+                continue
+            docs, frequencies = arrays
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            if mask is not None:
+                keep = mask[docs]
+                docs, frequencies = docs[keep], frequencies[keep]
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[docs] / average_length)
+            scores[docs] += idf * frequencies * (BM25_K1 + 1) / (frequencies + norms)
+            matched[docs] += 1
+
+        return np.flatnonzero(matched == len(terms) if require_all else matched), scores
+
+    def search(self, query: str, facets: Optional[Dict[str, Iterable[str]]] = None, limit: int = 20,
+               offset: int = 0, require_all: bool = False) -> Tuple[int, List[Tuple[Dict[str, Any], float]]]:
+        """BM25-ranked posts matching ``query`` (any term, or every term with ``require_all``).
+
+        Returns (total matches, [(post, score)] for the requested page).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            hits, scores = self._match(terms, facets, require_all)
+            wanted = min(offset + limit, len(hits))
+            if wanted <= 0:
+                return len(hits), []
+            # Highest score first, earlier-indexed post first on ties
+            top = hits[np.argpartition(-scores[hits], wanted - 1)[:wanted]] if wanted < len(hits) else hits
+            top = top[np.lexsort((self._order[top], -scores[top]))]
+            return len(hits), [(self._docs[int(number)], float(scores[number])) for number in top[offset:]]
+
+    def search_newest(self, query: str, facets: Optional[Dict[str, Iterable[str]]] = None, limit: int = 20,
+                      before: Optional[Tuple[str, str]] = None,
+                      require_all: bool = False) -> Tuple[int, List[Dict[str, Any]]]:
+        """Posts matching ``query`` newest first by (created_at, id), continuing after the
+        ``before`` keyset position; only the page itself is materialized.
+
+        Returns (total matches, up to ``limit`` posts).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            hits, _ = self._match(terms, facets, require_all)
+            total = len(hits)
+            if before is not None:
+                cursor_time, cursor_id = post_time(before[0]), str(before[1])
+                times = self._times[hits]
+                tied = times == cursor_time
+                tied[tied] = [self._keys[number] < cursor_id for number in hits[tied]]
+                hits = hits[(times < cursor_time) | tied]
+            if len(hits) > limit:
+                # Everything at least as new as the limit-th newest; ids order the ties below
+                threshold = np.partition(self._times[hits], len(hits) - limit)[len(hits) - limit]
+                hits = hits[self._times[hits] >= threshold]
+            page = sorted(hits.tolist(), key=lambda number: (self._times[number], self._keys[number]), reverse=True)
+            return total, [self._docs[number] for number in page[:limit]]
+
+    def _lock_path(self) -> str:
+        return os.path.join(self.path, '.lock')
+
+    def flush(self) -> None:
+        """Write pending operations as a new segment"""
+        with self._lock:
+            self._flush_pending()
+            if len(self._segments) > SEARCH_MAX_SEGMENTS:
+                self.compact()
+
+    def _flush_pending(self) -> None:
+        if self.path is None or not self._pending:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with locked(self._lock_path(), shared=True):
+            self._segments.append(self._write_segment(_segment_name(), self._pending))
+        self._pending = []
+
+    def _write_segment(self, name: str, operations: List[Dict[str, Any]]) -> str:
+        target = os.path.join(self.path, name)
+        temporary = f'{target}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            for operation in operations:
+                handle.write(json.dumps(operation, default=str) + '\n')
+        os.replace(temporary, target)
+        return name
+
+    def compact(self) -> None:
+        """Replace the segments on disk with one holding the live posts
+
+        Other workers may have written segments since this index loaded, so
+        the live set is rebuilt from every segment present under the lock
+        rather than from this process's memory. The result takes the name of
+        the newest segment it replaces, keeping its place in replay order.
+        """
+        with self._lock:
+            if self.path is None:
+                return
+            self._flush_pending()
+            with locked(self._lock_path()):
+                segments = _segment_names(self.path)
+                if not segments:
+                    return
+                merged = SearchIndex()
+                for name in segments:
+                    merged._replay(os.path.join(self.path, name))
+                live = [{'op': 'add', 'doc': merged._docs[number]}
+                        for number in sorted(merged._docs, key=lambda number: merged._order[number])]
+                compacted = self._write_segment(segments[-1], live)
+                for old in segments[:-1]:
+                    try:
+                        os.remove(os.path.join(self.path, old))
+                    except OSError as e:
+                        logger.warning(f"Could not remove search segment {old}: {e}")
+            self._segments = [compacted]
+
+    def _replay(self, segment_path: str) -> None:
+        with open(segment_path, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    operation = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in search segment {segment_path}")
+                    continue
+                if operation.get('op') == 'add':
+                    self._index(operation['doc'])
+                elif operation.get('op') == 'delete':
+                    self._unindex(operation['id'])
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        """Replay the segments under ``path`` (an empty index if there are none)"""
+        index = cls(path)
+        if not os.path.isdir(path):
+            return index
+        with locked(index._lock_path(), shared=True):
+            segments = _segment_names(path)
+            for name in segments:
+                index._replay(os.path.join(path, name))
+        index._segments = segments
+        logger.info(f"Loaded search index: {len(index)} posts from {len(segments)} segments")
+        return index
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'documents': len(self._numbers),
+                'terms': len(self._postings),
+                'facets': len(self._facets),
+                'segments': len(self._segments),
+                'pending': len(self._pending),
+                'free_slots': len(self._free),
+                'transient': len(self._transient)
+            }
+
+
+def _segment_name() -> str:
+    """Segment names sort in write order and never collide between workers"""
+    return f'segment-{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl'
+
+
+def _segment_names(path: str) -> List[str]:
+    return sorted(name for name in os.listdir(path) if name.startswith('segment-') and name.endswith('.jsonl'))
+
+
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Process-wide index loaded from SEARCH_INDEX_DIR; pending updates are flushed at exit"""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = SearchIndex.load(SEARCH_INDEX_DIR)
+                atexit.register(_search_index.flush)
+    return _search_index
@@ -0,0 +1,78 @@
+"""
+Deterministic randomness for STAR divination features
+Every draw gets its own ``random.Random`` or NumPy ``Generator`` derived
+from the parts that identify it (user id, date, spread, ...), so concurrent
+requests never share or reseed the process-wide RNG and the same inputs
+always reproduce the same reading. Bulk helpers draw many readings in one
+vectorized call, and per-user daily results are memoized until the day ends
+"""
+
+import datetime
+import hashlib
+import random
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+from cache_utils import TTLCache
+
+DAILY_CACHE_SIZE = 20000
+DAILY_CACHE_TTL = 24 * 3600
+
+_daily_cache = TTLCache(maxsize=DAILY_CACHE_SIZE, ttl=DAILY_CACHE_TTL)
+
+
+def derive_seed(*parts: Any) -> int:
+    """Stable 64-bit seed for ``parts`` (independent of PYTHONHASHSEED)"""
+    material = '\x1f'.join(str(part) for part in parts).encode()
+    return int.from_bytes(hashlib.blake2b(material, digest_size=8).digest(), 'big')
+
+
+def rng_for(*parts: Any) -> random.Random:
+    """A private ``random.Random`` seeded from ``parts``, or from OS entropy when none are given"""
+    if not parts:
+        return random.Random()
+    return random.Random(derive_seed(*parts))
+
+
+def generator_for(*parts: Any) -> np.random.Generator:
+    """A private NumPy ``Generator`` seeded from ``parts``, or from OS entropy when none are given"""
+    if not parts:
+        return np.random.default_rng()
+    return np.random.default_rng(derive_seed(*parts))
+
+
+def draw_indices(deck_size: int, count: int, draws: int,
+                 generator: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """``draws`` independent draws of ``count`` distinct cards from a deck of ``deck_size``
+
+    Returns ``(indices, reversed)``, both shaped ``(draws, count)``. Each row
+    is the head of an independent permutation obtained by argsorting a row
+    of uniform keys, so all readings come out of one array operation.
+    """
+    count = min(count, deck_size)
+    indices = generator.random((draws, deck_size)).argsort(axis=1)[:, :count]
+    reversed_ = generator.random((draws, count)) < 0.5
+    return indices, reversed_
+
+
+def toss_hexagram_lines(draws: int, generator: np.random.Generator) -> np.ndarray:
+    """Three-coin totals (6-9) for ``draws`` hexagrams, shaped ``(draws, 6)``, bottom line first"""
+    return generator.integers(2, 4, size=(draws, 6, 3)).sum(axis=2)
+
+
+def today_utc() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def daily(kind: str, user_id: str, build: Callable[[], Any], day: Optional[datetime.date] = None) -> Any:
+    """Memoize a per-user daily result; ``build`` must be deterministic for (kind, user, day)"""
+    key: Hashable = (kind, user_id, (day or today_utc()).isoformat())
+    value = _daily_cache.get(key)
+    if value is None:
+        value = build()
+        _daily_cache.set(key, value)
+    return value
+
+
+def get_stats() -> Dict[str, Any]:
+    return _daily_cache.stats()
@@ -0,0 +1,184 @@
+"""
+Versioned shared state for STAR collaboration sessions
+Clients send small ops; each accepted batch bumps a monotonically
+increasing version and is kept in a bounded tail so peers receive only
+deltas and late joiners get a snapshot plus whatever they missed.
+Persistence is write-behind: a session is written at most once per
+interval no matter how many ops arrive
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_TAIL_SIZE = 256            # deltas kept for catch-up before a snapshot is needed
+STATE_PERSIST_INTERVAL = 1.0     # seconds between writes of the same session
+STATE_RETRY_MAX_DELAY = 60.0     # cap on the backoff between retries of a failed write
+STATE_OPS = ('set', 'delete')
+
+
+class InvalidOp(ValueError):
+    """A state op the store does not understand"""
+
+
+def ops_from_update(state_update: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ops for a legacy ``{key: value}`` state update"""
+    return [{'op': 'set', 'key': key, 'value': value} for key, value in state_update.items()]
+
+
+class VersionedState:
+    """Key/value state with a version per accepted batch of ops"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None, tail_size: int = STATE_TAIL_SIZE):
+        # Entries keep the {'value', 'updated_by', 'timestamp'} shape of shared_state
+        self.state: Dict[str, Dict[str, Any]] = state if state is not None else {}
+        self.version = 0
+        self._tail: Deque[Dict[str, Any]] = deque(maxlen=tail_size)
+        self._lock = threading.Lock()
+
+    def apply(self, ops: List[Dict[str, Any]], user_id: str) -> Dict[str, Any]:
+        """Apply a batch of ops atomically and return the delta peers need"""
+        for op in ops:
+            if op.get('op') not in STATE_OPS or 'key' not in op:
+                raise InvalidOp(f"Unsupported state op: {op!r}")
+
+        timestamp = datetime.utcnow().isoformat()
+        with self._lock:
+            self.version += 1
+            applied = []
+            for op in ops:
+                key = str(op['key'])
+                if op['op'] == 'set':
+                    self.state[key] = {'value': op.get('value'), 'updated_by': user_id,
+                                       'timestamp': timestamp, 'version': self.version}
+                    applied.append({'op': 'set', 'key': key, 'value': op.get('value')})
+                elif self.state.pop(key, None) is not None:
+                    applied.append({'op': 'delete', 'key': key})
+            delta = {
+                'version': self.version,
+                'base_version': self.version - 1,
+                'ops': applied,
+                'updated_by': user_id,
+                'timestamp': timestamp
+            }
+            self._tail.append(delta)
+        return delta
+
+    def since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Deltas after ``version``; None when they are no longer retained"""
+        with self._lock:
+            if version >= self.version:
+                return []
+            if not self._tail or self._tail[0]['base_version'] > version:
+                return None
+            return [delta for delta in self._tail if delta['version'] > version]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'version': self.version, 'state': {key: dict(entry) for key, entry in self.state.items()}}
+
+    def catch_up(self, version: Optional[int]) -> Dict[str, Any]:
+        """Tail since ``version`` if possible, otherwise a full snapshot"""
+        if version is not None:
+            tail = self.since(version)
+            if tail is not None:
+                return {'version': self.version, 'deltas': tail}
+        return self.snapshot()
+
+
+class DebouncedWriter:
+    """Write-behind for dirty keys, at most one write per key per interval
+
+    ``write`` must raise when a write fails; the key is then marked dirty
+    again and retried with exponential backoff until it succeeds or is
+    discarded.
+    """
+
+    def __init__(self, write: Callable[[str], None], interval: float = STATE_PERSIST_INTERVAL,
+                 max_retry_delay: float = STATE_RETRY_MAX_DELAY):
+        self.write = write
+        self.interval = interval
+        self.max_retry_delay = max_retry_delay
+        self._dirty = set()
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.marked = 0
+        self.writes = 0
+        self.failed = 0
+
+    def mark(self, key: str) -> None:
+        """Schedule a write of ``key`` (no I/O)"""
+        with self._lock:
+            self.marked += 1
+            self._dirty.add(key)
+        self._ensure_flusher()
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._dirty.discard(key)
+            self._failures.pop(key, None)
+            self._retry_at.pop(key, None)
+
+    def flush(self, key: Optional[str] = None, force: bool = False) -> int:
+        """Write pending keys now (all, or just ``key``); returns how many were written
+
+        Keys backing off after a failure are skipped unless ``force`` is set.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = sorted(self._dirty) if key is None else [key] if key in self._dirty else []
+            keys = [pending for pending in candidates if force or self._retry_at.get(pending, 0.0) <= now]
+            self._dirty.difference_update(keys)
+
+        written = 0
+        for pending in keys:
+            try:
+                self.write(pending)
+                written += 1
+                with self._lock:
+                    self._failures.pop(pending, None)
+                    self._retry_at.pop(pending, None)
+            except Exception as e:
+                self.failed += 1
+                with self._lock:
+                    failures = self._failures[pending] = self._failures.get(pending, 0) + 1
+                    delay = min(self.interval * 2 ** failures, self.max_retry_delay)
+                    self._retry_at[pending] = time.monotonic() + delay
+                    self._dirty.add(pending)
+                logger.error(f"Write-behind failed for {pending} (attempt {failures}, retry in {delay:.0f}s): {e}")
+        self.writes += written
+        return written
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None and not self._stopped.is_set():
+                self._flusher = threading.Thread(target=self._run, name='state-write-behind', daemon=True)
+                self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def stop(self) -> None:
+        """Stop the flusher and write anything still pending"""
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.interval * 2)
+        self.flush(force=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._dirty)
+            retrying = len(self._retry_at)
+        return {'pending': pending, 'retrying': retrying, 'marked': self.marked, 'writes': self.writes,
+                'failed': self.failed}
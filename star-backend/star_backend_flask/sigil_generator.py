@@ -3,20 +3,36 @@ Enhanced Sigil Generator for STAR Platform
 Generates personalized sigils based on zodiac signs and archetypal alignments
 """
 
+import copy
 import hashlib
 import math
 import random
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_utils import TTLCache
+from seeded_rng import rng_for
+
+SIGIL_CACHE_SIZE = 5000
+SIGIL_CACHE_TTL = 24 * 3600
+
+_sigil_cache = TTLCache(maxsize=SIGIL_CACHE_SIZE, ttl=SIGIL_CACHE_TTL)
 
 
 def generate_base_sigil(zodiac_sign: str, archetype: str, user_id: str) -> Dict[str, Any]:
     """Generate a base sigil combining zodiac and archetype influences"""
-    
-    # Create deterministic seed from user data
+    key = (zodiac_sign.lower(), archetype.lower(), user_id)
+    sigil = _sigil_cache.get(key)
+    if sigil is None:
+        sigil = _build_base_sigil(zodiac_sign, archetype, user_id)
+        _sigil_cache.set(key, sigil)
+    # Callers decorate the result in place; keep the cached copy pristine
+    return copy.deepcopy(sigil)
+
+def _build_base_sigil(zodiac_sign: str, archetype: str, user_id: str) -> Dict[str, Any]:
+    # Deterministic per-call RNG from user data (same stream the old global reseed produced)
     seed_string = f"{zodiac_sign}_{archetype}_{user_id}"
-    seed = int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16)
-    random.seed(seed)
+    rng = random.Random(int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16))
     
     # Base geometric patterns for zodiac signs
     zodiac_patterns = {
@@ -46,7 +62,7 @@ def generate_base_sigil(zodiac_sign: str, archetype: str, user_id: str) -> Dict[
     modifier = archetype_modifiers.get(archetype.lower(), archetype_modifiers['mystic'])
     
     # Generate geometric points
-    points = generate_sigil_geometry(pattern, modifier)
+    points = generate_sigil_geometry(pattern, modifier, rng)
     
     # Generate connecting strokes
     strokes = generate_connecting_strokes(points, pattern, modifier)
@@ -69,8 +85,10 @@ def generate_base_sigil(zodiac_sign: str, archetype: str, user_id: str) -> Dict[
         }
     }
 
-def generate_sigil_geometry(pattern: Dict, modifier: Dict) -> List[Tuple[float, float]]:
+def generate_sigil_geometry(pattern: Dict, modifier: Dict,
+                            rng: Optional[random.Random] = None) -> List[Tuple[float, float]]:
     """Generate the core geometric points for the sigil"""
+    rng = rng or rng_for()
     sides = pattern['sides']
     base_angle = math.radians(pattern['base_angle'] + modifier['rotation'])
     
@@ -82,7 +100,7 @@ def generate_sigil_geometry(pattern: Dict, modifier: Dict) -> List[Tuple[float,
         angle = base_angle + (2 * math.pi * i / sides)
         
         # Add some variation based on archetype
-        radius_variation = 1 + (random.random() - 0.5) * 0.3 * modifier['inner_complexity']
+        radius_variation = 1 + (rng.random() - 0.5) * 0.3 * modifier['inner_complexity']
         radius = base_radius * radius_variation
         
         x = center_x + radius * math.cos(angle)
@@ -186,6 +204,7 @@ def get_connection_style(symmetry: str) -> str:
 def generate_sigil_variations(base_sigil: Dict[str, Any], count: int = 3) -> List[Dict[str, Any]]:
     """Generate multiple variations of a base sigil for user selection"""
     variations = [base_sigil]  # Include original
+    rng = rng_for(base_sigil['id'], 'variations')
     
     for i in range(count - 1):
         variation = base_sigil.copy()
@@ -196,8 +215,8 @@ def generate_sigil_variations(base_sigil: Dict[str, Any], count: int = 3) -> Lis
         for point in base_sigil['points']:
             x, y = point
             # Small random offset
-            x += (random.random() - 0.5) * 10
-            y += (random.random() - 0.5) * 10
+            x += (rng.random() - 0.5) * 10
+            y += (rng.random() - 0.5) * 10
             varied_points.append((x, y))
         
         variation['points'] = varied_points
@@ -0,0 +1,341 @@
+"""
+Multi-node Socket.IO fan-out for STAR
+Every emit reaches this node's clients directly and is published once, with
+all of its target rooms, on a shared Redis channel; the other nodes re-emit
+it to the rooms they host. Room membership (room -> hosting nodes) and the
+connected-socket registry live in Redis, so a publish nobody else needs is
+skipped and any worker can count clients. Each node keeps a heartbeat key
+alive; entries left behind by a node whose heartbeat expired are reaped, and
+a node that finds its own heartbeat lapsed re-registers what it still hosts
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+try:
+    from redis_utils import get_redis
+except ImportError:
+    get_redis = None
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CHANNEL = 'socketio:fanout'
+ROOM_KEY = 'socketio:room:{}'        # set of node ids with members in the room
+SOCKETS_KEY = 'socketio:sockets'     # hash sid -> {"node", "connected_at"}
+ROOMS_KEY = 'socketio:rooms'         # set of rooms with a ROOM_KEY entry, for reaping
+NODE_KEY = 'socketio:node:{}'        # heartbeat; expires when the node stops refreshing it
+LISTEN_POLL_TIMEOUT = 1.0            # seconds the listener blocks before checking for stop
+HEARTBEAT_INTERVAL = 10.0
+HEARTBEAT_TTL = 30                   # seconds without a heartbeat before a node counts as dead
+REAP_INTERVAL = 60.0
+
+Rooms = Optional[Union[str, Iterable[str]]]
+
+
+class SocketFanout:
+    """Local room bookkeeping plus Redis pub/sub delivery to the other nodes"""
+
+    def __init__(self, socketio, redis_manager=None, node_id: Optional[str] = None):
+        self.socketio = socketio
+        self.redis = redis_manager
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self.sockets: Dict[str, Dict[str, Any]] = {}  # sid -> {'connected_at', 'rooms'}
+        self.rooms: Dict[str, Set[str]] = {}          # room -> local sids
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._next_beat = 0.0
+        self._lapsed = False  # re-register on the next beat (a reap may have removed our entries)
+        self._next_reap = 0.0
+        self.published = 0
+        self.skipped = 0
+        self.received = 0
+        self.reaped = 0
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.client is not None
+
+    # Membership
+
+    def connect(self, sid: str) -> None:
+        """Register a newly connected socket"""
+        connected_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self.sockets[sid] = {'connected_at': connected_at, 'rooms': set()}
+        if self._use_redis():
+            self.redis.hset(SOCKETS_KEY, sid, json.dumps({'node': self.node_id, 'connected_at': connected_at}))
+            self._ensure_listener()
+
+    def disconnect(self, sid: str) -> None:
+        """Forget a socket and every room it was in"""
+        with self._lock:
+            info = self.sockets.pop(sid, None)
+            vacated = [room for room in (info['rooms'] if info else ()) if self._drop(sid, room)]
+        if self._use_redis():
+            self.redis.hdel(SOCKETS_KEY, sid)
+            for room in vacated:
+                self.redis.srem(ROOM_KEY.format(room), self.node_id)
+
+    def join(self, sid: str, room: str) -> None:
+        """Record room membership; the first local member advertises this node for the room"""
+        with self._lock:
+            members = self.rooms.setdefault(room, set())
+            first = not members
+            members.add(sid)
+            self.sockets.setdefault(sid, {'connected_at': None, 'rooms': set()})['rooms'].add(room)
+        if first and self._use_redis():
+            self.redis.sadd(ROOM_KEY.format(room), self.node_id)
+            self.redis.sadd(ROOMS_KEY, room)
+            self._ensure_listener()
+
+    def leave(self, sid: str, room: str) -> None:
+        """Drop room membership; the last local member withdraws this node"""
+        with self._lock:
+            info = self.sockets.get(sid)
+            if info:
+                info['rooms'].discard(room)
+            vacated = self._drop(sid, room)
+        if vacated and self._use_redis():
+            self.redis.srem(ROOM_KEY.format(room), self.node_id)
+
+    def _drop(self, sid: str, room: str) -> bool:
+        """Remove sid from a local room; True when this node no longer hosts the room"""
+        members = self.rooms.get(room)
+        if not members or sid not in members:
+            return False
+        members.discard(sid)
+        if members:
+            return False
+        del self.rooms[room]
+        return True
+
+    def rooms_of(self, sid: str) -> List[str]:
+        with self._lock:
+            info = self.sockets.get(sid)
+            return sorted(info['rooms']) if info else []
+
+    def connected_count(self) -> int:
+        """Connected sockets across all nodes (this node's only without Redis)"""
+        if self._use_redis():
+            count = self.redis.hlen(SOCKETS_KEY)
+            if count is not None:
+                return count
+        with self._lock:
+            return len(self.sockets)
+
+    # Delivery
+
+    def emit(self, event: str, data: Any, rooms: Rooms = None, skip_sid: Optional[Union[str, List[str]]] = None) -> None:
+        """Emit to rooms (every client when None) on all nodes with a single publish"""
+        if isinstance(rooms, str):
+            rooms = [rooms]
+        elif rooms is not None:
+            rooms = list(dict.fromkeys(rooms))
+        self._emit_local(event, data, rooms, skip_sid)
+
+        if not self._use_redis():
+            return
+        if rooms is not None:
+            hosts = self.redis.sunion(ROOM_KEY.format(room) for room in rooms)
+            if hosts is not None and not hosts - {self.node_id}:
+                self.skipped += 1
+                return
+        message = {'origin': self.node_id, 'event': event, 'data': data, 'rooms': rooms, 'skip_sid': skip_sid}
+        self.redis.publish(FANOUT_CHANNEL, json.dumps(message, default=str))
+        self.published += 1
+
+    def deliver(self, raw: str) -> bool:
+        """Re-emit a message published by another node to the rooms hosted here"""
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Dropping malformed fan-out message: {e}")
+            return False
+        if message.get('origin') == self.node_id:
+            return False
+
+        rooms = message.get('rooms')
+        if rooms is not None:
+            with self._lock:
+                rooms = [room for room in rooms if room in self.rooms]
+            if not rooms:
+                return False
+        self.received += 1
+        self._emit_local(message['event'], message.get('data'), rooms, message.get('skip_sid'))
+        return True
+
+    def _emit_local(self, event: str, data: Any, rooms: Optional[List[str]], skip_sid) -> None:
+        if rooms is None:
+            self.socketio.emit(event, data, skip_sid=skip_sid)
+        elif rooms:
+            # A client in several target rooms receives the event once
+            self.socketio.emit(event, data, to=rooms, skip_sid=skip_sid)
+
+    # Listener
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None and not self._stopped.is_set():
+                self._listener = threading.Thread(target=self._listen, name='socket-fanout', daemon=True)
+                self._listener.start()
+
+    def _listen(self) -> None:
+        self.heartbeat()
+        pubsub = self.redis.pubsub()
+        if pubsub is None:
+            return
+        try:
+            pubsub.subscribe(FANOUT_CHANNEL)
+            while not self._stopped.is_set():
+                self._housekeeping()
+                try:
+                    message = pubsub.get_message(timeout=LISTEN_POLL_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f"Socket fan-out listener error: {e}")
+                    self._stopped.wait(LISTEN_POLL_TIMEOUT)
+                    continue
+                if message and message.get('type') == 'message':
+                    self.deliver(message['data'])
+        finally:
+            pubsub.close()
+
+    # Liveness
+
+    def heartbeat(self) -> None:
+        """Refresh this node's heartbeat key, re-registering local sockets and rooms if it had lapsed"""
+        key = NODE_KEY.format(self.node_id)
+        present = self.redis.exists_many([key])
+        beat = self.redis.set(key, datetime.now(timezone.utc).isoformat(), ex=HEARTBEAT_TTL)
+        self._next_beat = time.monotonic() + HEARTBEAT_INTERVAL
+        if not beat:
+            self._lapsed = True
+            return
+        missing = not (present and present[0])
+        if self._lapsed or missing:
+            self.reassert()
+        # A peer's reap that read the lapse before this beat can still land after it; repeat once
+        self._lapsed = missing
+
+    def reassert(self) -> None:
+        """Write every local socket and room back to the shared registry"""
+        with self._lock:
+            sockets = {sid: json.dumps({'node': self.node_id, 'connected_at': info['connected_at']})
+                       for sid, info in self.sockets.items() if info['connected_at']}
+            rooms = list(self.rooms)
+        self.redis.hset_many(SOCKETS_KEY, sockets)
+        for room in rooms:
+            self.redis.sadd(ROOM_KEY.format(room), self.node_id)
+        if rooms:
+            self.redis.sadd(ROOMS_KEY, *rooms)
+
+    def _housekeeping(self) -> None:
+        now = time.monotonic()
+        if now >= self._next_beat:
+            self.heartbeat()
+        if now >= self._next_reap:
+            self._next_reap = now + REAP_INTERVAL
+            try:
+                self.reap()
+            except Exception as e:
+                logger.warning(f"Socket fan-out reaping failed: {e}")
+
+    def alive_nodes(self, nodes: Iterable[str]) -> Optional[Set[str]]:
+        """The given nodes whose heartbeat is current; None if Redis cannot tell"""
+        if not self._use_redis():
+            return None
+        nodes = [node for node in set(nodes) if node != self.node_id]
+        found = self.redis.exists_many(NODE_KEY.format(node) for node in nodes)
+        if found is None:
+            return None
+        return {self.node_id} | {node for node, alive in zip(nodes, found) if alive}
+
+    def reap(self) -> int:
+        """Remove socket and room entries of nodes whose heartbeat expired; returns entries removed"""
+        if not self._use_redis():
+            return 0
+        sockets = self.redis.hgetall_many([SOCKETS_KEY])
+        rooms = sorted(self.redis.sunion([ROOMS_KEY]) or ())
+        hosts = self.redis.smembers_many(ROOM_KEY.format(room) for room in rooms) if rooms else []
+        if sockets is None or hosts is None:
+            return 0
+
+        owners = {}
+        for sid, raw in sockets[0].items():
+            try:
+                owners[sid] = json.loads(raw).get('node')
+            except (TypeError, ValueError, AttributeError):
+                owners[sid] = None
+        alive = self.alive_nodes([node for node in owners.values() if node]
+                                 + [node for members in hosts for node in members])
+        if alive is None:
+            return 0  # never reap on a failed liveness check
+
+        removed = 0
+        dead_sids = [sid for sid, node in owners.items() if node not in alive]
+        if dead_sids:
+            self.redis.hdel(SOCKETS_KEY, *dead_sids)
+            removed += len(dead_sids)
+        for room, members in zip(rooms, hosts):
+            dead = members - alive
+            if dead:
+                self.redis.srem(ROOM_KEY.format(room), *dead)
+                removed += len(dead)
+            if not members - dead:
+                self.redis.srem(ROOMS_KEY, room)
+        self.reaped += removed
+        if removed:
+            logger.info(f"Reaped {removed} socket/room entries of stopped nodes")
+        return removed
+
+    def stop(self) -> None:
+        """Stop listening and withdraw this node's sockets and rooms from Redis"""
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.join(timeout=LISTEN_POLL_TIMEOUT * 2)
+        if self._use_redis():
+            with self._lock:
+                sids, rooms = list(self.sockets), list(self.rooms)
+            if sids:
+                self.redis.hdel(SOCKETS_KEY, *sids)
+            for room in rooms:
+                self.redis.srem(ROOM_KEY.format(room), self.node_id)
+            self.redis.delete(NODE_KEY.format(self.node_id))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            local_sockets, local_rooms = len(self.sockets), len(self.rooms)
+        return {
+            'node_id': self.node_id,
+            'redis': self._use_redis(),
+            'local_sockets': local_sockets,
+            'local_rooms': local_rooms,
+            'published': self.published,
+            'skipped': self.skipped,
+            'received': self.received,
+            'reaped': self.reaped
+        }
+
+
+# Global fan-out for the process's SocketIO server
+_socket_fanout: Optional[SocketFanout] = None
+
+
+def init_socket_fanout(socketio) -> SocketFanout:
+    """Fan-out for this SocketIO server (created once per process)"""
+    global _socket_fanout
+    if _socket_fanout is None or _socket_fanout.socketio is not socketio:
+        _socket_fanout = SocketFanout(socketio, get_redis() if get_redis else None)
+        atexit.register(_socket_fanout.stop)
+    return _socket_fanout
+
+
+def get_socket_fanout() -> Optional[SocketFanout]:
+    return _socket_fanout
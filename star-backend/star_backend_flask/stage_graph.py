@@ -0,0 +1,276 @@
+"""
+Dependency-graph execution for multi-stage STAR computations
+Stages declare the stages they depend on; every stage whose dependencies
+are done runs on a shared bounded worker pool as soon as a worker is free,
+so a request takes as long as its critical path instead of the sum of its
+stages. Stages are only handed to the pool when a worker slot is free, so
+they never sit in the pool queue; each stage's timeout starts when it
+begins running, a failed or timed-out stage only takes down the stages
+that depend on it, and per-stage timings are aggregated for stats
+"""
+
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+STAGE_POOL_WORKERS = 32
+STAGE_DEFAULT_TIMEOUT = 10.0     # seconds a stage may run before its result is abandoned
+STAGE_QUEUE_TIMEOUT = 30.0       # seconds a ready stage may wait for a free worker
+STAGE_SLOT_POLL = 0.02           # how often a run blocked on worker slots re-checks
+
+
+class StageGraphError(ValueError):
+    """A stage graph that cannot be executed (unknown dependency or cycle)"""
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A unit of work; ``fn`` receives the results of ``deps`` as keyword arguments"""
+    name: str
+    fn: Callable[..., Any]
+    deps: Sequence[str] = ()
+    timeout: float = STAGE_DEFAULT_TIMEOUT
+
+
+@dataclass
+class StageRun:
+    """Outcome of one graph execution"""
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)   # stage -> milliseconds
+    wall_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+
+class StageGraph:
+    """A validated, immutable set of stages in dependency order"""
+
+    def __init__(self, stages: Sequence[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise StageGraphError("Duplicate stage names")
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise StageGraphError(f"Stage {stage.name} depends on unknown stages {missing}")
+        self.order = self._topological_order()
+        self.dependents: Dict[str, List[str]] = {name: [] for name in self.stages}
+        for stage in stages:
+            for dep in stage.deps:
+                self.dependents[dep].append(stage.name)
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}   # 1 = visiting, 2 = done
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise StageGraphError(f"Stage dependency cycle through {name}")
+            state[name] = 1
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+
+class StageTimings:
+    """Thread-safe per-stage latency aggregates"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, run: StageRun, graph_name: str = 'graph') -> None:
+        with self._lock:
+            for name, elapsed in list(run.timings.items()) + [(graph_name, run.wall_ms)]:
+                stats = self._stats.setdefault(name, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stats['count'] += 1
+                stats['total_ms'] += elapsed
+                stats['max_ms'] = max(stats['max_ms'], elapsed)
+                stats['last_ms'] = elapsed
+            for name in run.errors:
+                stats = self._stats.setdefault(name, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stats['errors'] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    'count': int(stats['count']),
+                    'errors': int(stats['errors']),
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 2) if stats['count'] else 0.0,
+                    'max_ms': round(stats['max_ms'], 2),
+                    'last_ms': round(stats.get('last_ms', 0.0), 2)
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+class StageExecutor:
+    """Runs stage graphs on a bounded thread pool
+
+    A worker slot is taken when a stage is handed to the pool and given
+    back only when its function returns, including stages whose result was
+    abandoned after a timeout, so the slot count always matches the busy
+    workers and a submitted stage starts immediately.
+    """
+
+    def __init__(self, max_workers: int = STAGE_POOL_WORKERS, queue_timeout: float = STAGE_QUEUE_TIMEOUT):
+        self.max_workers = max_workers
+        self.queue_timeout = queue_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+        self._free = max_workers
+        self._slots = threading.Condition()
+
+    def _acquire_slot(self) -> bool:
+        with self._slots:
+            if self._free <= 0:
+                return False
+            self._free -= 1
+            return True
+
+    def _release_slot(self) -> None:
+        with self._slots:
+            self._free += 1
+            self._slots.notify_all()
+
+    def _wait_for_slot(self, timeout: float) -> None:
+        with self._slots:
+            if self._free <= 0:
+                self._slots.wait(timeout)
+
+    def _call(self, fn: Callable[..., Any], kwargs: Dict[str, Any], started: Dict[str, float], name: str) -> Any:
+        started[name] = time.perf_counter()
+        try:
+            return fn(**kwargs)
+        finally:
+            self._release_slot()
+
+    def run(self, graph: StageGraph) -> StageRun:
+        """Execute every stage as soon as its dependencies have results"""
+        run = StageRun()
+        for _ in self.stream(graph, run):
+            pass
+        return run
+
+    def stream(self, graph: StageGraph, run: Optional[StageRun] = None) -> Iterator[str]:
+        """Execute ``graph``, yielding each stage name as it finishes or fails
+
+        Results and errors accumulate on ``run`` so a consumer can emit each
+        stage the moment it lands; ``wall_ms`` is set once the graph is done.
+        """
+        run = run if run is not None else StageRun()
+        started = time.perf_counter()
+        finished: List[str] = []
+        pending = set(graph.order)
+        running: Dict[Future, str] = {}
+        submitted: Dict[str, float] = {}
+        starts: Dict[str, float] = {}    # written by the worker when the stage begins
+        ready_since: Dict[str, float] = {}
+
+        def skip(name: str, reason: str) -> None:
+            # A stage that cannot run takes its dependents with it
+            if name not in pending:
+                return
+            pending.discard(name)
+            ready_since.pop(name, None)
+            run.errors[name] = reason
+            finished.append(name)
+            for dependent in graph.dependents[name]:
+                skip(dependent, f"dependency {name} failed")
+
+        def launch_ready() -> None:
+            now = time.perf_counter()
+            for name in graph.order:
+                stage = graph.stages[name]
+                if name in pending and name not in submitted and all(dep in run.results for dep in stage.deps):
+                    ready_since.setdefault(name, now)
+                    if not self._acquire_slot():
+                        continue
+                    ready_since.pop(name)
+                    kwargs = {dep: run.results[dep] for dep in stage.deps}
+                    submitted[name] = time.perf_counter()
+                    running[self._pool.submit(self._call, stage.fn, kwargs, starts, name)] = name
+
+        def deadline(name: str) -> float:
+            return starts.get(name, submitted[name]) + graph.stages[name].timeout
+
+        launch_ready()
+        while running or ready_since:
+            timeout = min([deadline(name) for name in running.values()], default=time.perf_counter() + 1.0)
+            timeout = max(0.0, timeout - time.perf_counter())
+            if ready_since:
+                timeout = min(timeout, STAGE_SLOT_POLL)
+            if running:
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                done = set()
+                self._wait_for_slot(timeout)
+            now = time.perf_counter()
+            for future in done:
+                name = running.pop(future)
+                run.timings[name] = (now - starts.get(name, submitted[name])) * 1000
+                try:
+                    run.results[name] = future.result()
+                    pending.discard(name)
+                    finished.append(name)
+                except Exception as e:
+                    logger.error(f"Stage {name} failed: {e}")
+                    skip(name, f"{type(e).__name__}: {e}")
+            for future, name in list(running.items()):
+                if now >= deadline(name):
+                    # The worker cannot be interrupted; its result is simply discarded
+                    running.pop(future)
+                    run.timings[name] = (now - starts.get(name, submitted[name])) * 1000
+                    logger.warning(f"Stage {name} timed out after {graph.stages[name].timeout}s")
+                    skip(name, f"timed out after {graph.stages[name].timeout}s")
+            for name, since in list(ready_since.items()):
+                if now - since >= self.queue_timeout:
+                    logger.warning(f"Stage {name} found no free worker within {self.queue_timeout}s")
+                    skip(name, f"no free worker within {self.queue_timeout}s")
+            launch_ready()
+            while finished:
+                yield finished.pop(0)
+
+        run.wall_ms = (time.perf_counter() - started) * 1000
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._slots:
+            return {'workers': self.max_workers, 'busy': self.max_workers - self._free}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global executor instance
+_stage_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_stage_executor() -> StageExecutor:
+    """Get global StageExecutor instance"""
+    global _stage_executor
+    if _stage_executor is None:
+        with _executor_lock:
+            if _stage_executor is None:
+                _stage_executor = StageExecutor()
+                atexit.register(_stage_executor.shutdown)
+    return _stage_executor
@@ -2,7 +2,23 @@ from datetime import datetime, timedelta, timezone
 from functools import wraps
 
 import jwt
+from auth_cache import get_principal
 from flask import current_app, request
+from presence import get_presence_tracker
+
+
+class DatabaseUnavailable(Exception):
+    """The users table could not be reached"""
+
+
+def _fetch_user(user_id):
+    """Load a user row by id"""
+    from database_utils import get_users_container
+    users_table = get_users_container()
+    if not users_table:
+        raise DatabaseUnavailable()
+    result = users_table.select('*').eq('id', user_id).execute()
+    return result.data[0] if result.data else None
 
 
 def token_required(f):
@@ -19,24 +35,19 @@ def token_required(f):
         try:
             token = request.headers['Authorization'].split(' ')[1]
             data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=[app.config.get('JWT_ALGORITHM', 'HS256')])
-            # Get user from database using utilities
-            from .database_utils import (get_users_container,
-                                         update_user_online_status)
-            users_table = get_users_container()
-            if not users_table:
-                return {'error': 'Database not available'}, 500
-                
-            result = users_table.select('*').eq('id', str(data['user_id'])).execute()
-            if not result.data:
+            # Get user from the principal cache, falling back to the database
+            user_data = get_principal(data['user_id'], data.get('exp'), _fetch_user)
+            if not user_data:
                 return {'error': 'User not found'}, 401
-            user_data = result.data[0]
             current_user = type('User', (), {'id': user_data['id'], 'username': user_data.get('username'), 'zodiac_sign': user_data.get('zodiac_sign')})
-            # Update last seen
-            update_user_online_status(current_user.username, True)
+            # Update last seen (written in bulk by the presence flusher)
+            get_presence_tracker().touch(current_user.id)
         except jwt.ExpiredSignatureError:
             return {'error': 'Token has expired'}, 401
         except jwt.InvalidTokenError:
             return {'error': 'Token is invalid'}, 401
+        except DatabaseUnavailable:
+            return {'error': 'Database not available'}, 500
         except Exception as e:
             # Avoid importing logger here to keep module minimal; rely on app logging
             print(f"Token validation error: {e}")
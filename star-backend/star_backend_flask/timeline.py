@@ -0,0 +1,207 @@
+"""
+Home timeline store for the STAR social feed
+Fan-out-on-write per-follower timelines with a pull-on-read fallback
+for high-follower accounts
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from cache_utils import TTLCache
+
+try:
+    from redis_utils import get_redis
+except ImportError:  # redis client not installed; timelines stay in-process
+    get_redis = None
+
+logger = logging.getLogger(__name__)
+
+# Timeline tuning
+TIMELINE_MAX_LENGTH = 800          # entries kept per follower timeline
+FANOUT_FOLLOWER_LIMIT = 5000       # authors above this are served pull-on-read
+FOLLOWING_CACHE_TTL = 60           # seconds to remember who a reader follows
+FOLLOWING_CACHE_SIZE = 10000       # readers whose follow lists are kept
+PULL_AUTHORS_REFRESH = 5           # seconds between re-reads of the shared pull-author set
+TIMELINE_KEY_PREFIX = "timeline:"
+PULL_AUTHORS_KEY = "timeline:pull_authors"
+
+# Fields copied into timeline entries; enough to render a feed card
+TIMELINE_ENTRY_FIELDS = ('id', 'user_id', 'content', 'timestamp')
+
+
+class TimelineStore:
+    """Per-follower home timelines backed by Redis lists, with an in-memory fallback"""
+
+    def __init__(self, redis_manager=None, max_length: int = TIMELINE_MAX_LENGTH,
+                 fanout_limit: int = FANOUT_FOLLOWER_LIMIT):
+        self.redis = redis_manager
+        self.max_length = max_length
+        self.fanout_limit = fanout_limit
+        self._timelines: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.max_length))
+        self._pull_authors: Set[str] = set()  # local copy; Redis holds the set shared by all workers
+        self._pull_authors_read_at = float('-inf')
+        self._following_cache = TTLCache(maxsize=FOLLOWING_CACHE_SIZE, ttl=FOLLOWING_CACHE_TTL)
+        self._lock = threading.Lock()
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.client is not None
+
+    @staticmethod
+    def _entry(post: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce a post document to the fields stored in timelines"""
+        entry = {field: post.get(field) for field in TIMELINE_ENTRY_FIELDS}
+        if not entry['timestamp']:
+            entry['timestamp'] = post.get('created_at')
+        return entry
+
+    def push(self, user_ids: Iterable[str], post: Dict[str, Any]) -> int:
+        """Push a post onto the head of each user's timeline"""
+        user_ids = [str(uid) for uid in user_ids if uid]
+        if not user_ids:
+            return 0
+        entry = self._entry(post)
+
+        if self._use_redis():
+            # Other workers read Redis, so a post kept only in this process would be invisible to them;
+            # skip it and let readers fall back to querying
+            keys = [f"{TIMELINE_KEY_PREFIX}{uid}" for uid in user_ids]
+            if self.redis.lpush_capped(keys, json.dumps(entry), self.max_length):
+                return len(user_ids)
+            logger.warning(f"Redis timeline push failed, skipping delivery to {len(user_ids)} timelines")
+            return 0
+
+        with self._lock:
+            for uid in user_ids:
+                self._timelines[uid].appendleft(entry)
+        return len(user_ids)
+
+    def fan_out(self, post: Dict[str, Any], follower_ids: Optional[List[str]],
+                follower_count: Optional[int] = None) -> int:
+        """Deliver a new post to its author and followers.
+
+        Authors with more than ``fanout_limit`` followers are recorded as
+        pull authors instead; their posts are merged in at read time.
+        """
+        author_id = str(post.get('user_id'))
+        if follower_count is None:
+            follower_count = len(follower_ids or [])
+
+        if follower_count > self.fanout_limit:
+            self._set_pull_author(author_id, True)
+            return self.push([author_id], post)
+
+        self._set_pull_author(author_id, False)
+        return self.push([author_id] + list(follower_ids or []), post)
+
+    def _set_pull_author(self, author_id: str, pull: bool) -> None:
+        with self._lock:
+            if pull:
+                self._pull_authors.add(author_id)
+            else:
+                self._pull_authors.discard(author_id)
+        if self._use_redis():
+            # Any worker may have recorded the author, so the shared set is always updated
+            (self.redis.sadd if pull else self.redis.srem)(PULL_AUTHORS_KEY, author_id)
+
+    def pull_authors(self) -> Set[str]:
+        """Authors served pull-on-read, as recorded by any worker (re-read every few seconds)"""
+        if not self._use_redis():
+            return self._pull_authors
+        now = time.monotonic()
+        if now - self._pull_authors_read_at >= PULL_AUTHORS_REFRESH:
+            members = self.redis.smembers_many([PULL_AUTHORS_KEY])
+            if members is not None:
+                with self._lock:
+                    self._pull_authors = {m.decode() if isinstance(m, bytes) else m for m in members[0]}
+            self._pull_authors_read_at = now
+        return self._pull_authors
+
+    def read(self, user_id: str, limit: int = 20, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Read up to ``limit`` newest entries from a user's timeline, optionally older than ``before``"""
+        user_id = str(user_id)
+        # Over-read a little when paging so a cutoff does not leave the page short
+        window = self.max_length if before else limit
+
+        if self._use_redis():
+            raw = self.redis.lrange(f"{TIMELINE_KEY_PREFIX}{user_id}", 0, window - 1)
+            entries = []
+            for item in raw:
+                try:
+                    entries.append(json.loads(item))
+                except (TypeError, json.JSONDecodeError):
+                    continue
+        else:
+            with self._lock:
+                timeline = self._timelines.get(user_id)
+                entries = list(timeline)[:window] if timeline else []
+
+        if before:
+            entries = [e for e in entries if (e.get('timestamp') or '') < before]
+        return entries[:limit]
+
+    def is_pull_author(self, author_id: str) -> bool:
+        return str(author_id) in self.pull_authors()
+
+    def pull_authors_followed_by(self, user_id: str,
+                                 load_following: Callable[[str], List[str]]) -> List[str]:
+        """Return the pull authors a reader follows, caching the follow list briefly"""
+        pull_authors = self.pull_authors()
+        if not pull_authors:
+            return []
+        user_id = str(user_id)
+        following = self._following_cache.get(user_id)
+        if following is None:
+            following = {str(uid) for uid in load_following(user_id)}
+            self._following_cache.set(user_id, following)
+        return sorted(following & pull_authors)
+
+    def invalidate_following(self, user_id: str) -> None:
+        """Forget the cached follow list after a follow/unfollow"""
+        self._following_cache.delete(str(user_id))
+
+    @staticmethod
+    def merge(entries: List[Dict[str, Any]], pulled: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Merge pushed and pulled entries newest-first, dropping duplicates"""
+        seen = set()
+        merged = []
+        for entry in sorted(entries + pulled, key=lambda e: e.get('timestamp') or '', reverse=True):
+            if entry.get('id') in seen:
+                continue
+            seen.add(entry.get('id'))
+            merged.append(TimelineStore._entry(entry))
+            if len(merged) >= limit:
+                break
+        return merged
+
+
+def fan_out_post(post: Dict[str, Any], helper) -> int:
+    """Deliver a newly created post to timelines, loading followers through ``helper``
+
+    Every post-creation path calls this so no post is missing from follower
+    timelines; ``helper`` is the database helper exposing
+    ``get_followers_count`` and ``get_followers``.
+    """
+    store = get_timeline_store()
+    author_id = post['user_id']
+    follower_count = helper.get_followers_count(author_id)
+    if follower_count > store.fanout_limit:
+        # High-follower author: skip loading followers, readers pull these posts
+        return store.fan_out(post, None, follower_count)
+    follower_ids = [f['follower_id'] for f in helper.get_followers(author_id) if f.get('follower_id')]
+    return store.fan_out(post, follower_ids)
+
+
+# Global timeline store instance
+_timeline_store = None
+
+
+def get_timeline_store() -> TimelineStore:
+    """Get global TimelineStore instance"""
+    global _timeline_store
+    if _timeline_store is None:
+        _timeline_store = TimelineStore(get_redis() if get_redis else None)
+    return _timeline_store
@@ -0,0 +1,212 @@
+"""
+Per-user rolling event index for STAR analytics
+Keeps per-type counts and an hour-of-day histogram for every (user, day),
+updated incrementally as events are ingested, so interest prediction and
+recommendation tags read a handful of day buckets instead of re-scanning
+the platform's event history. Buckets live in memory and, when Redis is
+configured, in one Redis hash per user and day shared by all workers
+"""
+
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_RETENTION_DAYS = 30
+INDEX_MAX_USERS = 50000        # least recently updated users are evicted (and re-seeded on demand)
+INDEX_KEY_PREFIX = "user_events"
+TYPE_FIELD = "type:"
+HOUR_FIELD = "hour:"
+
+# (user_id, event_type, timestamp)
+IndexedEvent = Tuple[str, str, datetime]
+
+
+class DayBucket:
+    """Event counts for one user on one UTC day"""
+
+    __slots__ = ('types', 'hours')
+
+    def __init__(self):
+        self.types: Counter = Counter()
+        self.hours: List[int] = [0] * 24
+
+    def add(self, event_type: str, hour: int, count: int = 1) -> None:
+        self.types[event_type] += count
+        self.hours[hour] += count
+
+
+class UserEventIndex:
+    """Rolling per-user, per-day event aggregates"""
+
+    def __init__(self, redis_manager: Any = None, retention_days: int = INDEX_RETENTION_DAYS,
+                 max_users: int = INDEX_MAX_USERS):
+        self.redis = redis_manager
+        self.retention_days = retention_days
+        self.max_users = max_users
+        # user_id -> {day: DayBucket}; presence means the user's history has been seeded here
+        self._users: "OrderedDict[str, Dict[date, DayBucket]]" = OrderedDict()
+        self._seeding: set = set()     # users whose seed is claimed here but not yet loaded
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.seeded = 0
+        self.evicted = 0
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and self.redis.client is not None
+
+    def _day_key(self, user_id: str, day: date) -> str:
+        return f"{INDEX_KEY_PREFIX}:{user_id}:{day.isoformat()}"
+
+    def _seeded_key(self, user_id: str) -> str:
+        return f"{INDEX_KEY_PREFIX}:{user_id}:seeded"
+
+    def _ttl(self) -> int:
+        return (self.retention_days + 1) * 86400
+
+    def _user_buckets(self, user_id: str) -> Dict[date, DayBucket]:
+        """Bucket map for a user, marking them most recently used (caller holds the lock)"""
+        buckets = self._users.get(user_id)
+        if buckets is None:
+            buckets = self._users[user_id] = {}
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._users.move_to_end(user_id)
+        return buckets
+
+    def _add(self, events: Iterable[IndexedEvent]) -> None:
+        """Fold events into the in-memory buckets and mirror them to Redis"""
+        cutoff = datetime.utcnow().date() - timedelta(days=self.retention_days)
+        increments: Dict[str, Counter] = {}
+        count = 0
+        with self._lock:
+            for user_id, event_type, timestamp in events:
+                day = timestamp.date()
+                if day <= cutoff:
+                    continue
+                buckets = self._user_buckets(user_id)
+                bucket = buckets.get(day)
+                if bucket is None:
+                    bucket = buckets[day] = DayBucket()
+                    for stale in [d for d in buckets if d <= cutoff]:
+                        del buckets[stale]
+                bucket.add(event_type, timestamp.hour)
+                count += 1
+
+                fields = increments.setdefault(self._day_key(user_id, day), Counter())
+                fields[TYPE_FIELD + event_type] += 1
+                fields[HOUR_FIELD + str(timestamp.hour)] += 1
+            self.recorded += count
+
+        if increments and self._use_redis():
+            self.redis.hincrby_many({key: dict(fields) for key, fields in increments.items()}, ex=self._ttl())
+
+    def is_seeded(self, user_id: str) -> bool:
+        """Whether the user's history is already in the index (here or in Redis)"""
+        with self._lock:
+            if user_id in self._users:
+                return True
+        if self._use_redis() and self.redis.get(self._seeded_key(user_id)):
+            with self._lock:
+                self._user_buckets(user_id)
+            return True
+        return False
+
+    def claim_seed(self, user_id: str) -> bool:
+        """Claim the right to seed a user; False if they are seeded or another caller claimed them
+
+        The claim is a local set plus SET NX on the user's seeded marker, so of
+        several threads or workers seeing a new user at once only one loads and
+        counts their history. A claimer that cannot seed calls ``release_seed``.
+        """
+        with self._lock:
+            if user_id in self._users or user_id in self._seeding:
+                return False
+            self._seeding.add(user_id)
+        if self._use_redis() and self.redis.set_nx(self._seeded_key(user_id), "1", ex=self._ttl()) is False:
+            with self._lock:
+                self._seeding.discard(user_id)
+            return False
+        return True
+
+    def release_seed(self, user_id: str) -> None:
+        """Give up a claim without seeding, so a later caller can try again"""
+        with self._lock:
+            self._seeding.discard(user_id)
+        if self._use_redis():
+            self.redis.delete(self._seeded_key(user_id))
+
+    def seed(self, user_id: str, history: Iterable[Tuple[str, datetime]]) -> None:
+        """Load a user's stored events (event_type, timestamp) the first time they are seen"""
+        self._add((user_id, event_type, timestamp) for event_type, timestamp in history)
+        with self._lock:
+            self._seeding.discard(user_id)
+            self._user_buckets(user_id)
+            self.seeded += 1
+        if self._use_redis():
+            self.redis.set(self._seeded_key(user_id), "1", ex=self._ttl())
+
+    def record_many(self, events: Iterable[IndexedEvent]) -> None:
+        """Count newly ingested events"""
+        self._add(events)
+
+    def _redis_buckets(self, user_id: str, days: List[date]) -> Optional[List[DayBucket]]:
+        hashes = self.redis.hgetall_many(self._day_key(user_id, day) for day in days)
+        if hashes is None:
+            return None
+        buckets = []
+        for fields in hashes:
+            bucket = DayBucket()
+            for field, value in (fields or {}).items():
+                if field.startswith(TYPE_FIELD):
+                    bucket.types[field[len(TYPE_FIELD):]] += int(value)
+                elif field.startswith(HOUR_FIELD):
+                    bucket.hours[int(field[len(HOUR_FIELD):])] += int(value)
+            buckets.append(bucket)
+        return buckets
+
+    def summary(self, user_id: str, days: int = 7, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Event counts, hour histogram and total over the last `days` UTC days (today included)"""
+        today = (now or datetime.utcnow()).date()
+        window = [today - timedelta(days=offset) for offset in range(min(days, self.retention_days))]
+
+        buckets = self._redis_buckets(user_id, window) if self._use_redis() else None
+        if buckets is None:
+            with self._lock:
+                stored = self._users.get(user_id, {})
+                buckets = [stored[day] for day in window if day in stored]
+
+        event_counts: Counter = Counter()
+        hour_histogram = [0] * 24
+        for bucket in buckets:
+            event_counts.update(bucket.types)
+            for hour, count in enumerate(bucket.hours):
+                hour_histogram[hour] += count
+
+        return {
+            'event_counts': event_counts,
+            'hour_histogram': hour_histogram,
+            'total': sum(event_counts.values())
+        }
+
+    @staticmethod
+    def active_hours(hour_histogram: List[int]) -> List[int]:
+        """Hours with any activity, busiest first"""
+        return sorted((hour for hour, count in enumerate(hour_histogram) if count),
+                      key=lambda hour: (-hour_histogram[hour], hour))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'day_buckets': sum(len(buckets) for buckets in self._users.values()),
+                'recorded': self.recorded,
+                'seeded': self.seeded,
+                'evicted': self.evicted,
+                'redis_enabled': self._use_redis()
+            }
@@ -0,0 +1,110 @@
+"""
+Batched user loading for STAR API responses
+DataLoader-style request-scoped loader backed by a shared per-process
+LRU of hot author profiles
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from cache_utils import TTLCache
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_SIZE = 5000
+USER_CACHE_TTL = 60  # seconds a hot profile may be served without a DB read
+
+# Shared by every loader in the process, keyed by (namespace, user_id)
+user_profile_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_namespaces = set()
+
+BatchFn = Callable[[List[str]], Union[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]]
+
+
+def _supabase_batch(user_ids: List[str]) -> List[Dict[str, Any]]:
+    """Default batch function: one ``in_`` query through SupabaseDBHelper"""
+    from cosmos_db import get_cosmos_helper
+    return get_cosmos_helper().get_users_by_ids(user_ids)
+
+
+class UserLoader:
+    """Collects user IDs needed for a response and resolves them in one batch.
+
+    Results are memoized for the loader's lifetime (one request) and
+    written through to the shared profile cache.
+    """
+
+    def __init__(self, batch_fn: Optional[BatchFn] = None, namespace: str = 'users',
+                 cache: Optional[TTLCache] = None):
+        self.batch_fn = batch_fn or _supabase_batch
+        self.namespace = namespace
+        _namespaces.add(namespace)
+        self.cache = user_profile_cache if cache is None else cache
+        self._memo: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending = set()
+        self.batches = 0
+
+    def prime(self, user_ids: Iterable[Any]) -> None:
+        """Queue user IDs to be fetched on the next dispatch"""
+        for user_id in user_ids:
+            if user_id is not None and str(user_id) not in self._memo:
+                self._pending.add(str(user_id))
+
+    def dispatch(self) -> None:
+        """Resolve all queued IDs: shared cache first, then one batched query"""
+        pending, self._pending = self._pending, set()
+        if not pending:
+            return
+
+        cached = self.cache.get_many((self.namespace, uid) for uid in pending)
+        for (_, uid), user in cached.items():
+            self._memo[uid] = user
+
+        missing = [uid for uid in pending if uid not in self._memo]
+        if not missing:
+            return
+
+        self.batches += 1
+        try:
+            result = self.batch_fn(missing)
+        except Exception as e:
+            logger.error(f"Batched user load failed: {e}")
+            result = {}
+        if isinstance(result, list):
+            result = {str(user['id']): user for user in result if user.get('id') is not None}
+
+        for uid in missing:
+            user = result.get(uid)
+            self._memo[uid] = user
+            if user:
+                self.cache.set((self.namespace, uid), user)
+
+    def load_many(self, user_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Get users keyed by ID; unknown IDs are omitted"""
+        user_ids = [str(uid) for uid in user_ids if uid is not None]
+        self.prime(user_ids)
+        self.dispatch()
+        return {uid: self._memo[uid] for uid in user_ids if self._memo.get(uid)}
+
+    def load(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        """Get a single user, batching with anything already queued"""
+        if user_id is None:
+            return None
+        return self.load_many([user_id]).get(str(user_id))
+
+
+def get_user_loader(batch_fn: Optional[BatchFn] = None, namespace: str = 'users') -> UserLoader:
+    """Get the UserLoader for the current request (a fresh one outside a request)"""
+    if not has_request_context():
+        return UserLoader(batch_fn, namespace)
+    loaders = g.setdefault('_user_loaders', {})
+    if namespace not in loaders:
+        loaders[namespace] = UserLoader(batch_fn, namespace)
+    return loaders[namespace]
+
+
+def invalidate_user(user_id: Any) -> None:
+    """Drop a user's cached profile from every namespace after an update"""
+    for namespace in list(_namespaces):
+        user_profile_cache.delete((namespace, str(user_id)))
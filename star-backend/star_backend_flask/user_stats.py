@@ -0,0 +1,250 @@
+"""
+Materialized per-user stats for STAR profiles
+One small document per user (post/like/comment totals, follower counts and
+posting streaks) kept current by the write paths: counter fields go through
+the coalescing CounterService as atomic increments, streaks are advanced at
+most once per user per day. Profile reads never scan a user's history; a
+rebuild recomputes documents from source data when they drift or are missing
+
+Rebuild with:
+    python user_stats.py rebuild [--user USER_ID ...]
+"""
+
+import argparse
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from cache_utils import TTLCache
+from counters import COUNTER_CACHE_TTL, CounterService, get_counter_service
+
+logger = logging.getLogger(__name__)
+
+USER_STATS_SCOPE = 'user_stats'
+USER_STATS_CACHE_SIZE = 20000
+COUNTER_FIELDS = ('post_count', 'total_likes', 'total_comments', 'followers_count', 'following_count')
+
+# A backend stores the documents and can scan source data for rebuilds:
+#   read(user_id) -> Optional[dict]
+#   increment(user_id, {field: delta}) -> bool   (False when the document is missing)
+#   set_fields(user_id, {field: value}) -> None
+#   replace(doc) -> None
+#   scan(user_id) -> {'posts': [{'likes', 'comments', 'created_at'}], 'followers_count', 'following_count'}
+#   user_ids() -> Iterable[str]
+
+
+def _day(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+        except ValueError:
+            return None
+    return None
+
+
+def streaks(active_days: Iterable[date]) -> Dict[str, Any]:
+    """Current (ending on the last active day) and longest runs of consecutive days"""
+    days = sorted(set(active_days))
+    if not days:
+        return {'current_streak': 0, 'longest_streak': 0, 'last_active_date': None}
+    longest = run = 1
+    for previous, day in zip(days, days[1:]):
+        run = run + 1 if day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+    return {'current_streak': run, 'longest_streak': longest, 'last_active_date': days[-1].isoformat()}
+
+
+def advance_streak(stats: Dict[str, Any], day: date) -> Dict[str, Any]:
+    """Streak fields to set after activity on ``day``; empty when nothing changes"""
+    last = _day(stats.get('last_active_date'))
+    if last is not None and last >= day:
+        return {}
+    current = stats.get('current_streak', 0) + 1 if last == day - timedelta(days=1) else 1
+    return {
+        'current_streak': current,
+        'longest_streak': max(stats.get('longest_streak', 0), current),
+        'last_active_date': day.isoformat()
+    }
+
+
+def live_streak(stats: Dict[str, Any], today: date) -> int:
+    """A streak only counts while its last day is today or yesterday"""
+    last = _day(stats.get('last_active_date'))
+    if last is None or today - last > timedelta(days=1):
+        return 0
+    return stats.get('current_streak', 0)
+
+
+def build_stats(user_id: str, source: Dict[str, Any]) -> Dict[str, Any]:
+    """Full stats document computed from scanned source data"""
+    posts = source.get('posts', [])
+    doc = {
+        'id': user_id,
+        'user_id': user_id,
+        'post_count': len(posts),
+        'total_likes': sum(post.get('likes') or 0 for post in posts),
+        'total_comments': sum(post.get('comments') or 0 for post in posts),
+        'followers_count': source.get('followers_count', 0),
+        'following_count': source.get('following_count', 0),
+        'rebuilt_at': datetime.now(timezone.utc).isoformat()
+    }
+    doc.update(streaks(filter(None, (_day(post.get('created_at')) for post in posts))))
+    return doc
+
+
+class UserStatsProjection:
+    """Read model for profile stats, updated incrementally by write paths"""
+
+    def __init__(self, backend=None, counters: Optional[CounterService] = None):
+        self.backend = backend
+        self.counters = counters or get_counter_service()
+        self.counters.register_writer(USER_STATS_SCOPE, self._write_deltas)
+        self._docs = TTLCache(maxsize=USER_STATS_CACHE_SIZE, ttl=COUNTER_CACHE_TTL)
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def bind(self, backend) -> None:
+        self.backend = backend
+
+    # Reads
+
+    def get(self, user_id: str, today: Optional[date] = None) -> Dict[str, Any]:
+        """Stats for a profile page: one point read on a cold cache, none when warm"""
+        user_id = str(user_id)
+        fresh: Dict[str, Dict[str, Any]] = {}
+
+        def load(field):
+            if 'doc' not in fresh:
+                fresh['doc'] = self._load(user_id)
+            return fresh['doc'].get(field, 0)
+
+        stats = {field: self.counters.get(USER_STATS_SCOPE, user_id, field, lambda field=field: load(field))
+                 for field in COUNTER_FIELDS}
+        doc = fresh.get('doc') or self._doc(user_id)
+        stats['longest_streak'] = doc.get('longest_streak', 0)
+        stats['last_active_date'] = doc.get('last_active_date')
+        stats['current_streak'] = live_streak(doc, today or datetime.now(timezone.utc).date())
+        return stats
+
+    def _doc(self, user_id: str) -> Dict[str, Any]:
+        doc = self._docs.get(user_id)
+        return doc if doc is not None else self._load(user_id)
+
+    def _load(self, user_id: str) -> Dict[str, Any]:
+        if self.backend is None:
+            return {}
+        doc = self.backend.read(user_id)
+        if doc is None:
+            return self.rebuild(user_id)
+        self._docs.set(user_id, doc)
+        return doc
+
+    # Write-path hooks
+
+    def post_created(self, user_id: str, created_at: Any = None) -> None:
+        self.counters.increment(USER_STATS_SCOPE, str(user_id), 'post_count', 1)
+        self._record_activity(str(user_id), _day(created_at) or datetime.now(timezone.utc).date())
+
+    def post_liked(self, author_id: str, delta: int = 1) -> None:
+        self.counters.increment(USER_STATS_SCOPE, str(author_id), 'total_likes', delta)
+
+    def comment_added(self, author_id: str, delta: int = 1) -> None:
+        self.counters.increment(USER_STATS_SCOPE, str(author_id), 'total_comments', delta)
+
+    def follow_changed(self, follower_id: str, followed_id: str, delta: int = 1) -> None:
+        self.counters.increment(USER_STATS_SCOPE, str(follower_id), 'following_count', delta)
+        self.counters.increment(USER_STATS_SCOPE, str(followed_id), 'followers_count', delta)
+
+    def _record_activity(self, user_id: str, day: date) -> None:
+        if self.backend is None:
+            return
+        with self._lock:
+            doc = self._doc(user_id)
+            changes = advance_streak(doc, day)
+            if not changes:
+                return
+            doc.update(changes)
+        try:
+            self.backend.set_fields(user_id, changes)
+        except Exception as e:
+            logger.error(f"Streak update failed for user {user_id}: {e}")
+
+    def _write_deltas(self, user_id: str, deltas: Dict[str, int]) -> None:
+        if self.backend is None:
+            return
+        if not self.backend.increment(user_id, deltas):
+            # No document yet: the rebuild already reflects these writes
+            self.rebuild(user_id)
+
+    # Rebuild
+
+    def rebuild(self, user_id: str) -> Dict[str, Any]:
+        """Recompute a user's document from source data and replace it
+
+        Queued deltas describe writes the scan already sees, so they are
+        discarded. This user's deltas are held back until the replacement
+        lands, so none is written to the document it overwrites; other
+        users keep flushing during the scan.
+        """
+        user_id = str(user_id)
+        with self.counters.held(USER_STATS_SCOPE, user_id):
+            self.counters.discard(USER_STATS_SCOPE, user_id)
+            doc = build_stats(user_id, self.backend.scan(user_id))
+            self.backend.replace(doc)
+        self._docs.set(user_id, doc)
+        self.counters.forget(USER_STATS_SCOPE, user_id, COUNTER_FIELDS)
+        self.rebuilds += 1
+        return doc
+
+    def rebuild_all(self, user_ids: Optional[Iterable[str]] = None) -> int:
+        """Rebuild the given users (default: every user); returns how many succeeded"""
+        rebuilt = 0
+        for user_id in (user_ids if user_ids is not None else self.backend.user_ids()):
+            try:
+                self.rebuild(user_id)
+                rebuilt += 1
+            except Exception as e:
+                logger.error(f"User stats rebuild failed for {user_id}: {e}")
+        return rebuilt
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'cached_docs': len(self._docs), 'rebuilds': self.rebuilds, 'bound': self.backend is not None}
+
+
+# Global projection instance
+_user_stats = None
+
+
+def get_user_stats_projection() -> UserStatsProjection:
+    """Get global UserStatsProjection instance"""
+    global _user_stats
+    if _user_stats is None:
+        _user_stats = UserStatsProjection()
+    return _user_stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the materialized user stats projection")
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--user', action='append', dest='users', help="rebuild only this user (repeatable)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    import feed  # noqa: F401  (binds the Cosmos backend)
+
+    projection = get_user_stats_projection()
+    if projection.backend is None:
+        logger.error("Cosmos DB not available; nothing to rebuild")
+        return 1
+    rebuilt = projection.rebuild_all(args.users)
+    logger.info(f"Rebuilt stats for {rebuilt} users")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
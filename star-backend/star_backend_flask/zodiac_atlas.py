@@ -0,0 +1,315 @@
+"""
+Precomputed multi-zodiac day atlas for STAR
+One packed record per calendar day from 1900 to 2100 holding the Western sun
+sign, Chinese animal/element/polarity, Vedic rashi and nakshatra, and the
+Tzolkin position shared by the Mayan and Aztec day signs and tones. Every
+column is a pure function of the date, so the table is built once, memory-
+mapped at runtime, and single or bulk birthdate lookups are array indexing
+
+Built at deploy time (see the Dockerfile) with:
+    python zodiac_atlas.py
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from ephemeris import EphemerisEngine, get_ephemeris_engine
+from file_lock import locked
+
+logger = logging.getLogger(__name__)
+
+ATLAS_START = datetime.date(1900, 1, 1)
+ATLAS_END = datetime.date(2100, 12, 31)
+ATLAS_PATH = os.environ.get(
+    'ZODIAC_ATLAS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'zodiac_atlas.npy')
+)
+ATLAS_VERSION = 1
+
+ATLAS_DTYPE = np.dtype([
+    ('western', 'u1'),          # tropical sun sign at 12:00 UTC, 0 = Aries
+    ('chinese_animal', 'u1'),   # 0 = Rat
+    ('chinese_element', 'u1'),  # 0 = Wood
+    ('chinese_polarity', 'u1'), # 0 = Yang, 1 = Yin
+    ('vedic_rashi', 'u1'),      # 0 = Mesha
+    ('nakshatra', 'u1'),        # 0 = Ashwini
+    ('tzolkin', '<u2'),         # 0-259 position in the 260-day count
+    ('day_sign', 'u1'),         # 0-19, Mayan and Aztec day sign index
+    ('tone', 'u1'),             # 1-13 galactic tone / Aztec day number
+])
+
+WESTERN_SIGNS = ("Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+                 "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces")
+CHINESE_ANIMALS = ("Rat", "Ox", "Tiger", "Rabbit", "Dragon", "Snake",
+                   "Horse", "Goat", "Monkey", "Rooster", "Dog", "Pig")
+CHINESE_ELEMENTS = ("Wood", "Fire", "Earth", "Metal", "Water")
+CHINESE_POLARITIES = ("Yang", "Yin")
+VEDIC_RASHIS = ("Mesha", "Vrishabha", "Mithuna", "Karka", "Simha", "Kanya",
+                "Tula", "Vrishchika", "Dhanu", "Makara", "Kumbha", "Meena")
+VEDIC_NAKSHATRAS = (
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra",
+    "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni",
+    "Uttara Phalguni", "Hasta", "Chitra", "Swati", "Vishakha",
+    "Anuradha", "Jyeshtha", "Mula", "Purva Ashadha", "Uttara Ashadha",
+    "Shravana", "Dhanishta", "Shatabhisha", "Purva Bhadrapada",
+    "Uttara Bhadrapada", "Revati"
+)
+MAYAN_DAY_SIGNS = ("Imix", "Ik", "Akbal", "Kan", "Chicchan", "Cimi", "Manik", "Lamat",
+                   "Muluc", "Oc", "Chuen", "Eb", "Ben", "Ix", "Men", "Cib",
+                   "Caban", "Etznab", "Cauac", "Ahau")
+GALACTIC_TONES = ("Magnetic", "Lunar", "Electric", "Self-Existing", "Overtone",
+                  "Rhythmic", "Resonant", "Galactic", "Solar", "Planetary",
+                  "Spectral", "Crystal", "Cosmic")
+AZTEC_DAY_SIGNS = ("Cipactli", "Ehecatl", "Calli", "Cuetzpalin", "Coatl", "Miquiztli",
+                   "Mazatl", "Tochtli", "Atl", "Itzcuintli", "Ozomatli", "Malinalli",
+                   "Acatl", "Ocelotl", "Cuauhtli", "Cozcacuauhtli", "Ollin",
+                   "Tecpatl", "Quiahuitl", "Xochitl")
+
+TZOLKIN_CORRELATION = 584283    # GMT correlation: Maya day 0 is this many days before 1970-01-01
+CHINESE_BASE_YEAR = 1924        # a Yang Wood Rat year
+VEDIC_AYANAMSA_DAYS = 24        # simplified sidereal shift, in days of the year
+_UNIX_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_EPHEM_ORDINAL = datetime.date(1899, 12, 31).toordinal()   # ephem date 0.0 is noon on this day
+
+
+def _metadata_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _lock_path(path: str) -> str:
+    return path + '.lock'
+
+
+def _ordinal(day) -> int:
+    return (day.date() if isinstance(day, datetime.datetime) else day).toordinal()
+
+
+def day_codes(ordinals: np.ndarray, engine: Optional[EphemerisEngine] = None) -> np.ndarray:
+    """Compute atlas records for proleptic Gregorian day ordinals, vectorized"""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    days = (ordinals - _UNIX_ORDINAL).astype('datetime64[D]')
+    years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+    day_of_year = (days - days.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
+
+    codes = np.empty(len(ordinals), dtype=ATLAS_DTYPE)
+    noon = (ordinals - _EPHEM_ORDINAL).astype(float)
+    sun = (engine or get_ephemeris_engine()).longitudes_for_ephem_dates(noon, ['Sun'])[:, 0]
+    codes['western'] = np.floor(sun / 30.0).astype(np.int64) % 12
+
+    cycle = years - CHINESE_BASE_YEAR
+    codes['chinese_animal'] = cycle % 12
+    codes['chinese_element'] = (cycle % 10) // 2
+    codes['chinese_polarity'] = cycle % 2
+
+    adjusted = (day_of_year - VEDIC_AYANAMSA_DAYS) % 365
+    codes['vedic_rashi'] = (adjusted / 30.44).astype(np.int64) % 12      # ~30.44 days per rashi
+    codes['nakshatra'] = (adjusted / 13.52).astype(np.int64) % 27        # ~13.52 days per nakshatra
+
+    tzolkin = (ordinals - _UNIX_ORDINAL + TZOLKIN_CORRELATION) % 260
+    codes['tzolkin'] = tzolkin
+    codes['day_sign'] = tzolkin % 20
+    codes['tone'] = tzolkin % 13 + 1
+    return codes
+
+
+def decode(record) -> Dict:
+    """Names for one atlas record"""
+    return {
+        'western': WESTERN_SIGNS[record['western']],
+        'chinese': {
+            'animal': CHINESE_ANIMALS[record['chinese_animal']],
+            'element': CHINESE_ELEMENTS[record['chinese_element']],
+            'polarity': CHINESE_POLARITIES[record['chinese_polarity']]
+        },
+        'vedic': {
+            'rashi': VEDIC_RASHIS[record['vedic_rashi']],
+            'nakshatra': VEDIC_NAKSHATRAS[record['nakshatra']]
+        },
+        'mayan': {
+            'day_sign': MAYAN_DAY_SIGNS[record['day_sign']],
+            'tone': int(record['tone']),
+            'galactic_tone': GALACTIC_TONES[record['tone'] - 1],
+            'tzolkin_position': int(record['tzolkin']) + 1
+        },
+        'aztec': {
+            'day_sign': AZTEC_DAY_SIGNS[record['day_sign']],
+            'number': int(record['tone'])
+        }
+    }
+
+
+class ZodiacAtlas:
+    """Day-indexed table of multi-zodiac codes"""
+
+    def __init__(self, codes: np.ndarray, start: datetime.date):
+        self.codes = codes
+        self.start = start
+        self.start_ordinal = start.toordinal()
+        self.end = datetime.date.fromordinal(self.start_ordinal + len(codes) - 1)
+        self.lookups = 0
+        self.misses = 0
+
+    # ---------- construction and persistence ----------
+
+    @classmethod
+    def build(cls, start: datetime.date = ATLAS_START, end: datetime.date = ATLAS_END,
+              engine: Optional[EphemerisEngine] = None) -> 'ZodiacAtlas':
+        """Compute every day in [start, end]"""
+        ordinals = np.arange(start.toordinal(), end.toordinal() + 1, dtype=np.int64)
+        return cls(day_codes(ordinals, engine), start)
+
+    def save(self, path: str = ATLAS_PATH) -> None:
+        """Write the atlas atomically (array + JSON metadata sidecar)
+
+        Temporary files are per process; the array is swapped in before the
+        metadata, under the atlas lock that ``load`` shares.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, np.asarray(self.codes, dtype=ATLAS_DTYPE))
+        metadata = {
+            'version': ATLAS_VERSION,
+            'start': self.start.isoformat(),
+            'rows': int(len(self.codes)),
+            'generated_at': datetime.datetime.utcnow().isoformat()
+        }
+        with open(_metadata_path(tmp_path), 'w') as f:
+            json.dump(metadata, f)
+        with locked(_lock_path(path)):
+            os.replace(tmp_path, path)
+            os.replace(_metadata_path(tmp_path), _metadata_path(path))
+
+    @classmethod
+    def load(cls, path: str = ATLAS_PATH) -> Optional['ZodiacAtlas']:
+        """Memory-map a saved atlas; returns None if it is missing or stale"""
+        if not os.path.exists(path) or not os.path.exists(_metadata_path(path)):
+            return None
+        try:
+            with locked(_lock_path(path), shared=True):
+                with open(_metadata_path(path)) as f:
+                    metadata = json.load(f)
+                if metadata.get('version') != ATLAS_VERSION:
+                    return None
+                codes = np.load(path, mmap_mode='r')
+            return cls(codes, datetime.date.fromisoformat(metadata['start']))
+        except Exception as e:
+            logger.error(f"Failed to load zodiac atlas {path}: {e}")
+            return None
+
+    # ---------- lookups ----------
+
+    def covers(self, day) -> bool:
+        return 0 <= _ordinal(day) - self.start_ordinal < len(self.codes)
+
+    def lookup(self, day):
+        """Atlas record for one date (days outside the atlas are computed directly)"""
+        return self.lookup_ordinals(np.array([_ordinal(day)]))[0]
+
+    def lookup_many(self, days: Sequence) -> np.ndarray:
+        """Records for many dates at once, in order"""
+        return self.lookup_ordinals(np.fromiter((_ordinal(day) for day in days), dtype=np.int64, count=len(days)))
+
+    def lookup_ordinals(self, ordinals: np.ndarray) -> np.ndarray:
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        rows = ordinals - self.start_ordinal
+        inside = (rows >= 0) & (rows < len(self.codes))
+        self.lookups += len(ordinals)
+        if inside.all():
+            return np.asarray(self.codes[rows])
+        records = np.empty(len(ordinals), dtype=ATLAS_DTYPE)
+        records[inside] = self.codes[rows[inside]]
+        outside = ~inside
+        self.misses += int(outside.sum())
+        records[outside] = day_codes(ordinals[outside])
+        return records
+
+    def describe(self, day) -> Dict:
+        """Decoded signs for one date"""
+        return decode(self.lookup(day))
+
+    def describe_many(self, days: Sequence) -> List[Dict]:
+        return [decode(record) for record in self.lookup_many(days)]
+
+    def get_stats(self) -> Dict:
+        return {
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'days': int(len(self.codes)),
+            'bytes': int(len(self.codes) * ATLAS_DTYPE.itemsize),
+            'lookups': self.lookups,
+            'computed_outside_range': self.misses
+        }
+
+
+# ---------- global atlas ----------
+
+_zodiac_atlas: Optional[ZodiacAtlas] = None
+_warm_thread: Optional[threading.Thread] = None
+_atlas_lock = threading.Lock()
+
+# Empty atlas used until the real one is loaded: every lookup falls outside
+# it and is computed directly, which is cheap for the few dates a request needs
+_computing_atlas = ZodiacAtlas(np.empty(0, dtype=ATLAS_DTYPE), ATLAS_START)
+
+
+def build_zodiac_atlas(path: str = ATLAS_PATH) -> ZodiacAtlas:
+    """Build the full 1900-2100 atlas and persist it"""
+    atlas = ZodiacAtlas.build()
+    atlas.save(path)
+    logger.info(f"Zodiac atlas built: {atlas.start} to {atlas.end}, {len(atlas.codes)} days")
+    return ZodiacAtlas.load(path) or atlas
+
+
+def load_or_build_zodiac_atlas(path: str = ATLAS_PATH) -> ZodiacAtlas:
+    """Load the atlas, building it first if it was never generated
+
+    Workers starting together serialize on a build lock, so only the first
+    builds and the rest load its file.
+    """
+    atlas = ZodiacAtlas.load(path)
+    if atlas is not None:
+        return atlas
+    try:
+        with locked(path + '.build.lock'):
+            return ZodiacAtlas.load(path) or build_zodiac_atlas(path)
+    except OSError as e:
+        logger.warning(f"Zodiac atlas not persisted ({e}); keeping it in memory")
+        return ZodiacAtlas.build()
+
+
+def warm_zodiac_atlas() -> threading.Thread:
+    """Load (or build) the atlas in the background; called at startup"""
+    global _warm_thread
+    with _atlas_lock:
+        if _warm_thread is None:
+            def run():
+                global _zodiac_atlas
+                try:
+                    _zodiac_atlas = load_or_build_zodiac_atlas(ATLAS_PATH)
+                except Exception as e:
+                    logger.error(f"Zodiac atlas warm-up failed: {e}")
+            _warm_thread = threading.Thread(target=run, name='zodiac-atlas-warm', daemon=True)
+            _warm_thread.start()
+    return _warm_thread
+
+
+def get_zodiac_atlas() -> ZodiacAtlas:
+    """Get the memory-mapped atlas; lookups are computed directly until it has loaded"""
+    if _zodiac_atlas is not None:
+        return _zodiac_atlas
+    warm_zodiac_atlas()
+    return _computing_atlas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the precomputed multi-zodiac day atlas")
+    parser.add_argument('--path', default=ATLAS_PATH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    build_zodiac_atlas(args.path)
@@ -11,6 +11,7 @@ import pytest
 # Add paths for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'star_backend_flask'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'star_backend_flask'))
 
 # Try to import zodiac components, skip if dependencies not available
 try:
@@ -0,0 +1,164 @@
+"""
+Tests for the AI interpretation gateway
+"""
+
+import threading
+import time
+
+import pytest
+
+from ai_gateway import AIGateway, AIGatewayBusy, AIGatewayTimeout, StubAIClient, fingerprint, load_test
+
+
+class GatedClient:
+    """Client whose calls block until released, tracking peak concurrency"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.release.wait(2)
+        with self._lock:
+            self.active -= 1
+        return f"answer to {prompt}"
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+class TestFingerprint:
+    """Canonical request keys"""
+
+    def test_key_ignores_dict_order(self):
+        assert fingerprint('t', {'a': 1, 'b': [1, 2]}) == fingerprint('t', {'b': [1, 2], 'a': 1})
+        assert fingerprint('t', {'a': 1}) != fingerprint('u', {'a': 1})
+
+
+class TestAIGateway:
+    """Caching, singleflight and the concurrency limit"""
+
+    def test_repeat_requests_are_cached(self):
+        client = StubAIClient()
+        gateway = AIGateway(client)
+
+        first = gateway.generate('k', 'prompt')
+        assert gateway.generate('k', 'prompt') == first
+        assert client.calls == 1
+        assert StubAIClient().generate('prompt') == first
+
+    def test_identical_in_flight_calls_are_coalesced(self):
+        client = GatedClient()
+        gateway = AIGateway(client)
+        results = []
+        threads = run_threads(8, lambda i: results.append(gateway.generate('same', 'p')))
+        while gateway.get_stats()['coalesced'] < 7:
+            time.sleep(0.005)
+        client.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert client.calls == 1
+        assert results == ['answer to p'] * 8
+
+    def test_concurrency_limit_and_shedding(self):
+        client = GatedClient()
+        gateway = AIGateway(client, max_concurrency=2, max_queue=2, queue_timeout=2)
+        outcomes = []
+
+        def call(i):
+            try:
+                outcomes.append(gateway.generate(f'k{i}', f'p{i}'))
+            except AIGatewayBusy:
+                outcomes.append('busy')
+
+        threads = run_threads(6, call)
+        while len(outcomes) < 2:
+            time.sleep(0.005)
+        client.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert client.peak == 2
+        assert outcomes.count('busy') == 2
+        assert gateway.get_stats()['rejected'] == 2
+
+    def test_errors_are_shared_but_not_cached(self):
+        class Flaky:
+            calls = 0
+
+            def generate(self, prompt):
+                self.calls += 1
+                if self.calls == 1:
+                    raise ConnectionError('upstream down')
+                return 'ok'
+
+        gateway = AIGateway(Flaky())
+        with pytest.raises(ConnectionError):
+            gateway.generate('k', 'p')
+        assert gateway.generate('k', 'p') == 'ok'
+        assert gateway.get_stats()['errors'] == 1
+
+    def test_stuck_upstream_call_times_out_for_leader_and_followers(self):
+        client = GatedClient()
+        gateway = AIGateway(client, queue_timeout=0.05, call_timeout=0.1)
+        outcomes = []
+        threads = run_threads(3, lambda i: outcomes.append(gateway.generate('k', 'p', fallback='basic')))
+        for thread in threads:
+            thread.join()
+
+        assert outcomes == ['basic'] * 3
+        with pytest.raises(AIGatewayTimeout):
+            gateway.generate('k', 'p')
+        client.release.set()
+        stats = gateway.get_stats()
+        assert stats['fallbacks'] == 3
+        assert stats['timeouts'] >= 2
+
+    def test_load_test_with_stub(self):
+        client = StubAIClient(latency=0.01)
+        result = load_test(AIGateway(client), requests=200, distinct=5, threads=16)
+
+        assert result['shed'] == 0
+        assert client.calls == 5
+
+
+class TestEngineInterpretations:
+    """Readings that share cards, moon and question share one call"""
+
+    def test_equivalent_readings_call_upstream_once(self):
+        pytest.importorskip('ephem')
+        from oracle_engine_enhanced import OccultOracleEngine
+
+        client = StubAIClient()
+        engine = OccultOracleEngine(ai_client=client)
+        moon = engine.calculate_moon_phase()
+        cards = [('The Fool', False, 'Present'), ('The Magician', True, 'Outcome')]
+
+        first = engine._generate_ai_interpretation(cards, 'Will my relationship last?', moon)
+        second = engine._generate_ai_interpretation(cards, '  Will my relationship   last? ', moon)
+        engine._generate_ai_interpretation(cards, 'Is my partner the one?', moon)
+
+        assert first == second
+        assert client.calls == 2
+        assert engine.get_performance_stats()['ai_gateway']['cache']['hits'] == 1
+
+    def test_prompt_carries_the_question(self):
+        pytest.importorskip('ephem')
+        from oracle_engine_enhanced import OccultOracleEngine
+
+        engine = OccultOracleEngine()
+        prompt = engine._create_ai_interpretation_prompt([], 'Should I move to Lisbon?', engine.calculate_moon_phase())
+
+        assert 'Question: Should I move to Lisbon?' in prompt
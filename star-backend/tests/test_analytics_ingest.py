@@ -0,0 +1,101 @@
+"""
+Tests for the batched analytics ingestion pipeline
+"""
+
+import threading
+import time
+
+from analytics_ingest import EventIngestor
+
+
+class RecordingWriter:
+    """Batch writer that records batch sizes and can be made to block or fail"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, batch):
+        self.release.wait()
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append(list(batch))
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestEventIngestor:
+    """Bounded queue, bulk flushes, drops and drain"""
+
+    def test_size_triggered_bulk_writes(self):
+        writer = RecordingWriter()
+        ingestor = EventIngestor(writer, batch_size=10, flush_interval=5)
+
+        assert ingestor.submit_many(range(30)) == (30, 0)
+        assert wait_for(lambda: ingestor.written == 30)
+        assert [len(batch) for batch in writer.batches] == [10, 10, 10]
+        ingestor.stop()
+
+    def test_time_triggered_flush(self):
+        writer = RecordingWriter()
+        ingestor = EventIngestor(writer, batch_size=100, flush_interval=0.05)
+
+        ingestor.submit("event")
+        assert wait_for(lambda: writer.batches == [["event"]])
+        ingestor.stop()
+
+    def test_full_queue_drops_and_counts(self):
+        writer = RecordingWriter()
+        writer.release.clear()  # hold the flusher so the queue fills up
+        ingestor = EventIngestor(writer, max_queue=5, batch_size=1, flush_interval=0.01)
+
+        ingestor.submit("first")
+        assert wait_for(lambda: ingestor.get_stats()['queued'] == 0)
+        accepted, dropped = ingestor.submit_many(range(10))
+
+        assert (accepted, dropped) == (5, 5)
+        assert ingestor.submit("late") is False
+        assert ingestor.get_stats()['dropped'] == 6
+
+        writer.release.set()
+        ingestor.stop()
+        assert ingestor.written == 6
+
+    def test_stop_drains_pending_events(self):
+        writer = RecordingWriter()
+        ingestor = EventIngestor(writer, batch_size=50, flush_interval=60)
+
+        ingestor.submit_many(range(120))
+        ingestor.stop(timeout=0.1)
+
+        assert sum(len(batch) for batch in writer.batches) == 120
+        assert ingestor.get_stats()['queued'] == 0
+
+    def test_failed_batches_are_counted(self):
+        ingestor = EventIngestor(RecordingWriter(fail=True), batch_size=5, flush_interval=0.01)
+
+        ingestor.submit_many(range(5))
+        ingestor.stop()
+
+        assert ingestor.failed == 5
+        assert ingestor.written == 0
+
+    def test_failed_batches_are_retried(self):
+        writer = RecordingWriter(fail=True)
+        ingestor = EventIngestor(writer, batch_size=5, flush_interval=0.01, retry_delay=0.01)
+
+        ingestor.submit_many(range(5))
+        assert wait_for(lambda: ingestor.retried >= 1)
+        writer.fail = False
+        assert wait_for(lambda: ingestor.written == 5)
+
+        ingestor.stop()
+        assert ingestor.failed == 0
+        assert writer.batches == [list(range(5))]
@@ -0,0 +1,145 @@
+"""
+Tests for the incremental analytics rollups
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("ephem")
+
+from analytics_rollups import AnalyticsRollups, HyperLogLog, lunar_phase_names
+
+
+class FakeRedisManager:
+    """Dict-backed stand-in for the RedisManager hash and HyperLogLog surface"""
+
+    def __init__(self):
+        self.client = object()
+        self.hashes = {}
+        self.sets = {}
+
+    def hincrby_many(self, increments, ex=None):
+        for key, fields in increments.items():
+            stored = self.hashes.setdefault(key, {})
+            for field, amount in fields.items():
+                stored[field] = str(int(stored.get(field, 0)) + amount)
+        return True
+
+    def hgetall_many(self, keys):
+        return [dict(self.hashes.get(key, {})) for key in keys]
+
+    def pfadd_many(self, members, ex=None):
+        for key, values in members.items():
+            self.sets.setdefault(key, set()).update(values)
+        return True
+
+    def pfcount(self, keys):
+        return len(set().union(*[self.sets.get(key, set()) for key in keys]))
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self.sets.pop(key, None)
+        return True
+
+
+HOUR = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+
+class TestHyperLogLog:
+    """Distinct counts within sketch error"""
+
+    def test_estimate_and_merge(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for i in range(6000):
+            first.add(f"user-{i}")
+        for i in range(4000, 10000):
+            second.add(f"user-{i}")
+        first.merge(second)
+
+        assert abs(first.count() - 10000) / 10000 < 0.05
+
+    def test_small_counts_are_exact_enough(self):
+        sketch = HyperLogLog()
+        for value in ["a", "b", "c", "a"]:
+            sketch.add(value)
+        assert sketch.count() == 3
+
+
+class TestAnalyticsRollups:
+    """Incremental aggregation and range queries"""
+
+    def test_summary_counts_dimensions(self):
+        rollups = AnalyticsRollups()
+        rollups.record_many([
+            ("alice", "tarot_draw", HOUR + timedelta(minutes=5), "fire"),
+            ("alice", "tarot_draw", HOUR + timedelta(minutes=50), "fire"),
+            ("bob", "voice_chat", HOUR + timedelta(hours=1), "water"),
+            ("carol", "spotify_play", HOUR - timedelta(days=3), None),
+        ])
+
+        summary = rollups.summary(HOUR - timedelta(hours=1), HOUR + timedelta(hours=2))
+        assert summary['total'] == 3
+        assert summary['event_types'] == {"tarot_draw": 2, "voice_chat": 1}
+        assert summary['elements'] == {"fire": 2, "water": 1}
+        assert summary['hours'][HOUR.hour] == 2
+        assert sum(summary['lunar_phases'].values()) == 3
+        assert summary['unique_users'] == 2
+
+        week = rollups.summary(HOUR - timedelta(days=7), HOUR + timedelta(hours=2))
+        assert week['total'] == 4
+        assert week['unique_users'] == 3
+
+    def test_redis_tier_is_shared_between_workers(self):
+        redis = FakeRedisManager()
+        writer, reader = AnalyticsRollups(redis_manager=redis), AnalyticsRollups(redis_manager=redis)
+        writer.record_many([("alice", "tarot_draw", HOUR, "air"), ("bob", "tarot_draw", HOUR, "air")])
+
+        summary = reader.summary(HOUR, HOUR + timedelta(hours=1))
+        assert summary['event_types'] == {"tarot_draw": 2}
+        assert summary['unique_users'] == 2
+
+    def test_running_engagement_average(self):
+        rollups = AnalyticsRollups()
+        assert rollups.average_engagement() is None
+
+        rollups.record_engagement_score(None, 60.0)
+        rollups.record_engagement_score(None, 80.0)
+        rollups.record_engagement_score(60.0, 40.0)
+        assert rollups.average_engagement() == pytest.approx(60.0)
+
+    def test_lunar_phase_names(self):
+        assert lunar_phase_names([datetime(2024, 3, 25, 7), datetime(2024, 4, 8, 18)]) == ["full_moon", "new_moon"]
+
+
+class TestRollupBackfill:
+    """Rebuilding rollups from stored events is idempotent"""
+
+    def test_backfill_replaces_days(self):
+        from analytics_engine import AnalyticsEngine
+
+        stored = [{'user_id': f'user-{i}', 'event_type': 'tarot_draw', 'timestamp': (HOUR - timedelta(days=i)).isoformat(),
+                   'zodiac_signs': {'western': 'Leo'}} for i in range(5)]
+
+        class Container:
+            def query_items(self, query, parameters=None):
+                if not parameters:
+                    return [{'engagement_score': 70.0}, {'engagement_score': 50.0}]
+                start, end = parameters[0]['value'], parameters[1]['value']
+                return [item for item in stored if start <= item['timestamp'] <= end]
+
+        class Helper:
+            def get_container(self, name):
+                return Container()
+
+        engine = AnalyticsEngine(Helper())
+        engine.rollups.redis = None
+        assert asyncio.run(engine.backfill_rollups(days=7)) == 5
+        assert asyncio.run(engine.backfill_rollups(days=7)) == 5
+
+        analytics = asyncio.run(engine.get_platform_analytics((HOUR - timedelta(days=10), HOUR + timedelta(hours=1))))
+        assert analytics['basic_metrics']['total_events'] == 5
+        assert analytics['basic_metrics']['unique_users'] == 5
+        assert analytics['basic_metrics']['average_engagement_score'] == pytest.approx(60.0)
+        assert analytics['cosmic_patterns']['elemental_affinity'] == {'fire': 100.0}
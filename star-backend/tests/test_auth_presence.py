@@ -0,0 +1,120 @@
+"""
+Tests for the authenticated-principal cache and coalesced presence writes
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+from auth_cache import get_principal, invalidate_principal, principal_cache
+from presence import PresenceTracker
+
+
+class CountingFetch:
+    """Fake user lookup that records every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, user_id):
+        self.calls.append(user_id)
+        return {'id': user_id, 'username': f'star{user_id}'} if user_id != 'missing' else None
+
+
+class RecordingWriter:
+    """Presence writer that records each bulk update"""
+
+    def __init__(self):
+        self.writes = []
+        self.stamps = []
+        self.written = threading.Event()
+
+    def __call__(self, user_ids, seen_at):
+        self.writes.append(list(user_ids))
+        self.stamps.append(seen_at)
+        self.written.set()
+
+
+class TestPrincipalCache:
+    """One lookup per (user, token) until invalidated"""
+
+    def setup_method(self):
+        principal_cache.clear()
+
+    def test_repeat_requests_skip_the_lookup(self):
+        fetch = CountingFetch()
+        for _ in range(5):
+            assert get_principal(7, 1700000000, fetch)['username'] == 'star7'
+        get_principal(7, 1700009999, fetch)
+
+        assert fetch.calls == ['7', '7']
+
+    def test_unknown_users_are_not_cached(self):
+        fetch = CountingFetch()
+        assert get_principal('missing', 1, fetch) is None
+        assert get_principal('missing', 1, fetch) is None
+        assert len(fetch.calls) == 2
+
+    def test_profile_update_invalidates_every_token(self):
+        fetch = CountingFetch()
+        get_principal('7', 1, fetch)
+        get_principal('7', 2, fetch)
+        get_principal('8', 1, fetch)
+
+        invalidate_principal(7)
+        get_principal('7', 1, fetch)
+        get_principal('8', 1, fetch)
+
+        assert fetch.calls == ['7', '7', '8', '7']
+
+
+class TestPresenceTracker:
+    """Touches are coalesced into periodic bulk writes"""
+
+    def test_touches_coalesce_into_one_write(self):
+        writer = RecordingWriter()
+        tracker = PresenceTracker(writer, flush_interval=60)
+        seen_at = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+        for user_id in ['a', 'b', 'a', 'c', 'b'] * 10:
+            tracker.touch(user_id, seen_at)
+
+        assert writer.writes == []
+        assert tracker.flush() == 3
+        assert writer.writes == [['a', 'b', 'c']]
+        assert tracker.last_seen('a') is not None
+        tracker.stop()
+
+    def test_recently_written_users_are_not_rewritten(self):
+        writer = RecordingWriter()
+        tracker = PresenceTracker(writer, flush_interval=60, write_interval=60)
+        tracker.touch('a')
+        tracker.flush()
+        tracker.touch('a')
+        tracker.touch('b')
+        tracker.flush()
+
+        assert writer.writes == [['a'], ['b']]
+        tracker.stop()
+
+    def test_background_flush_and_stop(self):
+        writer = RecordingWriter()
+        tracker = PresenceTracker(writer, flush_interval=0.01)
+        tracker.touch('a')
+
+        assert writer.written.wait(2)
+        tracker.touch('b')
+        tracker.stop()
+        assert writer.writes[-1] == ['b']
+
+    def test_users_are_stamped_with_their_activity_time(self):
+        writer = RecordingWriter()
+        tracker = PresenceTracker(writer, flush_interval=60)
+        early = datetime(2024, 1, 1, 12, 0, 0, 250000, tzinfo=timezone.utc)
+        later = early + timedelta(seconds=3)
+        tracker.touch('a', early)
+        tracker.touch('b', later)
+        tracker.touch('b', early)  # out-of-order activity does not move last_seen back
+
+        assert tracker.flush() == 2
+        assert writer.writes == [['a'], ['b']]
+        assert writer.stamps == [early.replace(microsecond=0), later.replace(microsecond=0)]
+        tracker.stop()
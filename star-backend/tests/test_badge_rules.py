@@ -0,0 +1,89 @@
+"""
+Tests for the rule-indexed badge engine
+"""
+
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("cosmos_db", exc_type=ImportError)
+
+from badge_system import BadgeRuleIndex, BadgeUnlockEngine, UserBadgeState, event_counters, sign_counter
+
+
+MANIFESTS = BadgeUnlockEngine._get_default_manifests(None)
+
+
+class TestBadgeRuleIndex:
+    """Manifests compile into a counter -> badges index"""
+
+    def test_counters_map_to_watching_badges(self):
+        rules = BadgeRuleIndex(MANIFESTS)
+
+        assert rules.affected(['tarot_readings_count']) == {'tarot_adept'}
+        assert rules.affected([sign_counter('Leo'), 'active']) == {'fire_element_master'}
+        assert rules.affected(['total_posts']) == set()
+
+    def test_only_completed_unlocked_badges_are_returned(self):
+        rules = BadgeRuleIndex(MANIFESTS)
+        state = UserBadgeState()
+        state.counters['tarot_readings_count'] = 5
+        for _ in range(10):
+            state.counters.update(event_counters('post_create', 'aries'))
+
+        assert rules.unlockable(rules.badges, state) == ['fire_element_master', 'tarot_adept']
+        state.unlocked.add('tarot_adept')
+        assert rules.unlockable(['tarot_adept'], state) == []
+
+    def test_event_counters(self):
+        assert event_counters('post_create', 'leo') == {'active': 1, 'total_posts': 1, 'posts_by_sign:Leo': 1}
+        assert event_counters('login') == {'active': 1}
+
+
+class Event:
+    """Minimal engagement event"""
+
+    def __init__(self, user_id, event_type, verified=False, zodiac_signs=None):
+        from analytics_engine import EngagementType
+        self.user_id = user_id
+        self.event_type = EngagementType(event_type)
+        self.verified = verified
+        self.zodiac_signs = zodiac_signs
+        self.metadata = {}
+
+
+@pytest.fixture
+def engine():
+    from badge_system import BadgeStateStore
+
+    engine = BadgeUnlockEngine.__new__(BadgeUnlockEngine)
+    engine.badge_manifests = MANIFESTS
+    engine.rules = BadgeRuleIndex(MANIFESTS)
+    engine.states = BadgeStateStore()
+    engine.unlocked = []
+    engine._unlock_badges = lambda user_id, badge_ids: engine.unlocked.extend(badge_ids) or badge_ids
+    engine.states.seed('u1', UserBadgeState(zodiac_sign='Leo', counters=Counter(total_posts=9)))
+    return engine
+
+
+class TestEngagementBatches:
+    """Only server-verified actions advance content counters"""
+
+    def test_client_reported_events_cannot_forge_badges(self, engine):
+        pytest.importorskip("numpy")
+        forged = [Event('u1', 'tarot_draw'), Event('u1', 'post_create', zodiac_signs={'western': 'Aries'})] * 10
+        engine.process_engagement_batch(forged)
+
+        counters = engine.states.get('u1').counters
+        assert counters['tarot_readings_count'] == 0 and counters['total_posts'] == 9
+        assert counters['active'] == 20 and engine.unlocked == []
+
+    def test_verified_events_use_the_profile_sign(self, engine):
+        pytest.importorskip("numpy")
+        engine.process_engagement_batch([Event('u1', 'post_create', verified=True,
+                                               zodiac_signs={'western': 'Pisces'})] * 10
+                                        + [Event('u1', 'tarot_draw', verified=True)] * 5)
+
+        counters = engine.states.get('u1').counters
+        assert counters[sign_counter('Leo')] == 10 and counters[sign_counter('Pisces')] == 0
+        assert sorted(engine.unlocked) == ['fire_element_master', 'tarot_adept']
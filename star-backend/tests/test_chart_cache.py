@@ -0,0 +1,88 @@
+"""
+Tests for the natal chart cache and the two-tier cache behind it
+"""
+
+import datetime
+
+import pytest
+
+pytest.importorskip("ephem")
+
+from cache_utils import TieredCache
+from oracle_engine_enhanced import OccultOracleEngine
+
+
+class FakeRedisManager:
+    """Dict-backed stand-in exposing the RedisManager get/set surface"""
+
+    def __init__(self):
+        self.client = object()
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        assert isinstance(value, str)
+        self.store[key] = value
+        return True
+
+
+@pytest.fixture
+def engine():
+    return OccultOracleEngine()
+
+
+class TestNatalChartCache:
+    """Canonical keys, binary round trip and counters"""
+
+    def test_equivalent_inputs_share_an_entry(self, engine):
+        eastern = datetime.timezone(datetime.timedelta(hours=-5))
+        first = engine.calculate_natal_chart_cached(datetime.datetime(1990, 5, 15, 19, 30, 10), "London")
+        second = engine.calculate_natal_chart_cached(
+            datetime.datetime(1990, 5, 15, 14, 30, tzinfo=eastern), "  london "
+        )
+
+        assert second is first
+        stats = engine.get_performance_stats()["natal_chart_cache"]
+        assert stats["local_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_binary_round_trip(self, engine):
+        chart = engine.calculate_natal_chart(datetime.datetime(1985, 1, 2, 3, 4), "Tokyo")
+        blob = engine._serialize_natal_chart(chart)
+
+        assert isinstance(blob, bytes)
+        assert len(blob) < 256
+        assert engine._deserialize_natal_chart(blob) == chart
+
+    def test_redis_tier_serves_other_processes(self, engine):
+        redis = FakeRedisManager()
+        writer = TieredCache("natal_chart", engine._serialize_natal_chart, engine._deserialize_natal_chart, redis)
+        reader = TieredCache("natal_chart", engine._serialize_natal_chart, engine._deserialize_natal_chart, redis)
+        chart = engine.calculate_natal_chart(datetime.datetime(2000, 6, 1, 12), "Paris")
+
+        writer.set("key", chart)
+        assert reader.get("key") == chart
+        assert reader.get("key") == chart
+        assert reader.stats()["redis_hits"] == 1
+        assert reader.stats()["local_hits"] == 1
+
+
+class TestNatalChartBulk:
+    """Many charts from one batched ephemeris pass"""
+
+    def test_bulk_matches_single_charts(self, engine):
+        births = [(datetime.datetime(1985, 1, 2, 3, 4), "Tokyo"),
+                  (datetime.datetime(1990, 5, 15, 19, 30), "London"),
+                  (datetime.datetime(2000, 6, 1, 12), "Paris")]
+
+        charts = engine.calculate_natal_charts_bulk(births)
+
+        assert engine.calculate_natal_charts_bulk([]) == []
+        assert len(charts) == len(births)
+        for chart, (birth_date, birth_place) in zip(charts, births):
+            single = engine.calculate_natal_chart(birth_date, birth_place)
+            for point in ("sun", "moon", "pluto", "ascendant", "midheaven"):
+                assert getattr(chart, point).longitude == pytest.approx(getattr(single, point).longitude)
+                assert getattr(chart, point).zodiac_sign == getattr(single, point).zodiac_sign
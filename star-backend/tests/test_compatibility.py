@@ -0,0 +1,195 @@
+"""
+Tests for the vectorized compatibility index
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("ephem")
+
+from compatibility import (PROFILE_COLUMNS, SCORE_TABLES, SYSTEM_WEIGHTS, SYSTEMS, UNKNOWN_SCORE, CompatibilityIndex,
+                           breakdown, encode, encode_many, load_profiles, score_codes, sign_compatibility)
+from recommendations import get_compatibility_score
+
+
+def random_codes(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return np.stack([rng.integers(0, len(SCORE_TABLES[system]), count) for system in SYSTEMS],
+                    axis=1).astype(np.uint8)
+
+
+class TestTables:
+    """Sign x sign score tables"""
+
+    def test_tables_are_symmetric_with_neutral_unknowns(self):
+        for system, table in SCORE_TABLES.items():
+            assert np.allclose(table, table.T), system
+            assert np.all(table[-1] == UNKNOWN_SCORE) and np.all(table[:, -1] == UNKNOWN_SCORE)
+
+    def test_western_matches_recommendation_scores(self):
+        assert sign_compatibility('Aries', 'Leo') == pytest.approx(get_compatibility_score('Aries', 'Leo'))
+        assert sign_compatibility('scorpio', 'Scorpio') == 1.0
+        assert sign_compatibility('Aries', 'Unknown') == UNKNOWN_SCORE
+
+    def test_chinese_karmic_and_clash_pairs(self):
+        rat, dragon, horse = encode({'chinese_zodiac': 'Rat'})[1], encode({'chinese_zodiac': 'Dragon'})[1], \
+            encode({'chinese_zodiac': 'Horse'})[1]
+        table = SCORE_TABLES['chinese_animal']
+        assert table[rat, dragon] == pytest.approx(0.9)
+        assert table[rat, horse] == pytest.approx(0.2)
+
+
+class TestEncoding:
+    """Profiles to code vectors"""
+
+    def test_birth_date_and_sign_names_agree(self):
+        from_date = encode({'birth_date': '1990-06-15'})
+        from_names = encode({'zodiac_sign': 'Gemini', 'chinese_zodiac': 'Horse', 'chinese_element': 'Metal'})
+
+        assert list(from_date[:3]) == list(from_names[:3])
+        assert from_names[3] == len(SCORE_TABLES['vedic']) - 1
+
+    def test_nested_profile_with_unknown_systems(self):
+        codes = encode({'zodiac_signs': {'western': 'Scorpio', 'chinese': 'Dragon', 'vedic': 'Vrischika',
+                                         'mayan': 'Serpent'}})
+        systems = breakdown(codes, codes)
+
+        assert systems['western'] == 1.0 and systems['vedic'] == 1.0
+        assert systems['chinese_element'] == UNKNOWN_SCORE and systems['mayan'] == UNKNOWN_SCORE
+
+
+class TestCompatibilityIndex:
+    """Bulk scoring and top-K"""
+
+    def test_vectorized_scores_match_pairwise(self):
+        others = random_codes(500)
+        codes = others[0]
+        expected = [sum(SYSTEM_WEIGHTS[system] * SCORE_TABLES[system][codes[s], other[s]]
+                        for s, system in enumerate(SYSTEMS)) for other in others]
+
+        assert np.allclose(score_codes(codes, others), expected, atol=1e-5)
+
+    def test_top_k_orders_and_excludes_self(self):
+        index = CompatibilityIndex(capacity=2)
+        for row, codes in enumerate(random_codes(50)):
+            index.upsert_codes(f'u{row}', codes)
+        matches = index.top_k('u0', 5, exclude=['u1'])
+        scores = [score for _, score, _ in matches]
+        everyone = {f'u{row}': index.score('u0', f'u{row}') for row in range(2, 50)}
+
+        assert len(matches) == 5 and scores == sorted(scores, reverse=True)
+        assert not {'u0', 'u1'} & {user_id for user_id, _, _ in matches}
+        assert scores[0] == pytest.approx(max(everyone.values()), abs=1e-4)
+
+    def test_upsert_and_remove(self):
+        index = CompatibilityIndex()
+        index.bind(lambda: [{'id': 'a', 'zodiac_sign': 'Aries'}, {'id': 'b', 'zodiac_sign': 'Leo'},
+                            {'id': 'c', 'zodiac_sign': 'Taurus'}])
+
+        assert [user_id for user_id, _, _ in index.top_k('a', 2)] == ['b', 'c']
+        assert index.remove('b') and not index.remove('b')
+        index.upsert('c', {'zodiac_sign': 'Sagittarius'})
+        assert index.top_k('a', 5)[0][0] == 'c' and len(index) == 2
+        assert index.top_k('missing') == []
+
+    def test_large_population_is_fast(self):
+        index = CompatibilityIndex()
+        for row, codes in enumerate(random_codes(200_000)):
+            index.upsert_codes(row, codes)
+        index.top_k(0, 10)
+        started = time.perf_counter()
+        matches = index.top_k(1, 10)
+
+        assert len(matches) == 10
+        assert time.perf_counter() - started < 0.5
+        assert index.get_stats()['users'] == 200_000
+
+    def test_refresh_picks_up_profiles_written_elsewhere(self):
+        users = [{'id': 'a', 'zodiac_sign': 'Aries'}, {'id': 'b', 'birth_date': '1990-07-30'}]
+        index = CompatibilityIndex()
+        index.bind(lambda: list(users))
+
+        assert index.top_k('a', 5)[0][0] == 'b'
+        users.append({'id': 'c', 'zodiac_sign': 'Aries'})
+        users.pop(1)
+        index.refresh()
+
+        assert 'c' in index and 'b' not in index
+        assert index.get_stats()['refreshes'] == 2
+
+    def test_local_writes_during_refresh_survive_the_swap(self):
+        index = CompatibilityIndex()
+
+        def loader():
+            index.upsert('late', {'zodiac_sign': 'Leo'})
+            return [{'id': 'a', 'zodiac_sign': 'Aries'}]
+
+        index.bind(loader)
+        index.refresh()
+
+        assert 'late' in index and 'a' in index
+
+    def test_bulk_encoding_matches_single(self):
+        profiles = [{'id': 'a', 'birth_date': '1985-02-11'}, {'id': 'b', 'zodiac_sign': 'Virgo'},
+                    {'id': 'c', 'birth_date': '2001-12-24'}, {'zodiac_sign': 'Leo'}]
+        ids, codes = encode_many(profiles)
+
+        assert ids == ['a', 'b', 'c']
+        for row, profile in enumerate(profiles[:3]):
+            assert list(codes[row]) == list(encode(profile))
+
+    def test_index_loads_every_page_of_the_users_table(self):
+        table = FakeUsersTable([{'id': f'u{i}', 'zodiac_sign': 'Leo'} for i in range(5)])
+        index = CompatibilityIndex()
+        index.bind(lambda: load_profiles(table, page_size=2))
+
+        index.refresh()
+
+        assert len(index) == 5 and 'u4' in index
+        assert table.selects == [PROFILE_COLUMNS] * 3
+        assert table.ranges == [(0, 1), (2, 3), (4, 5)]
+
+
+class FakeUsersTable:
+    """Just enough of a Supabase table builder for load_profiles"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.selects = []
+        self.ranges = []
+
+    def select(self, columns):
+        self.selects.append(columns)
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda row: row[column])
+        return self
+
+    def range(self, start, end):
+        self.ranges.append((start, end))
+        self._page = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        return type('Response', (), {'data': self._page})()
+
+
+class TestProfileInfluenceEndpoint:
+    """/api/v1/profile/<id>/influence in the enhanced backend"""
+
+    @pytest.fixture
+    def client(self):
+        pytest.importorskip("flask_socketio")
+        from enhanced_star_backend import app
+        return app.test_client()
+
+    @pytest.mark.parametrize('user_id', ['user_1', 'someone_new'])
+    def test_influence_returns_top_follows(self, client, user_id):
+        response = client.get(f'/api/v1/profile/{user_id}/influence')
+
+        assert response.status_code == 200
+        follows = response.get_json()['topFollows']
+        assert follows and user_id not in {follow['id'] for follow in follows}
@@ -0,0 +1,113 @@
+"""
+Tests for the write-behind counter service
+"""
+
+import threading
+
+from counters import CounterService
+
+
+class RecordingWriter:
+    """Fake delta writer that records each flushed patch"""
+
+    def __init__(self, fail=False):
+        self.patches = []
+        self.fail = fail
+
+    def __call__(self, entity_id, deltas):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.patches.append((entity_id, dict(deltas)))
+
+
+class TestCounterService:
+    """Coalescing, reads and failure handling"""
+
+    def test_increments_coalesce_into_one_write(self):
+        writer = RecordingWriter()
+        counters = CounterService(flush_interval=60)
+        counters.register_writer('post', writer)
+
+        for _ in range(50):
+            counters.increment('post', 'p1', 'likes')
+        counters.increment('post', 'p1', 'likes', -1)
+        counters.increment('post', 'p1', 'comments')
+        counters.flush()
+
+        assert writer.patches == [('p1', {'likes': 49, 'comments': 1})]
+
+    def test_reads_include_unflushed_deltas(self):
+        counters = CounterService(flush_interval=60)
+        counters.register_writer('post', RecordingWriter())
+
+        counters.increment('post', 'p1', 'likes', 3)
+        assert counters.get('post', 'p1', 'likes', lambda: 10) == 13
+
+        counters.increment('post', 'p1', 'likes')
+        assert counters.get('post', 'p1', 'likes', lambda: 0) == 14
+
+    def test_cache_only_scope_tracks_seeded_counts(self):
+        counters = CounterService()
+        loads = []
+        load = lambda: loads.append(1) or 5
+
+        assert counters.get('post', 'p1', 'likes', load) == 5
+        counters.increment('post', 'p1', 'likes', -1)
+        assert counters.get('post', 'p1', 'likes', load) == 4
+        assert len(loads) == 1
+        assert counters.get_stats()['pending_counters'] == 0
+
+    def test_failed_flush_is_requeued(self):
+        writer = RecordingWriter(fail=True)
+        counters = CounterService(flush_interval=60)
+        counters.register_writer('post', writer)
+
+        counters.increment('post', 'p1', 'likes', 2)
+        assert counters.flush() == 0
+
+        writer.fail = False
+        counters.flush()
+        assert writer.patches == [('p1', {'likes': 2})]
+
+    def test_repeatedly_failing_deltas_are_dead_lettered(self):
+        writer = RecordingWriter(fail=True)
+        counters = CounterService(flush_interval=60, max_retries=3)
+        counters.register_writer('post', writer)
+
+        counters.increment('post', 'p1', 'likes', 2)
+        assert counters.get('post', 'p1', 'likes', lambda: 10) == 12
+        for _ in range(3):
+            counters.flush()
+
+        assert counters.get_stats()['pending_counters'] == 0
+        assert [(dead['entity_id'], dead['deltas']) for dead in counters.dead_letters] == [('p1', {'likes': 2})]
+        # The lost deltas no longer inflate the served count
+        assert counters.get('post', 'p1', 'likes', lambda: 10) == 10
+
+        writer.fail = False
+        counters.flush()
+        assert writer.patches == []
+
+    def test_read_during_a_flush_counts_the_delta_once(self):
+        store = {'likes': 0}
+        persisted, release = threading.Event(), threading.Event()
+
+        def writer(entity_id, deltas):
+            store['likes'] += deltas['likes']
+            persisted.set()
+            release.wait(5)  # written, but the flush has not finished yet
+
+        counters = CounterService(flush_interval=60)
+        counters.register_writer('post', writer)
+        counters.increment('post', 'p1', 'likes')
+        flusher = threading.Thread(target=counters.flush)
+        flusher.start()
+        persisted.wait(5)
+
+        def load():
+            release.set()
+            return store['likes']
+
+        assert counters.get('post', 'p1', 'likes', load) == 1
+        flusher.join()
+        assert counters.get('post', 'p1', 'likes', lambda: 99) == 1
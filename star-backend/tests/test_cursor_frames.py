@@ -0,0 +1,68 @@
+"""
+Tests for coalesced live-cursor frames
+"""
+
+import threading
+
+from cursor_frames import CursorFrames, decode_frame
+
+
+class RecordingEmitter:
+    """Frame sink that records (session_id, frame) pairs"""
+
+    def __init__(self):
+        self.frames = []
+        self.emitted = threading.Event()
+
+    def __call__(self, session_id, frame):
+        self.frames.append((session_id, frame))
+        self.emitted.set()
+
+
+class TestCursorFrames:
+    """Moves between ticks collapse into one array-encoded frame per session"""
+
+    def test_moves_coalesce_to_latest_position(self):
+        emitter = RecordingEmitter()
+        frames = CursorFrames(emitter)
+        frames._ticker = object()  # drive ticks by hand
+        for i in range(100):
+            frames.update('s1', 'alice', i, i * 2)
+        frames.update('s1', 'bob', 5.04, 6.06, 'tarot-card-3')
+        frames.update('s2', 'carol', 1, 1)
+
+        assert frames.flush() == 2
+        assert frames.flush() == 0
+        session_id, frame = emitter.frames[0]
+        assert session_id == 's1'
+        assert frame['c'] == [[0, 99.0, 198.0, None], [1, 5.0, 6.1, 'tarot-card-3']]
+        assert decode_frame(frame)[1]['element'] == 'tarot-card-3'
+        assert frames.get_stats()['moves'] == 102
+
+    def test_slots_are_reused_and_released(self):
+        frames = CursorFrames(RecordingEmitter())
+        assert [frames.slot('s1', user) for user in ('a', 'b', 'c')] == [0, 1, 2]
+        frames.release('s1', 'b')
+        assert frames.slot('s1', 'd') == 1
+        assert frames.slots('s1') == {'a': 0, 'c': 2, 'd': 1}
+
+        frames.drop_session('s1')
+        assert frames.slots('s1') == {}
+
+    def test_released_participant_is_not_in_next_frame(self):
+        emitter = RecordingEmitter()
+        frames = CursorFrames(emitter)
+        frames._ticker = object()
+        frames.update('s1', 'a', 1, 1)
+        frames.release('s1', 'a')
+
+        assert frames.flush() == 0
+
+    def test_ticker_emits_and_stops(self):
+        emitter = RecordingEmitter()
+        frames = CursorFrames(emitter, hz=100)
+        frames.update('s1', 'a', 1, 2)
+
+        assert emitter.emitted.wait(2)
+        frames.stop()
+        assert emitter.frames[0][1]['c'] == [[0, 1.0, 2.0, None]]
@@ -0,0 +1,77 @@
+"""
+Tests for the batched ephemeris engine
+"""
+
+import datetime
+import math
+import threading
+
+import numpy as np
+import pytest
+
+ephem = pytest.importorskip("ephem")
+
+from ephemeris import EphemerisEngine
+
+
+@pytest.fixture
+def engine():
+    return EphemerisEngine()
+
+
+class TestEphemerisEngine:
+    """Longitude matrix and vectorized aspect detection"""
+
+    def test_longitudes_match_ephem_ecliptic(self, engine):
+        date = datetime.datetime(1990, 5, 15, 14, 30)
+        row = engine.longitudes([date])[0]
+
+        for name, longitude in zip(engine.bodies, row):
+            body = getattr(ephem, name)(ephem.Date(date))
+            expected = math.degrees(ephem.Ecliptic(body, epoch=ephem.Date(date)).lon)
+            assert abs((longitude - expected + 180) % 360 - 180) < 0.05, name
+
+    def test_matrix_shape_for_many_dates(self, engine):
+        dates = [datetime.datetime(2000, 1, 1) + datetime.timedelta(days=d) for d in range(10)]
+        matrix = engine.longitudes(dates, ["Jupiter", "Saturn"])
+
+        assert matrix.shape == (10, 2)
+        assert ((matrix >= 0) & (matrix < 360)).all()
+
+    def test_aware_datetimes_are_treated_as_utc(self, engine):
+        naive = datetime.datetime(2000, 1, 1, 12, 0)
+        aware = datetime.datetime(2000, 1, 1, 7, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+        assert np.allclose(engine.longitudes([naive]), engine.longitudes([aware]))
+
+    def test_find_aspects_reports_first_matching_aspect(self):
+        a = np.array([0.0, 10.0])
+        b = np.array([121.0, 250.0])
+        hit, aspect_index, orb, separation = EphemerisEngine.find_aspects(a, b, [0, 120, 180], [8, 8, 8])
+
+        assert hit.tolist() == [[True, False], [False, True]]
+        assert aspect_index[0, 0] == 1 and orb[0, 0] == pytest.approx(1.0)
+        assert aspect_index[1, 1] == 1 and separation[1, 1] == pytest.approx(120.0)
+
+    def test_find_aspects_broadcasts_over_time(self):
+        transiting = np.array([[0.0], [90.0], [180.0]])  # three days, one planet
+        hit, aspect_index, _, _ = EphemerisEngine.find_aspects(transiting, np.array([0.0]), [0, 90, 180], [1, 1, 1])
+
+        assert hit.shape == (3, 1, 1)
+        assert aspect_index[:, 0, 0].tolist() == [0, 1, 2]
+
+    def test_threads_compute_concurrently_with_their_own_bodies(self, engine):
+        dates = [datetime.datetime(2000, 1, 1) + datetime.timedelta(days=d) for d in range(20)]
+        expected = engine.longitudes(dates)
+        results = [None] * 4
+
+        def compute(slot):
+            results[slot] = engine.longitudes(dates)
+
+        threads = [threading.Thread(target=compute, args=(slot,)) for slot in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for result in results:
+            np.testing.assert_allclose(result, expected)
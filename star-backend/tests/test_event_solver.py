@@ -0,0 +1,101 @@
+"""
+Tests for the exact astronomical event solver
+"""
+
+import datetime
+import math
+from itertools import islice
+
+import pytest
+
+ephem = pytest.importorskip("ephem")
+
+from ephemeris import EphemerisEngine
+from event_solver import EventSolver, find_root, parse_cursor
+
+
+@pytest.fixture(scope="module")
+def solver():
+    return EventSolver()
+
+
+def separation_error(a, b, target):
+    return abs((a - b - target + 180) % 360 - 180)
+
+
+class TestEventSolver:
+    """Bracketing, root-finding and streaming"""
+
+    def test_find_root_stays_in_bracket(self):
+        root = find_root(lambda x: math.cos(x), 0.0, 3.0)
+        assert abs(root - math.pi / 2) < 1e-5
+
+    def test_full_moon_matches_ephem(self, solver):
+        events = list(solver.iter_events(datetime.datetime(2024, 3, 20), datetime.datetime(2024, 3, 30),
+                                         kinds=("phase",)))
+        full_moon = next(event for event in events if event.name == "full_moon")
+        expected = ephem.next_full_moon(ephem.Date(datetime.datetime(2024, 3, 20))).datetime()
+
+        assert abs((full_moon.time - expected).total_seconds()) < 60
+
+    def test_eclipses_2024(self, solver):
+        eclipses = list(solver.iter_events(datetime.datetime(2024, 1, 1), datetime.datetime(2025, 1, 1),
+                                           kinds=("eclipse",)))
+
+        assert [(event.name, event.time.date()) for event in eclipses] == [
+            ("lunar_eclipse", datetime.date(2024, 3, 25)),
+            ("solar_eclipse", datetime.date(2024, 4, 8)),
+            ("lunar_eclipse", datetime.date(2024, 9, 18)),
+            ("solar_eclipse", datetime.date(2024, 10, 2)),
+        ]
+
+    def test_ingress_and_aspect_times_are_exact(self, solver):
+        engine = EphemerisEngine()
+        start = datetime.datetime(2024, 6, 1)
+        events = list(solver.iter_events(start, start + datetime.timedelta(days=5),
+                                         kinds=("ingress", "aspect"), bodies=("Moon", "Mars")))
+        assert {event.kind for event in events} == {"ingress", "aspect"}
+
+        for event in events:
+            if event.kind == "ingress":
+                longitude = engine.longitudes([event.time], [event.body])[0, 0]
+                assert separation_error(longitude, event.angle, 0) < 0.01
+            else:
+                first, second = engine.longitudes([event.time], [event.body, event.other])[0]
+                assert min(separation_error(first, second, event.angle),
+                           separation_error(first, second, -event.angle)) < 0.01
+
+    def test_stream_is_ordered_and_lazy(self, solver):
+        start = datetime.datetime(2024, 1, 1)
+        events = list(islice(solver.iter_events(start, start + datetime.timedelta(days=3650)), 20))
+
+        assert len(events) == 20
+        assert events == sorted(events, key=lambda event: event.time)
+        assert events[-1].time < start + datetime.timedelta(days=10)
+
+    def test_keyset_pages_keep_ties(self, solver):
+        # 2024-04-08: the total solar eclipse coincides with the new moon
+        start, end = datetime.datetime(2024, 4, 1), datetime.datetime(2024, 4, 15)
+        expected = list(solver.iter_events(start, end, kinds=("phase", "eclipse")))
+        paged, cursor = [], None
+        while True:
+            resume = parse_cursor(cursor)[0] if cursor else start
+            page = [event for event in solver.iter_events(resume, end, kinds=("phase", "eclipse"))
+                    if cursor is None or event.key > parse_cursor(cursor)][:2]
+            paged.extend(page)
+            if len(page) < 2:
+                break
+            cursor = page[-1].cursor
+
+        assert [event.key for event in paged] == [event.key for event in expected]
+        assert {"new_moon", "solar_eclipse"} <= {event.name for event in paged}
+
+    def test_void_of_course_window(self, solver):
+        void = solver.void_of_course(datetime.datetime(2024, 3, 2, 12))
+
+        assert void["void_start"] < void["void_until"]
+        assert void["void_until"] > datetime.datetime(2024, 3, 2, 12)
+
+    def test_unknown_kind_rejected(self, solver):
+        with pytest.raises(ValueError):
+            next(solver.iter_events(datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2), kinds=("comet",)))
@@ -0,0 +1,71 @@
+"""
+Tests for the local gazetteer
+"""
+
+from gazetteer import Gazetteer, normalize
+
+GEONAMES_ROWS = [
+    # geonameid, name, asciiname, alternatenames, lat, lng, class, code, cc, cc2, admin1, ..., population, ..., timezone
+    ['3448439', 'São Paulo', 'Sao Paulo', 'Sampa,San Paulo', '-23.5475', '-46.63611', 'P', 'PPLA', 'BR', '',
+     '27', '', '', '', '12400232', '', '760', 'America/Sao_Paulo', '2023-01-01'],
+    ['4887398', 'Chicago', 'Chicago', 'Chi-town', '41.85003', '-87.65005', 'P', 'PPLA2', 'US', '',
+     'IL', '', '', '', '2746388', '', '180', 'America/Chicago', '2023-01-01'],
+    ['4717560', 'Paris', 'Paris', '', '33.66094', '-95.55551', 'P', 'PPLA2', 'US', '',
+     'TX', '', '', '', '24782', '', '183', 'America/Chicago', '2023-01-01'],
+    ['2988507', 'Paris', 'Paris', 'Lutetia', '48.85341', '2.3488', 'P', 'PPLC', 'FR', '',
+     '11', '', '', '', '2138551', '', '42', 'Europe/Paris', '2023-01-01'],
+]
+
+
+def write_geonames(path):
+    path.write_text(''.join('\t'.join(row) + '\n' for row in GEONAMES_ROWS), encoding='utf-8')
+
+
+class TestGazetteer:
+    """Exact, qualified, prefix and fuzzy resolution"""
+
+    def test_normalize(self):
+        assert normalize('  São Paulo, BR ') == 'sao paulo br'
+
+    def test_builtin_lookups(self):
+        gazetteer = Gazetteer.builtin()
+
+        assert gazetteer.resolve('NEW YORK').timezone == 'America/New_York'
+        assert gazetteer.resolve('Tokyo, Japan').coordinates == (35.6762, 139.6503)
+        assert gazetteer.resolve('san fransisco').name == 'San Francisco'
+        assert gazetteer.resolve('Brooklyn, New York').name == 'New York'
+        assert gazetteer.resolve('Atlantis') is None
+        assert gazetteer.coordinates('Atlantis', (0.0, 0.0)) == (0.0, 0.0)
+
+    def test_contradicting_qualifier_rejects_candidate(self):
+        gazetteer = Gazetteer.builtin()
+
+        assert gazetteer.resolve('Portland, Oregon').admin1 == 'OR'
+        assert gazetteer.resolve('Portland, Maine') is None
+        assert gazetteer.resolve('London, Ontario') is None
+        assert gazetteer.resolve('Toronto, Ontario').name == 'Toronto'
+        assert gazetteer.resolve('London, England').country == 'GB'
+        assert gazetteer.resolve('Springfield, IL') is None
+
+    def test_geonames_import_roundtrip(self, tmp_path):
+        source = tmp_path / 'cities.txt'
+        write_geonames(source)
+        Gazetteer.from_geonames(str(source)).save(str(tmp_path / 'gazetteer.npy'))
+        gazetteer = Gazetteer.load(str(tmp_path / 'gazetteer.npy'))
+
+        assert not list(tmp_path.glob('*.tmp*'))
+        assert gazetteer.resolve('Sao Paulo').timezone == 'America/Sao_Paulo'
+        assert gazetteer.resolve('sampa').name == 'São Paulo'
+        assert gazetteer.resolve('Paris').country == 'FR'
+        assert gazetteer.resolve('Paris, TX').country == 'US'
+        assert gazetteer.resolve('Paris, Texas').country == 'US'
+        assert gazetteer.resolve('Paris, France').country == 'FR'
+        assert gazetteer.resolve('Paris, Japan') is None
+        assert gazetteer.resolve('Chi-town').to_geocode()['addr'] == 'Chicago, IL, US'
+
+    def test_resolutions_are_cached(self):
+        gazetteer = Gazetteer.builtin()
+        first = gazetteer.resolve('Sydney')
+
+        assert gazetteer.resolve(' sydney ') is first
+        assert gazetteer.get_stats()['cache']['hits'] == 1
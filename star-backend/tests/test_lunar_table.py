@@ -0,0 +1,60 @@
+"""
+Tests for the precomputed lunar ephemeris table
+"""
+
+import datetime
+
+import numpy as np
+import pytest
+
+ephem = pytest.importorskip("ephem")
+
+from ephemeris import EphemerisEngine
+from lunar_table import LunarEphemerisTable
+
+START = datetime.datetime(2024, 3, 1)
+END = datetime.datetime(2024, 3, 4)
+
+
+@pytest.fixture(scope="module")
+def table():
+    return LunarEphemerisTable.build(START, END, step_minutes=10)
+
+
+def angular_error(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180) % 360 - 180)
+
+
+class TestLunarEphemerisTable:
+    """Interpolated lookups, ingress search and persistence"""
+
+    def test_interpolation_matches_ephemeris(self, table):
+        dates = [START + datetime.timedelta(minutes=37 * i) for i in range(100)]
+        expected = EphemerisEngine().longitudes(dates, table.bodies)
+
+        assert angular_error(table.longitudes_for(dates), expected).max() < 0.01
+
+    def test_coverage(self, table):
+        assert table.covers(START, END)
+        assert not table.covers(END + datetime.timedelta(hours=1))
+
+    def test_next_ingress_is_a_sign_boundary(self, table):
+        ingress = table.next_ingress(START, max_hours=60)
+        assert ingress is not None
+
+        engine = EphemerisEngine()
+        before, after = engine.longitudes(
+            [ingress - datetime.timedelta(minutes=2), ingress + datetime.timedelta(minutes=2)], ["Moon"]
+        )[:, 0]
+        assert int(before // 30) != int(after // 30)
+
+    def test_save_and_memory_map(self, table, tmp_path):
+        path = str(tmp_path / "lunar.npy")
+        table.save(path)
+        loaded = LunarEphemerisTable.load(path)
+
+        assert isinstance(loaded.longitudes, np.memmap)
+        assert loaded.positions(START + datetime.timedelta(hours=5)) == table.positions(START + datetime.timedelta(hours=5))
+
+    def test_missing_table_loads_as_none(self, tmp_path):
+        assert LunarEphemerisTable.load(str(tmp_path / "absent.npy")) is None
@@ -0,0 +1,133 @@
+"""
+Tests for keyset cursor pagination
+"""
+
+import pytest
+
+from pagination import (Cursor, InvalidCursor, cosmos_page, cosmos_seek, estimated_total, list_seek,
+                        page_params, postgrest_seek, sort_newest_first)
+
+
+def make_items():
+    # Two items share a timestamp so the id tie-break is exercised
+    times = ['2024-01-01T10:00', '2024-01-01T09:00', '2024-01-01T09:00', '2024-01-01T08:00', '2024-01-01T07:00']
+    return sort_newest_first([{'id': f'n{i}', 'created_at': t} for i, t in enumerate(times)])
+
+
+class RecordingQuery:
+    """PostgREST builder stand-in that records the chained calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return call
+
+
+class FakePager:
+    """Cosmos ItemPaged.by_page() stand-in"""
+
+    def __init__(self, pages, start):
+        self._pages = iter(pages[start:])
+        self.continuation_token = str(start + 1) if start + 1 < len(pages) else None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._pages)
+
+
+class FakeItems:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def by_page(self, continuation_token=None):
+        return FakePager(self.pages, int(continuation_token or 0))
+
+
+class TestCursor:
+    """Opaque tokens and request parameters"""
+
+    def test_round_trip(self):
+        cursor = Cursor(created_at='2024-01-01T09:00', id='n2')
+        assert Cursor.decode(cursor.encode()) == cursor
+        assert Cursor.decode(Cursor(continuation='+RID:abc==').encode()).continuation == '+RID:abc=='
+        assert Cursor.decode('') is None
+
+    def test_tampered_tokens_are_rejected(self):
+        with pytest.raises(InvalidCursor):
+            Cursor.decode('not-a-cursor')
+        with pytest.raises(InvalidCursor):
+            page_params({'cursor': 'e30'})  # base64 of {}
+
+    def test_page_params_clamp_limit(self):
+        limit, cursor, include_total = page_params({'limit': '1000', 'include_total': 'true'}, max_limit=50)
+        assert (limit, cursor, include_total) == (50, None, True)
+        assert page_params({'limit': 'x'}, default_limit=7)[0] == 7
+
+
+class TestSeek:
+    """Walking every page yields each item exactly once"""
+
+    def test_list_seek_walks_ties_without_gaps(self):
+        items = make_items()
+        seen, cursor = [], None
+        while True:
+            page, token = list_seek(items, cursor, 2)
+            seen.extend(item['id'] for item in page)
+            if token is None:
+                break
+            cursor = Cursor.decode(token)
+
+        assert seen == [item['id'] for item in items]
+
+    def test_postgrest_seek_predicate(self):
+        query = RecordingQuery()
+        postgrest_seek(query, Cursor(created_at='2024-01-01T09:00', id='n2'), 20)
+
+        assert query.calls[0] == ('or_', ('created_at.lt.2024-01-01T09:00,and(created_at.eq.2024-01-01T09:00,id.lt.n2)',), {})
+        assert query.calls[-1] == ('limit', (21,), {})
+
+    @pytest.mark.parametrize('created_at, item_id', [
+        ('2024-01-01T09:00,id.gt.0', 'n2'),
+        ('2024-01-01T09:00', 'n2),or(id.gt.0'),
+        ('yesterday', 'n2'),
+    ])
+    def test_postgrest_seek_rejects_forged_values(self, created_at, item_id):
+        token = Cursor(created_at=created_at, id=item_id).encode()
+
+        with pytest.raises(InvalidCursor):
+            postgrest_seek(RecordingQuery(), Cursor.decode(token), 20)
+
+    def test_cosmos_seek_clause(self):
+        predicate, order_by, params = cosmos_seek(Cursor(created_at='t', id='i'))
+
+        assert '@cursor_time' in predicate and 'c.id < @cursor_id' in predicate
+        assert order_by == ' ORDER BY c.created_at DESC, c.id DESC'
+        assert [p['value'] for p in params] == ['t', 'i']
+        assert cosmos_seek(None)[0] == ''
+
+    def test_cosmos_continuation_pages(self):
+        items = FakeItems([[{'id': 1}, {'id': 2}], [{'id': 3}]])
+        first, token = cosmos_page(items, None)
+        second, last = cosmos_page(items, Cursor.decode(token))
+
+        assert [c['id'] for c in first + second] == [1, 2, 3]
+        assert last is None
+
+
+class TestEstimatedTotal:
+    def test_counts_are_reused(self):
+        calls = []
+
+        def count():
+            calls.append(1)
+            return 42
+
+        assert estimated_total(('test', 'reuse'), count) == 42
+        assert estimated_total(('test', 'reuse'), count) == 42
+        assert len(calls) == 1
@@ -0,0 +1,136 @@
+"""
+Tests for the inverted-index post search
+"""
+
+from search_index import SearchIndex, tokenize
+from search_index import _segment_names
+
+
+def make_post(post_id, content, username='Stargazer', western='Scorpio', chinese='Dragon', post_type='community_post'):
+    return {
+        'id': post_id,
+        'username': username,
+        'zodiac': western,
+        'zodiac_signs': {'western': western, 'chinese': chinese, 'mayan': 'Serpent', 'galactic_tone': 8},
+        'type': post_type,
+        'content': content,
+    }
+
+
+POSTS = [
+    make_post('p1', 'Full moon ritual for deep transformation', username='CosmicScorpio1'),
+    make_post('p2', 'Mercury retrograde survival guide', western='Gemini', chinese='Rat'),
+    make_post('p3', {'card_name': 'The Moon', 'interpretation': 'Moon energy reveals hidden truths'},
+              western='Pisces', post_type='tarot_reading'),
+    make_post('p4', 'Gratitude under the new moon', western='Leo', chinese='Tiger'),
+]
+
+
+class TestSearchIndex:
+    """Ranking, facets, incremental updates and persistence"""
+
+    def test_tokenizer_splits_camel_case(self):
+        assert tokenize('CosmicScorpio12 loves #FullMoon') == ['cosmic', 'scorpio', '12', 'loves', 'full', 'moon']
+
+    def test_bm25_ranks_denser_matches_first(self):
+        index = SearchIndex()
+        index.add_many(POSTS)
+
+        total, hits = index.search('moon')
+        assert total == 3
+        assert hits[0][0]['id'] == 'p3'
+        assert 'p2' not in [post['id'] for post, _ in hits]
+
+    def test_require_all_and_facets(self):
+        index = SearchIndex()
+        index.add_many(POSTS)
+
+        assert index.search('full moon', require_all=True)[0] == 1
+        assert [post['id'] for post, _ in index.search('moon', {'sign': ['tiger']})[1]] == ['p4']
+        assert [post['id'] for post, _ in index.search('moon', {'type': ['tarot_reading']})[1]] == ['p3']
+        assert index.search('moon', {'sign': ['leo'], 'type': ['tarot_reading']})[0] == 0
+
+    def test_pagination(self):
+        index = SearchIndex()
+        index.add_many(POSTS)
+
+        total, first = index.search('moon', limit=2)
+        _, rest = index.search('moon', limit=2, offset=2)
+        assert total == 3
+        assert len(first) == 2 and len(rest) == 1
+        assert {post['id'] for post, _ in first + rest} == {'p1', 'p3', 'p4'}
+
+    def test_newest_first_keyset_pages(self):
+        index = SearchIndex()
+        times = ['2024-01-03T00:00:00', '2024-01-01T00:00:00', '2024-01-02T00:00:00', '2024-01-02T00:00:00']
+        index.add_many(dict(post, created_at=created_at) for post, created_at in zip(POSTS, times))
+
+        total, first = index.search_newest('moon', limit=2)
+        assert total == 3
+        assert [post['id'] for post in first] == ['p1', 'p4']
+        last = first[-1]
+        _, rest = index.search_newest('moon', limit=2, before=(last['created_at'], last['id']))
+        assert [post['id'] for post in rest] == ['p3']
+
+    def test_updates_and_removals(self):
+        index = SearchIndex()
+        index.add_many(POSTS)
+        index.add(make_post('p1', 'Sunrise meditation'))
+        index.remove('p4')
+
+        assert [post['id'] for post, _ in index.search('moon')[1]] == ['p3']
+        assert index.search('sunrise')[0] == 1
+        assert len(index) == 3
+
+    def test_segments_round_trip_and_compact(self, tmp_path, monkeypatch):
+        monkeypatch.setattr('search_index.SEARCH_MAX_SEGMENTS', 2)
+        index = SearchIndex(str(tmp_path))
+        for post in POSTS:
+            index.add(post)
+            index.flush()
+        index.remove('p2')
+        index.flush()
+
+        assert index.get_stats()['segments'] <= 2
+        reloaded = SearchIndex.load(str(tmp_path))
+        assert len(reloaded) == 3
+        assert reloaded.search('moon', {'sign': ['pisces']})[1][0][0]['id'] == 'p3'
+
+    def test_removed_slots_are_reused(self):
+        index = SearchIndex()
+        for round_number in range(50):
+            index.add(make_post(f'churn{round_number}', 'Passing moon thought'))
+            index.remove(f'churn{round_number}')
+        index.add_many(POSTS)
+
+        assert index._capacity() == 1024
+        assert len(index._keys) == len(POSTS)
+        assert index.search('moon')[0] == 3
+
+    def test_interest_facet(self):
+        index = SearchIndex()
+        index.add_many(POSTS)
+
+        assert [post['id'] for post, _ in index.search('moon', {'interest': ['tarot']})[1]] == ['p3']
+
+    def test_transient_posts_are_not_persisted(self, tmp_path):
+        index = SearchIndex(str(tmp_path))
+        index.add_many(POSTS[:2], persist=False)
+        index.add(POSTS[2])
+        index.remove('p1')
+        index.compact()
+
+        assert len(index) == 2
+        assert [post['id'] for post, _ in SearchIndex.load(str(tmp_path)).search('moon')[1]] == ['p3']
+
+    def test_workers_sharing_a_directory_keep_each_others_segments(self, tmp_path):
+        first, second = SearchIndex(str(tmp_path)), SearchIndex(str(tmp_path))
+        first.add(POSTS[0])
+        second.add(POSTS[1])
+        first.flush()
+        second.flush()
+
+        assert len(_segment_names(str(tmp_path))) == 2
+        first.compact()
+        assert len(_segment_names(str(tmp_path))) == 1
+        assert len(SearchIndex.load(str(tmp_path))) == 2
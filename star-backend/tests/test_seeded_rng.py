@@ -0,0 +1,75 @@
+"""
+Tests for per-call seeded randomness
+"""
+
+import datetime
+import random
+
+import numpy as np
+
+from enhanced_tarot_engine import EnhancedTarotEngine
+from oracle_engine_enhanced import OccultOracleEngine
+from seeded_rng import derive_seed, draw_indices, generator_for, rng_for
+from sigil_generator import generate_base_sigil, generate_sigil_variations
+
+
+class TestSeededRng:
+    """Seeds are stable and draws never touch the module RNG"""
+
+    def test_seed_is_stable_and_part_sensitive(self):
+        assert derive_seed('u1', '2026-01-01') == derive_seed('u1', '2026-01-01')
+        assert derive_seed('u1', '2026-01-01') != derive_seed('u1', '2026-01-02')
+        assert rng_for('u1').random() == rng_for('u1').random()
+
+    def test_bulk_draws_are_distinct_cards(self):
+        indices, reversed_ = draw_indices(78, 10, 500, generator_for('bulk'))
+
+        assert indices.shape == reversed_.shape == (500, 10)
+        assert all(len(set(row)) == 10 for row in indices.tolist())
+        assert indices.min() >= 0 and indices.max() < 78
+        assert np.array_equal(indices, draw_indices(78, 10, 500, generator_for('bulk'))[0])
+
+    def test_global_random_state_is_untouched(self):
+        random.seed(7)
+        expected = [random.random() for _ in range(3)]
+        random.seed(7)
+        EnhancedTarotEngine().draw_cards(3, seed='user-1')
+        generate_base_sigil('leo', 'seeker', 'user-1')
+
+        assert [random.random() for _ in range(3)] == expected
+
+
+class TestSeededReadings:
+    """Engines reproduce readings from the same seed"""
+
+    def test_tarot_draws_reproduce(self):
+        engine = EnhancedTarotEngine()
+        first = [card.name for card in engine.draw_cards(3, seed='user-1:2026-01-01')]
+
+        assert first == [card.name for card in engine.draw_cards(3, seed='user-1:2026-01-01')]
+        readings = engine.draw_many(3, 50, seed='batch')
+        assert len(readings) == 50 and all(len({card.name for card, _ in r}) == 3 for r in readings)
+        assert [c.name for c, _ in readings[0]] == [c.name for c, _ in engine.draw_many(3, 50, seed='batch')[0]]
+
+    def test_daily_guidance_is_one_card_per_user_per_day(self):
+        engine = EnhancedTarotEngine()
+        day = datetime.date(2026, 3, 1)
+        guidance = engine.get_daily_guidance({'id': 'user-daily'}, day)
+
+        assert engine.get_daily_guidance({'id': 'user-daily'}, day) is guidance
+        assert EnhancedTarotEngine().get_daily_guidance({'id': 'user-daily'}, day)['card'] == guidance['card']
+
+    def test_sigils_are_deterministic_copies(self):
+        sigil = generate_base_sigil('scorpio', 'mystic', 'user-2')
+        sigil['points'].clear()
+        again = generate_base_sigil('scorpio', 'mystic', 'user-2')
+
+        assert again['points'] and again['points'] == generate_base_sigil('scorpio', 'mystic', 'user-2')['points']
+        assert generate_sigil_variations(again)[1]['points'] == generate_sigil_variations(again)[1]['points']
+
+    def test_i_ching_casts(self):
+        oracle = OccultOracleEngine()
+
+        assert oracle.cast_i_ching('career?', seed='u1') == oracle.cast_i_ching('career?', seed='u1')
+        hexagrams = oracle.cast_i_ching_many(100, seed='u1')
+        assert len(hexagrams) == 100 and all(1 <= h.number <= 64 for h in hexagrams)
@@ -0,0 +1,91 @@
+"""
+Tests for versioned collaboration state and write-behind persistence
+"""
+
+import threading
+
+import pytest
+
+from session_state import DebouncedWriter, InvalidOp, VersionedState, ops_from_update
+
+
+class TestVersionedState:
+    """Deltas, catch-up tails and snapshots"""
+
+    def test_each_batch_is_one_version(self):
+        state = VersionedState()
+        first = state.apply(ops_from_update({'card': 'The Star', 'spread': 'single'}), 'u1')
+        second = state.apply([{'op': 'delete', 'key': 'spread'}, {'op': 'delete', 'key': 'missing'}], 'u2')
+
+        assert (first['version'], second['version'], second['base_version']) == (1, 2, 1)
+        assert second['ops'] == [{'op': 'delete', 'key': 'spread'}]
+        assert state.state == {'card': {'value': 'The Star', 'updated_by': 'u1',
+                                        'timestamp': first['timestamp'], 'version': 1}}
+
+    def test_late_joiner_gets_tail_or_snapshot(self):
+        state = VersionedState(tail_size=3)
+        for i in range(5):
+            state.apply([{'op': 'set', 'key': 'k', 'value': i}], 'u1')
+
+        assert [d['version'] for d in state.catch_up(3)['deltas']] == [4, 5]
+        assert state.catch_up(5) == {'version': 5, 'deltas': []}
+        snapshot = state.catch_up(1)
+        assert 'deltas' not in snapshot and snapshot['state']['k']['value'] == 4
+
+    def test_unknown_ops_are_rejected_whole(self):
+        state = VersionedState()
+        with pytest.raises(InvalidOp):
+            state.apply([{'op': 'set', 'key': 'a', 'value': 1}, {'op': 'append', 'key': 'b'}], 'u1')
+        assert state.version == 0 and state.state == {}
+
+
+class TestDebouncedWriter:
+    """Many marks collapse into one write per interval"""
+
+    def test_marks_coalesce(self):
+        writes = []
+        writer = DebouncedWriter(writes.append, interval=60)
+        for _ in range(50):
+            writer.mark('s1')
+        writer.mark('s2')
+        writer.mark('gone')
+        writer.discard('gone')
+
+        assert writes == []
+        assert writer.flush('s1') == 1
+        assert writer.flush() == 1
+        assert writes == ['s1', 's2']
+        writer.stop()
+
+    def test_background_flush(self):
+        written = threading.Event()
+        writes = []
+
+        def write(key):
+            writes.append(key)
+            written.set()
+
+        writer = DebouncedWriter(write, interval=0.01)
+        writer.mark('s1')
+
+        assert written.wait(2)
+        writer.stop()
+        assert writes == ['s1']
+
+    def test_failed_write_is_retried_with_backoff(self):
+        attempts = []
+
+        def write(key):
+            attempts.append(key)
+            if len(attempts) == 1:
+                raise IOError('cosmos unavailable')
+
+        writer = DebouncedWriter(write, interval=60)
+        writer.mark('s1')
+
+        assert writer.flush() == 0
+        assert writer.get_stats()['pending'] == 1 and writer.get_stats()['retrying'] == 1
+        assert writer.flush() == 0 and attempts == ['s1']       # still backing off
+        assert writer.flush(force=True) == 1
+        assert writer.get_stats() == {'pending': 0, 'retrying': 0, 'marked': 1, 'writes': 1, 'failed': 1}
+        writer.stop()
@@ -0,0 +1,176 @@
+"""
+Tests for multi-node Socket.IO fan-out
+"""
+
+from socket_fanout import FANOUT_CHANNEL, NODE_KEY, ROOM_KEY, SOCKETS_KEY, SocketFanout
+
+
+class RecordingSocketIO:
+    """SocketIO stand-in that records local emits"""
+
+    def __init__(self):
+        self.emits = []
+
+    def emit(self, event, data, to=None, skip_sid=None):
+        self.emits.append((event, to, skip_sid))
+
+
+class FakeRedisManager:
+    """Dict-backed stand-in for the RedisManager set/hash/publish surface shared by several nodes"""
+
+    def __init__(self):
+        self.client = object()
+        self.sets = {}
+        self.hashes = {}
+        self.values = {}
+        self.published = []
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        return True
+
+    def delete(self, key):
+        return self.values.pop(key, None) is not None
+
+    def exists_many(self, keys):
+        return [key in self.values for key in keys]
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+        return True
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+        return True
+
+    def sunion(self, keys):
+        return set().union(*(self.sets.get(key, set()) for key in keys))
+
+    def smembers_many(self, keys):
+        return [set(self.sets.get(key, set())) for key in keys]
+
+    def hgetall_many(self, keys):
+        return [dict(self.hashes.get(key, {})) for key in keys]
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+        return True
+
+    def hset_many(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+        return True
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+        return True
+
+    def hlen(self, key):
+        return len(self.hashes.get(key, {}))
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return True
+
+    def pubsub(self):
+        return None
+
+
+def make_nodes(count=2):
+    redis = FakeRedisManager()
+    return redis, [SocketFanout(RecordingSocketIO(), redis, node_id=f'node{i}') for i in range(count)]
+
+
+class TestSocketFanout:
+    """One publish per event, delivered only where the rooms are hosted"""
+
+    def test_local_only_without_redis(self):
+        fanout = SocketFanout(RecordingSocketIO())
+        fanout.connect('a')
+        fanout.join('a', 'general_feed')
+        fanout.emit('feed_update', {}, rooms=['general_feed', 'zodiac_western_Leo'])
+
+        assert fanout.socketio.emits == [('feed_update', ['general_feed', 'zodiac_western_Leo'], None)]
+        assert fanout.connected_count() == 1
+
+    def test_multi_room_emit_is_one_publish(self):
+        redis, (origin, remote) = make_nodes()
+        remote.connect('r1')
+        remote.join('r1', 'zodiac_western_Leo')
+        rooms = ['general_feed', 'zodiac_western_Leo', 'zodiac_chinese_Rat', 'zodiac_mayan_Seed', 'type_community_post']
+
+        origin.emit('feed_update', {'post': {'id': 'p1'}}, rooms=rooms)
+
+        assert len(redis.published) == 1 and redis.published[0][0] == FANOUT_CHANNEL
+        assert remote.deliver(redis.published[0][1])
+        assert remote.socketio.emits == [('feed_update', ['zodiac_western_Leo'], None)]
+        assert not origin.deliver(redis.published[0][1])  # own message
+
+    def test_publish_skipped_when_no_other_node_hosts_the_rooms(self):
+        redis, (origin, remote) = make_nodes()
+        origin.join('o1', 'post_7')
+        remote.join('r1', 'post_8')
+
+        origin.emit('post_reaction', {}, rooms='post_7')
+        assert redis.published == [] and origin.skipped == 1
+
+        remote.leave('r1', 'post_8')
+        assert redis.sets['socketio:room:post_8'] == set()
+
+    def test_shared_registry_and_disconnect(self):
+        redis, (first, second) = make_nodes()
+        first.connect('a')
+        second.connect('b')
+        second.join('b', 'session-1')
+
+        assert first.connected_count() == 2
+        second.disconnect('b')
+        assert first.connected_count() == 1
+        assert redis.sets['socketio:room:session-1'] == set()
+
+    def test_broadcast_reaches_every_node(self):
+        redis, (origin, remote) = make_nodes()
+        origin.emit('new_moment', {'id': 'm1'}, skip_sid=['x'])
+
+        assert remote.deliver(redis.published[0][1])
+        assert remote.socketio.emits == [('new_moment', None, ['x'])]
+
+    def test_reap_removes_entries_of_nodes_without_heartbeat(self):
+        redis, (live, crashed) = make_nodes()
+        for node, sid in ((live, 'l1'), (crashed, 'c1')):
+            node.connect(sid)
+            node.join(sid, 'general_feed')
+        crashed.join('c1', 'zodiac_western_Leo')
+        for node in (live, crashed):
+            node._listener.join()  # the listener beats once, then exits without pub/sub
+
+        assert live.reap() == 0
+        redis.values.pop(NODE_KEY.format('node1'))  # heartbeat expired
+        assert live.reap() == 3
+
+        assert set(redis.hashes[SOCKETS_KEY]) == {'l1'}
+        assert redis.sets[ROOM_KEY.format('general_feed')] == {'node0'}
+        assert not redis.sets[ROOM_KEY.format('zodiac_western_Leo')]
+        assert live.connected_count() == 1
+
+    def test_missed_beat_then_reap_is_repaired_by_the_next_beat(self):
+        redis, (peer, node) = make_nodes()
+        node.connect('n1')
+        node.join('n1', 'general_feed')
+        node._listener.join()
+        peer.connect('p1')
+        peer._listener.join()
+
+        redis.set = lambda key, value, ex=None: False  # Redis hiccup: this beat is lost
+        node.heartbeat()
+        del redis.set
+        redis.values.pop(NODE_KEY.format('node1'))      # ... and the TTL lapses
+        assert peer.reap() == 2
+        assert set(redis.hashes[SOCKETS_KEY]) == {'p1'}
+
+        node.heartbeat()
+
+        assert set(redis.hashes[SOCKETS_KEY]) == {'p1', 'n1'}
+        assert redis.sets[ROOM_KEY.format('general_feed')] == {'node1'}
+        assert 'general_feed' in redis.sets['socketio:rooms']
+        assert peer.reap() == 0
@@ -0,0 +1,182 @@
+"""
+Tests for the stage graph executor and the concurrent oracle session
+"""
+
+import datetime
+import threading
+import time
+
+import pytest
+
+from stage_graph import Stage, StageExecutor, StageGraph, StageGraphError, StageRun, StageTimings
+
+
+@pytest.fixture
+def executor():
+    executor = StageExecutor(max_workers=4)
+    yield executor
+    executor.shutdown()
+
+
+class TestStageGraph:
+    """Validation and dependency order"""
+
+    def test_order_respects_dependencies(self):
+        graph = StageGraph([
+            Stage('summary', lambda chart, moon: None, deps=('chart', 'moon')),
+            Stage('chart', lambda: None),
+            Stage('moon', lambda: None),
+        ])
+        assert graph.order.index('summary') > max(graph.order.index('chart'), graph.order.index('moon'))
+        assert graph.dependents['chart'] == ['summary']
+
+    def test_invalid_graphs_are_rejected(self):
+        with pytest.raises(StageGraphError):
+            StageGraph([Stage('a', lambda b: None, deps=('b',)), Stage('b', lambda a: None, deps=('a',))])
+        with pytest.raises(StageGraphError):
+            StageGraph([Stage('a', lambda missing: None, deps=('missing',))])
+        with pytest.raises(StageGraphError):
+            StageGraph([Stage('a', lambda: None), Stage('a', lambda: None)])
+
+
+class TestStageExecutor:
+    """Concurrency, partial results and timeouts"""
+
+    def test_independent_stages_run_concurrently(self, executor):
+        barrier = threading.Barrier(3, timeout=2)
+
+        def meet():
+            barrier.wait()
+            return threading.current_thread().name
+
+        graph = StageGraph([Stage(name, meet) for name in ('a', 'b', 'c')]
+                           + [Stage('d', lambda a, b: a + b, deps=('a', 'b'))])
+        run = executor.run(graph)
+
+        assert run.ok
+        assert run.get('d') == run.get('a') + run.get('b')
+        assert set(run.timings) == {'a', 'b', 'c', 'd'}
+
+    def test_failure_skips_only_dependents(self, executor):
+        def broken():
+            raise RuntimeError('ephemeris unavailable')
+
+        graph = StageGraph([
+            Stage('chart', broken),
+            Stage('transits', lambda chart: chart, deps=('chart',)),
+            Stage('moon', lambda: 'full'),
+        ])
+        run = executor.run(graph)
+
+        assert run.get('moon') == 'full'
+        assert run.errors == {'chart': 'RuntimeError: ephemeris unavailable',
+                              'transits': 'dependency chart failed'}
+
+    def test_slow_stage_times_out(self, executor):
+        release = threading.Event()
+        graph = StageGraph([
+            Stage('ai', lambda: release.wait(5), timeout=0.05),
+            Stage('moon', lambda: 'new'),
+        ])
+        started = time.perf_counter()
+        run = executor.run(graph)
+        release.set()
+
+        assert time.perf_counter() - started < 1
+        assert run.get('moon') == 'new'
+        assert run.errors['ai'].startswith('timed out')
+
+    def test_waiting_for_a_worker_does_not_count_against_the_timeout(self):
+        executor = StageExecutor(max_workers=2)
+        release = threading.Event()
+        graphs = [StageGraph([Stage('work', lambda: release.wait(0.2) or 'done', timeout=0.3)])
+                  for _ in range(6)]
+        runs = [StageRun() for _ in graphs]
+        threads = [threading.Thread(target=lambda g=g, r=r: [None for _ in executor.stream(g, r)])
+                   for g, r in zip(graphs, runs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        executor.shutdown()
+
+        assert all(run.ok and run.get('work') == 'done' for run in runs)
+        assert executor.get_stats()['busy'] == 0
+
+    def test_timed_out_stage_keeps_its_worker_until_it_returns(self):
+        executor = StageExecutor(max_workers=1, queue_timeout=0.1)
+        release = threading.Event()
+        first = executor.run(StageGraph([Stage('hung', lambda: release.wait(5), timeout=0.05)]))
+        second = executor.run(StageGraph([Stage('next', lambda: 'ran')]))
+        release.set()
+        third = executor.run(StageGraph([Stage('next', lambda: 'ran')]))
+        executor.shutdown()
+
+        assert first.errors['hung'].startswith('timed out')
+        assert second.errors['next'].startswith('no free worker')
+        assert third.get('next') == 'ran'
+
+    def test_stream_yields_stages_as_they_finish(self, executor):
+        release = threading.Event()
+        graph = StageGraph([
+            Stage('slow', lambda: release.wait(2)),
+            Stage('fast', lambda: 'cards'),
+            Stage('after_fast', lambda fast: fast.upper(), deps=('fast',)),
+        ])
+        run = StageRun()
+        seen = []
+        for name in executor.stream(graph, run):
+            seen.append(name)
+            if name == 'after_fast':
+                release.set()
+
+        assert seen == ['fast', 'after_fast', 'slow']
+        assert run.get('after_fast') == 'CARDS' and run.wall_ms > 0
+
+    def test_timings_aggregate_per_stage(self, executor):
+        timings = StageTimings()
+        graph = StageGraph([Stage('a', lambda: 1), Stage('b', lambda: 1 / 0)])
+        for _ in range(2):
+            timings.record(executor.run(graph), 'session')
+
+        snapshot = timings.snapshot()
+        assert snapshot['a']['count'] == 2 and snapshot['a']['errors'] == 0
+        assert snapshot['b']['errors'] == 2
+        assert snapshot['session']['count'] == 2
+
+
+class TestOracleSessionStages:
+    """create_complete_oracle_session degrades to partial results"""
+
+    def test_failed_stage_yields_partial_session(self, monkeypatch):
+        pytest.importorskip('ephem')
+        from oracle_engine_enhanced import OccultOracleEngine
+
+        engine = OccultOracleEngine()
+
+        def broken(*args, **kwargs):
+            raise RuntimeError('no ephemeris')
+
+        monkeypatch.setattr(engine, 'calculate_natal_chart_cached', broken)
+        session = engine.create_complete_oracle_session(
+            'u1', 'Ada Lovelace', datetime.datetime(1990, 6, 15, 12, 0), 'London', 'What next?'
+        )
+
+        assert session.natal_chart is None and session.current_transits == []
+        assert set(session.stage_errors) == {'natal_chart', 'transits'}
+        assert session.tarot_reading is not None and session.i_ching_hexagram is not None
+        assert session.session_summary
+        assert 'natal_chart' in engine.get_performance_stats()['stage_timings']
+
+    def test_session_stages_stream_before_the_session(self):
+        pytest.importorskip('ephem')
+        from oracle_engine_enhanced import OccultOracleEngine
+
+        stages = [stage for stage, _ in OccultOracleEngine().iter_complete_oracle_session(
+            'u1', 'Ada Lovelace', datetime.datetime(1990, 6, 15, 12, 0), 'London'
+        )]
+
+        assert stages[-1] == 'session'
+        assert stages.index('tarot_cards') < stages.index('tarot')
+        assert stages.index('natal_chart') < stages.index('transits')
+        assert len(stages) == 8
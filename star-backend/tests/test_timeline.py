@@ -0,0 +1,95 @@
+"""
+Tests for the fan-out-on-write home timeline store
+"""
+
+from timeline import TimelineStore
+
+
+class FakeRedisManager:
+    """Dict-backed stand-in for the RedisManager list and set surface"""
+
+    def __init__(self):
+        self.client = object()
+        self.lists = {}
+        self.sets = {}
+
+    def lpush_capped(self, keys, value, max_length):
+        for key in keys:
+            self.lists[key] = ([value] + self.lists.get(key, []))[:max_length]
+        return True
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+        return True
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+        return True
+
+    def smembers_many(self, keys):
+        return [set(self.sets.get(key, set())) for key in keys]
+
+
+def make_post(post_id, user_id, timestamp):
+    return {'id': post_id, 'user_id': user_id, 'content': f'post {post_id}', 'timestamp': timestamp}
+
+
+class TestTimelineStore:
+    """In-memory timeline behaviour (no Redis configured)"""
+
+    def test_fan_out_reaches_author_and_followers(self):
+        store = TimelineStore()
+        delivered = store.fan_out(make_post('p1', 'author', '2024-01-01T00:00:00'), ['f1', 'f2'])
+
+        assert delivered == 3
+        for user_id in ('author', 'f1', 'f2'):
+            assert [e['id'] for e in store.read(user_id)] == ['p1']
+
+    def test_timelines_are_newest_first_and_capped(self):
+        store = TimelineStore(max_length=3)
+        for i in range(5):
+            store.fan_out(make_post(f'p{i}', 'author', f'2024-01-01T00:00:0{i}'), ['f1'])
+
+        assert [e['id'] for e in store.read('f1', limit=10)] == ['p4', 'p3', 'p2']
+
+    def test_read_before_cursor(self):
+        store = TimelineStore()
+        for i in range(4):
+            store.fan_out(make_post(f'p{i}', 'author', f'2024-01-01T00:00:0{i}'), ['f1'])
+
+        page = store.read('f1', limit=2, before='2024-01-01T00:00:02')
+        assert [e['id'] for e in page] == ['p1', 'p0']
+
+    def test_high_follower_author_is_pulled_on_read(self):
+        store = TimelineStore(fanout_limit=2)
+        store.fan_out(make_post('p1', 'celebrity', '2024-01-01T00:00:00'), None, follower_count=10)
+
+        assert store.is_pull_author('celebrity')
+        assert store.read('f1') == []
+        assert store.pull_authors_followed_by('f1', lambda _uid: ['celebrity', 'friend']) == ['celebrity']
+
+    def test_merge_orders_and_deduplicates(self):
+        pushed = [make_post('p2', 'a', '2024-01-01T00:00:02'), make_post('p1', 'a', '2024-01-01T00:00:01')]
+        pulled = [make_post('p3', 'c', '2024-01-01T00:00:03'), make_post('p2', 'a', '2024-01-01T00:00:02')]
+
+        merged = TimelineStore.merge(pushed, pulled, limit=10)
+        assert [e['id'] for e in merged] == ['p3', 'p2', 'p1']
+
+    def test_pull_authors_are_shared_between_workers(self):
+        redis = FakeRedisManager()
+        writer = TimelineStore(redis, fanout_limit=2)
+        reader = TimelineStore(redis, fanout_limit=2)
+        writer.fan_out(make_post('p1', 'celebrity', '2024-01-01T00:00:00'), None, follower_count=10)
+
+        assert reader.pull_authors_followed_by('f1', lambda _uid: ['celebrity']) == ['celebrity']
+
+    def test_failed_redis_push_is_skipped_not_kept_locally(self):
+        redis = FakeRedisManager()
+        redis.lpush_capped = lambda keys, value, max_length: False
+        store = TimelineStore(redis)
+
+        assert store.fan_out(make_post('p1', 'a', '2024-01-01T00:00:00'), ['f1']) == 0
+        assert not store._timelines
@@ -0,0 +1,187 @@
+"""
+Tests for the per-user rolling event index
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from user_event_index import UserEventIndex
+
+
+class FakeRedisManager:
+    """Dict-backed stand-in exposing the RedisManager hash and get/set surface"""
+
+    def __init__(self):
+        self.client = object()
+        self.hashes = {}
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+        return True
+
+    def set_nx(self, key, value, ex=None):
+        if key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    def delete(self, key):
+        return self.store.pop(key, None) is not None
+
+    def hincrby_many(self, increments, ex=None):
+        for key, fields in increments.items():
+            stored = self.hashes.setdefault(key, {})
+            for field, amount in fields.items():
+                stored[field] = str(int(stored.get(field, 0)) + amount)
+        return True
+
+    def hgetall_many(self, keys):
+        return [dict(self.hashes.get(key, {})) for key in keys]
+
+
+NOW = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+class TestUserEventIndex:
+    """Incremental counts, day windows and the shared Redis tier"""
+
+    def test_counts_and_hour_histogram(self):
+        index = UserEventIndex()
+        index.record_many([
+            ("alice", "tarot_draw", NOW.replace(hour=9)),
+            ("alice", "tarot_draw", NOW.replace(hour=9)),
+            ("alice", "voice_chat", NOW.replace(hour=21)),
+            ("bob", "tarot_draw", NOW),
+        ])
+
+        summary = index.summary("alice", days=7, now=NOW)
+        assert summary['event_counts'] == {"tarot_draw": 2, "voice_chat": 1}
+        assert summary['total'] == 3
+        assert index.active_hours(summary['hour_histogram']) == [9, 21]
+
+    def test_window_excludes_older_days(self):
+        index = UserEventIndex()
+        index.record_many([
+            ("alice", "spotify_play", NOW - timedelta(days=2)),
+            ("alice", "spotify_play", NOW - timedelta(days=10)),
+        ])
+
+        assert index.summary("alice", days=7, now=NOW)['total'] == 1
+        assert index.summary("alice", days=14, now=NOW)['total'] == 2
+
+    def test_events_beyond_retention_are_ignored(self):
+        index = UserEventIndex(retention_days=3)
+        index.record_many([("alice", "tarot_draw", datetime.utcnow() - timedelta(days=5))])
+
+        assert index.get_stats()['recorded'] == 0
+
+    def test_seeding_marks_user_and_evicts_lru(self):
+        index = UserEventIndex(max_users=2)
+        index.seed("alice", [("tarot_draw", NOW)])
+        index.seed("bob", [])
+        index.seed("carol", [])
+
+        assert not index.is_seeded("alice")
+        assert index.is_seeded("carol")
+        assert index.get_stats()['evicted'] == 1
+
+    def test_redis_tier_is_shared_between_workers(self):
+        redis = FakeRedisManager()
+        writer = UserEventIndex(redis_manager=redis)
+        reader = UserEventIndex(redis_manager=redis)
+
+        writer.seed("alice", [("numerology_calc", NOW - timedelta(days=1))])
+        writer.record_many([("alice", "numerology_calc", NOW)])
+
+        assert reader.is_seeded("alice")
+        assert reader.summary("alice", days=7, now=NOW)['event_counts'] == {"numerology_calc": 2}
+
+
+    def test_only_one_caller_claims_a_seed(self):
+        redis = FakeRedisManager()
+        first, second = UserEventIndex(redis), UserEventIndex(redis)
+
+        assert first.claim_seed("alice")
+        assert not first.claim_seed("alice")
+        assert not second.claim_seed("alice")
+
+        first.release_seed("alice")
+        assert second.claim_seed("alice")
+        second.seed("alice", [("tarot_draw", NOW)])
+        assert second.summary("alice", days=1, now=NOW)['total'] == 1
+
+
+class TestAnalyticsEngineIndexing:
+    """Seeding from storage and counting each ingested event once"""
+
+    def test_batch_is_counted_once_after_seeding(self):
+        from analytics_engine import AnalyticsEngine, EngagementEvent, EngagementType
+
+        stored = [{'user_id': 'alice', 'event_type': 'tarot_draw',
+                   'timestamp': (NOW - timedelta(days=1)).isoformat()}]
+
+        class Container:
+            def query_items(self, query, parameters=None):
+                return [item for item in stored if item['user_id'] == parameters[0]['value']]
+
+            def upsert_item(self, body):
+                stored.append(body)
+
+        class Helper:
+            def get_container(self, name):
+                return Container()
+
+        engine = AnalyticsEngine(Helper())
+        engine.user_index.redis = None
+        event = EngagementEvent(user_id='alice', event_type=EngagementType.TAROT_DRAW, timestamp=datetime.utcnow(),
+                                metadata={}, session_id='s1')
+
+        engine._write_event_batch([event])
+        activity = asyncio.run(engine.get_user_activity('alice', days=7))
+
+        assert activity['event_counts'] == {'tarot_draw': 2}
+
+    def test_retry_repeats_only_the_write(self):
+        from analytics_engine import AnalyticsEngine, EngagementEvent, EngagementType
+
+        writes = []
+        listened = []
+
+        class Container:
+            def query_items(self, query, parameters=None):
+                return []
+
+            def upsert_item(self, body):
+                if 'event_type' not in body:
+                    return  # insights document
+                writes.append(body['id'])
+                if len(writes) == 1:
+                    raise ConnectionError("database unavailable")
+
+        class Helper:
+            def get_container(self, name):
+                return Container()
+
+        def failing_listener(events):
+            listened.append(len(events))
+            raise RuntimeError("listener broke")
+
+        engine = AnalyticsEngine(Helper())
+        engine.user_index.redis = None
+        AnalyticsEngine.add_batch_listener(failing_listener)
+        try:
+            event = EngagementEvent(user_id='bob', event_type=EngagementType.TAROT_DRAW, timestamp=datetime.utcnow(),
+                                    metadata={}, session_id='s1')
+            engine.ingestor._write([event])
+            engine.ingestor._write_retries(force=True)
+        finally:
+            AnalyticsEngine.batch_listeners.remove(failing_listener)
+
+        assert len(writes) == 2
+        assert listened == [1]
+        assert engine.ingestor.get_stats()['written'] == 1
+        assert engine.user_index.summary('bob', days=1)['total'] == 1
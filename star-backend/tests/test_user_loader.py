@@ -0,0 +1,79 @@
+"""
+Tests for the batched user loader and the shared TTL cache
+"""
+
+import time
+
+from cache_utils import TTLCache
+from user_loader import UserLoader, invalidate_user
+
+
+class CountingBatch:
+    """Fake batch function that records every query it receives"""
+
+    def __init__(self, users):
+        self.users = users
+        self.calls = []
+
+    def __call__(self, user_ids):
+        self.calls.append(sorted(user_ids))
+        return [self.users[uid] for uid in user_ids if uid in self.users]
+
+
+USERS = {str(i): {'id': str(i), 'username': f'star{i}'} for i in range(30)}
+
+
+class TestUserLoader:
+    """DataLoader-style batching and memoization"""
+
+    def test_twenty_authors_cost_one_query(self):
+        batch = CountingBatch(USERS)
+        loader = UserLoader(batch, namespace='test_batch', cache=TTLCache())
+
+        authors = loader.load_many(str(i % 20) for i in range(40))
+
+        assert len(authors) == 20
+        assert len(batch.calls) == 1
+
+    def test_memoized_within_request_and_cached_across_requests(self):
+        batch = CountingBatch(USERS)
+        cache = TTLCache()
+        first = UserLoader(batch, namespace='test_memo', cache=cache)
+        first.load_many(['1', '2'])
+        first.load('1')
+
+        second = UserLoader(batch, namespace='test_memo', cache=cache)
+        assert second.load('2')['username'] == 'star2'
+        assert len(batch.calls) == 1
+
+    def test_unknown_ids_are_omitted(self):
+        loader = UserLoader(CountingBatch(USERS), namespace='test_unknown', cache=TTLCache())
+        assert loader.load_many(['1', 'missing']) == {'1': USERS['1']}
+        assert loader.load('missing') is None
+
+    def test_invalidate_user_drops_shared_profile(self):
+        batch = CountingBatch(USERS)
+        UserLoader(batch, namespace='test_invalidate').load('3')
+        invalidate_user('3')
+        UserLoader(batch, namespace='test_invalidate').load('3')
+        assert len(batch.calls) == 2
+
+
+class TestTTLCache:
+    """LRU eviction and expiry"""
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert cache.stats()['misses'] == 1
@@ -0,0 +1,146 @@
+"""
+Tests for the materialized user stats projection
+"""
+
+from datetime import date
+
+from counters import CounterService
+from user_stats import UserStatsProjection, advance_streak, live_streak, streaks
+
+
+class MemoryBackend:
+    """Dict-backed stats documents over a fixed set of source posts"""
+
+    def __init__(self, posts=None, followers=0, following=0):
+        self.docs = {}
+        self.posts = posts or {}
+        self.followers = followers
+        self.following = following
+        self.reads = 0
+        self.scans = []
+
+    def read(self, user_id):
+        self.reads += 1
+        doc = self.docs.get(user_id)
+        return dict(doc) if doc else None
+
+    def increment(self, user_id, deltas):
+        if user_id not in self.docs:
+            return False
+        for field, delta in deltas.items():
+            self.docs[user_id][field] = self.docs[user_id].get(field, 0) + delta
+        return True
+
+    def set_fields(self, user_id, fields):
+        self.docs[user_id].update(fields)
+
+    def replace(self, doc):
+        self.docs[doc['id']] = dict(doc)
+
+    def scan(self, user_id):
+        self.scans.append(user_id)
+        return {'posts': self.posts.get(user_id, []), 'followers_count': self.followers,
+                'following_count': self.following}
+
+    def user_ids(self):
+        return list(self.posts)
+
+
+def projection_for(backend):
+    return UserStatsProjection(backend, CounterService(flush_interval=60))
+
+
+class TestStreaks:
+    """Posting streaks from history and from single days"""
+
+    def test_rebuild_streaks(self):
+        days = [date(2026, 1, d) for d in (1, 2, 3, 5, 6, 6)]
+        assert streaks(days) == {'current_streak': 2, 'longest_streak': 3, 'last_active_date': '2026-01-06'}
+        assert streaks([])['current_streak'] == 0
+
+    def test_advance_and_expire(self):
+        stats = {'current_streak': 2, 'longest_streak': 2, 'last_active_date': '2026-01-06'}
+
+        assert advance_streak(stats, date(2026, 1, 6)) == {}
+        assert advance_streak(stats, date(2026, 1, 7))['current_streak'] == 3
+        assert advance_streak(stats, date(2026, 1, 9))['longest_streak'] == 2
+        assert live_streak(stats, date(2026, 1, 7)) == 2
+        assert live_streak(stats, date(2026, 1, 8)) == 0
+
+
+class TestUserStatsProjection:
+    """Incremental updates, cached reads and rebuilds"""
+
+    def test_missing_document_is_rebuilt_once(self):
+        backend = MemoryBackend({'u1': [{'likes': 3, 'comments': 1, 'created_at': '2026-01-01T10:00:00'},
+                                        {'likes': 2, 'comments': 0, 'created_at': '2026-01-02T10:00:00'}]},
+                                followers=7)
+        projection = projection_for(backend)
+
+        stats = projection.get('u1', today=date(2026, 1, 2))
+        assert (stats['post_count'], stats['total_likes'], stats['total_comments']) == (2, 5, 1)
+        assert (stats['followers_count'], stats['current_streak']) == (7, 2)
+        projection.get('u1', today=date(2026, 1, 2))
+        assert (backend.reads, backend.scans) == (1, ['u1'])
+
+    def test_writes_update_counts_without_rescanning(self):
+        backend = MemoryBackend({'u1': []})
+        projection = projection_for(backend)
+        projection.get('u1')
+
+        projection.post_created('u1', '2026-02-01T08:00:00')
+        for _ in range(4):
+            projection.post_liked('u1')
+        projection.post_liked('u1', -1)
+        projection.comment_added('u1')
+        projection.follow_changed('u2', 'u1')
+
+        stats = projection.get('u1', today=date(2026, 2, 1))
+        assert (stats['post_count'], stats['total_likes'], stats['total_comments']) == (1, 3, 1)
+        assert (stats['followers_count'], stats['current_streak']) == (1, 1)
+        assert projection.counters.flush() == 2
+        assert backend.docs['u1']['total_likes'] == 3 and backend.docs['u1']['last_active_date'] == '2026-02-01'
+        # u2 had no document yet, so its first flush rebuilt it instead
+        assert backend.scans == ['u1', 'u2']
+
+    def test_rebuild_all_corrects_drift(self):
+        backend = MemoryBackend({'u1': [{'likes': 1}], 'u2': []})
+        projection = projection_for(backend)
+        projection.get('u1')
+        backend.docs['u1']['total_likes'] = 99
+
+        assert projection.rebuild_all() == 2
+        assert projection.get('u1')['total_likes'] == 1
+
+    def test_rebuild_discards_deltas_it_already_counted(self):
+        backend = MemoryBackend({'u1': [{'likes': 0}]})
+        projection = projection_for(backend)
+        projection.get('u1')
+        backend.posts['u1'].append({'likes': 0})
+        projection.post_created('u1')
+
+        projection.rebuild('u1')
+        projection.counters.flush()
+        assert backend.docs['u1']['post_count'] == 2
+        assert projection.get('u1')['post_count'] == 2
+
+    def test_rebuild_scans_without_pausing_other_flushes(self):
+        backend = MemoryBackend({'u1': [{'likes': 0}], 'u2': [{'likes': 0}]})
+        projection = projection_for(backend)
+        projection.get('u1')
+        projection.get('u2')
+        flushed = []
+
+        def scan(user_id, original=backend.scan):
+            projection.post_created('u2')
+            projection.post_created('u1')  # arrives mid-scan; the scan does not see it
+            flushed.append(projection.counters.flush())
+            return original(user_id)
+
+        backend.scan = scan
+        projection.rebuild('u1')
+
+        assert flushed == [1] and backend.docs['u2']['post_count'] == 2
+        assert backend.docs['u1']['post_count'] == 1
+        assert projection.counters.flush() == 1
+        assert backend.docs['u1']['post_count'] == 2
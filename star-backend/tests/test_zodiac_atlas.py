@@ -0,0 +1,64 @@
+"""
+Tests for the multi-zodiac day atlas
+"""
+
+import datetime
+
+import numpy as np
+import pytest
+
+pytest.importorskip("ephem")
+
+from zodiac_atlas import ZodiacAtlas, day_codes, decode
+
+
+@pytest.fixture(scope='module')
+def atlas():
+    return ZodiacAtlas.build(datetime.date(1999, 12, 1), datetime.date(2001, 1, 31))
+
+
+def legacy_codes(day):
+    """The per-call formulas MultiZodiacCalculator used before the atlas"""
+    birth = datetime.datetime(day.year, day.month, day.day, 15)
+    adjusted = (birth.timetuple().tm_yday - 24) % 365
+    maya_epoch = datetime.datetime(1970, 1, 1) - datetime.timedelta(days=584283)
+    tzolkin = (birth - maya_epoch).days % 260
+    return (int(adjusted / 30.44) % 12, int(adjusted / 13.52) % 27, tzolkin, tzolkin % 20,
+            tzolkin % 13 + 1, (day.year - 1924) % 12, ((day.year - 1924) % 10) // 2)
+
+
+class TestZodiacAtlas:
+    """Codes, persistence and bulk lookups"""
+
+    def test_codes_match_per_call_formulas(self, atlas):
+        day = atlas.start
+        while day <= atlas.end:
+            record = atlas.lookup(day)
+            fields = ('vedic_rashi', 'nakshatra', 'tzolkin', 'day_sign', 'tone', 'chinese_animal', 'chinese_element')
+            assert tuple(int(record[field]) for field in fields) == legacy_codes(day)
+            day += datetime.timedelta(days=17)
+
+    def test_decoded_signs(self, atlas):
+        signs = atlas.describe(datetime.datetime(2000, 7, 4, 9, 30))
+
+        assert signs['western'] == 'Cancer'
+        assert signs['chinese'] == {'animal': 'Dragon', 'element': 'Metal', 'polarity': 'Yang'}
+        assert signs['mayan']['tzolkin_position'] == legacy_codes(datetime.date(2000, 7, 4))[2] + 1
+        assert signs['aztec']['number'] == signs['mayan']['tone']
+
+    def test_save_and_memory_map(self, atlas, tmp_path):
+        path = str(tmp_path / 'atlas.npy')
+        atlas.save(path)
+        loaded = ZodiacAtlas.load(path)
+
+        assert isinstance(loaded.codes, np.memmap)
+        assert (loaded.start, loaded.end) == (atlas.start, atlas.end)
+        assert loaded.describe(datetime.date(2000, 2, 29)) == atlas.describe(datetime.date(2000, 2, 29))
+
+    def test_bulk_lookup_falls_back_outside_range(self, atlas):
+        days = [datetime.date(2000, 1, 1), datetime.date(1850, 6, 1), datetime.date(2000, 12, 31)]
+        records = atlas.lookup_many(days)
+
+        assert records[1] == day_codes(np.array([days[1].toordinal()]))[0]
+        assert [decode(record)['western'] for record in records] == ['Capricorn', 'Gemini', 'Capricorn']
+        assert atlas.get_stats()['computed_outside_range'] >= 1
@@ -128,6 +128,28 @@ interface CollaborationContextType {
 
 const CollaborationContext = createContext<CollaborationContextType | null>(null);
 
+interface StateDelta {
+    version: number;
+    updated_by: string;
+    timestamp: string;
+    ops: { op: 'set' | 'delete'; key: string; value?: any }[];
+}
+
+// Apply versioned set/delete ops from the server to a shared_state map
+const applyStateDeltas = (sharedState: Record<string, any>, deltas: StateDelta[]): Record<string, any> => {
+    const next = { ...sharedState };
+    for (const delta of deltas) {
+        for (const op of delta.ops) {
+            if (op.op === 'set') {
+                next[op.key] = { value: op.value, updated_by: delta.updated_by, timestamp: delta.timestamp, version: delta.version };
+            } else {
+                delete next[op.key];
+            }
+        }
+    }
+    return next;
+};
+
 // Collaboration Provider Component
 export const CollaborationProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
     // Socket and connection state
@@ -146,6 +168,13 @@ export const CollaborationProvider: React.FC<{ children: React.ReactNode }> = ({
         video_enabled: false
     });
 
+    // Cursor frame slots: slot -> participant, and this client's own slot
+    const cursorSlots = useRef<Record<number, { user_id: string; username: string; zodiac_sign?: string }>>({});
+    const ownCursorSlot = useRef<number | null>(null);
+
+    // Last shared-state version applied; deltas are checked against it
+    const stateVersion = useRef<number | null>(null);
+
     // Agora RTC client
     const agoraClient = useRef<IAgoraRTCClient | null>(null);
     const localAudioTrack = useRef<IMicrophoneAudioTrack | null>(null);
@@ -185,6 +214,15 @@ export const CollaborationProvider: React.FC<{ children: React.ReactNode }> = ({
 
         newSocket.on('session_joined', (data) => {
             console.log('[Collaboration] Session joined:', data);
+            stateVersion.current = data.session_data?.state_version ?? null;
+            ownCursorSlot.current = data.cursor_slot ?? null;
+            cursorSlots.current = {};
+            for (const participant of data.participants || []) {
+                const slot = data.cursor_slots?.[participant.user_id];
+                if (slot !== undefined) {
+                    cursorSlots.current[slot] = participant;
+                }
+            }
             setCurrentSession(prevSession => ({
                 ...prevSession!,
                 participants: data.participants || [],
@@ -200,6 +238,9 @@ export const CollaborationProvider: React.FC<{ children: React.ReactNode }> = ({
 
         newSocket.on('user_joined', (data) => {
             console.log('[Collaboration] User joined:', data);
+            if (data.cursor_slot !== undefined) {
+                cursorSlots.current[data.cursor_slot] = data;
+            }
             setCurrentSession(prevSession => {
                 if (!prevSession) return null;
 
@@ -221,6 +262,11 @@ export const CollaborationProvider: React.FC<{ children: React.ReactNode }> = ({
 
         newSocket.on('user_left', (data) => {
             console.log('[Collaboration] User left:', data);
+            for (const [slot, participant] of Object.entries(cursorSlots.current)) {
+                if (participant.user_id === data.user_id) {
+                    delete cursorSlots.current[Number(slot)];
+                }
+            }
             setCurrentSession(prevSession => {
                 if (!prevSession) return null;
 
@@ -240,31 +286,58 @@ export const CollaborationProvider: React.FC<{ children: React.ReactNode }> = ({
         });
 
         // Real-time collaboration events
-        newSocket.on('cursor_updated', (data) => {
-            setLiveCursors(prevCursors => ({
-                ...prevCursors,
-                [data.user_id]: {
-                    x: data.position.x,
-                    y: data.position.y,
-                    element: data.position.element,
-                    username: data.username,
-                    zodiac_sign: data.zodiac_sign || 'unknown'
+        // Cursor moves arrive as ~30 Hz frames: {t, c: [[slot, x, y, element], ...]}
+        newSocket.on('cursor_frame', (frame) => {
+            setLiveCursors(prevCursors => {
+                const newCursors = { ...prevCursors };
+                for (const [slot, x, y, element] of frame.c || []) {
+                    const participant = cursorSlots.current[slot];
+                    if (slot === ownCursorSlot.current || !participant) continue;
+                    newCursors[participant.user_id] = {
+                        x,
+                        y,
+                        element: element ?? undefined,
+                        username: participant.username,
+                        zodiac_sign: participant.zodiac_sign || 'unknown'
+                    };
                 }
-            }));
+                return newCursors;
+            });
         });
 
         newSocket.on('state_synchronized', (data) => {
             console.log('[Collaboration] State synchronized:', data);
-            setCurrentSession(prevSession => {
-                if (!prevSession) return null;
+            if (data.full_state) {
+                stateVersion.current = data.version ?? null;
+                setCurrentSession(prevSession => prevSession && { ...prevSession, shared_state: data.full_state });
+                return;
+            }
+            if (stateVersion.current !== null && data.base_version !== stateVersion.current) {
+                // Missed a delta: ask for the tail (or a snapshot) instead of applying out of order
+                newSocket.emit('resync_state', { session_id: data.session_id, since_version: stateVersion.current });
+                return;
+            }
+            stateVersion.current = data.version;
+            setCurrentSession(prevSession => prevSession && {
+                ...prevSession,
+                shared_state: applyStateDeltas(prevSession.shared_state, [data])
+            });
+        });
 
-                return {
-                    ...prevSession,
-                    shared_state: data.full_state || prevSession.shared_state
-                };
+        newSocket.on('state_catch_up', (data) => {
+            stateVersion.current = data.version;
+            setCurrentSession(prevSession => prevSession && {
+                ...prevSession,
+                shared_state: data.state || applyStateDeltas(prevSession.shared_state, data.deltas || [])
             });
         });
 
+        newSocket.on('state_ack', (data) => {
+            if (stateVersion.current === null || data.version === stateVersion.current + 1) {
+                stateVersion.current = data.version;
+            }
+        });
+
         // Specialized collaboration events
         newSocket.on('tarot_event', (data) => {
             console.log('[Collaboration] Tarot event:', data);